@@ -0,0 +1,135 @@
+"""
+Color palettes based on the IR Data Visualization Color Guidelines
+This file is created automatically. Do NOT edit manually.
+See: https://github.com/akita-international-university/ir-color-guide
+
+PALETTES maps the name of each palette to a read-only mapping of its
+"name", "variable_name", "type" and "description" strings and its
+"keys", "hex_values" and "rgb_values" tuples, in palette order.
+"""
+
+from types import MappingProxyType
+
+__version__ = "0.3.0"
+
+# fmt: off
+PALETTES = MappingProxyType({
+    "4-Scale Likert": MappingProxyType({
+        "name": "4-Scale Likert",
+        "variable_name": "4scale_likert",
+        "type": "diverging",
+        "description": "4-Scale Likert color palette from Strongly Agree to Strongly Disagree",
+        "keys": ("Strongly Agree", "Agree", "Disagree", "Strongly Disagree"),
+        "hex_values": ("#386325", "#8dbb54", "#d17dac", "#821851"),
+        "rgb_values": ((56, 99, 37), (141, 187, 84), (209, 125, 172), (130, 24, 81)),
+    }),
+    "AIU Grades": MappingProxyType({
+        "name": "AIU Grades",
+        "variable_name": "aiu_grades",
+        "type": "categorical",
+        "description": "Colors for AIU letter grades",
+        "keys": ("A+", "A", "A-", "B+", "B", "B-", "C+", "C", "C-", "D+", "D", "F", "P", "F*", "AP"),
+        "hex_values": ("#24693d", "#519c51", "#b3e0a6", "#2c5985", "#3b96b2", "#bce4d8", "#7c4d79", "#b27ba1", "#eec9e5", "#ca5422", "#ffc685", "#d3293d", "#5b8cb8", "#ffbeb2", "#4e79a7"),
+        "rgb_values": ((36, 105, 61), (81, 156, 81), (179, 224, 166), (44, 89, 133), (59, 150, 178), (188, 228, 216), (124, 77, 121), (178, 123, 161), (238, 201, 229), (202, 84, 34), (255, 198, 133), (211, 41, 61), (91, 140, 184), (255, 190, 178), (78, 121, 167)),
+    }),
+    "AIU Abbreviated Exam Types": MappingProxyType({
+        "name": "AIU Abbreviated Exam Types",
+        "variable_name": "aiu_abbreviated_exam_types",
+        "type": "categorical",
+        "description": "Colors for the abbreviated exam types at AIU",
+        "keys": ("A", "B", "C", "GS", "GW", "Sougou", "Recommendation", "International", "Gap", "Other Undergrad Exams", "Transfer (2nd yr) Sp. Non Degree", "Transfer (2nd yr)", "Transfer (Others)"),
+        "hex_values": ("#2a5783", "#5b8cb8", "#b9ddf1", "#24693d", "#b3e0a6", "#9e3d22", "#e36420", "#f59c3c", "#ffc685", "#9f3632", "#59504e", "#948c88", "#dcd4d0"),
+        "rgb_values": ((42, 87, 131), (91, 140, 184), (185, 221, 241), (36, 105, 61), (179, 224, 166), (158, 61, 34), (227, 100, 32), (245, 156, 60), (255, 198, 133), (159, 54, 50), (89, 80, 78), (148, 140, 136), (220, 212, 208)),
+    }),
+    "AIU Student Status": MappingProxyType({
+        "name": "AIU Student Status",
+        "variable_name": "aiu_student_status",
+        "type": "categorical",
+        "description": "Colors for the student status (現況区分) at AIU",
+        "keys": ("In School", "On leave", "Graduated", "Completed", "Withdrawn", "Expelled"),
+        "hex_values": ("#4e7fac", "#ffc685", "#24693d", "#59a253", "#9f3632", "#49525e"),
+        "rgb_values": ((78, 127, 172), (255, 198, 133), (36, 105, 61), (89, 162, 83), (159, 54, 50), (73, 82, 94)),
+    }),
+    "AIU Program Affiliation": MappingProxyType({
+        "name": "AIU Program Affiliation",
+        "variable_name": "aiu_program_affiliation",
+        "type": "categorical",
+        "description": "Colors for program affiliations for students, courses, and faculty members at AIU\n",
+        "keys": ("GB", "GS", "GC"),
+        "hex_values": ("#4e79a7", "#f28e2b", "#e15759"),
+        "rgb_values": ((78, 121, 167), (242, 142, 43), (225, 87, 89)),
+    }),
+    "AIU EAP Level at Enrollment": MappingProxyType({
+        "name": "AIU EAP Level at Enrollment",
+        "variable_name": "aiu_eap_level_at_enrollment",
+        "type": "categorical",
+        "description": "Colors for the EAP level at enrollment for undergraduate students at AIU",
+        "keys": ("EAP I", "EAP II", "EAP III", "EAP Bridge", "NA"),
+        "hex_values": ("#f4d166", "#a7bf5a", "#60a656", "#39894c", "#49525e"),
+        "rgb_values": ((244, 209, 102), (167, 191, 90), (96, 166, 86), (57, 137, 76), (73, 82, 94)),
+    }),
+    "AIU In-School Semesters": MappingProxyType({
+        "name": "AIU In-School Semesters",
+        "variable_name": "aiu_inschool_semesters",
+        "type": "categorical",
+        "description": "Colors for the in-school semesters at AIU",
+        "keys": ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12", "13", "14", "15", "16", "Exchange", "Other"),
+        "hex_values": ("#1ba3c6", "#2db7c0", "#2fbaa9", "#1fae81", "#38a452", "#6ca932", "#bcbd22", "#e4ba21", "#f8a61c", "#f88113", "#e74b21", "#e6343b", "#f43c63", "#fa6692", "#f075b0", "#d669be", "#a76dc2", "#9f3632", "#59504e"),
+        "rgb_values": ((27, 163, 198), (45, 183, 192), (47, 186, 169), (31, 174, 129), (56, 164, 82), (108, 169, 50), (188, 189, 34), (228, 186, 33), (248, 166, 28), (248, 129, 19), (231, 75, 33), (230, 52, 59), (244, 60, 99), (250, 102, 146), (240, 117, 176), (214, 105, 190), (167, 109, 194), (159, 54, 50), (89, 80, 78)),
+    }),
+    "AIU Course Levels": MappingProxyType({
+        "name": "AIU Course Levels",
+        "variable_name": "aiu_course_levels",
+        "type": "categorical",
+        "description": "Colors for the course levels at AIU",
+        "keys": ("700", "600", "500", "400", "300", "200", "100", "0"),
+        "hex_values": ("#b9ca5d", "#f1788d", "#8fb202", "#cf3e53", "#f3a546", "#b9ddf1", "#5b8cb8", "#2a5783"),
+        "rgb_values": ((185, 202, 93), (241, 120, 141), (143, 178, 2), (207, 62, 83), (243, 165, 70), (185, 221, 241), (91, 140, 184), (42, 87, 131)),
+    }),
+    "AIU Exchange Region": MappingProxyType({
+        "name": "AIU Exchange Region",
+        "variable_name": "aiu_exchange_region",
+        "type": "categorical",
+        "description": "Colors for regions for inbound exchange student origin or outbound student destination at AIU\n",
+        "keys": ("North America", "South America", "Europe", "Asia", "Oceania", "Africa", "※Other"),
+        "hex_values": ("#3599b8", "#8ad4eb", "#01b8aa", "#fe9666", "#dfbdbf", "#a66999", "#5f6b6d"),
+        "rgb_values": ((53, 153, 184), (138, 212, 235), (1, 184, 170), (254, 150, 102), (223, 189, 191), (166, 105, 153), (95, 107, 109)),
+    }),
+    "AIU Inbound Student Status": MappingProxyType({
+        "name": "AIU Inbound Student Status",
+        "variable_name": "aiu_inbound_student_status",
+        "type": "categorical",
+        "description": "Colors for inbound student status types at AIU",
+        "keys": ("New", "Continuing"),
+        "hex_values": ("#1abc9c", "#607d8b"),
+        "rgb_values": ((26, 188, 156), (96, 125, 139)),
+    }),
+    "AIU Inbound Student Status per Semester": MappingProxyType({
+        "name": "AIU Inbound Student Status per Semester",
+        "variable_name": "aiu_inbound_student_status_per_semester",
+        "type": "categorical",
+        "description": "Colors for inbound student status types per semester at AIU",
+        "keys": ("New - Spring", "New - Summer", "New - Fall", "New - Winter", "Continuing - Spring", "Continuing - Summer", "Continuing - Fall", "Continuing - Winter"),
+        "hex_values": ("#d1f2eb", "#a3e4d7", "#76d7c4", "#48c9b0", "#cfd8dc", "#b0bec5", "#90a4ae", "#78909c"),
+        "rgb_values": ((209, 242, 235), (163, 228, 215), (118, 215, 196), (72, 201, 176), (207, 216, 220), (176, 190, 197), (144, 164, 174), (120, 144, 156)),
+    }),
+    "AIU Inbound Student Length of Stay": MappingProxyType({
+        "name": "AIU Inbound Student Length of Stay",
+        "variable_name": "aiu_inbound_student_length_of_stay",
+        "type": "categorical",
+        "description": "Colors for inbound student length of stay category at AIU",
+        "keys": ("Intensive", "1 Semester", "1 Year", "Multi Year"),
+        "hex_values": ("#f5df4d", "#fa7268", "#0f4c81", "#5f4b8b"),
+        "rgb_values": ((245, 223, 77), (250, 114, 104), (15, 76, 129), (95, 75, 139)),
+    }),
+    "AIU Outbound Study Abroad Program": MappingProxyType({
+        "name": "AIU Outbound Study Abroad Program",
+        "variable_name": "aiu_outbound_study_abroad_program",
+        "type": "categorical",
+        "description": "Colors for study abroad program category at AIU\n",
+        "keys": ("EX", "EX (SP-B)", "EX-Opt", "EX-V", "FP", "FP(SP-A)", "※IS"),
+        "hex_values": ("#59a14f", "#4e79a7", "#a0cbe8", "#86bcb6", "#b07aa1", "#d4a6c8", "#ff9d9a"),
+        "rgb_values": ((89, 161, 79), (78, 121, 167), (160, 203, 232), (134, 188, 182), (176, 122, 161), (212, 166, 200), (255, 157, 154)),
+    }),
+})
+# fmt: on
@@ -0,0 +1,496 @@
+"""
+Benchmarks of the build on synthetic palette catalogs.
+Catalogs of 10, 1,000 and 100,000 palettes with 2 to 64 colors each
+and long Unicode names and keys are generated, and loading and compiling the palettes,
+generating each output and sanitizing the palette names are timed separately,
+so that a step that scales worse than linearly shows up as falling throughput.
+Loading is only benchmarked up to 10,000 palettes by default,
+since validating the YAML node tree of 100,000 palettes takes about 10 GB of memory.
+Results are saved as JSON, and can be compared against a baseline,
+failing when the throughput of a benchmark drops by more than a threshold.
+By defining it in pyproject.toml's [tool.poetry.scripts],
+it can be run as `poetry run benchmark`.
+"""
+
+import argparse
+import os
+import platform
+import random
+import tempfile
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from scripts import __version__
+from scripts.build import (
+    generate_r_script,
+    generate_tableau_preferences,
+    load_palettes,
+)
+from scripts.cache import get_cache_dir, load_json, save_json
+from scripts.compiler import compile_palettes, sanitize_variable_name
+from scripts.formatter import get_repo_root
+from scripts.model import PaletteCatalog
+from scripts.validator import PALETTE_TYPES
+
+# Version of the results format; results of other versions can't be compared
+BENCHMARK_VERSION = 1
+
+# Numbers of palettes of the benchmarked catalogs
+DEFAULT_SIZES = (10, 1000, 100000)
+
+# Range of the number of colors of a synthetic palette
+MIN_COLORS = 2
+MAX_COLORS = 64
+
+# Words of the synthetic names and keys, mixing scripts and combining characters
+UNICODE_WORDS = (
+    "学部",
+    "成績評価",
+    "入学試験",
+    "Ünïvërsité",
+    "Überblick",
+    "Établissement",
+    "Académico",
+    "Студенты",
+    "학생처",
+    "Ἀκαδημία",
+    "Ñandú",
+    "Łódź",
+)
+
+# Largest catalog whose loading is benchmarked by default; the YAML node tree
+# of a 10,000-palette catalog already takes about 1 GB of memory to validate
+DEFAULT_MAX_LOAD_SIZE = 10000
+
+# Default maximum drop of the throughput of a benchmark, as a fraction
+DEFAULT_THRESHOLD = 0.2
+
+
+class BenchmarkResult(NamedTuple):
+    """Timing of one benchmark on one catalog size."""
+
+    # Name of the benchmarked function
+    name: str
+    # Number of palettes of the catalog
+    palettes: int
+    # Number of colors of the catalog
+    colors: int
+    # Best time of the repetitions in seconds
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """Palettes processed per second."""
+        return self.palettes / self.seconds if self.seconds > 0 else float("inf")
+
+
+def make_unicode_text(rng: random.Random, words: int) -> str:
+    """
+    Make a text of random Unicode words.
+
+    Args:
+        rng: Random number generator
+        words: Number of words
+
+    Returns:
+        The words separated by spaces
+    """
+    return " ".join(rng.choice(UNICODE_WORDS) for _ in range(words))
+
+
+def iter_palettes(palette_count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Generate the palettes of a synthetic catalog as defined in palettes.yml,
+    one at a time, so that large catalogs aren't held in memory as dictionaries.
+    Palette names are unique, and so are the color keys within each palette.
+
+    Args:
+        palette_count: Number of palettes
+        seed: Seed of the random number generator; the same seed makes the same palettes
+
+    Yields:
+        Palette dictionaries
+    """
+    rng = random.Random(seed)
+    for index in range(palette_count):
+        colors = [
+            {
+                "key": f"{color_index + 1} {make_unicode_text(rng, 6)}",
+                "value": f"#{rng.getrandbits(24):06x}",
+            }
+            for color_index in range(rng.randint(MIN_COLORS, MAX_COLORS))
+        ]
+        yield {
+            "name": f"{make_unicode_text(rng, 3)} {index + 1}",
+            "type": PALETTE_TYPES[index % len(PALETTE_TYPES)],
+            "description": make_unicode_text(rng, 8),
+            "colors": colors,
+        }
+
+
+def quote_yaml(value: str) -> str:
+    """
+    Quote a string as a single-quoted YAML scalar.
+
+    Args:
+        value: String
+
+    Returns:
+        The quoted string
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+def write_catalog(palettes: Iterable[Dict[str, Any]], path: str) -> None:
+    """
+    Write palettes as a palettes.yml file, formatted like the real one.
+    It is formatted directly rather than with yaml.dump(),
+    which would take longer than the benchmarks of large catalogs.
+
+    Args:
+        palettes: Iterable of palette dictionaries
+        path: Path to the YAML file
+    """
+    with open(path, "w", encoding="utf-8", newline="\n") as file:
+        file.write("palettes:\n")
+        for palette in palettes:
+            file.write(
+                f"  - name: {quote_yaml(palette['name'])}\n"
+                f"    type: {quote_yaml(palette['type'])}\n"
+                f"    description: {quote_yaml(palette['description'])}\n"
+                "    colors:\n"
+            )
+            file.writelines(
+                f"      - key: {quote_yaml(color['key'])}\n"
+                f"        value: {quote_yaml(color['value'])}\n"
+                for color in palette["colors"]
+            )
+
+
+def time_best(function: Callable[[], Any], repeat: int) -> float:
+    """
+    Time a function, keeping the best of several runs to reduce noise.
+
+    Args:
+        function: Function to time
+        repeat: Number of runs
+
+    Returns:
+        Shortest run time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def get_benchmarks(
+    catalog: PaletteCatalog, tmp_dir: str
+) -> Dict[str, Callable[[], Any]]:
+    """
+    Get the benchmarked functions, bound to a catalog.
+    The outputs are generated from the catalog compiled once, as in the build.
+
+    Args:
+        catalog: Catalog of the benchmarks, also written to palettes.yml in tmp_dir
+            for load_palettes
+        tmp_dir: Directory of the input and output files
+
+    Returns:
+        Functions without arguments by name
+    """
+    names = [palette.name for palette in catalog]
+    compiled = compile_palettes(catalog)
+    return {
+        "load_palettes": lambda: load_palettes(os.path.join(tmp_dir, "palettes.yml")),
+        "compile_palettes": lambda: compile_palettes(catalog),
+        "generate_tableau_preferences": lambda: generate_tableau_preferences(
+            compiled, os.path.join(tmp_dir, "Preferences.tps")
+        ),
+        "generate_r_script": lambda: generate_r_script(
+            compiled, os.path.join(tmp_dir, "palettes.R")
+        ),
+        "sanitize_variable_name": lambda: [
+            sanitize_variable_name(name) for name in names
+        ],
+    }
+
+
+def get_skipped_benchmarks(
+    sizes: Sequence[int], max_load_size: int
+) -> List[Tuple[str, int]]:
+    """
+    Get the benchmarks that aren't run on catalogs too large to load.
+
+    Args:
+        sizes: Numbers of palettes of the catalogs
+        max_load_size: Largest catalog whose loading is benchmarked
+
+    Returns:
+        Name and catalog size of each skipped benchmark
+    """
+    return [("load_palettes", size) for size in sizes if size > max_load_size]
+
+
+def run_benchmarks(
+    sizes: Sequence[int],
+    repeat: int = 3,
+    seed: int = 0,
+    max_load_size: int = DEFAULT_MAX_LOAD_SIZE,
+) -> List[BenchmarkResult]:
+    """
+    Run every benchmark on a synthetic catalog of each size.
+
+    Args:
+        sizes: Numbers of palettes of the catalogs
+        repeat: Number of runs of each benchmark, of which the best is kept
+        seed: Seed of the synthetic catalogs
+        max_load_size: Largest catalog whose loading is benchmarked
+
+    Returns:
+        Result of each benchmark on each catalog size
+    """
+    results = []
+    skipped = set(get_skipped_benchmarks(sizes, max_load_size))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yaml_path = os.path.join(tmp_dir, "palettes.yml")
+        for size in sizes:
+            catalog = PaletteCatalog.from_dicts(iter_palettes(size, seed))
+            benchmarks = get_benchmarks(catalog, tmp_dir)
+            if ("load_palettes", size) in skipped:
+                print(f"Skipping load_palettes ({size:,} palettes): too large to load.")
+                del benchmarks["load_palettes"]
+            else:
+                write_catalog(iter_palettes(size, seed), yaml_path)
+            colors = sum(len(palette) for palette in catalog)
+            for name, function in benchmarks.items():
+                seconds = time_best(function, repeat)
+                results.append(BenchmarkResult(name, size, colors, seconds))
+                print(
+                    f"{name} ({size:,} palettes, {colors:,} colors): "
+                    f"{seconds * 1e3:.1f} ms"
+                )
+    return results
+
+
+def to_json(
+    results: Sequence[BenchmarkResult], skipped: Sequence[Tuple[str, int]] = ()
+) -> Dict[str, Any]:
+    """
+    Convert benchmark results to the structure of the results file.
+
+    Args:
+        results: Benchmark results
+        skipped: Name and catalog size of each benchmark that wasn't run
+
+    Returns:
+        Results with the versions of the benchmarked code and of Python
+    """
+    return {
+        "version": BENCHMARK_VERSION,
+        "package": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [
+            dict(result._asdict(), throughput=result.throughput) for result in results
+        ],
+        "skipped": [{"name": name, "palettes": size} for name, size in skipped],
+    }
+
+
+def from_json(data: Any) -> List[BenchmarkResult]:
+    """
+    Read benchmark results from the structure of the results file.
+
+    Args:
+        data: Decoded results file
+
+    Returns:
+        Benchmark results
+
+    Raises:
+        ValueError: If the data isn't a results file of this version
+    """
+    if not isinstance(data, dict) or data.get("version") != BENCHMARK_VERSION:
+        raise ValueError(f"Not a benchmark results file of version {BENCHMARK_VERSION}")
+    return [
+        BenchmarkResult(
+            entry["name"], entry["palettes"], entry["colors"], entry["seconds"]
+        )
+        for entry in data["results"]
+    ]
+
+
+def compare_results(
+    baseline: Sequence[BenchmarkResult],
+    current: Sequence[BenchmarkResult],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> Tuple[List[str], int]:
+    """
+    Compare the throughput of benchmark results against a baseline.
+    Benchmarks that only the current results have are skipped,
+    and those that only the baseline has are listed as not benchmarked.
+    Benchmarks too fast to time on either side aren't compared,
+    since their throughput is infinite.
+
+    Args:
+        baseline: Results to compare against
+        current: Results to compare
+        threshold: Maximum drop of the throughput, as a fraction of the baseline
+
+    Returns:
+        Lines of the comparison, and the number of benchmarks whose throughput
+            dropped by more than the threshold
+    """
+    baseline_results = {(result.name, result.palettes): result for result in baseline}
+    lines = []
+    regressions = 0
+    for result in current:
+        previous = baseline_results.pop((result.name, result.palettes), None)
+        if previous is None:
+            continue
+        if min(previous.seconds, result.seconds) <= 0:
+            lines.append(
+                f"{result.name} ({result.palettes:,} palettes): "
+                "too fast to time, not compared"
+            )
+            continue
+        change = result.throughput / previous.throughput - 1
+        regressed = change < -threshold
+        regressions += regressed
+        lines.append(
+            f"{result.name} ({result.palettes:,} palettes): "
+            f"{previous.throughput:,.0f} -> {result.throughput:,.0f} palettes/s "
+            f"({change:+.1%}){' REGRESSION' if regressed else ''}"
+        )
+    lines.extend(
+        f"{name} ({palettes:,} palettes): not benchmarked"
+        for name, palettes in baseline_results
+    )
+    return lines, regressions
+
+
+def parse_sizes(value: str) -> List[int]:
+    """
+    Parse the catalog sizes given on the command line.
+
+    Args:
+        value: Comma-separated numbers of palettes
+
+    Returns:
+        Numbers of palettes
+
+    Raises:
+        argparse.ArgumentTypeError: If a size isn't a positive integer
+    """
+    try:
+        sizes = [int(size) for size in value.split(",")]
+    except ValueError:
+        sizes = []
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError(
+            f"expected comma-separated positive integers: '{value}'"
+        )
+    return sizes
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Run the benchmarks, save their results and optionally compare them.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the build on synthetic palette catalogs."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=list(DEFAULT_SIZES),
+        metavar="N,N,...",
+        help="numbers of palettes of the catalogs (default: 10,1000,100000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs of each benchmark, of which the best is kept (default: 3)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the synthetic catalogs"
+    )
+    parser.add_argument(
+        "--max-load-size",
+        type=int,
+        default=DEFAULT_MAX_LOAD_SIZE,
+        metavar="N",
+        help=(
+            "benchmark load_palettes only on catalogs of up to N palettes, "
+            "since parsing needs about 100 kB of memory per palette "
+            "(default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="results file to write (default: .build_cache/benchmark.json)",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        help="exit with an error if a throughput dropped against this results file",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="maximum drop of the throughput as a fraction (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error(f"--repeat must be positive: {args.repeat}")
+
+    # Read the baseline first, so that an invalid one fails before benchmarking
+    baseline = None
+    if args.compare:
+        try:
+            baseline = from_json(load_json(args.compare))
+        except ValueError as e:
+            parser.error(f"{args.compare}: {e}")
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed, args.max_load_size)
+    skipped = get_skipped_benchmarks(args.sizes, args.max_load_size)
+    output_path = args.output or os.path.join(
+        get_cache_dir(get_repo_root()), "benchmark.json"
+    )
+    save_json(output_path, to_json(results, skipped))
+    print(f"Saved the results to {output_path}.")
+    for name, size in skipped:
+        print(
+            f"Not benchmarked: {name} ({size:,} palettes), "
+            f"larger than --max-load-size {args.max_load_size:,}."
+        )
+
+    if baseline is not None:
+        lines, regressions = compare_results(baseline, results, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(
+                f"{regressions} benchmark(s) lost more than {args.threshold:.0%} "
+                "of their throughput."
+            )
+            raise SystemExit(1)
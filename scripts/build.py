@@ -1,214 +1,1518 @@
 """
-Script to convert palettes.yml into Tableau Preferences.tps and R script files.
+Script to convert palettes.yml into Tableau Preferences.tps, R script,
+CSS, SASS, JSON and Python files.
+Palettes can also be split into YAML files in palettes.d/, merged after palettes.yml.
 """
 
+# pylint: disable=too-many-lines
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from contextvars import copy_context
+import glob
+import hashlib
+from io import BufferedReader
+import json
 import os
-import subprocess
-from typing import Any, Dict, List
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
+import unicodedata
 
 import yaml
 
+from scripts import __version__
+from scripts.cache import (
+    bytes_digest,
+    file_digest,
+    get_cache_dir,
+    load_json,
+    save_json,
+)
+
+# The helpers moved to scripts.compiler are re-exported for existing callers
+from scripts.compiler import (  # pylint: disable=unused-import
+    CompiledPalette,
+    PaletteLike,
+    as_compiled,
+    compile_palettes,
+    format_r_type,
+    get_tableau_type,
+    sanitize_variable_name,
+)
+from scripts.model import PaletteCatalog
+from scripts.profiler import Profiler, phase, record_bytes, record_file
+from scripts.validator import VALIDATOR_VERSION, load_validated
+
+# Use the libyaml-based loader when PyYAML was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# Identifies the loader in the parsed-result cache
+YAML_LOADER_VERSION = f"PyYAML {yaml.__version__} {YamlLoader.__name__}"
+
+# Directory of additional palette files, merged after palettes.yml
+PALETTE_DIR_NAME = "palettes.d"
+
+# Bumped whenever the layout of the build manifest changes
+MANIFEST_VERSION = 2
+
+# Print width used by Prettier, which formats Preferences.tps as HTML
+PRETTIER_PRINT_WIDTH = 80
 
-def load_palettes(yaml_path: str) -> List[Dict[str, Any]]:
+# Fixed parts of the Tableau Preferences.tps file
+TABLEAU_HEADER = (
+    "<?xml version='1.0'?>\n"
+    "<workbook>\n"
+    "  <preferences>\n"
+    "    <!-- Color palettes based on the IR Data Visualization Color Guidelines -->\n"
+    "    <!-- This file is created automatically. Do NOT edit manually. -->\n"
+    "    <!-- See: https://github.com/akita-international-university/ir-color-guide -->\n"
+)
+TABLEAU_FOOTER = "  </preferences>\n</workbook>\n"
+
+# Fixed parts of the R script file
+R_HEADER = (
+    "# Color palettes based on the IR Data Visualization Color Guidelines\n"
+    "# This file is created automatically. Do NOT edit manually.\n"
+    "# See: https://github.com/akita-international-university/ir-color-guide\n"
+)
+R_FOOTER = ""
+
+# Fixed parts of the CSS and SASS files
+CSS_HEADER = (
+    "/* Color palettes based on the IR Data Visualization Color Guidelines */\n"
+    "/* This file is created automatically. Do NOT edit manually. */\n"
+    "/* See: https://github.com/akita-international-university/ir-color-guide */\n"
+)
+CSS_FOOTER = ""
+SASS_HEADER = (
+    "// Color palettes based on the IR Data Visualization Color Guidelines\n"
+    "// This file is created automatically. Do NOT edit manually.\n"
+    "// See: https://github.com/akita-international-university/ir-color-guide\n"
+)
+SASS_FOOTER = ""
+
+# Fixed parts of the Python module, which only imports the types module,
+# so that importing it costs little more than loading its bytecode.
+# Black leaves the palettes as they are written, one palette field per line.
+PYTHON_HEADER = (
+    '"""\n'
+    "Color palettes based on the IR Data Visualization Color Guidelines\n"
+    "This file is created automatically. Do NOT edit manually.\n"
+    "See: https://github.com/akita-international-university/ir-color-guide\n"
+    "\n"
+    "PALETTES maps the name of each palette to a read-only mapping of its\n"
+    '"name", "variable_name", "type" and "description" strings and its\n'
+    '"keys", "hex_values" and "rgb_values" tuples, in palette order.\n'
+    '"""\n'
+    "\n"
+    "from types import MappingProxyType\n"
+    "\n"
+    f'__version__ = "{__version__}"\n'
+    "\n"
+    "# fmt: off\n"
+    "PALETTES = MappingProxyType({\n"
+)
+PYTHON_FOOTER = "})\n# fmt: on\n"
+
+
+def load_palette_dicts(
+    yaml_path: str, cache_dir: Optional[str] = None, cached_only: bool = False
+) -> Optional[List[Dict[str, Any]]]:
     """
-    Load palettes from the YAML file.
+    Load the palette dictionaries of a YAML file.
+    If a cache directory is given, the validated palettes are cached there,
+    keyed by the content of the YAML file and the YAML loader version,
+    so that repeated loads of an unchanged file skip YAML parsing.
+    Each file has a cache entry of its own.
 
     Args:
-        yaml_path: Path to the palettes.yml file
+        yaml_path: Path to the palettes YAML file
+        cache_dir: Path to the cache directory, or None to disable caching
+        cached_only: Return None instead of parsing the file if it isn't cached
 
     Returns:
-        List of palette dictionaries
+        List of palette dictionaries as defined in the file,
+        or None if cached_only is set and the file isn't cached
 
     Raises:
         FileNotFoundError: If the YAML file doesn't exist
         yaml.YAMLError: If the YAML file is malformed
+        ValueError: If the 'palettes' key is missing
+        PaletteValidationError: If the palettes have problems, listing all of them
     """
     try:
         with open(yaml_path, "r", encoding="utf-8") as file:
-            data = yaml.safe_load(file)
+            text = file.read()
     except FileNotFoundError as e:
         raise FileNotFoundError(f"YAML file not found: {yaml_path}") from e
+
+    cache_path = None
+    cache_key = ""
+    if cache_dir is not None:
+        # One cache entry per source file, valid only for the same content and loader
+        path_key = bytes_digest(os.path.abspath(yaml_path).encode("utf-8"))
+        cache_path = os.path.join(cache_dir, "palettes", f"{path_key}.json")
+        cache_key = bytes_digest(
+            f"{YAML_LOADER_VERSION}\n{VALIDATOR_VERSION}\n{text}".encode("utf-8")
+        )
+        cached = load_json(cache_path)
+        if isinstance(cached, dict) and cached.get("key") == cache_key:
+            return cached["palettes"]
+    if cached_only:
+        return None
+
+    try:
+        data = load_validated(text, yaml_path, YamlLoader)
     except yaml.YAMLError as e:
         raise yaml.YAMLError(f"Error parsing YAML file: {yaml_path}") from e
 
-    if not data or "palettes" not in data:
-        raise ValueError("YAML file must contain 'palettes' key")
+    palettes = data["palettes"]
+    if cache_path is not None:
+        try:
+            save_json(cache_path, {"key": cache_key, "palettes": palettes})
+        except (OSError, TypeError, ValueError):
+            # Caching is an optimization only; values JSON can't represent are not cached
+            pass
+    return palettes
+
+
+def load_palettes(yaml_path: str, cache_dir: Optional[str] = None) -> PaletteCatalog:
+    """
+    Load palettes from the YAML file, see load_palette_dicts().
+
+    Args:
+        yaml_path: Path to the palettes.yml file
+        cache_dir: Path to the cache directory, or None to disable caching
+
+    Returns:
+        Catalog of the palettes
+
+    Raises:
+        FileNotFoundError: If the YAML file doesn't exist
+        yaml.YAMLError: If the YAML file is malformed
+        ValueError: If the 'palettes' key is missing
+        PaletteValidationError: If the palettes have problems, listing all of them
+    """
+    return PaletteCatalog.from_dicts(load_palette_dicts(yaml_path, cache_dir) or [])
+
 
-    return data.get("palettes", [])
+def get_palette_paths(repo_root: str) -> List[str]:
+    """
+    Get the paths of the palette files in the order their palettes are merged:
+    palettes.yml first, then the YAML files in palettes.d/ sorted by file name.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        List of paths to the palette files
+    """
+    return list_palette_files(os.path.join(repo_root, "palettes.yml"))
 
 
-def get_tableau_type(palette_type: str) -> str:
+def list_palette_files(yaml_path: str) -> List[str]:
     """
-    Convert palette type to Tableau type.
+    Get the paths of a palette file and of the YAML files in the palettes.d/
+    directory next to it, in the order their palettes are merged.
 
     Args:
-        palette_type: Type from palettes.yml (categorical, sequential, diverging)
+        yaml_path: Path to the main palette file, usually palettes.yml
 
     Returns:
-        Tableau type string (regular, ordered-sequential, ordered-diverging)
+        List of paths to the palette files, starting with yaml_path
     """
-    type_mapping = {
-        "categorical": "regular",
-        "sequential": "ordered-sequential",
-        "diverging": "ordered-diverging",
+    palette_dir = os.path.join(os.path.dirname(yaml_path), PALETTE_DIR_NAME)
+    paths = [
+        path
+        for pattern in ("*.yml", "*.yaml")
+        for path in glob.glob(os.path.join(glob.escape(palette_dir), pattern))
+    ]
+    return [yaml_path, *sorted(paths)]
+
+
+def find_duplicate_names(sources: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """
+    Find the palette names defined in more than one palette file.
+    Duplicates within one file are reported by the validator instead.
+
+    Args:
+        sources: Mapping of the paths of the palette files to their palettes,
+            in merge order
+
+    Returns:
+        One message per duplicate palette name
+    """
+    first_paths: Dict[str, str] = {}
+    messages = []
+    for path, palettes in sources.items():
+        for name in dict.fromkeys(str(palette.get("name")) for palette in palettes):
+            first_path = first_paths.setdefault(name, path)
+            if first_path != path:
+                messages.append(
+                    f"Duplicate palette name '{name}' in {path} "
+                    f"(first defined in {first_path})"
+                )
+    return messages
+
+
+def load_palette_files(
+    yaml_paths: Sequence[str],
+    cache_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> PaletteCatalog:
+    """
+    Load the palettes of several YAML files and merge them in the order of the paths.
+    The files that aren't cached are parsed in parallel on a process pool,
+    since YAML parsing is CPU-bound; a single file is parsed in this process.
+
+    Args:
+        yaml_paths: Paths to the palette files, in merge order
+        cache_dir: Path to the cache directory, or None to disable caching
+        max_workers: Maximum number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        Catalog of the palettes of all files
+
+    Raises:
+        FileNotFoundError: If a YAML file doesn't exist
+        yaml.YAMLError: If a YAML file is malformed
+        ValueError: If a file has no 'palettes' key, or two files define
+            a palette with the same name
+        PaletteValidationError: If the palettes of a file have problems
+    """
+    sources = {
+        path: load_palette_dicts(path, cache_dir, cached_only=True)
+        for path in yaml_paths
     }
-    return type_mapping.get(palette_type, "regular")
+    pending = [path for path, palettes in sources.items() if palettes is None]
+    if len(pending) > 1:
+        workers = min(len(pending), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = executor.map(
+                load_palette_dicts, pending, [cache_dir] * len(pending)
+            )
+            sources.update(zip(pending, parsed))
+    else:
+        sources.update((path, load_palette_dicts(path, cache_dir)) for path in pending)
+
+    merged = {path: palettes or [] for path, palettes in sources.items()}
+    duplicates = find_duplicate_names(merged)
+    if duplicates:
+        raise ValueError(
+            "\n".join(
+                ["Palette files define the same palettes:"]
+                + [f"  {message}" for message in duplicates]
+            )
+        )
+    return PaletteCatalog.from_dicts(
+        palette for palettes in merged.values() for palette in palettes
+    )
 
 
-def generate_tableau_preferences(palettes: List[Dict[str, Any]], output_path: str):
+def get_display_width(text: str) -> int:
     """
-    Generate Tableau Preferences.tps file from palettes.
+    Get the width of a text in columns, measured the way Prettier measures it:
+    wide and fullwidth characters, such as CJK ones, count as two columns,
+    and control and combining characters as none.
 
     Args:
-        palettes: List of palette dictionaries
-        output_path: Path to output Preferences.tps file
+        text: Text to measure
+
+    Returns:
+        Width of the text in columns
     """
-    lines = ["<?xml version='1.0'?>", "<workbook>", "  <preferences>"]
+    if text.isascii():
+        return len(text)
+    width = 0
+    for character in text:
+        code_point = ord(character)
+        if code_point <= 0x1F or 0x7F <= code_point <= 0x9F:
+            continue
+        if 0x300 <= code_point <= 0x36F:
+            continue
+        width += 2 if unicodedata.east_asian_width(character) in "WF" else 1
+    return width
 
-    # Add header comments
-    lines.extend(
-        [
-            "    <!-- Color palettes based on the IR Data Visualization Color Guidelines -->",
-            "    <!-- This file is created automatically. Do NOT edit manually. -->",
-            "    <!-- See: https://github.com/akita-international-university/ir-color-guide -->",
-        ]
+
+def format_tableau_start_tag(
+    tag: str, attributes: Dict[str, str], indent: str
+) -> List[str]:
+    """
+    Format an element's start tag the way Prettier formats HTML,
+    so that the generated Preferences.tps file needs no further formatting.
+    A tag that doesn't fit in the print width gets one attribute per line.
+
+    Args:
+        tag: Tag name
+        attributes: Mapping of attribute names to their values
+        indent: Indentation of the tag
+
+    Returns:
+        Lines of the formatted start tag
+    """
+    attribute_strings = [f'{name}="{value}"' for name, value in attributes.items()]
+    line = f"{indent}<{' '.join([tag, *attribute_strings])}>"
+    if get_display_width(line) <= PRETTIER_PRINT_WIDTH:
+        return [line]
+    return [
+        f"{indent}<{tag}",
+        *(f"{indent}  {attribute}" for attribute in attribute_strings),
+        f"{indent}>",
+    ]
+
+
+def render_tableau_palette(palette: PaletteLike) -> str:
+    """
+    Render a single <color-palette> element of the Tableau Preferences.tps file.
+
+    Args:
+        palette: Palette to render, compiled if it isn't already
+
+    Returns:
+        The element as a string of newline-terminated lines
+    """
+    palette = as_compiled(palette)
+    # Add color-palette element
+    lines = format_tableau_start_tag(
+        "color-palette", {"name": palette.name, "type": palette.tableau_type}, "    "
     )
 
-    for palette in palettes:
-        name = palette.get("name", "")
-        palette_type = palette.get("type", "categorical")
-        description = palette.get("description", "")
-        colors = palette.get("colors", [])
+    # Add description as comment
+    if palette.description:
+        lines.append(f"      <!-- {palette.description} -->")
+
+    # Add colors with keys as comments
+    for key, value in zip(palette.keys, palette.hex_values):
+        lines.append(f"      <!-- {key} -->")
+        lines.append(f"      <color>{value}</color>")
+
+    lines.append("    </color-palette>")
+    return "".join(f"{line}\n" for line in lines)
 
-        tableau_type = get_tableau_type(palette_type)
 
-        # Add color-palette element
-        lines.append(f'    <color-palette name="{name}" type="{tableau_type}">')
+def iter_tableau_preferences(palettes: Iterable[PaletteLike]) -> Iterator[str]:
+    """
+    Generate the content of the Tableau Preferences.tps file chunk by chunk.
+    The generator yields the header, then one chunk per palette, then the footer,
+    so that only a single palette is held in memory at a time.
 
-        # Add description as comment
-        if description:
-            lines.append(f"      <!-- {description} -->")
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
 
-        # Add colors with keys as comments
-        for color in colors:
-            key = color.get("key", "")
-            value = color.get("value", "")
-            lines.append(f"      <!-- {key} -->")
-            lines.append(f"      <color>{value}</color>")
+    Yields:
+        Chunks of the file content
+    """
+    yield TABLEAU_HEADER
+    for palette in palettes:
+        yield render_tableau_palette(palette)
+    yield TABLEAU_FOOTER
 
-        lines.append("    </color-palette>")
 
-    lines.extend(["  </preferences>", "</workbook>"])
+def write_tableau_preferences(palettes: Iterable[PaletteLike], stream: TextIO) -> None:
+    """
+    Write the content of the Tableau Preferences.tps file into a text stream.
 
-    # Write to file
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
+        stream: Writable text stream
+    """
+    for chunk in iter_tableau_preferences(palettes):
+        stream.write(chunk)
+
+
+def generate_tableau_preferences(palettes: Iterable[PaletteLike], output_path: str):
+    """
+    Generate Tableau Preferences.tps file from palettes.
+
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
+        output_path: Path to output Preferences.tps file
+    """
     with open(output_path, "w", encoding="utf-8", newline="\n") as file:
-        file.write("\n".join(lines) + "\n")
+        write_tableau_preferences(palettes, file)
 
 
-def sanitize_variable_name(name: str) -> str:
+def render_r_palette(palette: PaletteLike) -> str:
     """
-    Convert palette name to a valid R variable name.
+    Render a single color_values_* definition of the R script,
+    preceded by the blank line that separates it from the previous block.
 
     Args:
-        name: Palette name
+        palette: Palette to render, compiled if it isn't already
 
     Returns:
-        Sanitized variable name in snake_case
+        The definition as a string of newline-terminated lines
     """
-    # Convert to lowercase and replace spaces with underscores
-    sanitized = name.lower().replace(" ", "_")
-    # Remove any characters that aren't alphanumeric or underscore
-    sanitized = "".join(c for c in sanitized if c.isalnum() or c == "_")
-    return sanitized
+    palette = as_compiled(palette)
+    lines = [
+        "",  # Add blank line between palettes
+        f"color_values_{palette.variable_name} <- c(",
+        f"    # Type: {palette.type_label}",
+        f"    # Description: {palette.description}",
+    ]
 
+    # Add color entries
+    last = len(palette.keys) - 1
+    for i, (key, value) in enumerate(zip(palette.keys, palette.hex_values)):
+        # Last item should not have a comma
+        comma = "," if i < last else ""
+        lines.append(f'    "{key}" = "{value}"{comma}')
 
-def format_r_type(palette_type: str) -> str:
+    lines.append(")")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def iter_r_script(palettes: Iterable[PaletteLike]) -> Iterator[str]:
     """
-    Format palette type for R comments.
+    Generate the content of the R script file chunk by chunk.
+    The generator yields the header, then one chunk per palette, then the footer,
+    so that only a single palette is held in memory at a time.
 
     Args:
-        palette_type: Type from palettes.yml
+        palettes: Iterable of palettes, compiled if they aren't already
 
-    Returns:
-        Capitalized type string
+    Yields:
+        Chunks of the file content
     """
-    return palette_type.capitalize()
+    yield R_HEADER
+    for palette in palettes:
+        yield render_r_palette(palette)
+    yield R_FOOTER
 
 
-def generate_r_script(palettes: List[Dict[str, Any]], output_path: str):
+def write_r_script(palettes: Iterable[PaletteLike], stream: TextIO) -> None:
+    """
+    Write the content of the R script file into a text stream.
+
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
+        stream: Writable text stream
+    """
+    for chunk in iter_r_script(palettes):
+        stream.write(chunk)
+
+
+def generate_r_script(palettes: Iterable[PaletteLike], output_path: str):
     """
     Generate R script file from palettes.
 
     Args:
-        palettes: List of palette dictionaries
+        palettes: Iterable of palettes, compiled if they aren't already
         output_path: Path to output R script file
     """
-    lines = [
-        "# Color palettes based on the IR Data Visualization Color Guidelines",
-        "# This file is created automatically. Do NOT edit manually.",
-        "# See: https://github.com/akita-international-university/ir-color-guide",
-        "",
-    ]
+    with open(output_path, "w", encoding="utf-8", newline="\n") as file:
+        write_r_script(palettes, file)
+
+
+def format_css_comment(text: str) -> str:
+    """
+    Format text as a CSS comment, which can't contain its end delimiter.
+
+    Args:
+        text: Text of the comment
+
+    Returns:
+        The comment, e.g. "/* text */"
+    """
+    return f"/* {text.replace('*/', '* /')} */"
+
+
+def render_css_palette(palette: PaletteLike) -> str:
+    """
+    Render a :root rule with a custom property per color of a palette,
+    preceded by the blank line that separates it from the previous block.
+    The properties are named --<palette>-<key>, e.g. --aiu-grades-a\\+.
+
+    Args:
+        palette: Palette to render, compiled if it isn't already
+
+    Returns:
+        The rule as a string of newline-terminated lines
+    """
+    palette = as_compiled(palette)
+    summary = f"{palette.name} ({palette.type})"
+    if palette.description:
+        summary += f": {palette.description}"
+    lines = ["", format_css_comment(summary), ":root {"]
+    for css_key, value in zip(palette.css_keys, palette.hex_values):
+        lines.append(f"  --{palette.css_name}-{css_key}: {value};")
+    lines.append("}")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def iter_css_properties(palettes: Iterable[PaletteLike]) -> Iterator[str]:
+    """
+    Generate the content of the CSS file of custom properties chunk by chunk.
+    The generator yields the header, then one chunk per palette, then the footer.
+
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
+
+    Yields:
+        Chunks of the file content
+    """
+    yield CSS_HEADER
+    for palette in palettes:
+        yield render_css_palette(palette)
+    yield CSS_FOOTER
+
+
+def quote_sass_string(value: str) -> str:
+    """
+    Quote a string for SCSS the way Prettier does with singleQuote,
+    preferring single quotes unless the string contains more of them.
+
+    Args:
+        value: String to quote
+
+    Returns:
+        The quoted string
+    """
+    quote = '"' if value.count("'") > value.count('"') else "'"
+    escaped = value.replace("\\", "\\\\").replace(quote, f"\\{quote}")
+    return f"{quote}{escaped}{quote}"
 
+
+def render_sass_palette(palette: PaletteLike) -> str:
+    """
+    Render a $color-values-* map of a palette's color keys to its colors,
+    preceded by the blank line that separates it from the previous block.
+
+    Args:
+        palette: Palette to render, compiled if it isn't already
+
+    Returns:
+        The map as a string of newline-terminated lines
+    """
+    palette = as_compiled(palette)
+    lines = ["", f"// Type: {palette.type_label}"]  # Blank line between palettes
+    if palette.description:
+        lines.append(f"// Description: {palette.description}")
+    variable = f"$color-values-{palette.css_name}"
+    if not palette.keys:
+        lines.append(f"{variable}: ();")
+    else:
+        lines.append(f"{variable}: (")
+        for key, value in zip(palette.keys, palette.hex_values):
+            lines.append(f"  {quote_sass_string(key)}: {value},")
+        lines.append(");")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def iter_sass_maps(palettes: Iterable[PaletteLike]) -> Iterator[str]:
+    """
+    Generate the content of the SASS file of palette maps chunk by chunk.
+    The generator yields the header, then one chunk per palette, then the footer.
+
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
+
+    Yields:
+        Chunks of the file content
+    """
+    yield SASS_HEADER
     for palette in palettes:
-        name = palette.get("name", "")
-        palette_type = palette.get("type", "categorical")
-        description = palette.get("description", "")
-        colors = palette.get("colors", [])
+        yield render_sass_palette(palette)
+    yield SASS_FOOTER
 
-        variable_name = f"color_values_{sanitize_variable_name(name)}"
 
-        lines.append(f"{variable_name} <- c(")
-        lines.append(f"    # Type: {format_r_type(palette_type)}")
-        lines.append(f"    # Description: {description}")
+def iter_json(palettes: Iterable[PaletteLike]) -> Iterator[str]:
+    """
+    Generate the content of the JSON file of the palettes.
+    The separators between the palettes depend on their positions,
+    so the file is yielded as a single chunk and rendered fully on every build.
 
-        # Add color entries
-        for i, color in enumerate(colors):
-            key = color.get("key", "")
-            value = color.get("value", "")
-            # Last item should not have a comma
-            comma = "," if i < len(colors) - 1 else ""
-            lines.append(f'    "{key}" = "{value}"{comma}')
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
 
-        lines.append(")")
-        lines.append("")  # Add blank line between palettes
+    Yields:
+        The file content
+    """
+    data = {
+        "palettes": [
+            {
+                "name": palette.name,
+                "variable_name": palette.variable_name,
+                "type": palette.type,
+                "description": palette.description,
+                "colors": [
+                    {"key": key, "value": value}
+                    for key, value in zip(palette.keys, palette.hex_values)
+                ],
+            }
+            for palette in map(as_compiled, palettes)
+        ]
+    }
+    yield json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+
+
+def quote_python_string(value: str) -> str:
+    """
+    Quote a string for Python, preferring double quotes the way black does.
+
+    Args:
+        value: String to quote
+
+    Returns:
+        The string literal
+    """
+    literal = repr(value)
+    # repr() only escapes single quotes if the string contains both kinds
+    if literal.startswith("'") and '"' not in value:
+        literal = f'"{literal[1:-1]}"'
+    return literal
 
-    # Write to file
-    with open(output_path, "w", encoding="utf-8", newline="\n") as file:
-        file.write("\n".join(lines))
 
+def format_python_tuple(items: Sequence[str]) -> str:
+    """
+    Format a tuple literal of items already formatted as Python expressions.
+
+    Args:
+        items: Python expressions of the items
 
-def main():
+    Returns:
+        The tuple literal, e.g. "()", "(1,)" or "(1, 2)"
     """
-    Main function to convert palettes.yml to Tableau and R files.
+    if len(items) == 1:
+        return f"({items[0]},)"
+    return f"({', '.join(items)})"
+
+
+def render_python_palette(palette: PaletteLike) -> str:
+    """
+    Render the entry of a palette in the PALETTES mapping of the Python module.
+    Every entry ends with a comma, so entries don't depend on their positions.
+
+    Args:
+        palette: Palette to render, compiled if it isn't already
+
+    Returns:
+        The entry as a string of newline-terminated lines
     """
+    palette = as_compiled(palette)
+    fields = {
+        "name": quote_python_string(palette.name),
+        "variable_name": quote_python_string(palette.variable_name),
+        "type": quote_python_string(palette.type),
+        "description": quote_python_string(palette.description),
+        "keys": format_python_tuple([quote_python_string(k) for k in palette.keys]),
+        "hex_values": format_python_tuple(
+            [quote_python_string(value) for value in palette.hex_values]
+        ),
+        "rgb_values": format_python_tuple([str(rgb) for rgb in palette.rgb_values]),
+    }
+    lines = [f"    {quote_python_string(palette.name)}: MappingProxyType({{"]
+    lines.extend(f'        "{field}": {value},' for field, value in fields.items())
+    lines.append("    }),")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def iter_python_module(palettes: Iterable[PaletteLike]) -> Iterator[str]:
+    """
+    Generate the content of the Python module of the palettes chunk by chunk.
+    The generator yields the header, then one chunk per palette, then the footer.
+
+    Args:
+        palettes: Iterable of palettes, compiled if they aren't already
+
+    Yields:
+        Chunks of the file content
+    """
+    yield PYTHON_HEADER
+    for palette in palettes:
+        yield render_python_palette(palette)
+    yield PYTHON_FOOTER
+
+
+class EmitterTarget(NamedTuple):
+    """An output file generated from the palettes."""
+
+    # Unique name of the target, also used as its key in the build manifest
+    name: str
+    # Path of the output file relative to the repository root, separated by "/"
+    path: str
+    # Function yielding the content of the output file chunk by chunk
+    emit: Callable[[Iterable[CompiledPalette]], Iterator[str]]
+    # Human-readable description of the output file
+    description: str
+
+
+# Registry of the output files generated by the build, in registration order
+EMITTER_TARGETS: Dict[str, EmitterTarget] = {}
+
+
+def register_emitter(
+    name: str,
+    path: str,
+    emit: Callable[[Iterable[CompiledPalette]], Iterator[str]],
+    description: str,
+) -> EmitterTarget:
+    """
+    Register an output file to be generated by the build.
+
+    Args:
+        name: Unique name of the target
+        path: Path of the output file relative to the repository root
+        emit: Function yielding the content of the output file chunk by chunk
+        description: Human-readable description of the output file
+
+    Returns:
+        The registered target
+
+    Raises:
+        ValueError: If a target with the same name is already registered
+    """
+    if name in EMITTER_TARGETS:
+        raise ValueError(f"Emitter target already registered: {name}")
+    target = EmitterTarget(name, path, emit, description)
+    EMITTER_TARGETS[name] = target
+    return target
+
+
+def get_output_path(repo_root: str, target: EmitterTarget) -> str:
+    """
+    Get the absolute path of a target's output file.
+
+    Args:
+        repo_root: Path to the repository root
+        target: Emitter target
+
+    Returns:
+        Path to the output file
+    """
+    return os.path.join(repo_root, *target.path.split("/"))
+
+
+def locate_chunks(
+    file: BufferedReader, layout: Dict[str, Any]
+) -> Dict[str, Tuple[int, int]]:
+    """
+    Locate the palette chunks of a previously generated output file,
+    reading the file block by block rather than into memory.
+
+    Args:
+        file: Previous output file, opened for reading in binary mode
+        layout: Chunk layout of the file recorded by write_target()
+
+    Returns:
+        Mapping of palette digests to the byte offsets and lengths of their chunks,
+        or an empty mapping if the file doesn't match the layout
+    """
+    if hashlib.file_digest(file, "sha256").hexdigest() != layout.get("digest"):
+        return {}
+    chunks = {}
+    offset = layout["header"]
+    for digest, length in layout["palettes"]:
+        chunks[digest] = (offset, length)
+        offset += length
+    if offset + layout["footer"] != file.tell():
+        return {}
+    return chunks
+
+
+class ChunkWriter:
+    """Writes an output file chunk by chunk, hashing the content as it goes."""
+
+    __slots__ = ("file", "hash", "lengths")
+
+    def __init__(self, file: BinaryIO):
+        """
+        Args:
+            file: Output file, opened for writing in binary mode
+        """
+        self.file = file
+        self.hash = hashlib.sha256()
+        # Byte length of each written chunk
+        self.lengths: List[int] = []
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Write a chunk to the file.
+
+        Args:
+            chunk: Content of the chunk
+        """
+        self.file.write(chunk)
+        self.hash.update(chunk)
+        self.lengths.append(len(chunk))
+
+    def restart(self) -> None:
+        """Discard everything written so far."""
+        self.file.seek(0)
+        self.file.truncate()
+        self.hash = hashlib.sha256()
+        self.lengths = []
+
+
+def write_patched_chunks(
+    writer: ChunkWriter,
+    target: EmitterTarget,
+    palettes: Sequence[CompiledPalette],
+    path: str,
+    previous: Dict[str, Any],
+) -> bool:
+    """
+    Write a target's output, copying the chunks of the palettes that are unchanged
+    since the previous output file and rendering only the others.
+    Only one chunk is held in memory at a time.
+
+    Args:
+        writer: Writer of the new output file
+        target: Emitter target
+        palettes: Sequence of compiled palettes
+        path: Path to the previous output file
+        previous: Chunk layout of the previous output file
+
+    Returns:
+        False if the previous file can't be patched, or the target doesn't yield
+        one chunk per palette between a header and a footer;
+        the writer then holds a partial output to be discarded
+    """
+    try:
+        previous_file = open(path, "rb")  # pylint: disable=consider-using-with
+    except OSError:
+        return False
+    with previous_file:
+        located = locate_chunks(previous_file, previous)
+        if not located:
+            return False
+        missing = [palette for palette in palettes if palette.digest not in located]
+        chunks = iter(target.emit(missing))
+        header = next(chunks, None)
+        if header is None:
+            return False
+        writer.write(header.encode("utf-8"))
+        for palette in palettes:
+            if palette.digest in located:
+                offset, length = located[palette.digest]
+                previous_file.seek(offset)
+                writer.write(previous_file.read(length))
+                continue
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            writer.write(chunk.encode("utf-8"))
+        footer = next(chunks, None)
+        if footer is None or next(chunks, None) is not None:
+            return False
+        writer.write(footer.encode("utf-8"))
+    return True
+
+
+def write_target(
+    target: EmitterTarget,
+    palettes: Sequence[CompiledPalette],
+    path: str,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Generate a target's output file.
+    Given the chunk layout of the previous output file, only the palettes
+    that were changed or inserted since are rendered; the chunks of the others
+    are copied from the previous file, so the result is byte-identical
+    to rendering every palette.
+    The content is streamed chunk by chunk into a temporary file first,
+    so that a failing emitter never leaves a partial output behind.
+
+    Args:
+        target: Emitter target
+        palettes: Sequence of compiled palettes
+        path: Path to the output file
+        previous: Chunk layout of the previous output file, if any
+
+    Returns:
+        Chunk layout of the written file: its digest, the byte lengths of the
+        header and the footer, and the digest and byte length of each palette's
+        chunk. None if the target doesn't yield one chunk per palette between
+        a header and a footer, in which case it can't be patched.
+    """
+    with phase(target.name, "emitter"):
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                writer = ChunkWriter(file)
+                if not previous or not write_patched_chunks(
+                    writer, target, palettes, path, previous
+                ):
+                    writer.restart()
+                    for chunk in target.emit(palettes):
+                        writer.write(chunk.encode("utf-8"))
+            os.replace(tmp_path, path)
+            record_bytes(sum(writer.lengths))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        lengths = writer.lengths
+        if len(lengths) != len(palettes) + 2:
+            return None
+        return {
+            "digest": writer.hash.hexdigest(),
+            "header": lengths[0],
+            "palettes": [
+                [palette.digest, length]
+                for palette, length in zip(palettes, lengths[1:-1])
+            ],
+            "footer": lengths[-1],
+        }
+
+
+def run_emitters(
+    palettes: Sequence[CompiledPalette],
+    targets: Iterable[EmitterTarget],
+    output_paths: Dict[str, str],
+    max_workers: Optional[int] = None,
+    layouts: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Exception]:
+    """
+    Generate the output files of several targets concurrently on a thread pool.
+    A failing target doesn't stop the others.
+
+    Args:
+        palettes: Compiled palettes, see compiler.compile_palettes()
+        targets: Emitter targets to run
+        output_paths: Mapping of target names to their output paths
+        max_workers: Maximum number of worker threads. Defaults to one per target.
+        layouts: Mapping of target names to the chunk layouts of their previous
+            output files, used to patch the files instead of rendering them fully,
+            and updated in place with the layouts of the written files
+
+    Returns:
+        Mapping of the names of the failed targets to their errors
+    """
+    targets = list(targets)
+    layouts = {} if layouts is None else layouts
+    errors: Dict[str, Exception] = {}
+    if not targets:
+        return errors
+    with ThreadPoolExecutor(max_workers=max_workers or len(targets)) as executor:
+        futures = {
+            # Each in a copy of the context, so that profiled emitters nest in the phase
+            executor.submit(
+                copy_context().run,
+                write_target,
+                target,
+                palettes,
+                output_paths[target.name],
+                layouts.pop(target.name, None),
+            ): target
+            for target in targets
+        }
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                layout = future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                errors[target.name] = e
+                print(f"Failed to generate {target.description}: {e}")
+            else:
+                if layout is not None:
+                    layouts[target.name] = layout
+                print(f"{target.description} generated.")
+    return errors
+
+
+register_emitter(
+    "tableau",
+    "tableau/Preferences.tps",
+    iter_tableau_preferences,
+    "Tableau Preferences file",
+)
+register_emitter(
+    "r_script",
+    "r_script/ir_color_palettes.R",
+    iter_r_script,
+    "R script file",
+)
+register_emitter(
+    "css",
+    "css/ir_color_palettes.css",
+    iter_css_properties,
+    "CSS custom properties file",
+)
+register_emitter(
+    "sass",
+    "sass/_ir_color_palettes.scss",
+    iter_sass_maps,
+    "SASS maps file",
+)
+register_emitter(
+    "json",
+    "json/ir_color_palettes.json",
+    iter_json,
+    "JSON file",
+)
+register_emitter(
+    "python",
+    "python/ir_color_palettes.py",
+    iter_python_module,
+    "Python module",
+)
+
+
+def get_generator_version(script_dir: str) -> str:
+    """
+    Get a version string identifying the generator code.
+    It combines the package version with a digest of every script in the package,
+    so that editing any generator code invalidates previous build outputs.
+
+    Args:
+        script_dir: Path to the scripts directory
+
+    Returns:
+        Generator version string
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(script_dir, "*.py"))):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        digest.update(file_digest(path).encode("ascii"))
+    return f"{__version__}+{digest.hexdigest()}"
+
+
+def get_input_digests(yaml_paths: Sequence[str], repo_root: str) -> Dict[str, str]:
+    """
+    Get the digests of the palette files.
+
+    Args:
+        yaml_paths: Paths to the palette files
+        repo_root: Path to the repository root
+
+    Returns:
+        Mapping of the paths relative to the repository root to the file digests
+    """
+    return {
+        os.path.relpath(path, repo_root).replace(os.sep, "/"): file_digest(path)
+        for path in yaml_paths
+    }
+
+
+def get_build_state(yaml_paths: Sequence[str], script_dir: str) -> Dict[str, Any]:
+    """
+    Get the state of the build inputs to be compared against the build manifest.
+
+    Args:
+        yaml_paths: Paths to the palette files
+        script_dir: Path to the scripts directory
+
+    Returns:
+        Dictionary with the generator version and the digests of the input files
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "generator": get_generator_version(script_dir),
+        "inputs": get_input_digests(yaml_paths, os.path.dirname(script_dir)),
+    }
+
+
+def is_up_to_date(
+    manifest: Optional[Dict[str, Any]],
+    state: Dict[str, Any],
+    output_paths: Dict[str, str],
+) -> bool:
+    """
+    Check whether the outputs recorded in the build manifest are still current.
+
+    Args:
+        manifest: Build manifest from the previous build, or None if there is none
+        state: Current build state from get_build_state()
+        output_paths: Mapping of output names to their paths
+
+    Returns:
+        True if the inputs, the generator and every output match the manifest
+    """
+    if not manifest:
+        return False
+    if any(manifest.get(field) != value for field, value in state.items()):
+        return False
+    recorded_outputs = manifest.get("outputs", {})
+    if set(recorded_outputs) != set(output_paths):
+        return False
+    for name, path in output_paths.items():
+        try:
+            if file_digest(path) != recorded_outputs[name]:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def create_manifest(
+    state: Dict[str, Any],
+    output_paths: Dict[str, str],
+    layouts: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Create a build manifest recording the build state and the generated outputs.
+
+    Args:
+        state: Build state from get_build_state()
+        output_paths: Mapping of output names to their paths
+        layouts: Mapping of output names to the chunk layouts of the outputs
+
+    Returns:
+        Build manifest dictionary
+    """
+    manifest = dict(state)
+    manifest["outputs"] = {
+        name: file_digest(path) for name, path in output_paths.items()
+    }
+    manifest["chunks"] = dict(layouts or {})
+    return manifest
+
+
+def get_previous_layouts(
+    manifest: Optional[Dict[str, Any]], state: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Get the chunk layouts of the previous outputs that can be patched.
+    Outputs of another manifest version or generator can't be patched,
+    since their unchanged palettes may render differently now.
+
+    Args:
+        manifest: Build manifest from the previous build, or None if there is none
+        state: Current build state from get_build_state()
+
+    Returns:
+        Mapping of output names to chunk layouts
+    """
+    if not manifest or any(
+        manifest.get(field) != state.get(field) for field in ("version", "generator")
+    ):
+        return {}
+    return dict(manifest.get("chunks") or {})
+
+
+def generate_outputs(
+    palettes: PaletteCatalog,
+    targets: List[EmitterTarget],
+    output_paths: Dict[str, str],
+    cvd_min_distance: Optional[float] = None,
+    layouts: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Check the palettes and generate the output files of the targets.
+
+    Args:
+        palettes: Catalog of the palettes
+        targets: Emitter targets to run
+        output_paths: Mapping of target names to their output paths
+        cvd_min_distance: Minimum OKLab distance between two colors of a palette
+            under simulated color vision deficiencies, below which a warning
+            is printed; defaults to the one of scripts.cvd
+        layouts: Chunk layouts of the previous output files, see run_emitters()
+
+    Raises:
+        RuntimeError: If any output file failed to generate
+    """
+    # Warn about colors that are hard to tell apart with color vision deficiencies;
+    # imported here so that up-to-date builds don't have to import NumPy
+    with phase("check colors"):
+        # pylint: disable-next=import-outside-toplevel
+        from scripts.cvd import check_palettes
+
+        warnings = check_palettes(palettes, cvd_min_distance)
+    for warning in warnings:
+        print(f"Warning: {warning}")
+
+    # Ensure output directories exist
+    with phase("create directories"):
+        for target in targets:
+            os.makedirs(os.path.dirname(output_paths[target.name]), exist_ok=True)
+
+    # Generate all output files concurrently
+    for target in targets:
+        print(f"Generating {target.description} at {output_paths[target.name]}...")
+    # Compile the palettes once for all emitters
+    with phase("compile palettes"):
+        compiled = compile_palettes(palettes)
+    with phase("emit"):
+        errors = run_emitters(compiled, targets, output_paths, layouts=layouts)
+    if errors:
+        raise RuntimeError(
+            f"Failed to generate {len(errors)} output file(s): "
+            + ", ".join(sorted(errors))
+        )
+
+
+def get_content_digest(palettes: PaletteCatalog) -> str:
+    """
+    Compute a digest of the parsed palettes, independent of the YAML formatting.
+
+    Args:
+        palettes: Catalog of the palettes
+
+    Returns:
+        SHA-256 hex digest of the palettes
+    """
+    content = json.dumps(palettes.to_dicts(), ensure_ascii=False)
+    return bytes_digest(content.encode("utf-8"))
+
+
+class WatchBuilder:
+    """Rebuilds the outputs whenever the parsed palettes change."""
+
+    def __init__(
+        self,
+        repo_root: str,
+        manifest_path: str,
+        state: Dict[str, Any],
+        output_paths: Dict[str, str],
+        cvd_min_distance: Optional[float] = None,
+    ):
+        """
+        Args:
+            repo_root: Path to the repository root with the palette files
+            manifest_path: Path to the build manifest, in the cache directory
+            state: Build state from get_build_state() when watching started
+            output_paths: Mapping of output names to their paths
+            cvd_min_distance: Minimum OKLab distance passed to generate_outputs()
+        """
+        self.repo_root = repo_root
+        self.manifest_path = manifest_path
+        self.state = state
+        self.output_paths = output_paths
+        self.cvd_min_distance = cvd_min_distance
+        # Digests of the files and of the parsed palettes the outputs were built from
+        self.inputs: Optional[Dict[str, str]] = None
+        self.content_digest: Optional[str] = None
+
+    def load(self) -> Optional[Tuple[Dict[str, str], PaletteCatalog]]:
+        """
+        Load the palettes if a palette file changed since the outputs were built.
+        Errors are printed rather than raised, so that watching continues.
+
+        Returns:
+            Digests of the palette files and the catalog of the palettes,
+            or None if the files are unchanged or invalid
+        """
+        yaml_paths = get_palette_paths(self.repo_root)
+        try:
+            inputs = get_input_digests(yaml_paths, self.repo_root)
+            if inputs == self.inputs:
+                return None
+            palettes = load_palette_files(
+                yaml_paths, os.path.dirname(self.manifest_path)
+            )
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"Failed to load the palettes: {e}")
+            return None
+        return inputs, palettes
+
+    def rebuild(self) -> bool:
+        """
+        Rebuild the outputs if the parsed palettes changed since the last rebuild.
+        The manifest records the new palette files even if the outputs are unchanged,
+        so that the next build doesn't redo the work.
+        Errors are printed rather than raised, so that watching continues,
+        and the same files are tried again on the next change.
+
+        Returns:
+            True if the outputs were written
+        """
+        start = time.perf_counter()
+        loaded = self.load()
+        if loaded is None:
+            return False
+        inputs, palettes = loaded
+        # Edits of comments or formatting don't change the outputs
+        content_digest = get_content_digest(palettes)
+        changed = content_digest != self.content_digest
+
+        try:
+            previous = load_json(self.manifest_path)
+            if changed:
+                layouts = get_previous_layouts(previous, self.state)
+                generate_outputs(
+                    palettes,
+                    [EMITTER_TARGETS[name] for name in self.output_paths],
+                    self.output_paths,
+                    self.cvd_min_distance,
+                    layouts,
+                )
+                manifest = create_manifest(
+                    dict(self.state, inputs=inputs), self.output_paths, layouts
+                )
+            else:
+                # The outputs recorded in the manifest are still those of the palettes
+                manifest = dict(previous or self.state, inputs=inputs)
+            save_json(self.manifest_path, manifest)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed to rebuild the outputs: {e}")
+            return False
+        self.inputs = inputs
+        self.content_digest = content_digest
+        if not changed:
+            print("The palette files changed, but the palettes didn't.")
+            return False
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Rebuilt {len(palettes)} palette(s) in {elapsed:.0f} ms.")
+        return True
+
+
+def watch_build(
+    repo_root: str,
+    manifest_path: str,
+    state: Dict[str, Any],
+    output_paths: Dict[str, str],
+    cvd_min_distance: Optional[float] = None,
+) -> None:
+    """
+    Rebuild the outputs whenever a palette file changes, until interrupted.
+    The outputs must be up to date with the palette files when watching starts.
+
+    Args:
+        repo_root: Path to the repository root with the palette files
+        manifest_path: Path to the build manifest, in the cache directory
+        state: Build state from get_build_state()
+        output_paths: Mapping of output names to their paths
+        cvd_min_distance: Minimum OKLab distance passed to generate_outputs()
+    """
+    # Imported here so that one-off builds don't load the watcher
+    from scripts.watch import (  # pylint: disable=import-outside-toplevel
+        InotifyWatcher,
+        open_watcher,
+        watch,
+    )
+
+    # palettes.d/ is watched as a whole, so that added files are noticed too,
+    # even if it is only created while watching
+    paths = [
+        os.path.join(repo_root, "palettes.yml"),
+        os.path.join(repo_root, PALETTE_DIR_NAME),
+    ]
+    # Started first, so that no change after loading the current palettes is missed
+    watcher = open_watcher(paths)
+    builder = WatchBuilder(
+        repo_root, manifest_path, state, output_paths, cvd_min_distance
+    )
+    # The current palettes are those of the outputs
+    loaded = builder.load()
+    if loaded is not None:
+        builder.inputs, palettes = loaded
+        builder.content_digest = get_content_digest(palettes)
+
+    mode = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+    watched = " and ".join(os.path.relpath(path, repo_root) for path in paths)
+    print(f"Watching {watched} for changes ({mode}). Press Ctrl+C to stop.")
+    try:
+        watch(paths, builder.rebuild, watcher=watcher)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Main function to convert palettes.yml and the files in palettes.d/
+    to the output files of the emitter targets.
+    The build is skipped when the build manifest shows that
+    neither the inputs nor the outputs have changed since the last build.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Convert palettes.yml into Tableau, R, CSS, SASS, JSON and Python files."
+        )
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild even if the build manifest shows the outputs are up to date",
+    )
+    parser.add_argument(
+        "--cvd-min-distance",
+        type=float,
+        metavar="DISTANCE",
+        help=(
+            "warn when two colors of a palette are closer than this OKLab distance "
+            "under simulated color vision deficiencies (default: 0.02)"
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild whenever a palette file changes",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="TRACE",
+        help=(
+            "profile the build phases, print a summary and write a Chrome trace "
+            "to TRACE (default: .build_cache/profile.json)"
+        ),
+    )
+    args = parser.parse_args(argv)
+
     # Define file paths
     script_dir = os.path.dirname(os.path.abspath(__file__))
     repo_root = os.path.dirname(script_dir)
-    yaml_path = os.path.join(repo_root, "palettes.yml")
-    tableau_path = os.path.join(repo_root, "tableau", "Preferences.tps")
-    r_script_path = os.path.join(repo_root, "r_script", "ir_color_palettes.R")
+    yaml_paths = get_palette_paths(repo_root)
+    manifest_path = os.path.join(get_cache_dir(repo_root), "manifest.json")
+    output_paths = {
+        target.name: get_output_path(repo_root, target)
+        for target in EMITTER_TARGETS.values()
+    }
 
-    # Load palettes
-    print(f"Loading palettes from {yaml_path}...")
-    palettes = load_palettes(yaml_path)
-    print(f"Loaded {len(palettes)} palette(s).")
+    profiler = Profiler() if args.profile is not None else None
+    with profiler or nullcontext(), phase("build"):
+        # Skip the build if nothing changed since the last build
+        with phase("check manifest"):
+            state = get_build_state(yaml_paths, script_dir)
+            manifest = load_json(manifest_path)
+            up_to_date = not args.force and is_up_to_date(manifest, state, output_paths)
+        if up_to_date:
+            print("All files are up to date.")
+        else:
+            # Load palettes
+            print(f"Loading palettes from {len(yaml_paths)} file(s)...")
+            with phase("load palettes"):
+                palettes = load_palette_files(
+                    yaml_paths, cache_dir=get_cache_dir(repo_root)
+                )
+            print(f"Loaded {len(palettes)} palette(s).")
 
-    # Ensure output directories exist
-    os.makedirs(os.path.dirname(tableau_path), exist_ok=True)
-    os.makedirs(os.path.dirname(r_script_path), exist_ok=True)
+            # Patch the previous outputs where possible, unless forced to rebuild fully
+            layouts = {} if args.force else get_previous_layouts(manifest, state)
+            generate_outputs(
+                palettes,
+                list(EMITTER_TARGETS.values()),
+                output_paths,
+                args.cvd_min_distance,
+                layouts,
+            )
 
-    # Generate Tableau Preferences file
-    print(f"Generating Tableau Preferences file at {tableau_path}...")
-    generate_tableau_preferences(palettes, tableau_path)
-    print("Tableau Preferences file generated.")
+            # Record the outputs so that the next build can be skipped or patched
+            with phase("save manifest"):
+                save_json(manifest_path, create_manifest(state, output_paths, layouts))
+                record_file(manifest_path)
 
-    # Generate R script file
-    print(f"Generating R script file at {r_script_path}...")
-    generate_r_script(palettes, r_script_path)
-    print("R script file generated.")
+            print("All files generated successfully.")
 
-    # Run formatters
-    subprocess.run(["poetry", "run", "formatter"], check=True)
+    if profiler is not None:
+        trace_path = args.profile or os.path.join(
+            get_cache_dir(repo_root), "profile.json"
+        )
+        profiler.write_trace(trace_path)
+        print("\n".join(profiler.format_summary()))
+        print(f"Wrote the profile trace to {trace_path}.")
 
-    print("All files generated successfully.")
+    if args.watch:
+        watch_build(
+            repo_root, manifest_path, state, output_paths, args.cvd_min_distance
+        )
@@ -0,0 +1,92 @@
+"""
+Helpers for the on-disk cache shared by the build and development scripts.
+Everything is stored as JSON under `.build_cache/` in the repository root.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any
+
+# Name of the cache directory, relative to the repository root
+CACHE_DIR_NAME = ".build_cache"
+
+
+def get_cache_dir(repo_root: str) -> str:
+    """
+    Get the path to the cache directory of the repository.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Path to the cache directory
+    """
+    return os.path.join(repo_root, CACHE_DIR_NAME)
+
+
+def bytes_digest(data: bytes) -> str:
+    """
+    Compute the SHA-256 hex digest of a byte string.
+
+    Args:
+        data: Bytes to hash
+
+    Returns:
+        Hex digest string
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's content.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest string
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def load_json(path: str) -> Any:
+    """
+    Load a JSON cache file.
+
+    Args:
+        path: Path to the JSON file
+
+    Returns:
+        The decoded JSON data, or None if the file is missing or unreadable
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(path: str, data: Any) -> None:
+    """
+    Atomically write a JSON cache file, creating its directory if needed.
+
+    Args:
+        path: Path to the JSON file
+        data: JSON-serializable data to write
+
+    Raises:
+        TypeError: If the data isn't JSON-serializable
+    """
+    # Serialize first so that unserializable data never leaves a partial file
+    content = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,165 @@
+"""
+Vectorized mapping of category values to the colors of a palette,
+e.g. to color the points of a chart by grade letter or exam type.
+The values are factorized once, so that only their distinct categories
+are looked up in the palette, and the colors of all values are then gathered
+from a precomputed color table in one step, without a dictionary lookup per value.
+"""
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from scripts.model import Palette, parse_hex, rgb_to_hex
+
+# Color of values that aren't keys of the palette, unless another one is given
+DEFAULT_UNKNOWN_COLOR = "#808080"
+
+# Output formats of map_colors() and the trailing dimension they add
+OUTPUT_FORMATS = {"rgb": (3,), "rgba": (4,), "hex": ()}
+
+
+def format_category(category: Any) -> str:
+    """
+    Convert a category value to the color key it matches.
+    Whole floats are matched as integers, so that 2.0 matches the key "2".
+
+    Args:
+        category: Category value
+
+    Returns:
+        Color key string
+    """
+    if isinstance(category, (float, np.floating)) and float(category).is_integer():
+        return str(int(category))
+    return str(category)
+
+
+def lookup_rows(
+    categories: np.ndarray, rows: Dict[str, int], unknown_row: int
+) -> np.ndarray:
+    """
+    Look up the color table rows of distinct categories.
+
+    Args:
+        categories: Array of distinct category values
+        rows: Mapping of color keys to rows of the color table
+        unknown_row: Row of the unknown color
+
+    Returns:
+        Array of shape (categories + 1,) with the row of each category,
+        followed by the unknown row for the -1 code of missing values
+    """
+    category_rows = [
+        rows.get(format_category(category), unknown_row) for category in categories
+    ]
+    return np.array([*category_rows, unknown_row], dtype=np.intp)
+
+
+def get_value_rows(values: Any, rows: Dict[str, int], unknown_row: int) -> np.ndarray:
+    """
+    Find the color table row of each category value,
+    looking up each distinct category only once.
+    Pandas categoricals, and Series of them, are looked up by their categories;
+    numbers are factorized with np.unique() before they are converted to strings,
+    whole floats as integers, also in object arrays;
+    strings are matched with a binary search in the sorted color keys.
+
+    Args:
+        values: NumPy array, list or pandas categorical of category values
+        rows: Mapping of color keys to rows of the color table
+        unknown_row: Row of the unknown color
+
+    Returns:
+        Array of the shape of the values with the row of each value
+    """
+    # Duck-typed so that pandas stays an optional dependency
+    categorical = getattr(values, "cat", values)
+    if hasattr(categorical, "categories") and hasattr(categorical, "codes"):
+        category_rows = lookup_rows(
+            np.asarray(categorical.categories), rows, unknown_row
+        )
+        return category_rows[np.asarray(categorical.codes)]
+
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        categories, codes = np.unique(array.ravel(), return_inverse=True)
+        category_rows = lookup_rows(categories, rows, unknown_row)
+        return category_rows[codes.reshape(array.shape)]
+
+    if array.dtype.kind == "O":
+        # Mixed values can't be sorted by np.unique(), but are converted
+        # to keys like the numbers, one str() call per value as astype(str) makes
+        array = np.vectorize(format_category, otypes=[str])(array)
+    elif array.dtype.kind != "U":
+        array = array.astype(str)
+    keys = np.array(sorted(rows) or [""])
+    positions = np.minimum(np.searchsorted(keys, array), len(keys) - 1)
+    key_rows = np.array([rows.get(key, unknown_row) for key in keys.tolist()])
+    return np.where(keys[positions] == array, key_rows[positions], unknown_row)
+
+
+def get_color_table(
+    palette: Palette, unknown: int
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Build the color table of a palette.
+
+    Args:
+        palette: Palette
+        unknown: RGB integer of values that aren't keys of the palette
+
+    Returns:
+        Array of shape (colors + 1, 3) with the 8-bit RGB channel values
+        of each color in palette order followed by the unknown color,
+        and a mapping of color keys to rows of the table
+    """
+    packed = np.array([*palette.rgb, unknown], dtype=np.uint32)
+    table = np.stack([packed >> 16, packed >> 8, packed], axis=-1) & 0xFF
+    rows = {key: row for row, key in enumerate(palette.keys)}
+    return table.astype(np.uint8), rows
+
+
+def map_colors(
+    palette: Palette,
+    values: Any,
+    output: str = "rgb",
+    unknown: str = DEFAULT_UNKNOWN_COLOR,
+) -> np.ndarray:
+    """
+    Map category values to the colors of a palette.
+
+    Args:
+        palette: Palette whose color keys are the categories
+        values: NumPy array, list or pandas categorical of category values,
+            compared with the color keys as strings
+        output: "rgb" or "rgba" for 8-bit channel values, or "hex" for
+            hex color strings in #rrggbb format
+        unknown: Hex color string of values that aren't keys of the palette,
+            and of missing values
+
+    Returns:
+        Array aligned with the values: of shape (..., 3) or (..., 4) and dtype
+        uint8 for "rgb" and "rgba", of the values' shape for "hex"
+
+    Raises:
+        ValueError: If the output format is unknown, or the unknown color
+            isn't a hex color string in #rrggbb format
+    """
+    if output not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format: '{output}' "
+            f"(expected one of {', '.join(OUTPUT_FORMATS)})"
+        )
+    unknown_rgb = parse_hex(unknown)
+    table, rows = get_color_table(palette, unknown_rgb)
+    value_rows = get_value_rows(values, rows, len(table) - 1)
+
+    if output == "hex":
+        hex_table = np.array([*palette.hex_values, rgb_to_hex(unknown_rgb)])
+        return hex_table[value_rows]
+    colors = table[value_rows]
+    if output == "rgba":
+        alpha = np.full((*colors.shape[:-1], 1), 255, dtype=np.uint8)
+        return np.concatenate([colors, alpha], axis=-1)
+    return colors
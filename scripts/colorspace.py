@@ -0,0 +1,84 @@
+"""
+Vectorized color space conversions shared by the palette analyses.
+All functions work on NumPy arrays of colors, one color per row.
+"""
+
+from typing import Iterable
+
+import numpy as np
+
+# Weights of the linear R, G and B channels in relative luminance (WCAG 2.x)
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+# Linear sRGB to LMS cone responses (OKLab, Björn Ottosson)
+LINEAR_RGB_TO_LMS = np.array(
+    [
+        [0.4122214708, 0.5363325363, 0.0514459929],
+        [0.2119034982, 0.6806995451, 0.1073969566],
+        [0.0883024619, 0.2817188376, 0.6299787005],
+    ]
+)
+
+# Cube roots of the LMS cone responses to OKLab
+LMS_TO_OKLAB = np.array(
+    [
+        [0.2104542553, 0.7936177850, -0.0040720468],
+        [1.9779984951, -2.4285922050, 0.4505937099],
+        [0.0259040371, 0.7827717662, -0.8086757660],
+    ]
+)
+
+
+def unpack_rgb(rgb: Iterable[int]) -> np.ndarray:
+    """
+    Convert packed 24-bit RGB integers to sRGB channel values.
+
+    Args:
+        rgb: Packed RGB integers, e.g. the rgb array of a Palette
+
+    Returns:
+        Array of shape (n, 3) with sRGB channel values in [0, 1]
+    """
+    packed = np.fromiter(rgb, dtype=np.uint32)
+    channels = np.stack([packed >> 16, packed >> 8, packed], axis=-1) & 0xFF
+    return channels / 255.0
+
+
+def srgb_to_linear(srgb: np.ndarray) -> np.ndarray:
+    """
+    Remove the sRGB transfer function.
+
+    Args:
+        srgb: Array of sRGB channel values in [0, 1]
+
+    Returns:
+        Array of linear RGB channel values in [0, 1]
+    """
+    return np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+
+
+def relative_luminance(linear: np.ndarray) -> np.ndarray:
+    """
+    Compute the WCAG relative luminance of linear RGB colors.
+
+    Args:
+        linear: Array of shape (n, 3) with linear RGB channel values
+
+    Returns:
+        Array of shape (n,) with relative luminances in [0, 1]
+    """
+    return linear @ LUMINANCE_WEIGHTS
+
+
+def linear_to_oklab(linear: np.ndarray) -> np.ndarray:
+    """
+    Convert linear RGB colors to the perceptually uniform OKLab space.
+
+    Args:
+        linear: Array of shape (..., 3) with linear RGB channel values
+
+    Returns:
+        Array of the same shape with OKLab L, a and b values
+    """
+    lms = linear @ LINEAR_RGB_TO_LMS.T
+    return np.cbrt(lms) @ LMS_TO_OKLAB.T
@@ -0,0 +1,191 @@
+"""
+Compiled form of the color palettes, shared by the emitters of the build.
+The palettes are compiled once per build: their fields are resolved,
+their colors normalized to lowercase hex strings and RGB tuples,
+and the identifiers every output format needs are computed,
+so that each emitter only has to serialize the compiled palettes.
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from scripts.cache import bytes_digest
+from scripts.model import Palette, RgbTuple, unpack_rgb_tuple
+
+
+class CompiledPalette(NamedTuple):
+    """A palette with everything the emitters need, computed ahead."""
+
+    name: str
+    # Palette type (categorical, sequential, diverging)
+    type: str
+    description: str
+    # Color keys, hex strings in #rrggbb format and RGB tuples, in palette order
+    keys: Tuple[str, ...]
+    hex_values: Tuple[str, ...]
+    rgb_values: Tuple[RgbTuple, ...]
+    # Digest identifying the rendered chunks of the palette in the output files
+    digest: str
+    # snake_case identifier, e.g. "aiu_grades", used for R and Python variables
+    variable_name: str
+    # kebab-case identifier, e.g. "aiu-grades", used for CSS and SASS names
+    css_name: str
+    # Color keys as parts of CSS custom property names, in palette order
+    css_keys: Tuple[str, ...]
+    # Tableau palette type (regular, ordered-sequential, ordered-diverging)
+    tableau_type: str
+    # Capitalized palette type for comments, e.g. "Categorical"
+    type_label: str
+
+
+# Palette accepted by the emitters: a palette of the model or a compiled one
+PaletteLike = Union[Palette, CompiledPalette]
+
+
+# ASCII characters other than letters, digits, hyphens and underscores
+CSS_ESCAPED_PATTERN = re.compile(r"[^a-z0-9_\-\u0080-\U0010ffff]")
+
+
+def get_tableau_type(palette_type: str) -> str:
+    """
+    Convert palette type to Tableau type.
+
+    Args:
+        palette_type: Type from palettes.yml (categorical, sequential, diverging)
+
+    Returns:
+        Tableau type string (regular, ordered-sequential, ordered-diverging)
+    """
+    type_mapping = {
+        "categorical": "regular",
+        "sequential": "ordered-sequential",
+        "diverging": "ordered-diverging",
+    }
+    return type_mapping.get(palette_type, "regular")
+
+
+def sanitize_variable_name(name: str) -> str:
+    """
+    Convert palette name to a valid R variable name.
+
+    Args:
+        name: Palette name
+
+    Returns:
+        Sanitized variable name in snake_case
+    """
+    # Convert to lowercase and replace spaces with underscores
+    sanitized = name.lower().replace(" ", "_")
+    # Remove any characters that aren't alphanumeric or underscore
+    sanitized = "".join(c for c in sanitized if c.isalnum() or c == "_")
+    return sanitized
+
+
+def format_r_type(palette_type: str) -> str:
+    """
+    Format palette type for R comments.
+
+    Args:
+        palette_type: Type from palettes.yml
+
+    Returns:
+        Capitalized type string
+    """
+    return palette_type.capitalize()
+
+
+def format_css_name(text: str) -> str:
+    """
+    Convert a color key to a part of a CSS custom property name.
+    Runs of whitespace become hyphens, and ASCII characters not allowed
+    in CSS identifiers are escaped rather than removed,
+    so that keys such as "A+", "A" and "A-" keep distinct names.
+
+    Args:
+        text: Color key
+
+    Returns:
+        Lowercase CSS identifier characters, e.g. "strongly-agree" or "a\\+"
+    """
+    return CSS_ESCAPED_PATTERN.sub(r"\\\g<0>", "-".join(text.lower().split()))
+
+
+def get_palette_digest(palette: Palette) -> str:
+    """
+    Compute a digest identifying the rendered chunks of a palette.
+
+    Args:
+        palette: Palette
+
+    Returns:
+        SHA-256 hex digest of the palette's fields and colors
+    """
+    fields = "\0".join([palette.name, palette.type, palette.description, *palette.keys])
+    return bytes_digest(fields.encode("utf-8") + palette.rgb.tobytes())
+
+
+def compile_palette(
+    palette: Palette, rgb_tuples: Optional[Dict[int, RgbTuple]] = None
+) -> CompiledPalette:
+    """
+    Compile a palette for the emitters.
+
+    Args:
+        palette: Palette of the model
+        rgb_tuples: Mapping of packed RGB values to the RGB tuples
+            shared between palettes, updated with the colors of the palette
+
+    Returns:
+        Compiled palette
+    """
+    if rgb_tuples is None:
+        rgb_tuples = {}
+    keys = palette.keys
+    variable_name = sanitize_variable_name(palette.name)
+    return CompiledPalette(
+        name=palette.name,
+        type=palette.type,
+        description=palette.description,
+        keys=keys,
+        hex_values=palette.hex_values,
+        rgb_values=tuple(
+            rgb_tuples.setdefault(rgb, unpack_rgb_tuple(rgb)) for rgb in palette.rgb
+        ),
+        digest=get_palette_digest(palette),
+        variable_name=variable_name,
+        css_name=variable_name.replace("_", "-"),
+        css_keys=tuple(format_css_name(key) for key in keys),
+        tableau_type=get_tableau_type(palette.type),
+        type_label=format_r_type(palette.type),
+    )
+
+
+def compile_palettes(palettes: Iterable[Palette]) -> List[CompiledPalette]:
+    """
+    Compile palettes for the emitters.
+    RGB tuples of the same color are shared between palettes.
+
+    Args:
+        palettes: Iterable of palettes, e.g. a PaletteCatalog
+
+    Returns:
+        Compiled palettes in the same order
+    """
+    rgb_tuples: Dict[int, RgbTuple] = {}
+    return [compile_palette(palette, rgb_tuples) for palette in palettes]
+
+
+def as_compiled(palette: PaletteLike) -> CompiledPalette:
+    """
+    Get the compiled form of a palette, compiling it if needed,
+    so that the emitters also accept the palettes of the model.
+
+    Args:
+        palette: Palette of the model or compiled palette
+
+    Returns:
+        Compiled palette
+    """
+    if isinstance(palette, CompiledPalette):
+        return palette
+    return compile_palette(palette)
@@ -0,0 +1,365 @@
+"""
+WCAG contrast analysis of the color palettes defined in palettes.yml.
+The relative luminances of all colors are computed in one NumPy batch,
+from which each palette gets its full matrix of pairwise contrast ratios
+and its contrast ratios against a set of backgrounds.
+Results are cached by a digest of each palette's colors,
+so only edited palettes are recomputed.
+By defining it in pyproject.toml's [tool.poetry.scripts],
+it can be run as `poetry run contrast`.
+"""
+
+import argparse
+import hashlib
+from itertools import chain
+import os
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+import zipfile
+
+import numpy as np
+
+from scripts.build import get_palette_paths, load_palette_files
+from scripts.cache import get_cache_dir
+from scripts.colorspace import relative_luminance, srgb_to_linear, unpack_rgb
+from scripts.formatter import get_repo_root
+from scripts.model import PaletteCatalog, parse_hex, rgb_to_hex
+
+# Version of the cached results; bump to invalidate existing caches
+CONTRAST_CACHE_VERSION = 1
+
+# Backgrounds the palette colors are checked against by default
+DEFAULT_BACKGROUNDS: Dict[str, int] = {
+    "white": 0xFFFFFF,
+    "black": 0x000000,
+    # Light gray used for Tableau dashboard and pane backgrounds
+    "tableau": 0xF5F5F5,
+}
+
+# Minimum contrast of graphical objects against adjacent colors (WCAG 2.1 SC 1.4.11)
+MIN_NON_TEXT_CONTRAST = 3.0
+
+
+class PaletteContrast(NamedTuple):
+    """Contrast ratios of the colors of a palette."""
+
+    name: str
+    keys: Tuple[str, ...]
+    # Cache key of the palette's contrast ratios
+    digest: str
+    # Matrix of shape (n, n) with the contrast ratio of each pair of colors
+    ratios: np.ndarray
+    # Matrix of shape (n, backgrounds) with the contrast ratio of each color
+    # against each background, in the order of the backgrounds
+    background_ratios: np.ndarray
+
+
+def contrast_ratios(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Compute the WCAG contrast ratio of every pair of luminances.
+
+    Args:
+        first: Array of shape (n,) with relative luminances
+        second: Array of shape (m,) with relative luminances
+
+    Returns:
+        Array of shape (n, m) with contrast ratios from 1 to 21
+    """
+    lighter = np.maximum.outer(first, second)
+    darker = np.minimum.outer(first, second)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def get_palette_digest(rgb: Sequence[int], backgrounds: Sequence[int]) -> str:
+    """
+    Compute the cache key of a palette's contrast ratios.
+
+    Args:
+        rgb: Packed RGB integers of the palette's colors
+        backgrounds: Packed RGB integers of the backgrounds
+
+    Returns:
+        SHA-256 hex digest of the colors, the backgrounds and the cache version
+    """
+    colors = ",".join(rgb_to_hex(value) for value in rgb)
+    background_colors = ",".join(rgb_to_hex(value) for value in backgrounds)
+    text = f"{CONTRAST_CACHE_VERSION}:{colors}:{background_colors}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compute_contrast_matrices(
+    palettes_rgb: Sequence[Sequence[int]], background_rgb: Sequence[int]
+) -> List[np.ndarray]:
+    """
+    Compute the contrast ratios of several palettes,
+    converting the colors of all of them to luminance in one batch.
+
+    Args:
+        palettes_rgb: Packed RGB integers of the colors of each palette
+        background_rgb: Packed RGB integers of the backgrounds
+
+    Returns:
+        For each palette, a matrix of shape (n, n + backgrounds) with the
+        pairwise contrast ratios followed by the ratios against the backgrounds
+    """
+    colors = unpack_rgb(chain(chain.from_iterable(palettes_rgb), background_rgb))
+    luminances = relative_luminance(srgb_to_linear(colors))
+    background_luminances = luminances[len(luminances) - len(background_rgb) :]
+    offsets = np.cumsum([len(rgb) for rgb in palettes_rgb])
+    return [
+        np.hstack(
+            [
+                contrast_ratios(palette_luminances, palette_luminances),
+                contrast_ratios(palette_luminances, background_luminances),
+            ]
+        )
+        for palette_luminances in np.split(luminances[: offsets[-1]], offsets[:-1])
+    ]
+
+
+def analyze_contrast(
+    catalog: PaletteCatalog,
+    backgrounds: Optional[Mapping[str, int]] = None,
+    cache: Optional[Dict[str, np.ndarray]] = None,
+) -> List[PaletteContrast]:
+    """
+    Compute the contrast ratios of every palette of the catalog.
+    Only the palettes missing from the cache are computed, in one batch.
+
+    Args:
+        catalog: Palette catalog
+        backgrounds: Mapping of background names to packed RGB integers;
+            defaults to DEFAULT_BACKGROUNDS
+        cache: Mapping of palette digests to the matrices computed for them,
+            updated in place
+
+    Returns:
+        Contrast ratios of each palette, in catalog order
+    """
+    cache = {} if cache is None else cache
+    background_rgb = list((backgrounds or DEFAULT_BACKGROUNDS).values())
+    digests = [get_palette_digest(palette.rgb, background_rgb) for palette in catalog]
+    missing = {
+        digest: palette.rgb
+        for palette, digest in zip(catalog, digests)
+        if digest not in cache
+    }
+    if missing:
+        matrices = compute_contrast_matrices(list(missing.values()), background_rgb)
+        cache.update(zip(missing, matrices))
+    return [
+        PaletteContrast(
+            palette.name,
+            palette.keys,
+            digest,
+            cache[digest][:, : len(palette)],
+            cache[digest][:, len(palette) :],
+        )
+        for palette, digest in zip(catalog, digests)
+    ]
+
+
+def get_contrast_cache_path(repo_root: str) -> str:
+    """
+    Get the path of the contrast cache file.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Path to the contrast cache file
+    """
+    return os.path.join(get_cache_dir(repo_root), "contrast.npz")
+
+
+def load_contrast_cache(path: str) -> Dict[str, np.ndarray]:
+    """
+    Load cached contrast ratios.
+
+    Args:
+        path: Path to the cache file
+
+    Returns:
+        Mapping of palette digests to contrast matrices;
+        empty if the file is missing or corrupt
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return {}
+
+
+def save_contrast_cache(
+    path: str, cache: Mapping[str, np.ndarray], digests: Sequence[str]
+) -> None:
+    """
+    Save the cached contrast ratios of the given palettes, dropping the others.
+
+    Args:
+        path: Path to the cache file
+        cache: Mapping of palette digests to contrast matrices
+        digests: Digests of the palettes to keep
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    arrays: Dict[str, Any] = {digest: cache[digest] for digest in digests}
+    with open(tmp_path, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(tmp_path, path)
+
+
+def get_lowest_pair(ratios: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    Find the pair of distinct colors with the lowest contrast ratio.
+
+    Args:
+        ratios: Matrix of shape (n, n) with pairwise contrast ratios
+
+    Returns:
+        Indices of the two colors, or None if there are fewer than two colors
+    """
+    if len(ratios) < 2:
+        return None
+    rows, columns = np.triu_indices(len(ratios), k=1)
+    index = int(np.argmin(ratios[rows, columns]))
+    return int(rows[index]), int(columns[index])
+
+
+def format_palette_report(
+    result: PaletteContrast, background_names: Sequence[str], min_ratio: float
+) -> Tuple[List[str], int]:
+    """
+    Format the contrast report of a palette.
+
+    Args:
+        result: Contrast ratios of the palette
+        background_names: Names of the backgrounds, in order
+        min_ratio: Minimum contrast ratio of a color against a background
+
+    Returns:
+        Lines of the report, and the number of colors below the minimum ratio
+            against a background
+    """
+    lines = [result.name]
+    issues = 0
+    keys = result.keys
+    pair = get_lowest_pair(result.ratios)
+    if pair is not None:
+        first, second = pair
+        lines.append(
+            f"  lowest pair: {result.ratios[first, second]:.2f}:1 "
+            f"({keys[first]} / {keys[second]})"
+        )
+    for column, name in enumerate(background_names if keys else []):
+        ratios = result.background_ratios[:, column]
+        below = int(np.count_nonzero(ratios < min_ratio))
+        issues += below
+        lowest = int(np.argmin(ratios))
+        line = f"  {name}: lowest {ratios[lowest]:.2f}:1 ({keys[lowest]})"
+        if below:
+            line += f", {below} of {len(keys)} color(s) below {min_ratio:g}:1"
+        lines.append(line)
+    return lines, issues
+
+
+def format_report(
+    results: Sequence[PaletteContrast],
+    background_names: Sequence[str],
+    min_ratio: float,
+) -> Tuple[List[str], int]:
+    """
+    Format the contrast report of the palettes.
+
+    Args:
+        results: Contrast ratios of each palette
+        background_names: Names of the backgrounds, in order
+        min_ratio: Minimum contrast ratio of a color against a background
+
+    Returns:
+        Lines of the report, and the number of colors below the minimum ratio
+            against a background
+    """
+    lines: List[str] = []
+    issues = 0
+    for result in results:
+        palette_lines, palette_issues = format_palette_report(
+            result, background_names, min_ratio
+        )
+        lines.extend(palette_lines)
+        issues += palette_issues
+    return lines, issues
+
+
+def parse_background(value: str) -> Tuple[str, int]:
+    """
+    Parse a background given on the command line.
+
+    Args:
+        value: Background in NAME=#RRGGBB format
+
+    Returns:
+        Background name and packed RGB integer
+
+    Raises:
+        argparse.ArgumentTypeError: If the value isn't in NAME=#RRGGBB format
+    """
+    name, _, color = value.partition("=")
+    try:
+        if not name:
+            raise ValueError(value)
+        return name, parse_hex(color)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"Background must be in NAME=#RRGGBB format: {value}"
+        ) from e
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Report the contrast ratios of every palette in palettes.yml.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+
+    Raises:
+        SystemExit: With --strict, if a color is below the minimum ratio
+            against a background
+    """
+    parser = argparse.ArgumentParser(
+        description="Report WCAG contrast ratios of the palettes."
+    )
+    parser.add_argument(
+        "--background",
+        action="append",
+        type=parse_background,
+        metavar="NAME=#RRGGBB",
+        help="background to check against, replacing the defaults (repeatable)",
+    )
+    parser.add_argument(
+        "--min-ratio",
+        type=float,
+        default=MIN_NON_TEXT_CONTRAST,
+        help="minimum contrast ratio against a background (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="exit with an error if a color is below the minimum ratio",
+    )
+    args = parser.parse_args(argv)
+    backgrounds = dict(args.background or DEFAULT_BACKGROUNDS)
+
+    repo_root = get_repo_root()
+    cache_dir = get_cache_dir(repo_root)
+    catalog = load_palette_files(get_palette_paths(repo_root), cache_dir)
+    cache_path = get_contrast_cache_path(repo_root)
+    cache = load_contrast_cache(cache_path)
+    results = analyze_contrast(catalog, backgrounds, cache)
+    save_contrast_cache(cache_path, cache, [result.digest for result in results])
+
+    lines, issues = format_report(results, list(backgrounds), args.min_ratio)
+    print("\n".join(lines))
+    if issues:
+        print(f"{issues} color(s) below {args.min_ratio:g}:1 against a background.")
+        if args.strict:
+            raise SystemExit(1)
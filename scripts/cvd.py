@@ -0,0 +1,184 @@
+"""
+Color vision deficiency (CVD) simulation of the palettes defined in palettes.yml.
+All colors of the catalog are simulated under protanopia, deuteranopia
+and tritanopia in one batched matrix product in linear RGB,
+using the severity 1.0 matrices of Machado, Oliveira and Fernandes (2009).
+Each palette is then scored by the smallest OKLab distance
+between two of its colors under each simulation.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from scripts.colorspace import linear_to_oklab, srgb_to_linear, unpack_rgb
+from scripts.model import PaletteCatalog
+
+# Simulation matrices in linear RGB, with normal vision first
+VISION_MATRICES = {
+    "normal vision": np.eye(3),
+    "protanopia": np.array(
+        [
+            [0.152286, 1.052583, -0.204868],
+            [0.114503, 0.786281, 0.099216],
+            [-0.003882, -0.048116, 1.051998],
+        ]
+    ),
+    "deuteranopia": np.array(
+        [
+            [0.367322, 0.860646, -0.227968],
+            [0.280085, 0.672501, 0.047413],
+            [-0.011820, 0.042940, 0.968881],
+        ]
+    ),
+    "tritanopia": np.array(
+        [
+            [1.255528, -0.076749, -0.178779],
+            [-0.078411, 0.930809, 0.147602],
+            [0.004733, 0.691367, 0.303900],
+        ]
+    ),
+}
+
+# Minimum OKLab distance between two colors of a palette, below which a warning
+# is given; about the just noticeable difference between flat colors
+DEFAULT_MIN_DISTANCE = 0.02
+# Significant digits of the distances in the warnings, at least
+DISTANCE_DIGITS = 4
+
+
+class ClosestPair(NamedTuple):
+    """The two least distinguishable colors of a palette under a vision type."""
+
+    vision: str
+    # OKLab distance between the two colors as simulated
+    distance: float
+    first_key: str
+    second_key: str
+
+
+class PaletteDistinguishability(NamedTuple):
+    """Distinguishability of the colors of a palette under each vision type."""
+
+    name: str
+    # Closest pair under each vision type, in the order of VISION_MATRICES;
+    # empty for palettes with fewer than two colors
+    closest_pairs: Tuple[ClosestPair, ...]
+
+
+def simulate_oklab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Simulate colors under each vision type and convert them to OKLab.
+
+    Args:
+        rgb: Array of shape (n, 3) with sRGB channel values in [0, 1]
+
+    Returns:
+        Array of shape (vision types, n, 3) with the simulated OKLab colors
+    """
+    matrices = np.stack(list(VISION_MATRICES.values()))
+    simulated = np.einsum("vij,nj->vni", matrices, srgb_to_linear(rgb))
+    return linear_to_oklab(np.clip(simulated, 0.0, 1.0))
+
+
+def find_closest_pairs(oklab: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the closest pair of colors under each vision type.
+
+    Args:
+        oklab: Array of shape (vision types, n, 3) with simulated OKLab colors,
+            with n of at least 2
+
+    Returns:
+        Distances of shape (vision types,) and color indices of shape
+        (vision types, 2) of the closest pair under each vision type
+    """
+    rows, columns = np.triu_indices(oklab.shape[1], k=1)
+    distances = np.linalg.norm(oklab[:, rows] - oklab[:, columns], axis=-1)
+    closest = np.argmin(distances, axis=1)
+    indices = np.stack([rows[closest], columns[closest]], axis=-1)
+    return distances[np.arange(len(closest)), closest], indices
+
+
+def analyze_distinguishability(
+    catalog: PaletteCatalog,
+) -> List[PaletteDistinguishability]:
+    """
+    Score how distinguishable the colors of every palette are
+    under normal vision and each simulated color vision deficiency.
+
+    Args:
+        catalog: Palette catalog
+
+    Returns:
+        Distinguishability of each palette, in catalog order
+    """
+    oklab = simulate_oklab(
+        unpack_rgb(rgb for palette in catalog for rgb in palette.rgb)
+    )
+    results = []
+    start = 0
+    for palette in catalog:
+        end = start + len(palette)
+        pairs: Tuple[ClosestPair, ...] = ()
+        if len(palette) > 1:
+            keys = palette.keys
+            distances, indices = find_closest_pairs(oklab[:, start:end])
+            pairs = tuple(
+                ClosestPair(vision, float(distance), keys[first], keys[second])
+                for vision, distance, (first, second) in zip(
+                    VISION_MATRICES, distances, indices
+                )
+            )
+        results.append(PaletteDistinguishability(palette.name, pairs))
+        start = end
+    return results
+
+
+def format_distances(distance: float, threshold: float) -> Tuple[str, str]:
+    """
+    Format a distance and the minimum distance with the same precision,
+    using more digits where needed to tell them apart.
+
+    Args:
+        distance: OKLab distance below the minimum
+        threshold: Minimum OKLab distance
+
+    Returns:
+        Formatted distance and minimum distance
+    """
+    # Rounding keeps the order, so the distance is never shown above the minimum,
+    # and 17 significant digits tell any two floats apart
+    digits = DISTANCE_DIGITS
+    while digits < 17 and f"{distance:.{digits}g}" == f"{threshold:.{digits}g}":
+        digits += 1
+    return f"{distance:.{digits}g}", f"{threshold:.{digits}g}"
+
+
+def check_palettes(
+    catalog: PaletteCatalog, min_distance: Optional[float] = None
+) -> List[str]:
+    """
+    Check that the colors of every palette stay distinguishable
+    under normal vision and each simulated color vision deficiency.
+
+    Args:
+        catalog: Palette catalog
+        min_distance: Minimum OKLab distance between two colors of a palette;
+            defaults to DEFAULT_MIN_DISTANCE
+
+    Returns:
+        One warning per palette and vision type below the minimum distance
+    """
+    threshold = DEFAULT_MIN_DISTANCE if min_distance is None else min_distance
+    warnings = []
+    for result in analyze_distinguishability(catalog):
+        for pair in result.closest_pairs:
+            if pair.distance < threshold:
+                distance, minimum = format_distances(pair.distance, threshold)
+                warnings.append(
+                    f"'{result.name}' colors '{pair.first_key}' and "
+                    f"'{pair.second_key}' are hard to tell apart under {pair.vision} "
+                    f"(OKLab distance {distance} < {minimum})"
+                )
+    return warnings
@@ -0,0 +1,254 @@
+"""
+Finds near-duplicate colors across all palettes,
+those in palettes.yml and in the files in palettes.d/ alike.
+Every color is converted to OKLab and hashed into a uniform grid
+whose cells are as wide as the distance threshold,
+so two colors within the threshold are always in the same or adjacent cells.
+Sorting the cell keys once and looking up the neighboring cells with binary search
+finds every close pair in O(n log n + pairs) time, without comparing all pairs.
+By defining it in pyproject.toml's [tool.poetry.scripts],
+it can be run as `poetry run duplicates`.
+"""
+
+import argparse
+from itertools import product
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scripts.build import get_palette_paths, load_palette_files
+from scripts.cache import get_cache_dir
+from scripts.colorspace import linear_to_oklab, srgb_to_linear, unpack_rgb
+from scripts.formatter import get_repo_root
+from scripts.model import PaletteCatalog
+
+# OKLab distance within which two colors are reported as near-duplicates;
+# about the just noticeable difference between flat colors
+DEFAULT_THRESHOLD = 0.02
+
+# Offsets of half of the 26 neighboring grid cells; the other half is covered
+# when the neighboring cell looks back, so each pair is found only once
+NEIGHBOR_OFFSETS = np.array(
+    [offset for offset in product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)]
+)
+
+
+class ColorLocation(NamedTuple):
+    """A color of the catalog, identified by its palette and key."""
+
+    palette: str
+    key: str
+    hex: str
+
+    def __str__(self) -> str:
+        return f"'{self.palette}' {self.key} ({self.hex})"
+
+
+class NearDuplicate(NamedTuple):
+    """A pair of colors within the distance threshold of each other."""
+
+    first: ColorLocation
+    second: ColorLocation
+    # OKLab distance between the two colors
+    distance: float
+
+    @property
+    def same_palette(self) -> bool:
+        """Whether both colors belong to the same palette."""
+        return self.first.palette == self.second.palette
+
+
+def expand_ranges(
+    starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Expand index ranges into pairs of (range number, index in the range).
+
+    Args:
+        starts: Array of shape (n,) with the first index of each range
+        ends: Array of shape (n,) with the index past the end of each range
+
+    Returns:
+        Arrays with the range number and the index of each expanded element
+    """
+    counts = np.maximum(ends - starts, 0)
+    owners = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, starts[owners] + offsets
+
+
+def get_cell_keys(
+    points: np.ndarray, cell_size: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash points into the cells of a uniform grid.
+
+    Args:
+        points: Array of shape (n, 3) with point coordinates, with n of at least 1
+        cell_size: Width of a grid cell
+
+    Returns:
+        Array of shape (n,) with the key of each point's cell, and the strides
+        of the three axes, by which the keys of neighboring cells differ
+    """
+    # Integer cell coordinates, shifted so that every neighbor has non-negative ones
+    cells = np.floor(points / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    shape = cells.max(axis=0) + 2
+    strides = np.array([shape[1] * shape[2], shape[2], 1])
+    return cells @ strides, strides
+
+
+def find_close_pairs(
+    points: np.ndarray, threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find every pair of points within a distance of each other using a grid index.
+
+    Args:
+        points: Array of shape (n, 3) with point coordinates
+        threshold: Maximum distance between the points of a pair
+
+    Returns:
+        Arrays of shape (pairs,) with the index of the first point of each pair,
+        the index of the second point, which is always larger,
+        and the distance between them, sorted by the two indices
+
+    Raises:
+        ValueError: If the threshold isn't positive
+    """
+    if not threshold > 0:
+        raise ValueError(f"Threshold must be positive: {threshold}")
+    if len(points) < 2:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, np.empty(0)
+
+    keys, strides = get_cell_keys(points, threshold)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+
+    # Later points in the same cell, then every point in the neighboring cells
+    same_cell_ends = np.searchsorted(keys, keys, side="right")
+    firsts, seconds = expand_ranges(np.arange(1, len(keys) + 1), same_cell_ends)
+    candidates = [(firsts, seconds)]
+    for neighbor_keys in keys + (NEIGHBOR_OFFSETS @ strides)[:, np.newaxis]:
+        candidates.append(
+            expand_ranges(
+                np.searchsorted(keys, neighbor_keys, side="left"),
+                np.searchsorted(keys, neighbor_keys, side="right"),
+            )
+        )
+    firsts = order[np.concatenate([first for first, _ in candidates])]
+    seconds = order[np.concatenate([second for _, second in candidates])]
+
+    distances = np.linalg.norm(points[firsts] - points[seconds], axis=-1)
+    close = distances <= threshold
+    firsts, seconds = np.sort(np.stack([firsts[close], seconds[close]]), axis=0)
+    pair_order = np.lexsort((seconds, firsts))
+    return firsts[pair_order], seconds[pair_order], distances[close][pair_order]
+
+
+def find_near_duplicates(
+    catalog: PaletteCatalog, threshold: Optional[float] = None
+) -> List[NearDuplicate]:
+    """
+    Find every pair of colors of the catalog within an OKLab distance,
+    both within a palette and across palettes.
+
+    Args:
+        catalog: Palette catalog
+        threshold: Maximum OKLab distance between the colors of a pair;
+            defaults to DEFAULT_THRESHOLD
+
+    Returns:
+        Near-duplicate pairs in catalog order of their first and second colors
+
+    Raises:
+        ValueError: If the threshold isn't positive
+    """
+    locations = [
+        ColorLocation(palette.name, key, hex_value)
+        for palette in catalog
+        for key, hex_value in zip(palette.keys, palette.hex_values)
+    ]
+    oklab = linear_to_oklab(
+        srgb_to_linear(unpack_rgb(rgb for palette in catalog for rgb in palette.rgb))
+    )
+    firsts, seconds, distances = find_close_pairs(
+        oklab, DEFAULT_THRESHOLD if threshold is None else threshold
+    )
+    return [
+        NearDuplicate(locations[first], locations[second], float(distance))
+        for first, second, distance in zip(firsts, seconds, distances)
+    ]
+
+
+def format_report(duplicates: Sequence[NearDuplicate]) -> List[str]:
+    """
+    Format the near-duplicates, grouped into pairs across palettes
+    and pairs within a palette.
+
+    Args:
+        duplicates: Near-duplicate pairs
+
+    Returns:
+        Lines of the report
+    """
+    lines: List[str] = []
+    for title, same_palette in (
+        ("Across palettes:", False),
+        ("Within a palette:", True),
+    ):
+        group = [pair for pair in duplicates if pair.same_palette == same_palette]
+        if group:
+            lines.append(title)
+            lines.extend(
+                f"  {pair.first} and {pair.second}: {pair.distance:.3f}"
+                for pair in group
+            )
+    return lines
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Report near-duplicate colors in palettes.yml.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+
+    Raises:
+        SystemExit: With --strict, if any near-duplicates are found
+    """
+    parser = argparse.ArgumentParser(
+        description="Report pairs of near-duplicate colors across all palettes."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        metavar="DISTANCE",
+        help="maximum OKLab distance of a near-duplicate pair (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="exit with an error if any near-duplicates are found",
+    )
+    args = parser.parse_args(argv)
+    if not args.threshold > 0:
+        parser.error(f"--threshold must be positive: {args.threshold}")
+
+    repo_root = get_repo_root()
+    catalog = load_palette_files(get_palette_paths(repo_root), get_cache_dir(repo_root))
+    duplicates = find_near_duplicates(catalog, args.threshold)
+    lines = format_report(duplicates)
+    if lines:
+        print("\n".join(lines))
+    across = sum(not pair.same_palette for pair in duplicates)
+    print(
+        f"{len(duplicates)} pair(s) of colors within OKLab distance "
+        f"{args.threshold:g}: {across} across palettes, "
+        f"{len(duplicates) - across} within a palette."
+    )
+    if duplicates and args.strict:
+        raise SystemExit(1)
@@ -2,22 +2,479 @@
 Script to run code formatters: Prettier for Markdown/HTML (*.tps) and isort/black for Python.
 """
 
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 import os
+from pathlib import Path
 import subprocess
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
 
+from scripts.cache import file_digest, get_cache_dir, load_json, save_json
 
-def main():
+# File extensions formatted by Prettier
+PRETTIER_EXTENSIONS = (
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".md",
+    ".scss",
+    ".tps",
+    ".yaml",
+    ".yml",
+)
+# File extensions formatted by isort and black
+PYTHON_EXTENSIONS = (".py",)
+# Files whose changes can alter the output of the formatters
+FORMATTER_CONFIG_FILES = (".prettierrc", ".prettierignore", "pyproject.toml")
+
+
+def get_repo_root() -> str:
     """
-    Run code formatters.
+    Get the path to the repository root.
+
+    Returns:
+        Path to the repository root
     """
-    # Prettier
-    print("Formatting with Prettier...")
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_prettier(paths: Sequence[str], cwd: Optional[str] = None) -> None:
+    """
+    Run Prettier on the given paths.
+
+    Args:
+        paths: Files or directories to format
+        cwd: Working directory. Defaults to the current directory.
+    """
+    command = ["npx", "prettier", "--write", *paths]
     if os.name == "nt":
         # Running on Windows
-        subprocess.run(["npx", "prettier", "--write", "."], check=True, shell=True)
+        subprocess.run(command, check=True, shell=True, cwd=cwd)
     else:
         # Running on other OS
-        subprocess.run(["npx", "prettier", "--write", "."], check=True)
+        subprocess.run(command, check=True, cwd=cwd)
+
+
+class ToolResult(NamedTuple):
+    """Result of running one formatter."""
+
+    # Name of the formatter
+    name: str
+    # Exit status, 0 on success
+    returncode: int
+    # Collected output of the formatter
+    output: str
+
+
+def run_prettier_captured(paths: Sequence[str], cwd: str) -> List[ToolResult]:
+    """
+    Run Prettier on the given paths, collecting its output instead of printing it.
+
+    Args:
+        paths: Files or directories to format
+        cwd: Working directory
+
+    Returns:
+        List containing the result of Prettier
+    """
+    result = subprocess.run(
+        ["npx", "prettier", "--write", *paths],
+        check=False,
+        shell=os.name == "nt",
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=cwd,
+    )
+    return [ToolResult("Prettier", result.returncode, result.stdout)]
+
+
+def get_black_mode(cwd: str) -> Any:
+    """
+    Get the black mode of the project, built from its [tool.black] settings
+    the way the black command builds it. Without a target-version setting,
+    black infers the target versions from requires-python.
+
+    Args:
+        cwd: Directory containing pyproject.toml
+
+    Returns:
+        black.Mode of the project, or the default mode without pyproject.toml
+    """
+    # black is a development dependency, only needed in the concurrent mode
+    import black  # pylint: disable=import-outside-toplevel
+
+    pyproject_path = os.path.join(cwd, "pyproject.toml")
+    config = (
+        black.parse_pyproject_toml(pyproject_path)
+        if os.path.exists(pyproject_path)
+        else {}
+    )
+    return black.Mode(
+        target_versions={
+            black.TargetVersion[name.upper()]
+            for name in config.get("target_version", [])
+        },
+        line_length=config.get("line_length", black.DEFAULT_LINE_LENGTH),
+        is_pyi=config.get("pyi", False),
+        skip_source_first_line=config.get("skip_source_first_line", False),
+        string_normalization=not config.get("skip_string_normalization", False),
+        magic_trailing_comma=not config.get("skip_magic_trailing_comma", False),
+        preview=config.get("preview", False),
+        unstable=config.get("unstable", False),
+        python_cell_magics=set(config.get("python_cell_magics", [])),
+        enabled_features={
+            black.Preview[name] for name in config.get("enable_unstable_feature", [])
+        },
+    )
+
+
+def run_python_formatters(paths: Sequence[str], cwd: str) -> List[ToolResult]:
+    """
+    Run isort and then black on the given Python files through their Python APIs,
+    without starting new interpreters.
+    Both tools edit the same files, so they run one after the other on each file.
+
+    Args:
+        paths: Python files to format, relative to the working directory
+        cwd: Working directory, containing pyproject.toml
+
+    Returns:
+        List containing the results of isort and black
+    """
+    # isort and black are development dependencies, only needed in this mode
+    import black  # pylint: disable=import-outside-toplevel
+    import isort  # pylint: disable=import-outside-toplevel
+
+    isort_config = isort.Config(settings_path=cwd, quiet=True)
+    black_mode = get_black_mode(cwd)
+    outputs: Dict[str, List[str]] = {"isort": [], "black": []}
+    failed = set()
+    for path in paths:
+        full_path = os.path.join(cwd, path)
+        try:
+            if isort.file(full_path, config=isort_config):
+                outputs["isort"].append(f"Fixed {path}")
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            outputs["isort"].append(f"Failed to format {path}: {e}")
+            failed.add("isort")
+        try:
+            if black.format_file_in_place(
+                Path(full_path),
+                fast=False,
+                mode=black_mode,
+                write_back=black.WriteBack.YES,
+            ):
+                outputs["black"].append(f"reformatted {path}")
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            outputs["black"].append(f"Failed to format {path}: {e}")
+            failed.add("black")
+    return [
+        ToolResult(name, 1 if name in failed else 0, "\n".join(lines))
+        for name, lines in outputs.items()
+    ]
+
+
+def format_files_concurrently(repo_root: str, files: Sequence[str]) -> int:
+    """
+    Run Prettier and the Python formatters concurrently on separate workers.
+    They never edit the same files, so the formatting time is that of the slowest tool.
+
+    Args:
+        repo_root: Path to the repository root
+        files: Relative paths of the files to format
+
+    Returns:
+        Combined exit status: 0 if every formatter succeeded, 1 otherwise
+    """
+    prettier_files = [path for path in files if path.endswith(PRETTIER_EXTENSIONS)]
+    python_files = [path for path in files if path.endswith(PYTHON_EXTENSIONS)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = []
+        if prettier_files:
+            print(f"Formatting {len(prettier_files)} file(s) with Prettier...")
+            futures.append(
+                executor.submit(run_prettier_captured, prettier_files, repo_root)
+            )
+        if python_files:
+            print(f"Formatting {len(python_files)} file(s) with isort and black...")
+            futures.append(
+                executor.submit(run_python_formatters, python_files, repo_root)
+            )
+        results = [result for future in futures for result in future.result()]
+    for result in results:
+        if result.output:
+            print(result.output)
+        if result.returncode == 0:
+            print(f"Formatting done ({result.name}).")
+        else:
+            print(f"Formatting failed ({result.name}).")
+    return 0 if all(result.returncode == 0 for result in results) else 1
+
+
+def list_repository_files(repo_root: str) -> List[str]:
+    """
+    List the tracked and untracked, non-ignored files of the repository.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Paths relative to the repository root, separated by "/"
+    """
+    result = subprocess.run(
+        ["git", "ls-files", "--cached", "--others", "--exclude-standard", "-z"],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+        cwd=repo_root,
+    )
+    return sorted({path for path in result.stdout.split("\0") if path})
+
+
+def is_formattable(path: str) -> bool:
+    """
+    Check whether a file is handled by one of the formatters.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        True if Prettier, or isort and black, format the file
+    """
+    return path.endswith(PRETTIER_EXTENSIONS) or path.endswith(PYTHON_EXTENSIONS)
+
+
+def get_config_digest(repo_root: str) -> str:
+    """
+    Get a digest of the formatter configuration files.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Digest string, changing whenever a configuration file changes
+    """
+    digests = []
+    for name in FORMATTER_CONFIG_FILES:
+        try:
+            digests.append(file_digest(os.path.join(repo_root, name)))
+        except FileNotFoundError:
+            digests.append("")
+    return ":".join(digests)
+
+
+def get_fingerprint(
+    path: str, cached: Optional[List[Any]] = None
+) -> Optional[List[Any]]:
+    """
+    Get the fingerprint of a file: its modification time, size and content digest.
+    The content is hashed only if the modification time or size differ from
+    the cached fingerprint.
+
+    Args:
+        path: Path to the file
+        cached: Previously recorded fingerprint of the file, if any
+
+    Returns:
+        Fingerprint as [mtime_ns, size, digest], or None if the file doesn't exist
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached
+    return [stat.st_mtime_ns, stat.st_size, file_digest(path)]
+
+
+def load_fingerprints(repo_root: str) -> Dict[str, List[Any]]:
+    """
+    Load the fingerprints of the files known to be formatted.
+    The fingerprints are discarded if the formatter configuration changed.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Mapping of relative file paths to their fingerprints
+    """
+    cache = load_json(os.path.join(get_cache_dir(repo_root), "formatter.json"))
+    if not isinstance(cache, dict) or cache.get("config") != get_config_digest(
+        repo_root
+    ):
+        return {}
+    return cache.get("files", {})
+
+
+def save_fingerprints(repo_root: str, fingerprints: Dict[str, List[Any]]) -> None:
+    """
+    Save the fingerprints of the files known to be formatted.
+
+    Args:
+        repo_root: Path to the repository root
+        fingerprints: Mapping of relative file paths to their fingerprints
+    """
+    save_json(
+        os.path.join(get_cache_dir(repo_root), "formatter.json"),
+        {"config": get_config_digest(repo_root), "files": fingerprints},
+    )
+
+
+def find_unformatted_files(
+    repo_root: str, fingerprints: Optional[Dict[str, List[Any]]] = None
+) -> List[str]:
+    """
+    Find the files that are new or changed since they were last formatted.
+
+    Args:
+        repo_root: Path to the repository root
+        fingerprints: Fingerprints of the formatted files. Loaded from the cache if None.
+
+    Returns:
+        Relative paths of the files to format
+    """
+    if fingerprints is None:
+        fingerprints = load_fingerprints(repo_root)
+    unformatted = []
+    for path in filter(is_formattable, list_repository_files(repo_root)):
+        cached = fingerprints.get(path)
+        fingerprint = get_fingerprint(os.path.join(repo_root, path), cached)
+        if fingerprint is None:
+            # Listed by git but deleted from the working tree
+            continue
+        if cached and fingerprint[2] == cached[2]:
+            # Same content, possibly with a new modification time
+            fingerprints[path] = fingerprint
+            continue
+        unformatted.append(path)
+    return unformatted
+
+
+def record_formatted_files(
+    repo_root: str, fingerprints: Dict[str, List[Any]], files: Sequence[str]
+) -> None:
+    """
+    Record the fingerprints of files as they are after the formatters ran.
+
+    Args:
+        repo_root: Path to the repository root
+        fingerprints: Fingerprints of the formatted files, updated in place
+        files: Relative paths of the formatted files
+    """
+    formatted = {path: get_fingerprint(os.path.join(repo_root, path)) for path in files}
+    fingerprints.update(
+        (path, fingerprint)
+        for path, fingerprint in formatted.items()
+        if fingerprint is not None
+    )
+    save_fingerprints(repo_root, fingerprints)
+
+
+def format_changed_files(
+    repo_root: str,
+    concurrent: bool = False,
+    fingerprints: Optional[Dict[str, List[Any]]] = None,
+    files: Optional[Sequence[str]] = None,
+) -> None:
+    """
+    Run the formatters only on files that are new or changed
+    since they were last formatted, then record their fingerprints.
+
+    Args:
+        repo_root: Path to the repository root
+        concurrent: Run the formatters concurrently, with isort and black in-process
+        fingerprints: Fingerprints of the formatted files. Loaded from the cache if None.
+        files: Relative paths of the files to format, as found by
+            find_unformatted_files() with the fingerprints. Found if None.
+
+    Raises:
+        SystemExit: If a formatter failed in concurrent mode
+    """
+    if fingerprints is None:
+        fingerprints = load_fingerprints(repo_root)
+    if files is None:
+        files = find_unformatted_files(repo_root, fingerprints)
+    if not files:
+        print("All files are already formatted.")
+        return
+    if concurrent:
+        status = format_files_concurrently(repo_root, files)
+        if status:
+            raise SystemExit(status)
+        record_formatted_files(repo_root, fingerprints, files)
+        print("All formatting complete.")
+        return
+    prettier_files = [path for path in files if path.endswith(PRETTIER_EXTENSIONS)]
+    python_files = [path for path in files if path.endswith(PYTHON_EXTENSIONS)]
+    if prettier_files:
+        print(f"Formatting {len(prettier_files)} file(s) with Prettier...")
+        run_prettier(prettier_files, cwd=repo_root)
+        print("Formatting done (Prettier).")
+    if python_files:
+        print(f"Formatting {len(python_files)} file(s) with isort...")
+        subprocess.run(["isort", *python_files], check=True, cwd=repo_root)
+        print("Formatting done (isort).")
+        print(f"Formatting {len(python_files)} file(s) with black...")
+        subprocess.run(["black", *python_files], check=True, cwd=repo_root)
+        print("Formatting done (black).")
+    record_formatted_files(repo_root, fingerprints, files)
+    print("All formatting complete.")
+
+
+def format_all_concurrently(repo_root: str) -> None:
+    """
+    Run the formatters concurrently on every file of the repository,
+    then record their fingerprints.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Raises:
+        SystemExit: If a formatter failed
+    """
+    files = [
+        path
+        for path in list_repository_files(repo_root)
+        if is_formattable(path) and os.path.exists(os.path.join(repo_root, path))
+    ]
+    status = format_files_concurrently(repo_root, files)
+    if status:
+        raise SystemExit(status)
+    record_formatted_files(repo_root, {}, files)
+    print("All formatting complete.")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Run code formatters.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Run code formatters.")
+    parser.add_argument(
+        "--changed",
+        action="store_true",
+        help="format only files that are new or changed since they were last formatted",
+    )
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="run Prettier concurrently with isort and black, which run in-process",
+    )
+    args = parser.parse_args(argv)
+    if args.changed:
+        format_changed_files(get_repo_root(), concurrent=args.concurrent)
+        return
+    if args.concurrent:
+        format_all_concurrently(get_repo_root())
+        return
+
+    # Prettier
+    print("Formatting with Prettier...")
+    run_prettier(["."])
     print("Formatting done (Prettier).")
     # isort
     print("Formatting with isort...")
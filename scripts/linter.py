@@ -2,16 +2,136 @@
 Script to run linters after running formatters defined in scripts.formatter.py.
 """
 
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from scripts import formatter
+from scripts.formatter import ToolResult
 
 # Directories to lint
 LINT_TARGET = ["./scripts", "./tests"]
 
 
-def main():
+def get_lint_commands(targets: Sequence[str]) -> Dict[str, List[str]]:
+    """
+    Get the commands running each linter once over all targets
+    with the current interpreter, without going through Poetry.
+
+    Args:
+        targets: Directories to lint
+
+    Returns:
+        Mapping of linter names to their commands
+    """
+    return {
+        # mypy reuses its cache in .mypy_cache/ across runs
+        "mypy": [sys.executable, "-m", "mypy", "--incremental", *targets],
+        "pylint": [sys.executable, "-m", "pylint", *targets],
+    }
+
+
+def run_linter(name: str, command: Sequence[str], cwd: str) -> ToolResult:
+    """
+    Run a linter, collecting its output instead of printing it.
+
+    Args:
+        name: Name of the linter
+        command: Command to run
+        cwd: Working directory
+
+    Returns:
+        Result of the linter
+    """
+    result = subprocess.run(
+        command,
+        check=False,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=cwd,
+    )
+    return ToolResult(name, result.returncode, result.stdout)
+
+
+def run_linters_concurrently(repo_root: str, targets: Sequence[str]) -> int:
+    """
+    Run mypy and pylint concurrently, each once over all targets.
+
+    Args:
+        repo_root: Path to the repository root
+        targets: Directories to lint
+
+    Returns:
+        Combined exit status: 0 if every linter succeeded, 1 otherwise
+    """
+    commands = get_lint_commands(targets)
+    print(f"Linting {', '.join(targets)} with {' and '.join(commands)}...")
+    with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+        futures = [
+            executor.submit(run_linter, name, command, repo_root)
+            for name, command in commands.items()
+        ]
+        results = [future.result() for future in futures]
+    for result in results:
+        if result.output:
+            print(result.output.rstrip("\n"))
+        if result.returncode == 0:
+            print(f"{result.name} linting done.")
+        else:
+            print(f"{result.name} linting failed.")
+    return 0 if all(result.returncode == 0 for result in results) else 1
+
+
+def lint_cached(repo_root: str) -> None:
+    """
+    Format the files changed since they were last formatted, if any,
+    then run the linters concurrently in a single pass.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Raises:
+        SystemExit: If a formatter or a linter failed
+    """
+    # The files are fingerprinted once, for both finding and formatting them
+    fingerprints = formatter.load_fingerprints(repo_root)
+    files = formatter.find_unformatted_files(repo_root, fingerprints)
+    if files:
+        formatter.format_changed_files(
+            repo_root, concurrent=True, fingerprints=fingerprints, files=files
+        )
+    else:
+        print("All files are already formatted. Skipping formatters.")
+    status = run_linters_concurrently(repo_root, LINT_TARGET)
+    if status:
+        raise SystemExit(status)
+    print("All linting complete.")
+
+
+def main(argv: Optional[Sequence[str]] = None):
     """
     Run linters after running the set of formatters defined in scripts.formatter.py.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
     """
+    parser = argparse.ArgumentParser(description="Run formatters and linters.")
+    parser.add_argument(
+        "--cached",
+        action="store_true",
+        help=(
+            "skip formatting when all files are known to be formatted, "
+            "and run mypy and pylint concurrently in a single pass"
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.cached:
+        lint_cached(formatter.get_repo_root())
+        return
+
     # First, run the formatter
     subprocess.run(["poetry", "run", "formatter"], check=True)
     for target in LINT_TARGET:
@@ -0,0 +1,300 @@
+"""
+Compact typed model of the color palettes defined in palettes.yml.
+Colors are stored as packed 24-bit RGB integers,
+and color keys and hex strings shared between palettes are stored only once.
+"""
+
+from array import array
+from collections.abc import Sequence
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, overload
+
+# Default palette type when none is given in palettes.yml
+DEFAULT_PALETTE_TYPE = "categorical"
+
+# Red, green and blue channel values from 0 to 255
+RgbTuple = Tuple[int, int, int]
+
+# Hex color string in #rrggbb format
+HEX_COLOR_PATTERN = re.compile(r"#[0-9a-fA-F]{6}")
+
+
+def parse_hex(value: str) -> int:
+    """
+    Convert a hex color string to a 24-bit RGB integer.
+
+    Args:
+        value: Hex color string in #rrggbb format
+
+    Returns:
+        RGB integer, e.g. 0xff0000 for "#ff0000"
+
+    Raises:
+        ValueError: If the value isn't a hex color string in #rrggbb format
+    """
+    # int() alone would also accept signs, spaces, underscores and a 0x prefix
+    if not isinstance(value, str) or not HEX_COLOR_PATTERN.fullmatch(value):
+        raise ValueError(f"Invalid hex color: {value!r}")
+    return int(value[1:], 16)
+
+
+def rgb_to_hex(rgb: int) -> str:
+    """
+    Convert a 24-bit RGB integer to a lowercase hex color string.
+
+    Args:
+        rgb: RGB integer
+
+    Returns:
+        Hex color string in #rrggbb format
+    """
+    return f"#{rgb:06x}"
+
+
+def unpack_rgb_tuple(rgb: int) -> RgbTuple:
+    """
+    Convert a 24-bit RGB integer to a tuple of channel values.
+
+    Args:
+        rgb: RGB integer
+
+    Returns:
+        Red, green and blue channel values from 0 to 255
+    """
+    return (rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF
+
+
+class Color:
+    """A single color of a palette, identified by its key."""
+
+    __slots__ = ("key", "rgb")
+
+    def __init__(self, key: str, rgb: int):
+        self.key = key
+        self.rgb = rgb
+
+    @property
+    def hex(self) -> str:
+        """Hex color string in #rrggbb format."""
+        return rgb_to_hex(self.rgb)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Color):
+            return NotImplemented
+        return self.key == other.key and self.rgb == other.rgb
+
+    def __hash__(self) -> int:
+        return hash((self.key, self.rgb))
+
+    def __repr__(self) -> str:
+        return f"Color({self.key!r}, {self.hex!r})"
+
+
+class ColorTable:
+    """
+    Tables shared by all palettes of a catalog.
+    Each distinct color key and each distinct hex string is stored only once.
+    """
+
+    __slots__ = ("keys", "_key_ids", "_hex")
+
+    def __init__(self) -> None:
+        self.keys: List[str] = []
+        self._key_ids: Dict[str, int] = {}
+        self._hex: Dict[int, str] = {}
+
+    def key_id(self, key: str) -> int:
+        """
+        Get the index of a key in the key table, adding it if needed.
+
+        Args:
+            key: Color key
+
+        Returns:
+            Index of the key in the key table
+        """
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self._key_ids[key] = key_id
+        return key_id
+
+    def hex(self, rgb: int) -> str:
+        """
+        Get the shared hex string of an RGB integer.
+
+        Args:
+            rgb: RGB integer
+
+        Returns:
+            Hex color string in #rrggbb format
+        """
+        value = self._hex.get(rgb)
+        if value is None:
+            value = self._hex[rgb] = rgb_to_hex(rgb)
+        return value
+
+
+class Palette:
+    """A color palette with its colors packed into arrays."""
+
+    __slots__ = ("name", "type", "description", "_table", "_key_ids", "_rgb")
+
+    def __init__(
+        self,
+        name: str,
+        palette_type: str,
+        description: str,
+        colors: Iterable[Tuple[str, int]],
+        table: ColorTable,
+    ):
+        """
+        Args:
+            name: Palette name
+            palette_type: Palette type (categorical, sequential, diverging)
+            description: Palette description
+            colors: Iterable of (key, RGB integer) pairs
+            table: Table shared by the palettes of the catalog
+        """
+        self.name = name
+        self.type = palette_type
+        self.description = description
+        self._table = table
+        self._key_ids = array("I")
+        self._rgb = array("I")
+        for key, rgb in colors:
+            self._key_ids.append(table.key_id(key))
+            self._rgb.append(rgb)
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        """Color keys in palette order."""
+        table_keys = self._table.keys
+        return tuple(table_keys[key_id] for key_id in self._key_ids)
+
+    @property
+    def rgb(self) -> array:
+        """Packed 24-bit RGB integers in palette order."""
+        return self._rgb
+
+    @property
+    def hex_values(self) -> Tuple[str, ...]:
+        """Hex color strings in palette order."""
+        return tuple(self._table.hex(rgb) for rgb in self._rgb)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the palette back into the structure used in palettes.yml.
+
+        Returns:
+            Palette dictionary
+        """
+        return {
+            "name": self.name,
+            "type": self.type,
+            "description": self.description,
+            "colors": [
+                {"key": key, "value": value}
+                for key, value in zip(self.keys, self.hex_values)
+            ],
+        }
+
+    def __len__(self) -> int:
+        return len(self._rgb)
+
+    def __iter__(self) -> Iterator[Color]:
+        table_keys = self._table.keys
+        for key_id, rgb in zip(self._key_ids, self._rgb):
+            yield Color(table_keys[key_id], rgb)
+
+    def __repr__(self) -> str:
+        return f"Palette({self.name!r}, {self.type!r}, {len(self)} color(s))"
+
+
+class PaletteCatalog(Sequence[Palette]):
+    """An ordered collection of palettes sharing one ColorTable."""
+
+    __slots__ = ("palettes", "table")
+
+    def __init__(self) -> None:
+        self.palettes: List[Palette] = []
+        self.table = ColorTable()
+
+    @classmethod
+    def from_dicts(cls, palettes: Iterable[Dict[str, Any]]) -> "PaletteCatalog":
+        """
+        Build a catalog from palette dictionaries as defined in palettes.yml.
+        Missing fields are resolved to their defaults here, once.
+
+        Args:
+            palettes: Iterable of palette dictionaries
+
+        Returns:
+            Palette catalog
+
+        Raises:
+            ValueError: If a color value isn't a hex color string in #rrggbb format
+        """
+        catalog = cls()
+        for palette in palettes:
+            catalog.add(
+                str(palette.get("name") or ""),
+                str(palette.get("type") or DEFAULT_PALETTE_TYPE),
+                str(palette.get("description") or ""),
+                [
+                    (str(color.get("key", "")), parse_hex(color.get("value", "")))
+                    for color in palette.get("colors") or []
+                ],
+            )
+        return catalog
+
+    def add(
+        self,
+        name: str,
+        palette_type: str,
+        description: str,
+        colors: Iterable[Tuple[str, int]],
+    ) -> Palette:
+        """
+        Add a palette to the catalog.
+
+        Args:
+            name: Palette name
+            palette_type: Palette type (categorical, sequential, diverging)
+            description: Palette description
+            colors: Iterable of (key, RGB integer) pairs
+
+        Returns:
+            The added palette
+        """
+        palette = Palette(name, palette_type, description, colors, self.table)
+        self.palettes.append(palette)
+        return palette
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Convert the catalog back into the structure used in palettes.yml.
+
+        Returns:
+            List of palette dictionaries
+        """
+        return [palette.to_dict() for palette in self.palettes]
+
+    @overload
+    def __getitem__(self, index: int) -> Palette: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Palette]: ...
+
+    def __getitem__(self, index):
+        return self.palettes[index]
+
+    def __len__(self) -> int:
+        return len(self.palettes)
+
+    def __iter__(self) -> Iterator[Palette]:
+        return iter(self.palettes)
+
+    def __repr__(self) -> str:
+        return f"PaletteCatalog({len(self)} palette(s))"
@@ -0,0 +1,322 @@
+"""
+Profiling of the build for `poetry run build --profile`.
+Every phase of the build, and every emitter, records its wall time, CPU time,
+peak memory traced by tracemalloc and the bytes it wrote.
+The phases are written as a Chrome trace-event file,
+which can be opened in chrome://tracing or https://ui.perfetto.dev,
+and summarized in a table.
+Phases only measure anything while a Profiler is active,
+so instrumented code costs next to nothing in normal builds.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from scripts.cache import save_json
+
+
+class PhaseRecord(NamedTuple):
+    """Measurements of a finished phase."""
+
+    name: str
+    # Kind of phase, e.g. "phase" or "emitter"; the category of the trace event
+    category: str
+    # Number of enclosing phases
+    depth: int
+    thread_id: int
+    thread_name: str
+    # Start time in seconds since the profiler started
+    start: float
+    wall_time: float
+    # CPU time of the phase's thread and of the phases it ran on other threads
+    cpu_time: float
+    # Peak traced memory in bytes above the memory traced when the phase started
+    peak_memory: int
+    # Bytes written by the phase and the phases it ran
+    bytes_written: int
+
+
+class Phase:
+    """A running phase."""
+
+    __slots__ = (
+        "name",
+        "category",
+        "parent",
+        "started",
+        "memory",
+        "child_cpu_time",
+        "bytes_written",
+    )
+
+    def __init__(self, name: str, category: str, parent: Optional["Phase"]):
+        """
+        Args:
+            name: Name of the phase
+            category: Kind of phase
+            parent: Enclosing phase, or None for a top-level phase
+        """
+        self.name = name
+        self.category = category
+        self.parent = parent
+        # Wall clock, thread CPU clock and thread at the start
+        self.started = (time.perf_counter(), time.thread_time(), threading.get_ident())
+        # Traced memory at the start, and the highest traced memory seen since
+        self.memory = [0, 0]
+        self.child_cpu_time = 0.0
+        self.bytes_written = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of enclosing phases."""
+        return 0 if self.parent is None else self.parent.depth + 1
+
+    def add_bytes(self, count: int) -> None:
+        """
+        Add written bytes to the phase.
+
+        Args:
+            count: Number of bytes written
+        """
+        self.bytes_written += count
+
+    def finish(self, origin: float) -> PhaseRecord:
+        """
+        Measure the phase at its end, adding its totals to the enclosing phase.
+
+        Args:
+            origin: perf_counter() value at the start of the profiler
+
+        Returns:
+            Measurements of the phase
+        """
+        wall_start, cpu_start, thread_id = self.started
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.thread_time() - cpu_start + self.child_cpu_time
+        if self.parent is not None:
+            self.parent.add_bytes(self.bytes_written)
+            # CPU time of the same thread is counted by the parent's clock
+            if self.parent.started[2] != thread_id:
+                self.parent.child_cpu_time += cpu_time
+        return PhaseRecord(
+            self.name,
+            self.category,
+            self.depth,
+            thread_id,
+            threading.current_thread().name,
+            wall_start - origin,
+            wall_time,
+            cpu_time,
+            self.memory[1] - self.memory[0],
+            self.bytes_written,
+        )
+
+
+# Context variables are copied into emitter threads with contextvars.copy_context(),
+# so that their phases are recorded by the profiler and nest in the running phase
+_active_profiler: ContextVar[Optional["Profiler"]] = ContextVar(
+    "profiler", default=None
+)
+_current_phase: ContextVar[Optional[Phase]] = ContextVar("phase", default=None)
+
+
+class Profiler:
+    """Records the phases run while it is active, as a context manager."""
+
+    def __init__(self, trace_memory: bool = True):
+        """
+        Args:
+            trace_memory: Trace memory allocations with tracemalloc,
+                which slows the traced code down
+        """
+        self.trace_memory = trace_memory
+        self.records: List[PhaseRecord] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._running: List[Phase] = []
+        self._restore: List[Tuple[Token, bool]] = []
+
+    def __enter__(self) -> "Profiler":
+        start_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        self._restore.append((_active_profiler.set(self), start_tracing))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        token, stop_tracing = self._restore.pop()
+        _active_profiler.reset(token)
+        if stop_tracing:
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase") -> Iterator[Phase]:
+        """
+        Record a phase.
+
+        Args:
+            name: Name of the phase
+            category: Kind of phase, e.g. "phase" or "emitter"
+
+        Yields:
+            The running phase
+        """
+        current = Phase(name, category, _current_phase.get())
+        with self._lock:
+            current.memory = [self._update_memory_peaks()] * 2
+            self._running.append(current)
+        token = _current_phase.set(current)
+        try:
+            yield current
+        finally:
+            _current_phase.reset(token)
+            self._finish(current)
+
+    def _update_memory_peaks(self) -> int:
+        """
+        Update the peak memory of the running phases; called holding the lock.
+        The peak of tracemalloc is reset, so that each phase sees its own peak.
+
+        Returns:
+            Currently traced memory in bytes
+        """
+        if not tracemalloc.is_tracing():
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for running in self._running:
+            running.memory[1] = max(running.memory[1], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def _finish(self, current: Phase) -> None:
+        """
+        Record a finished phase.
+
+        Args:
+            current: The finished phase
+        """
+        with self._lock:
+            self._update_memory_peaks()
+            self._running.remove(current)
+            self.records.append(current.finish(self._origin))
+
+    def to_trace(self) -> Dict[str, Any]:
+        """
+        Convert the recorded phases to the Chrome trace-event format.
+
+        Returns:
+            Trace with one complete event per phase and the names of the threads
+        """
+        pid = os.getpid()
+        records = sorted(self.records, key=lambda record: record.start)
+        thread_ids = {record.thread_id: record.thread_name for record in records}
+        tids = {thread_id: tid for tid, thread_id in enumerate(thread_ids, 1)}
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tids[thread_id],
+                "args": {"name": thread_name},
+            }
+            for thread_id, thread_name in thread_ids.items()
+        ]
+        for record in records:
+            events.append(
+                {
+                    "name": record.name,
+                    "cat": record.category,
+                    "ph": "X",
+                    "ts": round(record.start * 1e6, 3),
+                    "dur": round(record.wall_time * 1e6, 3),
+                    "pid": pid,
+                    "tid": tids[record.thread_id],
+                    "args": {
+                        "cpu_time_ms": round(record.cpu_time * 1e3, 3),
+                        "peak_memory_bytes": record.peak_memory,
+                        "bytes_written": record.bytes_written,
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: str) -> None:
+        """
+        Write the recorded phases to a Chrome trace-event JSON file.
+
+        Args:
+            path: Path to the trace file
+        """
+        save_json(path, self.to_trace())
+
+    def format_summary(self) -> List[str]:
+        """
+        Format a table of the recorded phases, nested phases indented.
+
+        Returns:
+            Lines of the table
+        """
+        header = ("Phase", "Wall ms", "CPU ms", "Peak KiB", "Written")
+        rows = [
+            (
+                "  " * record.depth + record.name,
+                f"{record.wall_time * 1e3:.1f}",
+                f"{record.cpu_time * 1e3:.1f}",
+                f"{record.peak_memory / 1024:.1f}",
+                f"{record.bytes_written:,}",
+            )
+            for record in sorted(self.records, key=lambda record: record.start)
+        ]
+        width = max(len(row[0]) for row in [header, *rows])
+        return [
+            f"{row[0]:<{width}}  {row[1]:>9}  {row[2]:>9}  {row[3]:>9}  {row[4]:>11}"
+            for row in [header, *rows]
+        ]
+
+
+@contextmanager
+def phase(name: str, category: str = "phase") -> Iterator[Optional[Phase]]:
+    """
+    Record a phase of the active profiler, if any.
+
+    Args:
+        name: Name of the phase
+        category: Kind of phase, e.g. "phase" or "emitter"
+
+    Yields:
+        The running phase, or None if no profiler is active
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield None
+        return
+    with profiler.phase(name, category) as current:
+        yield current
+
+
+def record_bytes(count: int) -> None:
+    """
+    Add written bytes to the running phase, if a profiler is active.
+
+    Args:
+        count: Number of bytes written
+    """
+    current = _current_phase.get()
+    if current is not None and _active_profiler.get() is not None:
+        current.add_bytes(count)
+
+
+def record_file(path: str) -> None:
+    """
+    Add the size of a written file to the running phase, if a profiler is active.
+
+    Args:
+        path: Path to the written file
+    """
+    if _current_phase.get() is not None and _active_profiler.get() is not None:
+        record_bytes(os.path.getsize(path))
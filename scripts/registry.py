@@ -0,0 +1,210 @@
+"""
+Runtime registry of the color palettes defined in palettes.yml and palettes.d/,
+for looking up palettes and colors from Python code such as report generators.
+All lookup tables are built once when the registry is created,
+so looking up a palette or a color is a single dictionary access.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from scripts.build import list_palette_files, load_palette_files
+from scripts.colormap import DEFAULT_UNKNOWN_COLOR, map_colors
+from scripts.compiler import sanitize_variable_name
+from scripts.model import Palette, PaletteCatalog, RgbTuple, unpack_rgb_tuple
+
+# Color of a palette, identified by the palette name and the color key
+ColorId = Tuple[str, str]
+
+
+class PaletteRegistry:
+    """Palettes of a catalog indexed by name, variable name and color key."""
+
+    __slots__ = ("catalog", "_by_name", "_by_variable_name", "_keys", "_hex", "_rgb")
+
+    def __init__(self, catalog: PaletteCatalog):
+        """
+        Args:
+            catalog: Palette catalog
+
+        Raises:
+            ValueError: If two palettes have the same name or variable name
+        """
+        self.catalog = catalog
+        self._by_name: Dict[str, Palette] = {}
+        self._by_variable_name: Dict[str, Palette] = {}
+        self._keys: Dict[str, Tuple[str, ...]] = {}
+        self._hex: Dict[ColorId, str] = {}
+        self._rgb: Dict[ColorId, RgbTuple] = {}
+        for palette in catalog:
+            variable_name = sanitize_variable_name(palette.name)
+            if palette.name in self._by_name:
+                raise ValueError(f"Duplicate palette name: '{palette.name}'")
+            other = self._by_variable_name.get(variable_name)
+            if other is not None:
+                raise ValueError(
+                    f"Palettes '{other.name}' and '{palette.name}' have the same "
+                    f"variable name: '{variable_name}'"
+                )
+            self._by_name[palette.name] = palette
+            self._by_variable_name[variable_name] = palette
+            keys = self._keys[palette.name] = palette.keys
+            for key, hex_value, rgb in zip(keys, palette.hex_values, palette.rgb):
+                self._hex[palette.name, key] = hex_value
+                self._rgb[palette.name, key] = unpack_rgb_tuple(rgb)
+
+    @classmethod
+    def load(cls, yaml_path: str, cache_dir: Optional[str] = None) -> "PaletteRegistry":
+        """
+        Load the palettes of a YAML file into a registry,
+        merged with those of the palettes.d/ directory next to it as in the build.
+
+        Args:
+            yaml_path: Path to the palettes.yml file
+            cache_dir: Path to the cache directory, or None to disable caching
+
+        Returns:
+            Palette registry
+
+        Raises:
+            ValueError: If two palettes have the same variable name,
+                or the same name in different files
+        """
+        return cls(load_palette_files(list_palette_files(yaml_path), cache_dir))
+
+    def palette(self, name: str) -> Palette:
+        """
+        Get a palette by its name.
+
+        Args:
+            name: Palette name, e.g. "AIU Grades"
+
+        Returns:
+            The palette
+
+        Raises:
+            KeyError: If there is no palette with the name
+        """
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise KeyError(f"Unknown palette: '{name}'") from None
+
+    def palette_by_variable_name(self, variable_name: str) -> Palette:
+        """
+        Get a palette by its name as sanitized by sanitize_variable_name().
+
+        Args:
+            variable_name: Sanitized palette name, e.g. "aiu_grades"
+
+        Returns:
+            The palette
+
+        Raises:
+            KeyError: If there is no palette with the variable name
+        """
+        try:
+            return self._by_variable_name[variable_name]
+        except KeyError:
+            raise KeyError(
+                f"Unknown palette variable name: '{variable_name}'"
+            ) from None
+
+    def keys(self, name: str) -> Tuple[str, ...]:
+        """
+        Get the color keys of a palette.
+
+        Args:
+            name: Palette name
+
+        Returns:
+            Color keys in palette order
+
+        Raises:
+            KeyError: If there is no palette with the name
+        """
+        try:
+            return self._keys[name]
+        except KeyError:
+            raise KeyError(f"Unknown palette: '{name}'") from None
+
+    def hex(self, name: str, key: str) -> str:
+        """
+        Get the hex string of a color.
+
+        Args:
+            name: Palette name
+            key: Color key
+
+        Returns:
+            Hex color string in #rrggbb format
+
+        Raises:
+            KeyError: If the palette has no color with the key
+        """
+        try:
+            return self._hex[name, key]
+        except KeyError:
+            raise self._color_error(name, key) from None
+
+    def rgb(self, name: str, key: str) -> RgbTuple:
+        """
+        Get the channel values of a color.
+
+        Args:
+            name: Palette name
+            key: Color key
+
+        Returns:
+            Red, green and blue channel values from 0 to 255
+
+        Raises:
+            KeyError: If the palette has no color with the key
+        """
+        try:
+            return self._rgb[name, key]
+        except KeyError:
+            raise self._color_error(name, key) from None
+
+    def map_colors(
+        self,
+        name: str,
+        values: Any,
+        output: str = "rgb",
+        unknown: str = DEFAULT_UNKNOWN_COLOR,
+    ) -> np.ndarray:
+        """
+        Map category values to the colors of a palette, see colormap.map_colors().
+
+        Args:
+            name: Palette name
+            values: NumPy array, list or pandas categorical of color keys
+            output: "rgb", "rgba" or "hex"
+            unknown: Hex color string of values that aren't keys of the palette
+
+        Returns:
+            Array of the colors of the values
+
+        Raises:
+            KeyError: If there is no palette with the name
+            ValueError: If the output format or the unknown color is invalid
+        """
+        return map_colors(self.palette(name), values, output, unknown)
+
+    def _color_error(self, name: str, key: str) -> KeyError:
+        if name not in self._by_name:
+            return KeyError(f"Unknown palette: '{name}'")
+        return KeyError(f"Unknown color '{key}' in palette '{name}'")
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._by_name
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_name)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __repr__(self) -> str:
+        return f"PaletteRegistry({len(self)} palette(s))"
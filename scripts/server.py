@@ -0,0 +1,512 @@
+"""
+Local HTTP server for the color palettes defined in palettes.yml and palettes.d/.
+It serves the generated output files, such as the Tableau Preferences.tps and R script,
+and a JSON view of each palette, from an asyncio server.
+All responses are rendered once per change of the palette files,
+compressed with gzip ahead of time and given strong ETags,
+so repeated requests are answered from memory and conditional requests with a 304.
+By defining it in pyproject.toml's [tool.poetry.scripts],
+it can be run as `poetry run serve`.
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+from scripts.build import EMITTER_TARGETS, list_palette_files, load_palette_files
+from scripts.cache import get_cache_dir
+from scripts.compiler import compile_palettes
+from scripts.formatter import get_repo_root
+from scripts.model import PaletteCatalog
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+# Content types of the generated files, by file extension
+CONTENT_TYPES = {
+    ".tps": "application/xml; charset=utf-8",
+    ".R": "text/plain; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".scss": "text/x-scss; charset=utf-8",
+    ".json": JSON_CONTENT_TYPE,
+    ".py": "text/x-python; charset=utf-8",
+}
+
+# Methods the server answers; everything else gets a 405
+ALLOWED_METHODS = ("GET", "HEAD")
+
+STATUS_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+# Path, modification time and size of each of several files
+FileSignature = Tuple[Tuple[str, int, int], ...]
+
+
+class Resource(NamedTuple):
+    """A response body served by the server, in plain and gzip encoding."""
+
+    content_type: str
+    body: bytes
+    etag: str
+    gzip_body: bytes
+    gzip_etag: str
+
+
+class Response(NamedTuple):
+    """An HTTP response to be written to a client."""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+def make_resource(body: bytes, content_type: str) -> Resource:
+    """
+    Compress a response body and compute the ETags of both encodings.
+
+    Args:
+        body: Uncompressed response body
+        content_type: Value of the Content-Type header
+
+    Returns:
+        Resource with the plain and gzip bodies and their strong ETags
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    # A fixed mtime keeps the compressed body, and so its ETag, reproducible
+    gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+    return Resource(content_type, body, f'"{digest}"', gzip_body, f'"{digest}-gzip"')
+
+
+def render_json(data: Any) -> bytes:
+    """
+    Render data as a JSON response body.
+
+    Args:
+        data: JSON-serializable data
+
+    Returns:
+        UTF-8 encoded JSON, followed by a newline
+    """
+    return (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
+
+def build_resources(catalog: PaletteCatalog) -> Dict[str, Resource]:
+    """
+    Render every resource served for a catalog.
+
+    Args:
+        catalog: Palette catalog
+
+    Returns:
+        Mapping of URL paths to resources: the output file of each emitter
+        target at its path in the repository, /palettes.json listing the
+        palettes, and /palettes/<variable name>.json for each palette
+    """
+    resources: Dict[str, Resource] = {}
+    compiled = compile_palettes(catalog)
+    for target in EMITTER_TARGETS.values():
+        content_type = CONTENT_TYPES.get(
+            os.path.splitext(target.path)[1], "application/octet-stream"
+        )
+        body = "".join(target.emit(compiled)).encode("utf-8")
+        resources[f"/{target.path}"] = make_resource(body, content_type)
+
+    index = []
+    for palette, compiled_palette in zip(catalog, compiled):
+        path = f"/palettes/{compiled_palette.variable_name}.json"
+        resources[path] = make_resource(
+            render_json(palette.to_dict()), JSON_CONTENT_TYPE
+        )
+        index.append({"name": palette.name, "type": palette.type, "url": path})
+    resources["/palettes.json"] = make_resource(
+        render_json({"palettes": index}), JSON_CONTENT_TYPE
+    )
+    return resources
+
+
+def get_file_signature(paths: Sequence[str]) -> FileSignature:
+    """
+    Get a signature of files that changes whenever one of them does.
+
+    Args:
+        paths: Paths to the files
+
+    Returns:
+        Path, modification time and size of each file
+    """
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class ResourceStore:
+    """
+    Resources of a palettes.yml and the palettes.d/ directory next to it,
+    rebuilt whenever a palette file changes, is added or is removed.
+    """
+
+    def __init__(self, yaml_path: str, cache_dir: Optional[str] = None):
+        """
+        Args:
+            yaml_path: Path to the palettes.yml file
+            cache_dir: Path to the cache directory, or None to disable caching
+        """
+        self.yaml_path = yaml_path
+        self.cache_dir = cache_dir
+        self._signature: Optional[FileSignature] = None
+        self._resources: Dict[str, Resource] = {}
+        # Serializes the reloads of the event loop, see refresh_async()
+        self._lock = asyncio.Lock()
+
+    def find_changes(self) -> Optional[Tuple[List[str], FileSignature]]:
+        """
+        Check whether the palette files changed since the resources were built.
+        Once there are resources to serve, files that can't be read,
+        e.g. a palettes.yml that an editor renamed away while saving it,
+        count as unchanged, so that the previous resources are kept.
+
+        Returns:
+            Paths and signature of the palette files if they changed, else None
+
+        Raises:
+            OSError: If the palette files can't be read the first time
+        """
+        paths = list_palette_files(self.yaml_path)
+        try:
+            signature = get_file_signature(paths)
+        except OSError:
+            if self._signature is None:
+                raise
+            return None
+        return None if signature == self._signature else (paths, signature)
+
+    def reload(self, paths: Sequence[str], signature: FileSignature) -> None:
+        """
+        Rebuild the resources from the palette files.
+        If the files can't be loaded, the previous resources are kept.
+
+        Args:
+            paths: Paths to the palette files
+            signature: Signature of the palette files, see get_file_signature()
+
+        Raises:
+            Exception: If the palette files can't be loaded the first time
+        """
+        try:
+            catalog = load_palette_files(paths, self.cache_dir)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed to load the palettes: {e}")
+            if self._signature is None:
+                raise
+        else:
+            self._resources = build_resources(catalog)
+        self._signature = signature
+
+    def refresh(self) -> Dict[str, Resource]:
+        """
+        Rebuild the resources if a palette file changed since they were built.
+
+        Returns:
+            Mapping of URL paths to resources
+
+        Raises:
+            Exception: If the palette files can't be loaded the first time
+        """
+        changes = self.find_changes()
+        if changes is not None:
+            self.reload(*changes)
+        return self._resources
+
+    async def refresh_async(self) -> Dict[str, Resource]:
+        """
+        Rebuild the resources like refresh(), on a worker thread,
+        so that the event loop keeps serving the other connections meanwhile.
+        Requests arriving during a reload wait for it instead of reloading again.
+
+        Returns:
+            Mapping of URL paths to resources
+
+        Raises:
+            Exception: If the palette files can't be loaded the first time
+        """
+        async with self._lock:
+            changes = self.find_changes()
+            if changes is not None:
+                await asyncio.to_thread(self.reload, *changes)
+        return self._resources
+
+    def get(self, path: str) -> Optional[Resource]:
+        """
+        Get a resource, first rebuilding all of them if a palette file changed.
+
+        Args:
+            path: URL path of the resource
+
+        Returns:
+            The resource, or None if there is none at the path
+        """
+        return self.refresh().get(path)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Check whether a client accepts gzip encoded responses.
+
+    Args:
+        accept_encoding: Value of the Accept-Encoding request header
+
+    Returns:
+        True if gzip, or any encoding, is accepted with a non-zero quality
+    """
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if coding.lower() not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match request header against an ETag,
+    using the weak comparison that RFC 9110 prescribes for it.
+
+    Args:
+        if_none_match: Value of the If-None-Match request header
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client's copy is current
+    """
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def respond(
+    resources: Mapping[str, Resource], method: str, path: str, headers: Dict[str, str]
+) -> Response:
+    """
+    Answer a request.
+
+    Args:
+        resources: Mapping of URL paths to the resources to serve
+        method: Request method
+        path: Request target, which may include a query string
+        headers: Request headers, with lowercase names
+
+    Returns:
+        Response to the request
+    """
+    if method not in ALLOWED_METHODS:
+        return error_response(405, [("Allow", ", ".join(ALLOWED_METHODS))])
+    resource = resources.get(unquote(path.split("?", 1)[0]))
+    if resource is None:
+        return error_response(404)
+
+    if accepts_gzip(headers.get("accept-encoding", "")):
+        body, etag = resource.gzip_body, resource.gzip_etag
+        response_headers = [("Content-Encoding", "gzip")]
+    else:
+        body, etag = resource.body, resource.etag
+        response_headers = []
+    response_headers += [
+        ("ETag", etag),
+        ("Vary", "Accept-Encoding"),
+        # Clients may store the responses, but must revalidate them on every use
+        ("Cache-Control", "no-cache"),
+    ]
+    if etag_matches(headers.get("if-none-match", ""), etag):
+        return Response(304, response_headers, b"")
+    response_headers += [
+        ("Content-Type", resource.content_type),
+        ("Content-Length", str(len(body))),
+    ]
+    return Response(200, response_headers, b"" if method == "HEAD" else body)
+
+
+def error_response(
+    status: int, headers: Optional[List[Tuple[str, str]]] = None
+) -> Response:
+    """
+    Create a plain text error response.
+
+    Args:
+        status: HTTP status code
+        headers: Additional response headers
+
+    Returns:
+        Response with the reason phrase as its body
+    """
+    body = f"{STATUS_REASONS[status]}\n".encode("utf-8")
+    return Response(
+        status,
+        [
+            *(headers or []),
+            ("Content-Type", "text/plain; charset=utf-8"),
+            ("Content-Length", str(len(body))),
+        ],
+        body,
+    )
+
+
+def parse_request(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+    """
+    Parse the request line and headers of a request.
+
+    Args:
+        head: Request head up to and including the blank line
+
+    Returns:
+        Request method, request target, HTTP version,
+        and the headers with lowercase names
+
+    Raises:
+        ValueError: If the request is malformed
+    """
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    method, path, version = request_line.split(" ")
+    if not version.startswith("HTTP/1.") or not path.startswith("/"):
+        raise ValueError(f"Unsupported request: {request_line}")
+    headers = {}
+    for line in filter(None, header_lines):
+        name, separator, value = line.partition(":")
+        if not separator:
+            raise ValueError(f"Malformed header: {line}")
+        headers[name.strip().lower()] = value.strip()
+    return method, path, version, headers
+
+
+def encode_response(response: Response, keep_alive: bool) -> bytes:
+    """
+    Encode a response for writing to the client.
+
+    Args:
+        response: Response
+        keep_alive: Whether the connection stays open for further requests
+
+    Returns:
+        Status line, headers and body
+    """
+    lines = [f"HTTP/1.1 {response.status} {STATUS_REASONS[response.status]}"]
+    lines += [f"{name}: {value}" for name, value in response.headers]
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    head = "".join(f"{line}\r\n" for line in lines) + "\r\n"
+    return head.encode("latin-1") + response.body
+
+
+async def handle_connection(
+    store: ResourceStore, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """
+    Answer the requests of a client connection until either side closes it.
+
+    Args:
+        store: Resources to serve
+        reader: Stream of the client's requests
+        writer: Stream to the client
+    """
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                break
+            try:
+                method, path, version, headers = parse_request(head)
+            except ValueError:
+                writer.write(encode_response(error_response(400), keep_alive=False))
+                break
+            # Request bodies aren't used, but must be consumed to reach the next request
+            await reader.readexactly(int(headers.get("content-length") or 0))
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" and (
+                version != "HTTP/1.0" or connection == "keep-alive"
+            )
+            response = respond(await store.refresh_async(), method, path, headers)
+            writer.write(encode_response(response, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(store: ResourceStore, host: str, port: int) -> None:
+    """
+    Serve the resources until cancelled.
+
+    Args:
+        store: Resources to serve
+        host: Host name or address to listen on
+        port: Port to listen on, or 0 for any free port
+    """
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(store, reader, writer), host, port
+    )
+    for sock in server.sockets:
+        address, bound_port = sock.getsockname()[:2]
+        print(f"Serving palettes at http://{address}:{bound_port}/palettes.json")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Serve the palettes in palettes.yml and palettes.d/ over HTTP.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve the generated palette files and JSON palettes over HTTP."
+    )
+    parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help="host name or address to listen on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="port to listen on (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    repo_root = get_repo_root()
+    store = ResourceStore(
+        os.path.join(repo_root, "palettes.yml"), get_cache_dir(repo_root)
+    )
+    # Render the resources up front, so that errors in the palettes surface here
+    store.refresh()
+    try:
+        asyncio.run(serve(store, args.host, args.port))
+    except KeyboardInterrupt:
+        print("Server stopped.")
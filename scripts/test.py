@@ -1,18 +1,320 @@
 """
 Script to run a suite of unit tests.
 Also runs formatters and linters.
+
+The stages run as a small dependency graph: formatting runs first,
+then type checking, linting and unit tests run in parallel.
+Each stage's result is cached against a digest of its inputs,
+so a stage whose inputs have not changed since it last passed is not run again.
 """
 
-import subprocess
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import hashlib
+import os
+import sys
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from scripts import formatter, linter
+from scripts.build import EMITTER_TARGETS
+from scripts.cache import file_digest, get_cache_dir, load_json, save_json
+from scripts.formatter import ToolResult
+
+# Version of the stage cache format; bump to invalidate existing caches
+STAGE_CACHE_VERSION = 1
+
+# Stage statuses
+PASSED = "passed"
+FAILED = "failed"
+CACHED = "cached"
+SKIPPED = "skipped"
+
+# Files other than Python files that affect the results of the unit tests
+TEST_DATA_FILES = ("pyproject.toml", ".coveragerc", "palettes.yml") + tuple(
+    target.path for target in EMITTER_TARGETS.values()
+)
+
+
+class Stage(NamedTuple):
+    """A stage of the test run."""
+
+    # Name of the stage
+    name: str
+    # Names of the stages that must pass before this stage runs
+    depends_on: Tuple[str, ...]
+    # Predicate selecting the stage's inputs among the repository files
+    is_input: Callable[[str], bool]
+    # Function running the stage in the repository root
+    run: Callable[[str], ToolResult]
+    # Whether the stage rewrites its own inputs, e.g. formatting
+    rewrites_inputs: bool = False
+
+
+def is_format_input(path: str) -> bool:
+    """
+    Check whether a file is an input of the format stage.
+
+    Args:
+        path: Repository-relative path
+
+    Returns:
+        True if the file is formatted or configures the formatters
+    """
+    return formatter.is_formattable(path) or path in formatter.FORMATTER_CONFIG_FILES
+
+
+def is_lint_input(path: str) -> bool:
+    """
+    Check whether a file is an input of the type check and lint stages.
+
+    Args:
+        path: Repository-relative path
+
+    Returns:
+        True if the file is a Python file or the project configuration
+    """
+    return path.endswith(".py") or path == "pyproject.toml"
+
+
+def is_test_input(path: str) -> bool:
+    """
+    Check whether a file is an input of the unit test stage.
+
+    Args:
+        path: Repository-relative path
+
+    Returns:
+        True if the file is a Python file or a file read by the tests
+    """
+    return path.endswith(".py") or path in TEST_DATA_FILES
+
+
+def run_format(repo_root: str) -> ToolResult:
+    """
+    Format the files changed since they were last formatted.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Result of the stage; the formatters print their own output
+    """
+    try:
+        formatter.format_changed_files(repo_root, concurrent=True)
+    except SystemExit as e:
+        return ToolResult("format", int(e.code or 1), "")
+    return ToolResult("format", 0, "")
+
+
+def run_tool(name: str, command: Sequence[str]) -> Callable[[str], ToolResult]:
+    """
+    Get a function running a tool and collecting its output.
+
+    Args:
+        name: Name of the stage
+        command: Command to run in the repository root
+
+    Returns:
+        Function running the command in the given repository root
+    """
+    return lambda repo_root: linter.run_linter(name, command, repo_root)
+
+
+def get_stages() -> List[Stage]:
+    """
+    Get the stages of the test run, in dependency order.
+
+    Returns:
+        List of stages
+    """
+    lint_commands = linter.get_lint_commands(linter.LINT_TARGET)
+    return [
+        Stage("format", (), is_format_input, run_format, rewrites_inputs=True),
+        Stage(
+            "typecheck",
+            ("format",),
+            is_lint_input,
+            run_tool("typecheck", lint_commands["mypy"]),
+        ),
+        Stage(
+            "lint",
+            ("format",),
+            is_lint_input,
+            run_tool("lint", lint_commands["pylint"]),
+        ),
+        Stage(
+            "tests",
+            ("format",),
+            is_test_input,
+            run_tool("tests", [sys.executable, "-m", "pytest"]),
+        ),
+    ]
+
+
+def get_stage_digest(repo_root: str, stage: Stage, files: Sequence[str]) -> str:
+    """
+    Compute a digest of the stage's inputs.
+
+    Args:
+        repo_root: Path to the repository root
+        stage: Stage
+        files: Repository-relative paths of all repository files
+
+    Returns:
+        SHA-256 hex digest of the stage name, the Python version,
+        and the paths and contents of the stage's input files
+    """
+    digest = hashlib.sha256(f"{stage.name}\n{sys.version}\n".encode("utf-8"))
+    for path in files:
+        full_path = os.path.join(repo_root, path)
+        if stage.is_input(path) and os.path.isfile(full_path):
+            digest.update(f"{path}\0{file_digest(full_path)}\n".encode("utf-8"))
+    return digest.hexdigest()
 
 
-def main():
+def get_stage_cache_path(repo_root: str) -> str:
+    """
+    Get the path of the stage cache file.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Path to the stage cache file
+    """
+    return os.path.join(get_cache_dir(repo_root), "test.json")
+
+
+def load_stage_cache(repo_root: str) -> Dict[str, str]:
+    """
+    Load the input digests of the stages that last passed.
+
+    Args:
+        repo_root: Path to the repository root
+
+    Returns:
+        Mapping of stage names to input digests; empty if there is no valid cache
+    """
+    cache = load_json(get_stage_cache_path(repo_root))
+    if not isinstance(cache, dict) or cache.get("version") != STAGE_CACHE_VERSION:
+        return {}
+    return cache.get("stages", {})
+
+
+def run_stage(
+    repo_root: str, stage: Stage, files: Sequence[str], cache: Dict[str, str]
+) -> str:
+    """
+    Run a stage unless its inputs are unchanged since it last passed.
+    The cache is updated in place with the stage's result.
+
+    Args:
+        repo_root: Path to the repository root
+        stage: Stage to run
+        files: Repository-relative paths of all repository files
+        cache: Mapping of stage names to the input digests they last passed with
+
+    Returns:
+        Status of the stage: passed, failed or cached
+    """
+    digest = get_stage_digest(repo_root, stage, files)
+    if cache.get(stage.name) == digest:
+        print(f"{stage.name}: {CACHED}")
+        return CACHED
+    result = stage.run(repo_root)
+    status = PASSED if result.returncode == 0 else FAILED
+    lines = [result.output.rstrip("\n")] if result.output else []
+    print("\n".join(lines + [f"{stage.name}: {status}"]))
+    if status == FAILED:
+        cache.pop(stage.name, None)
+    elif stage.rewrites_inputs:
+        cache[stage.name] = get_stage_digest(repo_root, stage, files)
+    else:
+        cache[stage.name] = digest
+    return status
+
+
+def run_stages(
+    repo_root: str,
+    stages: Sequence[Stage],
+    files: Sequence[str],
+    cache: Dict[str, str],
+) -> Dict[str, str]:
+    """
+    Run stages in dependency order, running independent stages in parallel.
+    A stage whose dependency failed or was skipped is skipped.
+
+    Args:
+        repo_root: Path to the repository root
+        stages: Stages in dependency order
+        files: Repository-relative paths of all repository files
+        cache: Mapping of stage names to the input digests they last passed with
+
+    Returns:
+        Mapping of stage names to their statuses, in stage order
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage or on itself
+    """
+    statuses: Dict[str, str] = {}
+    pending = list(stages)
+    running: Dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=len(stages) or 1) as executor:
+        while pending or running:
+            for stage in list(pending):
+                dependencies = [statuses.get(name) for name in stage.depends_on]
+                if FAILED in dependencies or SKIPPED in dependencies:
+                    statuses[stage.name] = SKIPPED
+                    print(f"{stage.name}: {SKIPPED}")
+                    pending.remove(stage)
+                elif None not in dependencies:
+                    future = executor.submit(run_stage, repo_root, stage, files, cache)
+                    running[future] = stage.name
+                    pending.remove(stage)
+            if not running:
+                if pending:
+                    names = ", ".join(stage.name for stage in pending)
+                    raise ValueError(f"Unresolvable stage dependencies: {names}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                statuses[running.pop(future)] = future.result()
+    return {stage.name: statuses[stage.name] for stage in stages}
+
+
+def main(argv: Optional[Sequence[str]] = None):
     """
     Run the suite of formatters defined in scripts.formatter.py,
     and linters defined in scripts.linter.py,
     then run pytest.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv[1:].
+
+    Raises:
+        SystemExit: If a stage failed or was skipped
     """
-    # First, run formatters and linters
-    subprocess.run(["poetry", "run", "linter"], check=True)
-    # Run pytest
-    subprocess.run(["poetry", "run", "pytest"], check=True)
+    parser = argparse.ArgumentParser(
+        description="Run formatters, linters and unit tests."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="run every stage even if its inputs are unchanged",
+    )
+    args = parser.parse_args(argv)
+
+    repo_root = formatter.get_repo_root()
+    cache = {} if args.force else load_stage_cache(repo_root)
+    files = formatter.list_repository_files(repo_root)
+    statuses = run_stages(repo_root, get_stages(), files, cache)
+    save_json(
+        get_stage_cache_path(repo_root),
+        {"version": STAGE_CACHE_VERSION, "stages": cache},
+    )
+
+    print("Summary:")
+    for name, status in statuses.items():
+        print(f"  {name:<10} {status}")
+    if any(status in (FAILED, SKIPPED) for status in statuses.values()):
+        raise SystemExit(1)
@@ -0,0 +1,383 @@
+"""
+Validator of palettes.yml working on the YAML node tree,
+so that every problem is reported with its line and column in a single pass.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+# Version of the validation rules; palettes cached by an older version are revalidated
+VALIDATOR_VERSION = 1
+
+# Palette types supported by the emitters
+PALETTE_TYPES = ("categorical", "sequential", "diverging")
+
+# Keys every palette must define
+REQUIRED_PALETTE_KEYS = ("name", "type", "colors")
+
+# Keys every color must define
+REQUIRED_COLOR_KEYS = ("key", "value")
+
+# Tag of YAML string scalars
+STR_TAG = "tag:yaml.org,2002:str"
+
+# Matches each line that isn't a hex color in #rrggbb format,
+# so that all color values joined by newlines are checked in one scan
+INVALID_HEX_LINE = re.compile(r"^(?!#[0-9A-Fa-f]{6}$).*$", re.MULTILINE)
+
+
+# Entries of a mapping node by key string: (key node, value node)
+Entries = Dict[str, Tuple[ScalarNode, Node]]
+
+
+class ValidationError(NamedTuple):
+    """A problem found in palettes.yml."""
+
+    # 1-based line number
+    line: int
+    # 1-based column number
+    column: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}, column {self.column}: {self.message}"
+
+
+class PaletteValidationError(ValueError):
+    """Raised when palettes.yml has one or more problems."""
+
+    def __init__(self, path: str, errors: List[ValidationError]):
+        """
+        Args:
+            path: Path to the validated file
+            errors: Problems found, in document order
+        """
+        self.path = path
+        self.errors = errors
+        lines = [f"{path} has {len(errors)} error(s):"]
+        lines.extend(f"  {error}" for error in errors)
+        super().__init__("\n".join(lines))
+
+    def __reduce__(self):
+        # Pickled by its arguments, so that it can be raised in worker processes
+        return type(self), (self.path, self.errors)
+
+
+def make_error(node: Node, message: str) -> ValidationError:
+    """
+    Create an error located at the start of a node.
+
+    Args:
+        node: YAML node the error is about
+        message: Description of the error
+
+    Returns:
+        Validation error with 1-based line and column
+    """
+    mark = node.start_mark
+    return ValidationError(mark.line + 1, mark.column + 1, message)
+
+
+def find_invalid_hex(values: Iterable[str]) -> Set[str]:
+    """
+    Find the strings that aren't hex colors in #rrggbb format.
+    Distinct values are joined by newlines and checked with a single regex scan.
+
+    Args:
+        values: Color value strings
+
+    Returns:
+        Set of the invalid values
+    """
+    distinct = set(values)
+    invalid = {value for value in distinct if "\n" in value}
+    candidates = distinct - invalid
+    if candidates:
+        invalid.update(INVALID_HEX_LINE.findall("\n".join(candidates)))
+    return invalid
+
+
+def get_mapping(node: MappingNode) -> Entries:
+    """
+    Get the entries of a mapping node by their scalar keys.
+    For duplicate keys, the first entry is returned.
+
+    Args:
+        node: Mapping node
+
+    Returns:
+        Mapping of key strings to (key node, value node) pairs
+    """
+    entries: Entries = {}
+    for key_node, value_node in node.value:
+        if isinstance(key_node, ScalarNode):
+            entries.setdefault(key_node.value, (key_node, value_node))
+    return entries
+
+
+def find_duplicate_keys(node: Node) -> List[ValidationError]:
+    """
+    Find the duplicate mapping keys anywhere under a node,
+    which YAML loaders otherwise silently overwrite.
+
+    Args:
+        node: Root node
+
+    Returns:
+        One error per duplicate key
+    """
+    errors = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, MappingNode):
+            first_lines: Dict[str, int] = {}
+            for key_node, value_node in current.value:
+                if isinstance(key_node, ScalarNode):
+                    first_line = first_lines.get(key_node.value)
+                    if first_line is None:
+                        first_lines[key_node.value] = key_node.start_mark.line + 1
+                    else:
+                        errors.append(
+                            make_error(
+                                key_node,
+                                f"Duplicate key '{key_node.value}' "
+                                f"(first defined at line {first_line})",
+                            )
+                        )
+                stack.append(value_node)
+        elif isinstance(current, SequenceNode):
+            stack.extend(current.value)
+    return errors
+
+
+def check_string(node: Node, description: str) -> Optional[ValidationError]:
+    """
+    Check that a node is a non-empty string scalar.
+
+    Args:
+        node: Node to check
+        description: Description of the value for the error message
+
+    Returns:
+        An error if the node isn't a non-empty string, None otherwise
+    """
+    if not isinstance(node, ScalarNode) or node.tag != STR_TAG or not node.value:
+        return make_error(node, f"{description} must be a non-empty string")
+    return None
+
+
+class PaletteValidator:
+    """Collects the errors of the palettes in the node tree."""
+
+    def __init__(self) -> None:
+        self.errors: List[ValidationError] = []
+        # Palette names and the line they were first defined on
+        self.names: Dict[str, int] = {}
+        # Color value nodes, checked together at the end
+        self.value_nodes: List[ScalarNode] = []
+
+    def add(self, error: Optional[ValidationError]) -> None:
+        """
+        Record an error, if any.
+
+        Args:
+            error: Error to record, or None
+        """
+        if error is not None:
+            self.errors.append(error)
+
+    def check_required_keys(
+        self, node: MappingNode, entries: Entries, required: Iterable[str], label: str
+    ) -> None:
+        """
+        Check that a mapping defines the required keys.
+
+        Args:
+            node: Mapping node
+            entries: Entries of the mapping node by key
+            required: Required keys
+            label: Label of the mapping for the error message
+        """
+        for key in required:
+            if key not in entries:
+                self.add(make_error(node, f"{label} is missing required key '{key}'"))
+
+    def check_palette(self, node: Node) -> None:
+        """
+        Check a palette node.
+
+        Args:
+            node: Palette node
+        """
+        if not isinstance(node, MappingNode):
+            self.add(make_error(node, "Palette must be a mapping"))
+            return
+        entries = get_mapping(node)
+        name = "(unnamed)"
+        if "name" in entries:
+            name_node = entries["name"][1]
+            error = check_string(name_node, "Palette name")
+            self.add(error)
+            if error is None:
+                name = name_node.value
+                first_line = self.names.setdefault(name, name_node.start_mark.line + 1)
+                if first_line != name_node.start_mark.line + 1:
+                    self.add(
+                        make_error(
+                            name_node,
+                            f"Duplicate palette name '{name}' "
+                            f"(first defined at line {first_line})",
+                        )
+                    )
+        label = f"Palette '{name}'"
+        self.check_required_keys(node, entries, REQUIRED_PALETTE_KEYS, label)
+        if "type" in entries:
+            type_node = entries["type"][1]
+            if not isinstance(type_node, ScalarNode) or (
+                type_node.value not in PALETTE_TYPES
+            ):
+                value = type_node.value if isinstance(type_node, ScalarNode) else ""
+                self.add(
+                    make_error(
+                        type_node,
+                        f"{label} has invalid type '{value}' "
+                        f"(expected one of: {', '.join(PALETTE_TYPES)})",
+                    )
+                )
+        if "description" in entries:
+            description_node = entries["description"][1]
+            if not isinstance(description_node, ScalarNode) or (
+                description_node.tag != STR_TAG
+            ):
+                self.add(
+                    make_error(
+                        description_node, f"{label} description must be a string"
+                    )
+                )
+        if "colors" in entries:
+            self.check_colors(entries["colors"][1], label)
+
+    def check_colors(self, node: Node, label: str) -> None:
+        """
+        Check the colors node of a palette.
+
+        Args:
+            node: Colors node
+            label: Label of the palette for error messages
+        """
+        if not isinstance(node, SequenceNode) or not node.value:
+            self.add(make_error(node, f"{label} colors must be a non-empty list"))
+            return
+        keys: Dict[str, int] = {}
+        for color_node in node.value:
+            if not isinstance(color_node, MappingNode):
+                self.add(make_error(color_node, f"{label} color must be a mapping"))
+                continue
+            entries = get_mapping(color_node)
+            self.check_required_keys(
+                color_node, entries, REQUIRED_COLOR_KEYS, f"{label} color"
+            )
+            if "key" in entries:
+                key_node = entries["key"][1]
+                if not isinstance(key_node, ScalarNode) or not key_node.value:
+                    self.add(
+                        make_error(
+                            key_node, f"{label} color key must be a non-empty scalar"
+                        )
+                    )
+                else:
+                    line = key_node.start_mark.line + 1
+                    first_line = keys.setdefault(key_node.value, line)
+                    if first_line != line:
+                        self.add(
+                            make_error(
+                                key_node,
+                                f"{label} has duplicate color key "
+                                f"'{key_node.value}' (first defined at line {first_line})",
+                            )
+                        )
+            if "value" in entries:
+                value_node = entries["value"][1]
+                if isinstance(value_node, ScalarNode) and value_node.tag == STR_TAG:
+                    self.value_nodes.append(value_node)
+                else:
+                    self.add(
+                        make_error(
+                            value_node,
+                            f"{label} color value must be a hex color string",
+                        )
+                    )
+
+    def check_values(self) -> None:
+        """Check all collected color values at once."""
+        invalid = find_invalid_hex(node.value for node in self.value_nodes)
+        if invalid:
+            for node in self.value_nodes:
+                if node.value in invalid:
+                    self.add(
+                        make_error(
+                            node,
+                            f"Invalid hex color '{node.value}' "
+                            "(expected #rrggbb format)",
+                        )
+                    )
+
+
+def validate_node(root: Optional[Node]) -> List[ValidationError]:
+    """
+    Validate the node tree of palettes.yml.
+
+    Args:
+        root: Root node of the document, or None for an empty document
+
+    Returns:
+        All errors found, sorted by position
+
+    Raises:
+        ValueError: If the document has no 'palettes' key
+    """
+    entries = get_mapping(root) if isinstance(root, MappingNode) else {}
+    if root is None or "palettes" not in entries:
+        raise ValueError("YAML file must contain 'palettes' key")
+    validator = PaletteValidator()
+    validator.errors.extend(find_duplicate_keys(root))
+    palettes_node = entries["palettes"][1]
+    if isinstance(palettes_node, SequenceNode):
+        for palette_node in palettes_node.value:
+            validator.check_palette(palette_node)
+    else:
+        validator.add(make_error(palettes_node, "'palettes' must be a list"))
+    validator.check_values()
+    return sorted(validator.errors)
+
+
+def load_validated(text: str, path: str, loader: type) -> Dict[str, Any]:
+    """
+    Parse YAML text into its node tree once, validate the tree,
+    and construct the Python data from the same tree.
+
+    Args:
+        text: YAML text
+        path: Path of the YAML file, for error messages
+        loader: YAML loader class
+
+    Returns:
+        The constructed document mapping
+
+    Raises:
+        yaml.YAMLError: If the text is malformed
+        ValueError: If the document has no 'palettes' key
+        PaletteValidationError: If the palettes have problems
+    """
+    yaml_loader = loader(text)
+    try:
+        root = yaml_loader.get_single_node()
+        errors = validate_node(root)
+        if errors:
+            raise PaletteValidationError(path, errors)
+        return yaml_loader.construct_document(root)
+    finally:
+        yaml_loader.dispose()
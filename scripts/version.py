@@ -6,7 +6,16 @@ By defining it in pyproject.toml's [tool.poetry.scripts],
 it can be run as `poetry run version_[major|minor|patch]`.
 """
 
+import re
 import subprocess
+import tomllib
+from typing import List
+
+# Path to pyproject.toml, relative to the repository root
+PYPROJECT_PATH = "pyproject.toml"
+
+# Line of the `version` key in a TOML table, e.g. version = "1.2.3"
+VERSION_LINE_PATTERN = re.compile(r'^version\s*=\s*"(?P<version>[^"]*)"')
 
 
 def get_version() -> str:
@@ -17,21 +26,106 @@ def get_version() -> str:
         str: a version number in X.Y.Z format according to Semantic Versioning,
             without a leading `v` (e.g., 1.2.3).
     """
-    result = subprocess.run(
-        ["poetry", "version"], check=True, text=True, stdout=subprocess.PIPE
-    )
-    return result.stdout.split(" ")[1].strip()
+    with open(PYPROJECT_PATH, "rb") as f:
+        return tomllib.load(f)["project"]["version"]
+
+
+def increment_version(current_version: str, version_type: str) -> str:
+    """
+    Increment a version number the way `poetry version [major|minor|patch]` does.
+
+    Args:
+        current_version (str):
+            Current version number in X.Y.Z format according to Semantic Versioning,
+            without a leading `v` (e.g., 1.2.3).
+        version_type (str): "major", "minor", or "patch"
+
+    Returns:
+        str: the incremented version number (e.g., 1.2.4 for a patch bump of 1.2.3).
+
+    Raises:
+        ValueError: if current_version is not in X.Y.Z format
+    """
+    if not re.fullmatch(r"\d+\.\d+\.\d+", current_version):
+        raise ValueError(f"Version is not in X.Y.Z format: {current_version}")
+    major_number, minor_number, patch_number = map(int, current_version.split("."))
+    if version_type == "major":
+        return f"{major_number + 1}.0.0"
+    if version_type == "minor":
+        return f"{major_number}.{minor_number + 1}.0"
+    return f"{major_number}.{minor_number}.{patch_number + 1}"
+
+
+def update_pyproject_version(current_version: str, new_version: str) -> None:
+    """
+    Update the `version` of the [project] table in pyproject.toml,
+    leaving the rest of the file untouched.
 
+    Args:
+        current_version (str):
+            Current version number in X.Y.Z format according to Semantic Versioning,
+            without a leading `v` (e.g., 1.2.3).
+        new_version (str):
+            New version number in X.Y.Z format according to Semantic Versioning,
+            without a leading `v` (e.g., 1.2.3).
 
-def get_branch() -> str:
-    """Get the current Git branch name."""
+    Raises:
+        RuntimeError: if the [project] table has no `version` line
+            with the current version
+    """
+    # Keep the original line endings by disabling newline translation
+    with open(PYPROJECT_PATH, "r", encoding="utf-8", newline="") as fread:
+        lines = fread.read().splitlines(keepends=True)
+    table = ""
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("["):
+            table = stripped
+            continue
+        match = VERSION_LINE_PATTERN.match(line)
+        if table == "[project]" and match and match.group("version") == current_version:
+            start, end = match.span("version")
+            lines[index] = line[:start] + new_version + line[end:]
+            break
+    else:
+        raise RuntimeError(
+            f'No version = "{current_version}" in the [project] table '
+            f"of {PYPROJECT_PATH}."
+        )
+    with open(PYPROJECT_PATH, "w", encoding="utf-8", newline="") as fwrite:
+        fwrite.write("".join(lines))
+
+
+def get_git_status() -> List[str]:
+    """
+    Get the branch and the working tree status with a single Git query.
+
+    Returns:
+        List[str]: lines of `git status --porcelain --branch`;
+            the first line is the branch header (e.g., ## main...origin/main).
+    """
     result = subprocess.run(
-        ["git", "branch", "--show-current"],
+        ["git", "status", "--porcelain", "--branch"],
         check=True,
         text=True,
         stdout=subprocess.PIPE,
     )
-    return result.stdout.strip()
+    return result.stdout.strip().split("\n")
+
+
+def get_branch(status: List[str]) -> str:
+    """
+    Get the current Git branch name from the status.
+
+    Args:
+        status (List[str]): lines of `git status --porcelain --branch`
+
+    Returns:
+        str: the branch name (e.g., main for ## main...origin/main).
+    """
+    header = status[0].removeprefix("## ")
+    header = header.removeprefix("No commits yet on ")
+    return header.split("...")[0].split(" ")[0]
 
 
 def update_init_py_version(current_version: str, new_version: str) -> None:
@@ -66,8 +160,7 @@ def git_add_commit_version_tag(new_version: str) -> None:
             without a leading `v` (e.g., 1.2.3).
     """
     # Commit the version update
-    subprocess.run(["git", "add", "scripts/__init__.py"], check=True)
-    subprocess.run(["git", "add", "pyproject.toml"], check=True)
+    subprocess.run(["git", "add", "scripts/__init__.py", PYPROJECT_PATH], check=True)
     subprocess.run(
         ["git", "commit", "-m", f"Bump version to {new_version}"], check=True
     )
@@ -75,25 +168,19 @@ def git_add_commit_version_tag(new_version: str) -> None:
     subprocess.run(["git", "tag", f"v{new_version}"], check=True)
 
 
-def is_clean_main_branch() -> bool:
+def is_clean_main_branch(status: List[str]) -> bool:
     """
     Return True if the current Git branch is 'main'
     and there are no uncommitted or unpushed changes.
     Return False otherwise.
 
+    Args:
+        status (List[str]): lines of `git status --porcelain --branch`
+
     Returns:
         bool: True if on clean 'main' branch, False otherwise.
     """
-    result = subprocess.run(
-        ["git", "status", "--porcelain", "--branch"],
-        check=True,
-        text=True,
-        stdout=subprocess.PIPE,
-    )
-    lines = result.stdout.strip().split("\n")
-    if len(lines) == 1 and lines[0] == "## main...origin/main":
-        return True
-    return False
+    return status == ["## main...origin/main"]
 
 
 def check_branch() -> None:
@@ -105,14 +192,15 @@ def check_branch() -> None:
         RuntimeError: if the current branch is not 'main'
                       or if there are uncommitted or unpushed changes.
     """
-    current_branch = get_branch()
+    status = get_git_status()
+    current_branch = get_branch(status)
     if not current_branch == "main":
         raise RuntimeError(
             f"The current Git branch is not 'main': {current_branch}\n"
             "Please switch to the 'main' branch before running this.\n"
             "Aborting version bump."
         )
-    if not is_clean_main_branch():
+    if not is_clean_main_branch(status):
         raise RuntimeError(
             "There are uncommitted or unpushed changes.\n"
             "Please ensure the 'main' branch is clean before running this.\n"
@@ -137,9 +225,8 @@ def bump_version(version_type: str) -> None:
     # Get the current version
     current_version = get_version()
     # Update the version in pyproject.toml
-    subprocess.run(["poetry", "version", version_type], check=True)
-    # Get the updated version
-    new_version = get_version()
+    new_version = increment_version(current_version, version_type)
+    update_pyproject_version(current_version, new_version)
     # Update __version__ in scripts/__init__.py
     update_init_py_version(current_version, new_version)
     # Commit and tag the version update
@@ -0,0 +1,315 @@
+"""
+File watching for `poetry run build --watch`.
+Files and directories are watched with inotify where the C library provides it,
+and by polling their file status elsewhere.
+Bursts of change events, such as an editor's save, are debounced into one call.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Quiet period after the last change event before reacting to it
+DEBOUNCE_SECONDS = 0.02
+
+# Interval between two checks of the file status when polling
+POLL_INTERVAL_SECONDS = 0.02
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+# Editors save in place or by replacing the file, so both kinds are watched,
+# as are removed files and the loss of the watched directory itself
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+# Header of an inotify event: watch descriptor, mask, cookie and name length
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Watches files through inotify on their directories, and directories as a whole."""
+
+    def __init__(self, paths: Sequence[str], libc: Any):
+        """
+        Args:
+            paths: Paths to the watched files and directories.
+                A path that becomes a directory later,
+                such as a palettes.d/ created while watching, is then watched as one.
+            libc: C library providing the inotify functions
+
+        Raises:
+            OSError: If inotify can't be set up
+        """
+        self.libc = libc
+        self.paths = list(paths)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Names of the watched files by watch descriptor; None for any file
+        self.names: Dict[int, Optional[Set[bytes]]] = {}
+        # Inodes of the directories watched as a whole, by path
+        self.directories: Dict[str, int] = {}
+        try:
+            for path in self.paths:
+                self.add_watch(path)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_watch(self, path: str) -> None:
+        """
+        Watch a file or directory through its parent directory,
+        and a directory as a whole as well.
+
+        Args:
+            path: Path to the file or directory
+
+        Raises:
+            OSError: If the watch can't be added
+        """
+        self.watch_directory(
+            os.fsencode(os.path.dirname(os.path.abspath(path))),
+            {os.fsencode(os.path.basename(path))},
+        )
+        if os.path.isdir(path):
+            self.watch_directory(os.fsencode(path), None)
+            self.directories[path] = os.stat(path).st_ino
+
+    def watch_directory(self, directory: bytes, names: Optional[Set[bytes]]) -> None:
+        """
+        Watch files of a directory.
+
+        Args:
+            directory: Path to the directory
+            names: Names of the watched files, or None for any file
+
+        Raises:
+            OSError: If the watch can't be added
+        """
+        wd = self.libc.inotify_add_watch(self.fd, directory, WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        # The same directory has one watch descriptor for all its files
+        watched = self.names.get(wd, set())
+        self.names[wd] = None if names is None or watched is None else watched | names
+
+    def watch_new_directories(self) -> None:
+        """Watch the watched paths that were created or replaced as directories."""
+        for path in self.paths:
+            try:
+                if not os.path.isdir(path):
+                    # Forgotten, to be watched again once recreated, whatever its inode
+                    self.directories.pop(path, None)
+                elif self.directories.get(path) != os.stat(path).st_ino:
+                    self.add_watch(path)
+            except OSError:
+                # Removed again before it could be watched
+                continue
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Wait for a watched file to change.
+
+        Args:
+            timeout: Maximum time to wait in seconds, or None to wait indefinitely
+
+        Returns:
+            True if a file changed, False if the timeout passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining < 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if readable and any(
+                self.is_watched(wd, name) for wd, name in self.read_names()
+            ):
+                self.watch_new_directories()
+                return True
+
+    def is_watched(self, wd: int, name: bytes) -> bool:
+        """
+        Check whether an event is about a watched file.
+
+        Args:
+            wd: Watch descriptor of the directory the event is about
+            name: Name of the file in the directory,
+                or empty for an event about the directory itself
+
+        Returns:
+            True if the file, or its whole directory, is watched,
+            or if the watched directory itself was removed or moved
+        """
+        names = self.names.get(wd, set())
+        return names is None or name in names or (not name and wd in self.names)
+
+    def read_names(self) -> List[Tuple[int, bytes]]:
+        """
+        Read the pending events.
+
+        Returns:
+            Watch descriptors of the watched directories the events are about,
+            with the names of the files in them
+        """
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            names.append((wd, data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self.fd)
+
+
+def get_file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Get the status of a file that changes when the file is written.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Modification time, size and inode, or None if the file is missing
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class PollingWatcher:
+    """Watches files and directories by polling their modification time, size and inode."""
+
+    def __init__(self, paths: Sequence[str], interval: float = POLL_INTERVAL_SECONDS):
+        """
+        Args:
+            paths: Paths to the watched files and directories
+            interval: Interval between two checks in seconds
+        """
+        self.paths = list(paths)
+        self.interval = interval
+        self.signature = self.get_signature()
+
+    def get_signature(self) -> List[Any]:
+        """
+        Get the status of the files that changes when a file is written.
+        A directory's status includes that of every file in it.
+
+        Returns:
+            Modification time, size and inode of each file,
+            or None for a missing file
+        """
+        signature: List[Any] = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                names = sorted(os.listdir(path))
+                signature.append(
+                    [
+                        (name, get_file_signature(os.path.join(path, name)))
+                        for name in names
+                    ]
+                )
+            else:
+                signature.append(get_file_signature(path))
+        return signature
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Wait for a watched file to change.
+
+        Args:
+            timeout: Maximum time to wait in seconds, or None to wait indefinitely
+
+        Returns:
+            True if a file changed, False if the timeout passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self.get_signature()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+def open_watcher(paths: Sequence[str]) -> Any:
+    """
+    Start watching files and directories, with inotify if available
+    and by polling otherwise.
+
+    Args:
+        paths: Paths to the watched files and directories
+
+    Returns:
+        InotifyWatcher or PollingWatcher
+    """
+    libc_name = ctypes.util.find_library("c")
+    try:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if hasattr(libc, "inotify_init1"):
+            return InotifyWatcher(paths, libc)
+    except OSError:
+        pass
+    return PollingWatcher(paths)
+
+
+def watch(
+    paths: Sequence[str],
+    on_change: Callable[[], Any],
+    debounce: float = DEBOUNCE_SECONDS,
+    watcher: Any = None,
+) -> None:
+    """
+    Call a function after every burst of changes to the watched files, until interrupted.
+
+    Args:
+        paths: Paths to the watched files and directories
+        on_change: Function called once the files stopped changing
+        debounce: Quiet period in seconds after the last change before calling
+        watcher: Watcher to use; defaults to open_watcher(paths)
+    """
+    watcher = watcher or open_watcher(paths)
+    try:
+        while True:
+            watcher.wait(None)
+            while watcher.wait(debounce):
+                pass
+            on_change()
+    finally:
+        watcher.close()
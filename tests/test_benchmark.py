@@ -0,0 +1,347 @@
+"""
+Unit tests for ./scripts/benchmark.py
+"""
+
+import json
+
+import pytest
+
+from scripts import benchmark
+from scripts.build import load_palettes
+from scripts.validator import PALETTE_TYPES
+
+
+class TestSyntheticCatalogs:
+    """Tests for the synthetic catalog generator."""
+
+    def test_iter_palettes(self):
+        """Test that palettes have unique names and keys and 2 to 64 colors."""
+        # Act
+        palettes = list(benchmark.iter_palettes(200))
+
+        # Assert
+        assert len(palettes) == 200
+        assert len({palette["name"] for palette in palettes}) == 200
+        color_counts = [len(palette["colors"]) for palette in palettes]
+        assert min(color_counts) >= benchmark.MIN_COLORS
+        assert max(color_counts) <= benchmark.MAX_COLORS
+        assert len(set(color_counts)) > 10
+        assert {palette["type"] for palette in palettes} == set(PALETTE_TYPES)
+        for palette in palettes:
+            keys = [color["key"] for color in palette["colors"]]
+            assert len(set(keys)) == len(keys)
+            assert not palette["name"].isascii()
+
+    def test_iter_palettes_seed(self):
+        """Test that the same seed makes the same palettes, and another seed others."""
+        # Act
+        first = list(benchmark.iter_palettes(5, seed=1))
+        second = list(benchmark.iter_palettes(5, seed=1))
+        other = list(benchmark.iter_palettes(5, seed=2))
+
+        # Assert
+        assert first == second
+        assert first != other
+
+    def test_write_catalog(self, tmp_path):
+        """Test that written catalogs load as valid palettes.yml files."""
+        # Arrange
+        palettes = list(benchmark.iter_palettes(20))
+        palettes[0]["description"] = "Students' grades"
+        path = tmp_path / "palettes.yml"
+
+        # Act
+        benchmark.write_catalog(palettes, str(path))
+
+        # Assert
+        catalog = load_palettes(str(path))
+        assert [palette.name for palette in catalog] == [
+            palette["name"] for palette in palettes
+        ]
+        assert catalog.palettes[0].description == "Students' grades"
+        assert [color.key for color in catalog.palettes[1]] == [
+            color["key"] for color in palettes[1]["colors"]
+        ]
+        assert [color.hex for color in catalog.palettes[1]] == [
+            color["value"] for color in palettes[1]["colors"]
+        ]
+
+
+class TestRunBenchmarks:
+    """Tests for the run_benchmarks() and time_best() functions."""
+
+    def test_run_benchmarks(self, mocker):
+        """Test that every benchmark is timed on every catalog size."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        results = benchmark.run_benchmarks([3, 5], repeat=1)
+
+        # Assert
+        assert [(result.name, result.palettes) for result in results] == [
+            (name, size)
+            for size in [3, 5]
+            for name in [
+                "load_palettes",
+                "compile_palettes",
+                "generate_tableau_preferences",
+                "generate_r_script",
+                "sanitize_variable_name",
+            ]
+        ]
+        colors = sum(len(palette["colors"]) for palette in benchmark.iter_palettes(5))
+        assert results[-1].colors == colors
+        assert all(result.seconds > 0 for result in results)
+        assert mock_print.call_count == 10
+
+    def test_run_benchmarks_max_load_size(self, mocker):
+        """Test that catalogs above the maximum load size aren't loaded."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+        mock_write = mocker.patch("scripts.benchmark.write_catalog")
+
+        # Act
+        results = benchmark.run_benchmarks([4], repeat=1, max_load_size=3)
+
+        # Assert
+        assert "load_palettes" not in [result.name for result in results]
+        assert len(results) == 4
+        mock_write.assert_not_called()
+        mock_print.assert_any_call(
+            "Skipping load_palettes (4 palettes): too large to load."
+        )
+
+    def test_time_best(self, mocker):
+        """Test that the shortest of the runs is kept."""
+        # Arrange
+        mocker.patch(
+            "scripts.benchmark.time.perf_counter", side_effect=[0.0, 3.0, 10.0, 11.0]
+        )
+        function = mocker.Mock()
+
+        # Act
+        seconds = benchmark.time_best(function, 2)
+
+        # Assert
+        assert seconds == 1.0
+        assert function.call_count == 2
+
+
+class TestResults:
+    """Tests for saving and comparing results."""
+
+    def test_json_round_trip(self):
+        """Test that results read back from their JSON structure are unchanged."""
+        # Arrange
+        results = [benchmark.BenchmarkResult("generate_r_script", 10, 300, 0.5)]
+
+        # Act
+        data = json.loads(json.dumps(benchmark.to_json(results)))
+
+        # Assert
+        assert data["version"] == benchmark.BENCHMARK_VERSION
+        assert data["results"][0]["throughput"] == 20.0
+        assert benchmark.from_json(data) == results
+
+    @pytest.mark.parametrize("data", [[], {"version": 0, "results": []}])
+    def test_from_json_invalid(self, data):
+        """Test that data other than results of this version are rejected."""
+        with pytest.raises(ValueError, match="Not a benchmark results file"):
+            benchmark.from_json(data)
+
+    def test_throughput_of_instant_benchmark(self):
+        """Test that a benchmark too fast to time has an infinite throughput."""
+        assert benchmark.BenchmarkResult("x", 10, 20, 0.0).throughput == float("inf")
+
+    def test_compare_results(self):
+        """Test that throughput drops beyond the threshold are regressions."""
+        # Arrange
+        baseline = [
+            benchmark.BenchmarkResult("load_palettes", 1000, 0, 1.0),
+            benchmark.BenchmarkResult("generate_r_script", 1000, 0, 1.0),
+            benchmark.BenchmarkResult("generate_r_script", 10, 0, 1.0),
+        ]
+        current = [
+            benchmark.BenchmarkResult("load_palettes", 1000, 0, 1.1),
+            benchmark.BenchmarkResult("generate_r_script", 1000, 0, 2.0),
+            benchmark.BenchmarkResult("sanitize_variable_name", 1000, 0, 1.0),
+        ]
+
+        # Act
+        lines, regressions = benchmark.compare_results(baseline, current, 0.2)
+
+        # Assert
+        assert regressions == 1
+        assert lines == [
+            "load_palettes (1,000 palettes): 1,000 -> 909 palettes/s (-9.1%)",
+            "generate_r_script (1,000 palettes): 1,000 -> 500 palettes/s "
+            "(-50.0%) REGRESSION",
+            "generate_r_script (10 palettes): not benchmarked",
+        ]
+
+    @pytest.mark.parametrize(
+        "baseline_seconds, current_seconds", [(0.0, 0.0), (0.0, 1.0), (1.0, 0.0)]
+    )
+    def test_compare_instant_benchmarks(self, baseline_seconds, current_seconds):
+        """Test that benchmarks too fast to time are neither compared nor regressions."""
+        # Arrange
+        baseline = [
+            benchmark.BenchmarkResult("compile_palettes", 10, 0, baseline_seconds)
+        ]
+        current = [
+            benchmark.BenchmarkResult("compile_palettes", 10, 0, current_seconds)
+        ]
+
+        # Act
+        lines, regressions = benchmark.compare_results(baseline, current, 0.2)
+
+        # Assert
+        assert regressions == 0
+        assert lines == [
+            "compile_palettes (10 palettes): too fast to time, not compared"
+        ]
+
+
+class TestMain:
+    """Tests for the main() function."""
+
+    @pytest.fixture
+    def run(self, mocker):
+        """Patched run_benchmarks() returning a fixed result."""
+        return mocker.patch(
+            "scripts.benchmark.run_benchmarks",
+            return_value=[benchmark.BenchmarkResult("load_palettes", 10, 100, 0.01)],
+        )
+
+    def test_main(self, mocker, tmp_path, run):  # pylint: disable=redefined-outer-name
+        """Test that the results are saved to the build cache by default."""
+        # Arrange
+        mocker.patch("builtins.print")
+        mocker.patch("scripts.benchmark.get_repo_root", return_value=str(tmp_path))
+
+        # Act
+        benchmark.main(["--sizes", "10,20", "--repeat", "2", "--seed", "3"])
+
+        # Assert
+        run.assert_called_once_with([10, 20], 2, 3, benchmark.DEFAULT_MAX_LOAD_SIZE)
+        with open(tmp_path / ".build_cache" / "benchmark.json", encoding="utf-8") as f:
+            data = json.load(f)
+        assert benchmark.from_json(data) == run.return_value
+        assert not data["skipped"]
+
+    def test_main_reports_skipped_benchmarks(
+        self, mocker, tmp_path, run
+    ):  # pylint: disable=redefined-outer-name
+        """Test that catalogs too large to load are reported as not benchmarked."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+        output_path = tmp_path / "out.json"
+
+        # Act
+        benchmark.main(
+            [
+                "--sizes",
+                "10,100000",
+                "--max-load-size",
+                "10",
+                "--output",
+                str(output_path),
+            ]
+        )
+
+        # Assert
+        run.assert_called_once_with([10, 100000], 3, 0, 10)
+        mock_print.assert_called_with(
+            "Not benchmarked: load_palettes (100,000 palettes), "
+            "larger than --max-load-size 10."
+        )
+        with open(output_path, encoding="utf-8") as f:
+            assert json.load(f)["skipped"] == [
+                {"name": "load_palettes", "palettes": 100000}
+            ]
+
+    def test_main_compare(
+        self, mocker, tmp_path, run
+    ):  # pylint: disable=redefined-outer-name,unused-argument
+        """Test that a comparison within the threshold passes."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(
+            json.dumps(
+                benchmark.to_json(
+                    [benchmark.BenchmarkResult("load_palettes", 10, 100, 0.011)]
+                )
+            ),
+            encoding="utf-8",
+        )
+
+        # Act
+        benchmark.main(
+            ["--output", str(tmp_path / "out.json"), "--compare", str(baseline)]
+        )
+
+        # Assert
+        mock_print.assert_called_with(
+            "load_palettes (10 palettes): 909 -> 1,000 palettes/s (+10.0%)"
+        )
+
+    def test_main_compare_regression(
+        self, mocker, tmp_path, run
+    ):  # pylint: disable=redefined-outer-name,unused-argument
+        """Test that a throughput drop beyond the threshold fails."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(
+            json.dumps(
+                benchmark.to_json(
+                    [benchmark.BenchmarkResult("load_palettes", 10, 100, 0.005)]
+                )
+            ),
+            encoding="utf-8",
+        )
+
+        # Act & Assert
+        with pytest.raises(SystemExit) as exc_info:
+            benchmark.main(
+                [
+                    "--output",
+                    str(tmp_path / "out.json"),
+                    "--compare",
+                    str(baseline),
+                    "--threshold",
+                    "0.3",
+                ]
+            )
+        assert exc_info.value.code == 1
+        mock_print.assert_called_with(
+            "1 benchmark(s) lost more than 30% of their throughput."
+        )
+
+    def test_main_invalid_baseline(
+        self, tmp_path, run
+    ):  # pylint: disable=redefined-outer-name
+        """Test that an invalid baseline fails before benchmarking."""
+        # Arrange
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text("[]", encoding="utf-8")
+
+        # Act & Assert
+        with pytest.raises(SystemExit) as exc_info:
+            benchmark.main(["--compare", str(baseline)])
+        assert exc_info.value.code == 2
+        run.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "argv", [["--repeat", "0"], ["--sizes", "10,x"], ["--sizes", "0"]]
+    )
+    def test_main_invalid_arguments(
+        self, argv, run
+    ):  # pylint: disable=redefined-outer-name
+        """Test that invalid sizes and repeat counts are rejected."""
+        with pytest.raises(SystemExit) as exc_info:
+            benchmark.main(argv)
+        assert exc_info.value.code == 2
+        run.assert_not_called()
@@ -2,50 +2,71 @@
 Unit tests for ./scripts/build.py
 """
 
+# pylint: disable=too-many-lines
+
+import importlib.util
+import io
+import json
 import os
+from pathlib import Path
 import tempfile
+import tracemalloc
 from typing import Any, Dict, List
 from unittest.mock import mock_open
 
 import pytest
 import yaml
 
-from scripts import build
+from scripts import __version__, benchmark, build
+from scripts.compiler import CompiledPalette, compile_palettes
+from scripts.model import PaletteCatalog
+from scripts.profiler import Profiler, phase
+from scripts.validator import PaletteValidationError
 
 
 # Test data fixtures
 @pytest.fixture
-def sample_palettes() -> List[Dict[str, Any]]:
+def sample_palettes() -> PaletteCatalog:
     """Sample palettes for testing."""
-    return [
-        {
-            "name": "Test Palette",
-            "type": "categorical",
-            "description": "A test palette",
-            "colors": [
-                {"key": "Color One", "value": "#ff0000"},
-                {"key": "Color Two", "value": "#00ff00"},
-            ],
-        },
-        {
-            "name": "Sequential Test",
-            "type": "sequential",
-            "description": "A sequential palette",
-            "colors": [
-                {"key": "Light", "value": "#e0e0e0"},
-                {"key": "Dark", "value": "#202020"},
-            ],
-        },
-        {
-            "name": "Empty Description Palette",
-            "type": "sequential",
-            "description": "",
-            "colors": [
-                {"key": "Start", "value": "#ffffff"},
-                {"key": "End", "value": "#000000"},
-            ],
-        },
-    ]
+    return PaletteCatalog.from_dicts(
+        [
+            {
+                "name": "Test Palette",
+                "type": "categorical",
+                "description": "A test palette",
+                "colors": [
+                    {"key": "Color One", "value": "#ff0000"},
+                    {"key": "Color Two", "value": "#00ff00"},
+                ],
+            },
+            {
+                "name": "Sequential Test",
+                "type": "sequential",
+                "description": "A sequential palette",
+                "colors": [
+                    {"key": "Light", "value": "#e0e0e0"},
+                    {"key": "Dark", "value": "#202020"},
+                ],
+            },
+            {
+                "name": "Empty Description Palette",
+                "type": "sequential",
+                "description": "",
+                "colors": [
+                    {"key": "Start", "value": "#ffffff"},
+                    {"key": "End", "value": "#000000"},
+                ],
+            },
+        ]
+    )
+
+
+@pytest.fixture
+def compiled_palettes(
+    sample_palettes,  # pylint: disable=redefined-outer-name
+) -> List[CompiledPalette]:
+    """Sample palettes compiled for the emitters."""
+    return compile_palettes(sample_palettes)
 
 
 @pytest.fixture
@@ -85,9 +106,11 @@ class TestLoadPalettes:
         result = build.load_palettes("test.yml")
 
         # Assert
+        assert isinstance(result, PaletteCatalog)
         assert len(result) == 1
-        assert result[0]["name"] == "Test Palette"
-        assert result[0]["type"] == "categorical"
+        assert result[0].name == "Test Palette"
+        assert result[0].type == "categorical"
+        assert result[0].hex_values == ("#ff0000", "#00ff00")
         mock_file.assert_called_once_with("test.yml", "r", encoding="utf-8")
 
     def test_load_palettes_file_not_found(self, mocker):
@@ -131,31 +154,241 @@ class TestLoadPalettes:
             build.load_palettes("empty.yml")
 
 
-class TestGetTableauType:
-    """Tests for get_tableau_type() function."""
+class TestLoadPalettesCache:
+    """Tests for the parsed-result cache of load_palettes()."""
+
+    @pytest.fixture
+    def yaml_path(
+        self, tmp_path, sample_yaml_data
+    ):  # pylint: disable=redefined-outer-name
+        """Write the sample YAML data into a temporary palettes.yml."""
+        path = tmp_path / "palettes.yml"
+        path.write_text(yaml.dump(sample_yaml_data), encoding="utf-8")
+        return str(path)
+
+    def test_uses_libyaml_loader_when_available(self):
+        """Test that the C loader is preferred when PyYAML provides it."""
+        expected = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        assert build.YamlLoader is expected
+        assert expected.__name__ in build.YAML_LOADER_VERSION
+
+    def test_cache_hit_skips_parsing(
+        self, mocker, tmp_path, yaml_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a second load of an unchanged file doesn't parse YAML."""
+        # Arrange
+        cache_dir = str(tmp_path / "cache")
+        first = build.load_palettes(yaml_path, cache_dir=cache_dir)
+        mock_load = mocker.patch("scripts.build.load_validated")
 
-    def test_get_tableau_type_categorical(self):
-        """Test conversion of 'categorical' type."""
-        assert build.get_tableau_type("categorical") == "regular"
+        # Act
+        second = build.load_palettes(yaml_path, cache_dir=cache_dir)
 
-    def test_get_tableau_type_sequential(self):
-        """Test conversion of 'sequential' type."""
-        assert build.get_tableau_type("sequential") == "ordered-sequential"
+        # Assert
+        assert second.to_dicts() == first.to_dicts()
+        mock_load.assert_not_called()
 
-    def test_get_tableau_type_diverging(self):
-        """Test conversion of 'diverging' type."""
-        assert build.get_tableau_type("diverging") == "ordered-diverging"
+    def test_cache_miss_after_edit(
+        self, tmp_path, yaml_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that editing the file invalidates the cached result."""
+        # Arrange
+        cache_dir = str(tmp_path / "cache")
+        build.load_palettes(yaml_path, cache_dir=cache_dir)
+        with open(yaml_path, "w", encoding="utf-8") as f:
+            f.write(
+                "palettes:\n  - name: Edited\n    type: sequential\n"
+                "    colors:\n      - key: A\n        value: '#000000'\n"
+            )
+
+        # Act
+        result = build.load_palettes(yaml_path, cache_dir=cache_dir)
+
+        # Assert
+        assert result.to_dicts() == [
+            {
+                "name": "Edited",
+                "type": "sequential",
+                "description": "",
+                "colors": [{"key": "A", "value": "#000000"}],
+            }
+        ]
+
+    def test_cache_miss_after_loader_change(
+        self, mocker, tmp_path, yaml_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a different YAML loader invalidates the cached result."""
+        # Arrange
+        cache_dir = str(tmp_path / "cache")
+        build.load_palettes(yaml_path, cache_dir=cache_dir)
+        mocker.patch("scripts.build.YAML_LOADER_VERSION", "another loader")
+        mock_load = mocker.patch(
+            "scripts.build.load_validated", wraps=build.load_validated
+        )
+
+        # Act
+        build.load_palettes(yaml_path, cache_dir=cache_dir)
 
-    def test_get_tableau_type_unknown(self):
-        """Test default behavior for unknown type."""
-        assert build.get_tableau_type("unknown_type") == "regular"
+        # Assert
+        mock_load.assert_called_once()
+
+    def test_unserializable_values_are_not_cached(
+        self, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that values JSON can't represent are loaded but not cached."""
+        # Arrange
+        path = tmp_path / "palettes.yml"
+        path.write_text(
+            "palettes:\n  - name: Dated\n    type: categorical\n    added: 2024-01-01\n"
+            "    colors:\n      - key: A\n        value: '#000000'\n",
+            encoding="utf-8",
+        )
+        cache_dir = tmp_path / "cache"
+
+        # Act
+        result = build.load_palettes(str(path), cache_dir=str(cache_dir))
+
+        # Assert
+        assert len(result) == 1
+        assert not (cache_dir / "palettes").exists()
+
+
+class TestLoadPaletteFiles:
+    """Tests for loading and merging palettes.yml and palettes.d/."""
+
+    @staticmethod
+    def write_palettes(path, *names: str) -> str:
+        """Write a palette file with one two-color palette per name."""
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(
+            yaml.dump(
+                {
+                    "palettes": [
+                        {
+                            "name": name,
+                            "type": "diverging",
+                            "colors": [
+                                {"key": "Low", "value": "#0000aa"},
+                                {"key": "High", "value": "#aa0000"},
+                            ],
+                        }
+                        for name in names
+                    ]
+                }
+            ),
+            encoding="utf-8",
+        )
+        return str(path)
+
+    def test_get_palette_paths(self, tmp_path):
+        """Test that palettes.yml comes first, then palettes.d/ by file name."""
+        # Arrange
+        for name in ["b.yaml", "a.yml", "notes.txt"]:
+            self.write_palettes(tmp_path / "palettes.d" / name)
+
+        # Act
+        paths = build.get_palette_paths(str(tmp_path))
+
+        # Assert
+        assert paths == [
+            str(tmp_path / "palettes.yml"),
+            str(tmp_path / "palettes.d" / "a.yml"),
+            str(tmp_path / "palettes.d" / "b.yaml"),
+        ]
+        assert build.get_palette_paths(str(tmp_path / "none")) == [
+            str(tmp_path / "none" / "palettes.yml")
+        ]
+
+    def test_files_are_parsed_in_parallel_and_merged_in_order(self, mocker, tmp_path):
+        """Test that uncached files are parsed on a process pool once."""
+        # Arrange
+        paths = [
+            self.write_palettes(tmp_path / "palettes.yml", "Enrollment"),
+            self.write_palettes(tmp_path / "palettes.d" / "a.yml", "Finance", "Budget"),
+            self.write_palettes(tmp_path / "palettes.d" / "b.yml", "Alumni"),
+        ]
+        cache_dir = str(tmp_path / "cache")
+        pool = mocker.patch(
+            "scripts.build.ProcessPoolExecutor", wraps=build.ProcessPoolExecutor
+        )
+
+        # Act
+        first = build.load_palette_files(paths, cache_dir, max_workers=2)
+        second = build.load_palette_files(paths, cache_dir)
+
+        # Assert
+        names = ["Enrollment", "Finance", "Budget", "Alumni"]
+        assert [palette.name for palette in first] == names
+        assert second.to_dicts() == first.to_dicts()
+        pool.assert_called_once_with(max_workers=2)
+
+    def test_only_changed_file_is_parsed(self, mocker, tmp_path):
+        """Test that each file is cached on its own."""
+        # Arrange
+        paths = [
+            self.write_palettes(tmp_path / "palettes.yml", "Admissions"),
+            self.write_palettes(tmp_path / "palettes.d" / "ir.yml", "Retention"),
+        ]
+        cache_dir = str(tmp_path / "cache")
+        build.load_palette_files(paths, cache_dir)
+        self.write_palettes(tmp_path / "palettes.d" / "ir.yml", "Graduation")
+        pool = mocker.patch("scripts.build.ProcessPoolExecutor")
+        load_validated = mocker.patch(
+            "scripts.build.load_validated", wraps=build.load_validated
+        )
+
+        # Act
+        catalog = build.load_palette_files(paths, cache_dir)
+
+        # Assert
+        assert [palette.name for palette in catalog] == ["Admissions", "Graduation"]
+        pool.assert_not_called()
+        load_validated.assert_called_once()
+        assert load_validated.call_args.args[1] == paths[1]
+
+    def test_duplicate_names_across_files(self, tmp_path):
+        """Test that all palettes defined in more than one file are reported."""
+        # Arrange
+        paths = [
+            self.write_palettes(tmp_path / "palettes.yml", "Grades", "Terms"),
+            self.write_palettes(tmp_path / "palettes.d" / "a.yml", "Terms", "Grades"),
+            self.write_palettes(tmp_path / "palettes.d" / "b.yml", "Terms"),
+        ]
+
+        # Act
+        with pytest.raises(ValueError) as exc_info:
+            build.load_palette_files(paths)
+
+        # Assert
+        assert str(exc_info.value).splitlines() == [
+            "Palette files define the same palettes:",
+            f"  Duplicate palette name 'Terms' in {paths[1]} (first defined in {paths[0]})",
+            f"  Duplicate palette name 'Grades' in {paths[1]} (first defined in {paths[0]})",
+            f"  Duplicate palette name 'Terms' in {paths[2]} (first defined in {paths[0]})",
+        ]
+
+    def test_worker_errors_are_raised(self, tmp_path):
+        """Test that a file failing validation in a worker raises its error."""
+        # Arrange
+        paths = [
+            self.write_palettes(tmp_path / "palettes.yml", "Valid"),
+            self.write_palettes(tmp_path / "palettes.d" / "bad.yml", "Bad"),
+        ]
+        with open(paths[1], "a", encoding="utf-8") as file:
+            file.write("- name: Bad\n  type: categorical\n  colors: []\n")
+
+        # Act & Assert
+        with pytest.raises(PaletteValidationError) as exc_info:
+            build.load_palette_files(paths)
+        assert exc_info.value.path == paths[1]
+        assert build.load_palette_dicts(paths[0], cached_only=True) is None
 
 
 class TestGenerateTableauPreferences:
     """Tests for generate_tableau_preferences() function."""
 
     def test_generate_tableau_preferences_creates_file(
-        self, mocker, sample_palettes
+        self, mocker, compiled_palettes
     ):  # pylint: disable=redefined-outer-name
         """Test that generate_tableau_preferences creates a file."""
         # Arrange
@@ -163,7 +396,7 @@ class TestGenerateTableauPreferences:
         mocker.patch("builtins.open", mock_file)
 
         # Act
-        build.generate_tableau_preferences(sample_palettes, "output.tps")
+        build.generate_tableau_preferences(compiled_palettes, "output.tps")
 
         # Assert
         mock_file.assert_called_once_with(
@@ -174,7 +407,7 @@ class TestGenerateTableauPreferences:
         assert handle.write.called
 
     def test_generate_tableau_preferences_content(
-        self, sample_palettes
+        self, compiled_palettes
     ):  # pylint: disable=redefined-outer-name
         """Test the content of generated Tableau preferences file."""
         # Arrange
@@ -183,7 +416,7 @@ class TestGenerateTableauPreferences:
 
         try:
             # Act
-            build.generate_tableau_preferences(sample_palettes, tmp_path)
+            build.generate_tableau_preferences(compiled_palettes, tmp_path)
 
             # Assert
             with open(tmp_path, "r", encoding="utf-8") as f:
@@ -243,62 +476,175 @@ class TestGenerateTableauPreferences:
                 os.remove(tmp_path)
 
 
-class TestSanitizeVariableName:
-    """Tests for sanitize_variable_name() function."""
+class TestStreamTableauPreferences:
+    """Tests for iter_tableau_preferences() and write_tableau_preferences()."""
 
-    def test_sanitize_variable_name_basic(self):
-        """Test basic conversion to snake_case."""
-        assert build.sanitize_variable_name("Test Palette") == "test_palette"
+    def test_iter_tableau_preferences_yields_one_chunk_per_palette(
+        self, compiled_palettes
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the generator yields the header, the palettes and the footer."""
+        # Act
+        chunks = list(build.iter_tableau_preferences(compiled_palettes))
 
-    def test_sanitize_variable_name_with_special_chars(self):
-        """Test removal of special characters."""
-        assert build.sanitize_variable_name("Test-Palette!@#$") == "testpalette"
+        # Assert
+        assert len(chunks) == len(compiled_palettes) + 2
+        assert chunks[0] == build.TABLEAU_HEADER
+        assert chunks[1].startswith('    <color-palette name="Test Palette"')
+        assert chunks[-1] == build.TABLEAU_FOOTER
 
-    def test_sanitize_variable_name_multiple_spaces(self):
-        """Test multiple spaces converted to underscores."""
-        assert (
-            build.sanitize_variable_name("Test  Multiple   Spaces")
-            == "test__multiple___spaces"
-        )
+    def test_iter_tableau_preferences_is_lazy(self):
+        """Test that palettes are consumed one at a time."""
 
-    def test_sanitize_variable_name_numbers(self):
-        """Test that numbers are preserved."""
-        assert build.sanitize_variable_name("Test 123 Palette") == "test_123_palette"
+        # Arrange
+        def palettes():
+            yield compile_palettes(PaletteCatalog.from_dicts([{"name": "First"}]))[0]
+            raise AssertionError("Second palette should not be consumed yet")
 
-    def test_sanitize_variable_name_already_snake_case(self):
-        """Test that already snake_case names are preserved."""
-        assert build.sanitize_variable_name("test_palette") == "test_palette"
+        # Act
+        chunks = build.iter_tableau_preferences(palettes())
 
-    def test_sanitize_variable_name_mixed_case(self):
-        """Test mixed case conversion."""
-        assert build.sanitize_variable_name("TestPalette") == "testpalette"
+        # Assert
+        assert next(chunks) == build.TABLEAU_HEADER
+        assert 'name="First"' in next(chunks)
 
+    def test_write_tableau_preferences_matches_file(
+        self, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that writing into a stream produces the same content as the file."""
+        # Arrange
+        stream = io.StringIO()
+        output_path = tmp_path / "Preferences.tps"
+
+        # Act
+        build.write_tableau_preferences(compiled_palettes, stream)
+        build.generate_tableau_preferences(compiled_palettes, str(output_path))
 
-class TestFormatRType:
-    """Tests for format_r_type() function."""
+        # Assert
+        assert stream.getvalue() == output_path.read_text(encoding="utf-8")
 
-    def test_format_r_type_categorical(self):
-        """Test formatting of 'categorical' type."""
-        assert build.format_r_type("categorical") == "Categorical"
 
-    def test_format_r_type_sequential(self):
-        """Test formatting of 'sequential' type."""
-        assert build.format_r_type("sequential") == "Sequential"
+class TestStreamRScript:
+    """Tests for iter_r_script() and write_r_script()."""
+
+    def test_iter_r_script_yields_one_chunk_per_palette(
+        self, compiled_palettes
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the generator yields the header, the palettes and the footer."""
+        # Act
+        chunks = list(build.iter_r_script(compiled_palettes))
+
+        # Assert
+        assert len(chunks) == len(compiled_palettes) + 2
+        assert chunks[0] == build.R_HEADER
+        assert chunks[1].startswith("\ncolor_values_test_palette <- c(\n")
+        assert chunks[-1] == build.R_FOOTER
+
+    def test_write_r_script_matches_file(
+        self, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that writing into a stream produces the same content as the file."""
+        # Arrange
+        stream = io.StringIO()
+        output_path = tmp_path / "palettes.R"
+
+        # Act
+        build.write_r_script(compiled_palettes, stream)
+        build.generate_r_script(compiled_palettes, str(output_path))
+
+        # Assert
+        assert stream.getvalue() == output_path.read_text(encoding="utf-8")
+        assert stream.getvalue().endswith(")\n")
+        assert not stream.getvalue().endswith(")\n\n")
+
+
+class TestGetDisplayWidth:
+    """Tests for get_display_width() function."""
+
+    @pytest.mark.parametrize(
+        "text, width",
+        [
+            ("", 0),
+            ("Exam Types", 10),
+            ("入学試験", 8),
+            ("ＡＢ", 4),
+            ("Ünïvërsité", 10),
+            ("e\u0301", 1),
+            ("a\tb\x85", 2),
+            ("학생처 Ñandú", 12),
+        ],
+    )
+    def test_get_display_width(self, text, width):
+        """Test that wide characters count twice, control and combining ones not."""
+        assert build.get_display_width(text) == width
+
+
+class TestFormatTableauStartTag:
+    """Tests for format_tableau_start_tag() function."""
+
+    def test_short_tag_on_one_line(self):
+        """Test that a tag fitting in the print width stays on one line."""
+        assert build.format_tableau_start_tag(
+            "color-palette", {"name": "Short", "type": "regular"}, "    "
+        ) == ['    <color-palette name="Short" type="regular">']
+
+    def test_tag_at_print_width_on_one_line(self):
+        """Test that a tag exactly as long as the print width stays on one line."""
+        # Arrange
+        name = "x" * (build.PRETTIER_PRINT_WIDTH - 42)
+
+        # Act
+        lines = build.format_tableau_start_tag(
+            "color-palette", {"name": name, "type": "regular"}, "    "
+        )
+
+        # Assert
+        assert len(lines) == 1
+        assert len(lines[0]) == build.PRETTIER_PRINT_WIDTH
+
+    def test_wide_characters_count_twice(self):
+        """Test that a CJK name wraps by its display width, as Prettier wraps it."""
+        # Arrange
+        fitting = "入" * ((build.PRETTIER_PRINT_WIDTH - 42) // 2)
+        too_wide = fitting + "学"
 
-    def test_format_r_type_diverging(self):
-        """Test formatting of 'diverging' type."""
-        assert build.format_r_type("diverging") == "Diverging"
+        # Act
+        fitting_lines = build.format_tableau_start_tag(
+            "color-palette", {"name": fitting, "type": "regular"}, "    "
+        )
+        wrapped_lines = build.format_tableau_start_tag(
+            "color-palette", {"name": too_wide, "type": "regular"}, "    "
+        )
+
+        # Assert
+        assert len(fitting_lines) == 1
+        assert build.get_display_width(fitting_lines[0]) == build.PRETTIER_PRINT_WIDTH
+        assert len(too_wide) + 42 < build.PRETTIER_PRINT_WIDTH
+        assert wrapped_lines == [
+            "    <color-palette",
+            f'      name="{too_wide}"',
+            '      type="regular"',
+            "    >",
+        ]
 
-    def test_format_r_type_lowercase(self):
-        """Test that lowercase input is capitalized."""
-        assert build.format_r_type("lowercase") == "Lowercase"
+    def test_long_tag_one_attribute_per_line(self):
+        """Test that a tag exceeding the print width is wrapped like Prettier does."""
+        assert build.format_tableau_start_tag(
+            "color-palette",
+            {"name": "AIU Inbound Student Status per Semester", "type": "regular"},
+            "    ",
+        ) == [
+            "    <color-palette",
+            '      name="AIU Inbound Student Status per Semester"',
+            '      type="regular"',
+            "    >",
+        ]
 
 
 class TestGenerateRScript:
     """Tests for generate_r_script() function."""
 
     def test_generate_r_script_creates_file(
-        self, mocker, sample_palettes
+        self, mocker, compiled_palettes
     ):  # pylint: disable=redefined-outer-name
         """Test that generate_r_script creates a file."""
         # Arrange
@@ -306,7 +652,7 @@ class TestGenerateRScript:
         mocker.patch("builtins.open", mock_file)
 
         # Act
-        build.generate_r_script(sample_palettes, "output.R")
+        build.generate_r_script(compiled_palettes, "output.R")
 
         # Assert
         mock_file.assert_called_once_with(
@@ -316,7 +662,7 @@ class TestGenerateRScript:
         assert handle.write.called
 
     def test_generate_r_script_content(
-        self, sample_palettes
+        self, compiled_palettes
     ):  # pylint: disable=redefined-outer-name
         """Test the content of generated R script file."""
         # Arrange
@@ -325,7 +671,7 @@ class TestGenerateRScript:
 
         try:
             # Act
-            build.generate_r_script(sample_palettes, tmp_path)
+            build.generate_r_script(compiled_palettes, tmp_path)
 
             # Assert
             with open(tmp_path, "r", encoding="utf-8") as f:
@@ -392,6 +738,636 @@ class TestGenerateRScript:
                 os.remove(tmp_path)
 
 
+class TestStyleSheets:
+    """Tests for the CSS and SASS emitters."""
+
+    @pytest.fixture
+    def palettes(self) -> List[CompiledPalette]:
+        """Palettes with keys needing escapes, and one without colors."""
+        return compile_palettes(
+            PaletteCatalog.from_dicts(
+                [
+                    {
+                        "name": "AIU Grades",
+                        "description": "Grades */ A+ to F",
+                        "colors": [
+                            {"key": "A+", "value": "#24693d"},
+                            {"key": "Student's \\ Choice", "value": "#519c51"},
+                        ],
+                    },
+                    {"name": "Empty", "type": "sequential"},
+                ]
+            )
+        )
+
+    def test_iter_css_properties(self, palettes):
+        """Test that each palette is a :root rule of escaped custom properties."""
+        # Act
+        chunks = list(build.iter_css_properties(palettes))
+
+        # Assert
+        assert chunks == [
+            build.CSS_HEADER,
+            "\n"
+            "/* AIU Grades (categorical): Grades * / A+ to F */\n"
+            ":root {\n"
+            "  --aiu-grades-a\\+: #24693d;\n"
+            "  --aiu-grades-student\\'s-\\\\-choice: #519c51;\n"
+            "}\n",
+            "\n/* Empty (sequential) */\n:root {\n}\n",
+            build.CSS_FOOTER,
+        ]
+
+    def test_iter_sass_maps(self, palettes):
+        """Test that each palette is a map of its quoted keys to its colors."""
+        # Act
+        chunks = list(build.iter_sass_maps(palettes))
+
+        # Assert
+        assert chunks == [
+            build.SASS_HEADER,
+            "\n"
+            "// Type: Categorical\n"
+            "// Description: Grades */ A+ to F\n"
+            "$color-values-aiu-grades: (\n"
+            "  'A+': #24693d,\n"
+            '  "Student\'s \\\\ Choice": #519c51,\n'
+            ");\n",
+            "\n// Type: Sequential\n$color-values-empty: ();\n",
+            build.SASS_FOOTER,
+        ]
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("A+", "'A+'"),
+            ("Student's", '"Student\'s"'),
+            ("'Quoted' \"twice\"", "'\\'Quoted\\' \"twice\"'"),
+        ],
+    )
+    def test_quote_sass_string(self, value, expected):
+        """Test that strings are single-quoted unless that needs more escapes."""
+        assert build.quote_sass_string(value) == expected
+
+
+class TestIterJson:
+    """Tests for iter_json() function."""
+
+    def test_iter_json(self, compiled_palettes):  # pylint: disable=redefined-outer-name
+        """Test that the palettes are one JSON document in a single chunk."""
+        # Act
+        chunks = list(build.iter_json(compiled_palettes))
+
+        # Assert
+        assert len(chunks) == 1
+        assert chunks[0].endswith("}\n")
+        data = json.loads(chunks[0])
+        assert [palette["variable_name"] for palette in data["palettes"]] == [
+            "test_palette",
+            "sequential_test",
+            "empty_description_palette",
+        ]
+        assert data["palettes"][0] == {
+            "name": "Test Palette",
+            "variable_name": "test_palette",
+            "type": "categorical",
+            "description": "A test palette",
+            "colors": [
+                {"key": "Color One", "value": "#ff0000"},
+                {"key": "Color Two", "value": "#00ff00"},
+            ],
+        }
+
+    def test_iter_json_keeps_unicode(self):
+        """Test that non-ASCII text is written as is rather than escaped."""
+        # Arrange
+        palettes = compile_palettes(PaletteCatalog.from_dicts([{"name": "学部"}]))
+
+        # Act
+        content = "".join(build.iter_json(palettes))
+
+        # Assert
+        assert '"name": "学部"' in content
+
+
+class TestPythonModule:
+    """Tests for the Python module emitter."""
+
+    @pytest.fixture
+    def palettes(self) -> List[CompiledPalette]:
+        """Palettes with quotes in their text, one color, and no colors."""
+        return compile_palettes(
+            PaletteCatalog.from_dicts(
+                [
+                    {
+                        "name": "AIU Grades",
+                        "description": "Grades \"A+\" to 'F'",
+                        "colors": [
+                            {"key": "A+", "value": "#24693D"},
+                            {"key": "Student's \\ Choice", "value": "#519c51"},
+                        ],
+                    },
+                    {
+                        "name": "学部",
+                        "type": "sequential",
+                        "colors": [{"key": "教養", "value": "#ffffff"}],
+                    },
+                    {"name": "Empty", "type": "diverging"},
+                ]
+            )
+        )
+
+    def test_iter_python_module(self, palettes, tmp_path):
+        """Test that the module defines the palettes as frozen mappings and tuples."""
+        # Arrange
+        path = tmp_path / "ir_color_palettes.py"
+
+        # Act
+        chunks = list(build.iter_python_module(palettes))
+        path.write_text("".join(chunks), encoding="utf-8")
+        spec = importlib.util.spec_from_file_location("ir_color_palettes", path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        # Assert
+        assert len(chunks) == len(palettes) + 2
+        assert module.__version__ == __version__
+        assert list(module.PALETTES) == ["AIU Grades", "学部", "Empty"]
+        assert dict(module.PALETTES["AIU Grades"]) == {
+            "name": "AIU Grades",
+            "variable_name": "aiu_grades",
+            "type": "categorical",
+            "description": "Grades \"A+\" to 'F'",
+            "keys": ("A+", "Student's \\ Choice"),
+            "hex_values": ("#24693d", "#519c51"),
+            "rgb_values": ((36, 105, 61), (81, 156, 81)),
+        }
+        assert module.PALETTES["学部"]["keys"] == ("教養",)
+        assert module.PALETTES["学部"]["rgb_values"] == ((255, 255, 255),)
+        assert module.PALETTES["Empty"]["rgb_values"] == ()
+        with pytest.raises(TypeError):
+            module.PALETTES["Empty"]["name"] = "Changed"
+
+    def test_render_python_palette(self, palettes):
+        """Test that an entry has one field per line and ends with a comma."""
+        # Act
+        entry = build.render_python_palette(palettes[1])
+
+        # Assert
+        assert entry == (
+            '    "学部": MappingProxyType({\n'
+            '        "name": "学部",\n'
+            '        "variable_name": "学部",\n'
+            '        "type": "sequential",\n'
+            '        "description": "",\n'
+            '        "keys": ("教養",),\n'
+            '        "hex_values": ("#ffffff",),\n'
+            '        "rgb_values": ((255, 255, 255),),\n'
+            "    }),\n"
+        )
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("A+", '"A+"'),
+            ("Student's", '"Student\'s"'),
+            ('"A+"', "'\"A+\"'"),
+            ("'A' \"B\"", "'\\'A\\' \"B\"'"),
+            ("a\\b\n", '"a\\\\b\\n"'),
+        ],
+    )
+    def test_quote_python_string(self, value, expected):
+        """Test that strings are double-quoted unless they contain double quotes."""
+        assert build.quote_python_string(value) == expected
+
+
+class TestEmitterRegistry:
+    """Tests for the registry of emitter targets."""
+
+    def test_default_targets(self):
+        """Test that the built-in outputs are registered in order."""
+        assert {
+            name: target.emit for name, target in build.EMITTER_TARGETS.items()
+        } == {
+            "tableau": build.iter_tableau_preferences,
+            "r_script": build.iter_r_script,
+            "css": build.iter_css_properties,
+            "sass": build.iter_sass_maps,
+            "json": build.iter_json,
+            "python": build.iter_python_module,
+        }
+
+    @pytest.mark.parametrize(
+        "name", ["tableau", "r_script", "css", "sass", "json", "python"]
+    )
+    def test_committed_output_matches_build(self, name):
+        """Test that the emitters reproduce the committed, formatted outputs."""
+        # Arrange
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        palettes = compile_palettes(
+            build.load_palettes(os.path.join(repo_root, "palettes.yml"))
+        )
+        target = build.EMITTER_TARGETS[name]
+
+        # Act
+        content = "".join(target.emit(palettes))
+
+        # Assert
+        with open(
+            build.get_output_path(repo_root, target), "r", encoding="utf-8", newline=""
+        ) as f:
+            assert content == f.read()
+
+    @pytest.mark.parametrize(
+        "generate, suffix",
+        [
+            (build.generate_tableau_preferences, ".tps"),
+            (build.generate_r_script, ".R"),
+        ],
+    )
+    def test_generate_accepts_loaded_palettes(
+        self, generate, suffix, sample_palettes, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the path wrappers compile palettes of the model themselves."""
+        # Arrange
+        loaded_path = tmp_path / f"loaded{suffix}"
+        compiled_path = tmp_path / f"compiled{suffix}"
+
+        # Act
+        generate(sample_palettes, str(loaded_path))
+        generate(compiled_palettes, str(compiled_path))
+
+        # Assert
+        assert loaded_path.read_bytes() == compiled_path.read_bytes()
+
+    @pytest.mark.parametrize("name", list(build.EMITTER_TARGETS))
+    def test_emitters_accept_loaded_palettes(
+        self, name, sample_palettes, compiled_palettes
+    ):  # pylint: disable=redefined-outer-name
+        """Test that every emitter renders palettes of the model like compiled ones."""
+        # Arrange
+        emit = build.EMITTER_TARGETS[name].emit
+
+        # Act & Assert
+        assert list(emit(sample_palettes)) == list(emit(compiled_palettes))
+
+    def test_moved_helpers_are_reexported(self):
+        """Test that the helpers moved to the compiler are still part of build."""
+        assert build.sanitize_variable_name("AIU Grades") == "aiu_grades"
+        assert build.get_tableau_type("diverging") == "ordered-diverging"
+        assert build.format_r_type("sequential") == "Sequential"
+
+    def test_register_emitter(self, mocker):
+        """Test that a new target is added to the registry."""
+        # Arrange
+        mocker.patch.dict(build.EMITTER_TARGETS)
+
+        # Act
+        target = build.register_emitter(
+            "text", "text/palettes.txt", build.iter_r_script, "Text file"
+        )
+
+        # Assert
+        assert build.EMITTER_TARGETS["text"] is target
+        assert build.get_output_path("/repo", target) == os.path.join(
+            "/repo", "text", "palettes.txt"
+        )
+
+    def test_register_emitter_duplicate(self):
+        """Test that registering an existing name raises ValueError."""
+        with pytest.raises(ValueError, match="already registered: tableau"):
+            build.register_emitter(
+                "tableau", "other.tps", build.iter_tableau_preferences, "Other"
+            )
+
+
+class TestRunEmitters:
+    """Tests for write_target() and run_emitters() functions."""
+
+    def test_run_emitters_generates_all_outputs(
+        self, mocker, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that every target's output file is generated."""
+        # Arrange
+        mocker.patch("builtins.print")
+        targets = list(build.EMITTER_TARGETS.values())
+        output_paths = {target.name: str(tmp_path / target.name) for target in targets}
+
+        # Act
+        errors = build.run_emitters(compiled_palettes, targets, output_paths)
+
+        # Assert
+        assert not errors
+        assert (tmp_path / "tableau").read_text(encoding="utf-8") == "".join(
+            build.iter_tableau_preferences(compiled_palettes)
+        )
+        assert (tmp_path / "r_script").read_text(encoding="utf-8") == "".join(
+            build.iter_r_script(compiled_palettes)
+        )
+
+    def test_run_emitters_collects_errors(
+        self, mocker, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a failing target doesn't stop or corrupt the others."""
+
+        # Arrange
+        def failing_emit(_palettes):
+            yield "partial content"
+            raise ValueError("broken emitter")
+
+        mock_print = mocker.patch("builtins.print")
+        failing = build.EmitterTarget("broken", "broken.txt", failing_emit, "Broken")
+        targets = [failing, build.EMITTER_TARGETS["r_script"]]
+        output_paths = {"broken": str(tmp_path / "broken.txt")}
+        output_paths["r_script"] = str(tmp_path / "palettes.R")
+
+        # Act
+        errors = build.run_emitters(compiled_palettes, targets, output_paths)
+
+        # Assert
+        assert list(errors) == ["broken"]
+        assert str(errors["broken"]) == "broken emitter"
+        assert not (tmp_path / "broken.txt").exists()
+        assert not (tmp_path / "broken.txt.tmp").exists()
+        assert (tmp_path / "palettes.R").exists()
+        mock_print.assert_any_call("Failed to generate Broken: broken emitter")
+        mock_print.assert_any_call("R script file generated.")
+
+    def test_run_emitters_profiles_each_emitter(
+        self, mocker, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that each emitter is a profiled phase nested in the running one."""
+        # Arrange
+        mocker.patch("builtins.print")
+        targets = list(build.EMITTER_TARGETS.values())
+        output_paths = {target.name: str(tmp_path / target.name) for target in targets}
+
+        # Act
+        with Profiler(trace_memory=False) as active, phase("emit"):
+            build.run_emitters(compiled_palettes, targets, output_paths)
+
+        # Assert
+        records = {record.name: record for record in active.records}
+        sizes = {name: os.path.getsize(path) for name, path in output_paths.items()}
+        for name, size in sizes.items():
+            assert (records[name].category, records[name].depth) == ("emitter", 1)
+            assert records[name].bytes_written == size
+        assert records["emit"].bytes_written == sum(sizes.values())
+
+    def test_run_emitters_without_targets(
+        self, compiled_palettes
+    ):  # pylint: disable=redefined-outer-name
+        """Test that running no targets does nothing."""
+        assert not build.run_emitters(compiled_palettes, [], {})
+
+
+class TestPatchOutputs:
+    """Tests for patching output files per palette with write_target()."""
+
+    @staticmethod
+    def edit(palettes: List[CompiledPalette], index: int, description: str) -> Any:
+        """Copy the palettes with a new description for one of them."""
+        edited = list(palettes)
+        # A new digest, as compiling the edited palette would compute
+        edited[index] = edited[index]._replace(
+            description=description, digest=f"edited {index}"
+        )
+        return edited
+
+    @pytest.mark.parametrize("name", ["tableau", "r_script", "css", "sass"])
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda palettes: TestPatchOutputs.edit(palettes, 1, "Edited"),
+            lambda palettes: [*palettes, palettes[0]],
+            lambda palettes: [palettes[2], palettes[0]],
+            lambda palettes: list(palettes)[::-1],
+            lambda palettes: [],
+        ],
+        ids=["edit", "insert", "delete", "reorder", "clear"],
+    )
+    def test_patched_output_matches_full_build(
+        self, mocker, compiled_palettes, tmp_path, name, change
+    ):  # pylint: disable=redefined-outer-name,too-many-arguments,too-many-positional-arguments
+        """Test that a patched output is byte-identical to a full build."""
+        # Arrange
+        target = build.EMITTER_TARGETS[name]
+        path = str(tmp_path / "output")
+        previous = build.write_target(target, compiled_palettes, path)
+        changed = change(compiled_palettes)
+        emit = mocker.Mock(wraps=target.emit)
+        target = target._replace(emit=emit)
+
+        # Act
+        layout = build.write_target(target, changed, path, previous)
+
+        # Assert
+        with open(path, "rb") as file:
+            assert file.read() == "".join(target.emit(changed)).encode("utf-8")
+        assert layout == build.write_target(target, changed, str(tmp_path / "full"))
+        unchanged = {palette.digest for palette in compiled_palettes}
+        assert not any(
+            palette.digest in unchanged for palette in emit.call_args_list[0].args[0]
+        )
+
+    def test_only_changed_palettes_are_rendered(
+        self, mocker, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the unchanged palettes are copied from the previous file."""
+        # Arrange
+        target = build.EMITTER_TARGETS["tableau"]
+        path = str(tmp_path / "Preferences.tps")
+        previous = build.write_target(target, compiled_palettes, path)
+        changed = self.edit(compiled_palettes, 0, "Edited")
+        emit = mocker.Mock(wraps=target.emit)
+        target = target._replace(emit=emit)
+
+        # Act
+        build.write_target(target, changed, path, previous)
+
+        # Assert
+        emit.assert_called_once()
+        assert [palette.name for palette in emit.call_args.args[0]] == ["Test Palette"]
+
+    @pytest.mark.parametrize(
+        "edit_output, edit_layout",
+        [
+            (os.remove, lambda layout: None),
+            (
+                lambda path: Path(path).write_text("# edited\n", "utf-8"),
+                lambda layout: None,
+            ),
+            (lambda path: None, lambda layout: layout.update(header=0)),
+        ],
+        ids=["missing", "edited", "inconsistent"],
+    )
+    def test_invalid_previous_output_is_rendered_fully(
+        self, mocker, compiled_palettes, tmp_path, edit_output, edit_layout
+    ):  # pylint: disable=redefined-outer-name,too-many-arguments,too-many-positional-arguments
+        """Test that an output not matching its layout is rendered fully."""
+        # Arrange
+        target = build.EMITTER_TARGETS["r_script"]
+        path = str(tmp_path / "palettes.R")
+        previous = build.write_target(target, compiled_palettes, path)
+        edit_output(path)
+        edit_layout(previous)
+        emit = mocker.Mock(wraps=target.emit)
+        target = target._replace(emit=emit)
+
+        # Act
+        build.write_target(target, compiled_palettes, path, previous)
+
+        # Assert
+        assert len(list(emit.call_args.args[0])) == len(compiled_palettes)
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == "".join(target.emit(compiled_palettes))
+
+    def test_unchunked_emitter_is_not_patched(
+        self, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a target not yielding a chunk per palette has no layout."""
+        # Arrange
+        target = build.EmitterTarget(
+            "single", "single.txt", lambda palettes: [f"{len(palettes)}\n"], "Single"
+        )
+        path = str(tmp_path / "single.txt")
+
+        # Act
+        layout = build.write_target(target, compiled_palettes, path)
+
+        # Assert
+        assert layout is None
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == "3\n"
+
+    def test_unchunked_emitter_ignores_previous_layout(
+        self, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that an unchunked target renders every palette despite a layout."""
+        # Arrange
+        path = str(tmp_path / "output.txt")
+        previous = build.write_target(
+            build.EMITTER_TARGETS["r_script"], compiled_palettes, path
+        )
+        target = build.EmitterTarget(
+            "single", "single.txt", lambda palettes: [f"{len(palettes)}\n"], "Single"
+        )
+
+        # Act
+        layout = build.write_target(target, compiled_palettes, path, previous)
+
+        # Assert
+        assert layout is None
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == "3\n"
+
+    @pytest.mark.parametrize(
+        "emit, content",
+        [(lambda palettes: [], ""), (lambda palettes: ["header\n"], "header\n")],
+        ids=["no chunks", "header only"],
+    )
+    def test_emitter_running_out_of_chunks_is_rendered_fully(
+        self, compiled_palettes, tmp_path, emit, content
+    ):  # pylint: disable=redefined-outer-name,too-many-arguments,too-many-positional-arguments
+        """Test that a target yielding too few chunks to patch is rendered fully."""
+        # Arrange
+        path = str(tmp_path / "output.txt")
+        previous = build.write_target(
+            build.EMITTER_TARGETS["r_script"], compiled_palettes, path
+        )
+        target = build.EmitterTarget("short", "short.txt", emit, "Short")
+
+        # Act
+        layout = build.write_target(
+            target, self.edit(compiled_palettes, 1, "Edited"), path, previous
+        )
+
+        # Assert
+        assert layout is None
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == content
+
+    def test_patching_streams_the_output(self, tmp_path):
+        """Test that patching holds a chunk at a time rather than the whole file."""
+        # Arrange
+        palettes = compile_palettes(
+            PaletteCatalog.from_dicts(benchmark.iter_palettes(600))
+        )
+        target = build.EMITTER_TARGETS["r_script"]
+        path = str(tmp_path / "palettes.R")
+        previous = build.write_target(target, palettes, path)
+        changed = self.edit(palettes, 100, "Edited")
+
+        # Act
+        tracemalloc.start()
+        try:
+            build.write_target(target, changed, path, previous)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        # Assert
+        assert peak < os.path.getsize(path) / 4
+
+    def test_failed_write_leaves_no_temporary_file(
+        self, mocker, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the temporary file is removed if it can't replace the output."""
+        # Arrange
+        mocker.patch("os.replace", side_effect=OSError("read-only"))
+        path = tmp_path / "palettes.R"
+
+        # Act & Assert
+        with pytest.raises(OSError, match="read-only"):
+            build.write_target(
+                build.EMITTER_TARGETS["r_script"], compiled_palettes, str(path)
+            )
+        assert not list(tmp_path.iterdir())
+
+    def test_run_emitters_updates_layouts(
+        self, mocker, compiled_palettes, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that run_emitters() patches with and records the layouts."""
+        # Arrange
+        mocker.patch("builtins.print")
+        targets = [
+            *build.EMITTER_TARGETS.values(),
+            build.EmitterTarget("count", "count.txt", lambda p: [str(len(p))], "Count"),
+        ]
+        output_paths = {target.name: str(tmp_path / target.name) for target in targets}
+        layouts: Dict[str, Any] = {"removed": {}}
+        build.run_emitters(compiled_palettes, targets, output_paths, layouts=layouts)
+        previous = dict(layouts)
+        write_target = mocker.spy(build, "write_target")
+
+        # Act
+        build.run_emitters(compiled_palettes, targets, output_paths, layouts=layouts)
+
+        # Assert
+        assert set(layouts) == {
+            "removed",
+            "tableau",
+            "r_script",
+            "css",
+            "sass",
+            "python",
+        }
+        assert layouts == previous
+        assert {
+            call.args[0].name: call.args[3] is not None
+            for call in write_target.call_args_list
+        } == {
+            "tableau": True,
+            "r_script": True,
+            "css": True,
+            "sass": True,
+            "json": False,
+            "python": True,
+            "count": False,
+        }
+
+
 class TestMain:
     """Tests for main() function."""
 
@@ -401,46 +1377,72 @@ class TestMain:
         """Test successful execution of main function."""
         # Arrange
         mock_load_palettes = mocker.patch(
-            "scripts.build.load_palettes", return_value=sample_yaml_data["palettes"]
-        )
-        mock_generate_tableau = mocker.patch(
-            "scripts.build.generate_tableau_preferences"
+            "scripts.build.load_palette_files",
+            return_value=PaletteCatalog.from_dicts(sample_yaml_data["palettes"]),
         )
-        mock_generate_r = mocker.patch("scripts.build.generate_r_script")
+        mocker.patch("scripts.cvd.check_palettes", return_value=[])
+        mock_run_emitters = mocker.patch("scripts.build.run_emitters", return_value={})
         mock_subprocess = mocker.patch("subprocess.run")
         mock_makedirs = mocker.patch("os.makedirs")
         mock_print = mocker.patch("builtins.print")
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value=None)
+        mocker.patch("scripts.build.create_manifest", return_value={})
+        mock_save_json = mocker.patch("scripts.build.save_json")
 
         # Mock os.path functions
         mocker.patch("os.path.dirname", return_value="/fake/path")
         mocker.patch("os.path.abspath", return_value="/fake/path/scripts/build.py")
 
         # Act
-        build.main()
+        build.main([])
 
         # Assert
         mock_load_palettes.assert_called_once()
-        mock_generate_tableau.assert_called_once()
-        mock_generate_r.assert_called_once()
-        mock_subprocess.assert_has_calls(
-            [mocker.call(["poetry", "run", "formatter"], check=True)], any_order=False
+        mock_save_json.assert_called_once_with(
+            "/fake/path/.build_cache/manifest.json", {}
         )
-        assert (  # For both tableau and r_script directories
-            mock_makedirs.call_count == 2
+        mock_run_emitters.assert_called_once_with(
+            compile_palettes(mock_load_palettes.return_value),
+            list(build.EMITTER_TARGETS.values()),
+            {
+                "tableau": "/fake/path/tableau/Preferences.tps",
+                "r_script": "/fake/path/r_script/ir_color_palettes.R",
+                "css": "/fake/path/css/ir_color_palettes.css",
+                "sass": "/fake/path/sass/_ir_color_palettes.scss",
+                "json": "/fake/path/json/ir_color_palettes.json",
+                "python": "/fake/path/python/ir_color_palettes.py",
+            },
+            layouts={},
         )
+        # The outputs are written already formatted, without running the formatter
+        mock_subprocess.assert_not_called()
+        # For the directory of each output
+        assert mock_makedirs.call_count == len(build.EMITTER_TARGETS)
 
         # Verify print statements
         expected_prints = [
-            mocker.call("Loading palettes from /fake/path/palettes.yml..."),
+            mocker.call("Loading palettes from 1 file(s)..."),
             mocker.call("Loaded 1 palette(s)."),
             mocker.call(
                 "Generating Tableau Preferences file at /fake/path/tableau/Preferences.tps..."
             ),
-            mocker.call("Tableau Preferences file generated."),
             mocker.call(
                 "Generating R script file at /fake/path/r_script/ir_color_palettes.R..."
             ),
-            mocker.call("R script file generated."),
+            mocker.call(
+                "Generating CSS custom properties file at "
+                "/fake/path/css/ir_color_palettes.css..."
+            ),
+            mocker.call(
+                "Generating SASS maps file at /fake/path/sass/_ir_color_palettes.scss..."
+            ),
+            mocker.call(
+                "Generating JSON file at /fake/path/json/ir_color_palettes.json..."
+            ),
+            mocker.call(
+                "Generating Python module at /fake/path/python/ir_color_palettes.py..."
+            ),
             mocker.call("All files generated successfully."),
         ]
         mock_print.assert_has_calls(expected_prints, any_order=False)
@@ -451,23 +1453,27 @@ class TestMain:
         """Test that main function creates necessary directories."""
         # Arrange
         mocker.patch(
-            "scripts.build.load_palettes", return_value=sample_yaml_data["palettes"]
+            "scripts.build.load_palette_files",
+            return_value=PaletteCatalog.from_dicts(sample_yaml_data["palettes"]),
         )
-        mocker.patch("scripts.build.generate_tableau_preferences")
-        mocker.patch("scripts.build.generate_r_script")
-        mocker.patch("subprocess.run")
+        mocker.patch("scripts.cvd.check_palettes", return_value=[])
+        mocker.patch("scripts.build.run_emitters", return_value={})
         mock_makedirs = mocker.patch("os.makedirs")
         mocker.patch("builtins.print")
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value=None)
+        mocker.patch("scripts.build.create_manifest", return_value={})
+        mocker.patch("scripts.build.save_json")
 
         # Mock os.path functions
         mocker.patch("os.path.dirname", return_value="/fake/path")
         mocker.patch("os.path.abspath", return_value="/fake/path/scripts/build.py")
 
         # Act
-        build.main()
+        build.main([])
 
         # Assert
-        assert mock_makedirs.call_count == 2
+        assert mock_makedirs.call_count == len(build.EMITTER_TARGETS)
         # Check that makedirs was called with exist_ok=True
         for call in mock_makedirs.call_args_list:
             assert call[1]["exist_ok"] is True
@@ -476,13 +1482,514 @@ class TestMain:
         """Test that main function properly propagates load_palettes errors."""
         # Arrange
         mocker.patch(
-            "scripts.build.load_palettes",
+            "scripts.build.load_palette_files",
             side_effect=FileNotFoundError("File not found"),
         )
         mocker.patch("os.path.dirname", return_value="/fake/path")
         mocker.patch("os.path.abspath", return_value="/fake/path/scripts/build.py")
         mocker.patch("builtins.print")
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value=None)
 
         # Act & Assert
         with pytest.raises(FileNotFoundError):
-            build.main()
+            build.main([])
+
+    def test_main_reports_failed_emitters(
+        self, mocker, sample_yaml_data
+    ):  # pylint: disable=redefined-outer-name
+        """Test that main function fails after all emitters ran if any failed."""
+        # Arrange
+        mocker.patch(
+            "scripts.build.load_palette_files",
+            return_value=PaletteCatalog.from_dicts(sample_yaml_data["palettes"]),
+        )
+        mocker.patch("scripts.cvd.check_palettes", return_value=[])
+        mocker.patch(
+            "scripts.build.run_emitters",
+            return_value={"tableau": OSError("disk full"), "r_script": OSError("x")},
+        )
+        mock_subprocess = mocker.patch("subprocess.run")
+        mocker.patch("os.makedirs")
+        mocker.patch("builtins.print")
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value=None)
+        mock_save_json = mocker.patch("scripts.build.save_json")
+
+        # Act & Assert
+        with pytest.raises(
+            RuntimeError,
+            match="Failed to generate 2 output file\\(s\\): r_script, tableau",
+        ):
+            build.main([])
+        mock_subprocess.assert_not_called()
+        mock_save_json.assert_not_called()
+
+    def test_main_skips_up_to_date_build(self, mocker):
+        """Test that main function skips the build when nothing changed."""
+        # Arrange
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value={"outputs": {}})
+        mocker.patch("scripts.build.is_up_to_date", return_value=True)
+        mock_load_palettes = mocker.patch("scripts.build.load_palette_files")
+        mock_subprocess = mocker.patch("subprocess.run")
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        build.main([])
+
+        # Assert
+        mock_load_palettes.assert_not_called()
+        mock_subprocess.assert_not_called()
+        mock_print.assert_called_once_with("All files are up to date.")
+
+    def test_main_force_rebuilds(
+        self, mocker, sample_yaml_data
+    ):  # pylint: disable=redefined-outer-name
+        """Test that --force rebuilds even when the outputs are up to date."""
+        # Arrange
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value={"outputs": {}})
+        mock_is_up_to_date = mocker.patch(
+            "scripts.build.is_up_to_date", return_value=True
+        )
+        mock_load_palettes = mocker.patch(
+            "scripts.build.load_palette_files",
+            return_value=PaletteCatalog.from_dicts(sample_yaml_data["palettes"]),
+        )
+        mocker.patch("scripts.cvd.check_palettes", return_value=[])
+        mocker.patch("scripts.build.run_emitters", return_value={})
+        mocker.patch("scripts.build.create_manifest", return_value={})
+        mocker.patch("scripts.build.save_json")
+        mocker.patch("os.makedirs")
+        mocker.patch("builtins.print")
+
+        # Act
+        build.main(["--force"])
+
+        # Assert
+        mock_is_up_to_date.assert_not_called()
+        mock_load_palettes.assert_called_once()
+
+    def test_main_profile(
+        self, mocker, sample_yaml_data, tmp_path
+    ):  # pylint: disable=redefined-outer-name
+        """Test that --profile writes a trace of the build phases and a summary."""
+        # Arrange
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value=None)
+        mocker.patch(
+            "scripts.build.load_palette_files",
+            return_value=PaletteCatalog.from_dicts(sample_yaml_data["palettes"]),
+        )
+        mocker.patch("scripts.cvd.check_palettes", return_value=[])
+        mocker.patch("scripts.build.run_emitters", return_value={})
+        mocker.patch("scripts.build.create_manifest", return_value={})
+        mocker.patch("scripts.build.save_json")
+        mocker.patch("scripts.build.record_file")
+        mocker.patch("os.makedirs")
+        mock_print = mocker.patch("builtins.print")
+        trace_path = tmp_path / "profile.json"
+
+        # Act
+        build.main(["--profile", str(trace_path)])
+
+        # Assert
+        with open(trace_path, encoding="utf-8") as file:
+            events = json.load(file)["traceEvents"]
+        assert [event["name"] for event in events if event["ph"] == "X"] == [
+            "build",
+            "check manifest",
+            "load palettes",
+            "check colors",
+            "create directories",
+            "compile palettes",
+            "emit",
+            "save manifest",
+        ]
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert printed[-1] == f"Wrote the profile trace to {trace_path}."
+        assert printed[-2].splitlines()[0].startswith("Phase ")
+
+    def test_main_profile_default_path(self, mocker):
+        """Test that the trace is written to the cache directory by default."""
+        # Arrange
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value={"outputs": {}})
+        mocker.patch("scripts.build.is_up_to_date", return_value=True)
+        mock_write_trace = mocker.patch("scripts.profiler.Profiler.write_trace")
+        mocker.patch("builtins.print")
+
+        # Act
+        build.main(["--profile"])
+
+        # Assert
+        trace_path = mock_write_trace.call_args.args[0]
+        assert trace_path.endswith(os.path.join(".build_cache", "profile.json"))
+
+    def test_main_warns_about_indistinguishable_colors(
+        self, mocker, sample_yaml_data
+    ):  # pylint: disable=redefined-outer-name
+        """Test that color vision deficiency warnings are printed, not raised."""
+        # Arrange
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value=None)
+        palettes = PaletteCatalog.from_dicts(sample_yaml_data["palettes"])
+        mocker.patch("scripts.build.load_palette_files", return_value=palettes)
+        mock_check_palettes = mocker.patch(
+            "scripts.cvd.check_palettes", return_value=["'Test' colors are close"]
+        )
+        mocker.patch("scripts.build.run_emitters", return_value={})
+        mocker.patch("scripts.build.create_manifest", return_value={})
+        mocker.patch("scripts.build.save_json")
+        mocker.patch("os.makedirs")
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        build.main(["--cvd-min-distance", "0.05"])
+
+        # Assert
+        mock_check_palettes.assert_called_once_with(palettes, 0.05)
+        mock_print.assert_any_call("Warning: 'Test' colors are close")
+
+
+class TestBuildManifest:
+    """Tests for the build manifest functions."""
+
+    @pytest.fixture
+    def build_files(self, tmp_path) -> Dict[str, str]:
+        """Create a palettes.yml, a scripts directory and two outputs."""
+        yaml_path = tmp_path / "palettes.yml"
+        yaml_path.write_text("palettes: []\n", encoding="utf-8")
+        script_dir = tmp_path / "scripts"
+        script_dir.mkdir()
+        (script_dir / "build.py").write_text("# generator\n", encoding="utf-8")
+        tableau_path = tmp_path / "Preferences.tps"
+        tableau_path.write_text("<workbook />\n", encoding="utf-8")
+        r_script_path = tmp_path / "palettes.R"
+        r_script_path.write_text("# R\n", encoding="utf-8")
+        return {
+            "yaml": str(yaml_path),
+            "scripts": str(script_dir),
+            "tableau": str(tableau_path),
+            "r_script": str(r_script_path),
+        }
+
+    def test_get_generator_version_changes_with_sources(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that editing a script changes the generator version."""
+        # Arrange
+        before = build.get_generator_version(build_files["scripts"])
+
+        # Act
+        with open(
+            os.path.join(build_files["scripts"], "build.py"), "a", encoding="utf-8"
+        ) as f:
+            f.write("# edited\n")
+        after = build.get_generator_version(build_files["scripts"])
+
+        # Assert
+        assert before.startswith(f"{build.__version__}+")
+        assert before != after
+
+    def test_is_up_to_date_after_build(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a freshly recorded manifest is up to date."""
+        # Arrange
+        outputs = {
+            "tableau": build_files["tableau"],
+            "r_script": build_files["r_script"],
+        }
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+        manifest = build.create_manifest(state, outputs)
+
+        # Act & Assert
+        assert build.is_up_to_date(manifest, state, outputs) is True
+
+    def test_is_up_to_date_without_manifest(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a missing manifest is never up to date."""
+        # Arrange
+        outputs = {"tableau": build_files["tableau"]}
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+
+        # Act & Assert
+        assert build.is_up_to_date(None, state, outputs) is False
+
+    def test_is_up_to_date_input_changed(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that editing palettes.yml invalidates the manifest."""
+        # Arrange
+        outputs = {"tableau": build_files["tableau"]}
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+        manifest = build.create_manifest(state, outputs)
+        with open(build_files["yaml"], "a", encoding="utf-8") as f:
+            f.write("# edited\n")
+
+        # Act
+        new_state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+
+        # Assert
+        assert build.is_up_to_date(manifest, new_state, outputs) is False
+
+    def test_is_up_to_date_output_changed(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that an edited output invalidates the manifest."""
+        # Arrange
+        outputs = {"tableau": build_files["tableau"]}
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+        manifest = build.create_manifest(state, outputs)
+        with open(build_files["tableau"], "a", encoding="utf-8") as f:
+            f.write("<!-- edited -->\n")
+
+        # Act & Assert
+        assert build.is_up_to_date(manifest, state, outputs) is False
+
+    def test_is_up_to_date_output_missing(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a deleted output invalidates the manifest."""
+        # Arrange
+        outputs = {"tableau": build_files["tableau"]}
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+        manifest = build.create_manifest(state, outputs)
+        os.remove(build_files["tableau"])
+
+        # Act & Assert
+        assert build.is_up_to_date(manifest, state, outputs) is False
+
+    def test_is_up_to_date_outputs_differ(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a change in the set of outputs invalidates the manifest."""
+        # Arrange
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+        manifest = build.create_manifest(state, {"tableau": build_files["tableau"]})
+        outputs = {
+            "tableau": build_files["tableau"],
+            "r_script": build_files["r_script"],
+        }
+
+        # Act & Assert
+        assert build.is_up_to_date(manifest, state, outputs) is False
+
+    def test_get_previous_layouts(
+        self, build_files
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the layouts are reused by the same generator only."""
+        # Arrange
+        state = build.get_build_state([build_files["yaml"]], build_files["scripts"])
+        layouts = {"tableau": {"digest": "abc", "header": 1, "palettes": []}}
+        manifest = build.create_manifest(
+            state, {"tableau": build_files["tableau"]}, layouts
+        )
+
+        # Act
+        previous = build.get_previous_layouts(manifest, state)
+
+        # Assert
+        assert previous == layouts
+        assert previous is not manifest["chunks"]
+        assert not build.get_previous_layouts(None, state)
+        assert not build.get_previous_layouts(
+            dict(manifest, generator="0.0.0+other"), state
+        )
+        assert not build.get_previous_layouts(dict(manifest, version=1), state)
+
+
+class TestWatchBuild:
+    """Tests for the watch mode of the build."""
+
+    @pytest.fixture
+    def builder(self, mocker, tmp_path) -> build.WatchBuilder:
+        """Watch builder of a palettes.yml whose outputs are up to date."""
+        yaml_path = tmp_path / "palettes.yml"
+        yaml_path.write_text(
+            "palettes:\n"
+            "  - name: 'Watched'\n"
+            "    type: 'categorical'\n"
+            "    colors:\n"
+            "      - key: 'One'\n"
+            "        value: '#112233'\n",
+            encoding="utf-8",
+        )
+        mocker.patch("scripts.cvd.check_palettes", return_value=[])
+        mocker.patch("builtins.print")
+        watch_builder = build.WatchBuilder(
+            str(tmp_path),
+            str(tmp_path / ".build_cache" / "manifest.json"),
+            {"version": build.MANIFEST_VERSION, "generator": "test"},
+            {"r_script": str(tmp_path / "r_script" / "palettes.R")},
+        )
+        watch_builder.content_digest = build.get_content_digest(
+            build.load_palettes(str(yaml_path))
+        )
+        return watch_builder
+
+    @staticmethod
+    def edit(watch_builder: build.WatchBuilder, old: str, new: str) -> None:
+        """Replace text in the watched palettes.yml."""
+        yaml_path = os.path.join(watch_builder.repo_root, "palettes.yml")
+        with open(yaml_path, "r+", encoding="utf-8") as file:
+            text = file.read().replace(old, new)
+            file.seek(0)
+            file.write(text)
+            file.truncate()
+
+    def test_rebuild_on_content_change(
+        self, builder
+    ):  # pylint: disable=redefined-outer-name
+        """Test that changed palettes are written along with the manifest."""
+        # Arrange
+        self.edit(builder, "#112233", "#445566")
+
+        # Act
+        rebuilt = builder.rebuild()
+
+        # Assert
+        assert rebuilt is True
+        with open(builder.output_paths["r_script"], encoding="utf-8") as file:
+            assert '"One" = "#445566"' in file.read()
+        manifest = build.load_json(builder.manifest_path)
+        assert manifest["generator"] == "test"
+        assert manifest["inputs"] == builder.inputs
+        assert list(builder.inputs) == ["palettes.yml"]
+        assert builder.rebuild() is False  # The file didn't change since
+
+    def test_no_rebuild_without_content_change(
+        self, builder
+    ):  # pylint: disable=redefined-outer-name
+        """Test that formatting and comment edits don't rebuild."""
+        # Arrange
+        self.edit(builder, "colors:\n", "colors: # Edited\n")
+
+        # Act & Assert
+        assert builder.rebuild() is False
+        assert not os.path.exists(builder.output_paths["r_script"])
+        manifest = build.load_json(builder.manifest_path)
+        assert manifest["inputs"] == builder.inputs
+        assert list(builder.inputs) == ["palettes.yml"]
+
+    def test_rebuild_errors_are_printed(
+        self, mocker, builder
+    ):  # pylint: disable=redefined-outer-name
+        """Test that invalid palettes and emitter failures don't stop watching."""
+        # Arrange
+        self.edit(builder, "#112233", "red")
+
+        # Act & Assert
+        assert builder.rebuild() is False
+        self.edit(builder, "red", "#445566")
+        failing_emitters = mocker.patch(
+            "scripts.build.run_emitters", return_value={"r_script": OSError()}
+        )
+        assert builder.rebuild() is False
+        mocker.stop(failing_emitters)
+        failing_makedirs = mocker.patch(
+            "scripts.build.os.makedirs", side_effect=PermissionError("Denied")
+        )
+        assert builder.rebuild() is False
+        mocker.stop(failing_makedirs)
+        assert builder.inputs is None
+        # The unchanged files are built once the failure is fixed
+        assert builder.rebuild() is True
+        assert builder.rebuild() is False
+
+    def test_watch_build(self, mocker, builder):  # pylint: disable=redefined-outer-name
+        """Test that watching rebuilds on changes until interrupted."""
+        # Arrange
+        mock_watch = mocker.patch("scripts.watch.watch", side_effect=KeyboardInterrupt)
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        build.watch_build(
+            builder.repo_root,
+            builder.manifest_path,
+            builder.state,
+            builder.output_paths,
+        )
+
+        # Assert
+        on_change = mock_watch.call_args.args[1]
+        assert on_change.__self__.content_digest == builder.content_digest
+        assert list(on_change.__self__.inputs) == ["palettes.yml"]
+        # palettes.d/ is watched before it exists, so that it is noticed once created
+        assert mock_watch.call_args.args[0] == [
+            os.path.join(builder.repo_root, "palettes.yml"),
+            os.path.join(builder.repo_root, "palettes.d"),
+        ]
+        assert "Watching" in mock_print.call_args_list[0].args[0]
+        mock_print.assert_called_with("Stopped watching.")
+
+    def test_rebuild_on_added_palette_file(
+        self, mocker, builder
+    ):  # pylint: disable=redefined-outer-name
+        """Test that palette files added to palettes.d/ are built and watched."""
+        # Arrange
+        palette_dir = os.path.join(builder.repo_root, "palettes.d")
+        os.mkdir(palette_dir)
+        with open(os.path.join(palette_dir, "extra.yml"), "w", encoding="utf-8") as f:
+            f.write(
+                "palettes:\n  - name: 'Added'\n    type: 'sequential'\n"
+                "    colors:\n      - key: 'Low'\n        value: '#f0f0f0'\n"
+            )
+        mock_watch = mocker.patch("scripts.watch.watch", side_effect=KeyboardInterrupt)
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        rebuilt = builder.rebuild()
+        build.watch_build(builder.repo_root, builder.manifest_path, {}, {})
+
+        # Assert
+        assert rebuilt is True
+        assert list(builder.inputs) == ["palettes.yml", "palettes.d/extra.yml"]
+        with open(builder.output_paths["r_script"], encoding="utf-8") as file:
+            assert '"Low" = "#f0f0f0"' in file.read()
+        assert mock_watch.call_args.args[0] == [
+            os.path.join(builder.repo_root, "palettes.yml"),
+            palette_dir,
+        ]
+        assert "Watching palettes.yml and palettes.d for changes" in (
+            mock_print.call_args_list[-2].args[0]
+        )
+
+    def test_watch_build_invalid_palettes(
+        self, mocker, builder
+    ):  # pylint: disable=redefined-outer-name
+        """Test that watching starts even when palettes.yml is invalid."""
+        # Arrange
+        self.edit(builder, "#112233", "red")
+        mocker.patch("scripts.watch.open_watcher")
+        mock_watch = mocker.patch("scripts.watch.watch", side_effect=KeyboardInterrupt)
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        build.watch_build(builder.repo_root, builder.manifest_path, {}, {})
+
+        # Assert
+        assert mock_watch.call_args.args[1].__self__.content_digest is None
+        assert mock_print.call_args_list[0].args[0].startswith("Failed to load")
+        assert "(polling)" in mock_print.call_args_list[1].args[0]
+
+    def test_main_watch(self, mocker):
+        """Test that --watch starts watching after the build."""
+        # Arrange
+        mocker.patch("scripts.build.get_build_state", return_value={})
+        mocker.patch("scripts.build.load_json", return_value={"outputs": {}})
+        mocker.patch("scripts.build.is_up_to_date", return_value=True)
+        mocker.patch("builtins.print")
+        mock_watch_build = mocker.patch("scripts.build.watch_build")
+
+        # Act
+        build.main(["--watch"])
+
+        # Assert
+        mock_watch_build.assert_called_once()
+        assert mock_watch_build.call_args.args[0] == os.path.dirname(
+            os.path.dirname(os.path.abspath(build.__file__))
+        )
@@ -0,0 +1,57 @@
+"""
+Unit tests for ./scripts/cache.py
+"""
+
+import hashlib
+import os
+
+from scripts import cache
+
+
+def test_get_cache_dir():
+    """Test that the cache directory is placed under the repository root."""
+    assert cache.get_cache_dir("/repo") == os.path.join("/repo", ".build_cache")
+
+
+def test_bytes_digest():
+    """Test that bytes_digest() returns the SHA-256 hex digest."""
+    assert cache.bytes_digest(b"abc") == hashlib.sha256(b"abc").hexdigest()
+
+
+def test_file_digest(tmp_path):
+    """Test that file_digest() hashes the file content."""
+    # Arrange
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"content")
+
+    # Act & Assert
+    assert cache.file_digest(str(path)) == hashlib.sha256(b"content").hexdigest()
+
+
+def test_save_and_load_json(tmp_path):
+    """Test that save_json() creates the directory and load_json() reads it back."""
+    # Arrange
+    path = str(tmp_path / "nested" / "data.json")
+    data = {"key": ["値", 1]}
+
+    # Act
+    cache.save_json(path, data)
+
+    # Assert
+    assert cache.load_json(path) == data
+    assert os.listdir(tmp_path / "nested") == ["data.json"]
+
+
+def test_load_json_missing_file(tmp_path):
+    """Test that load_json() returns None for a missing file."""
+    assert cache.load_json(str(tmp_path / "missing.json")) is None
+
+
+def test_load_json_corrupted_file(tmp_path):
+    """Test that load_json() returns None for a corrupted file."""
+    # Arrange
+    path = tmp_path / "corrupted.json"
+    path.write_text("{not json", encoding="utf-8")
+
+    # Act & Assert
+    assert cache.load_json(str(path)) is None
@@ -0,0 +1,117 @@
+"""
+Unit tests for ./scripts/colormap.py
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from scripts import colormap
+from scripts.model import Palette, PaletteCatalog
+
+
+@pytest.fixture
+def palette() -> Palette:
+    """Palette with letter keys and a numeric key."""
+    return PaletteCatalog.from_dicts(
+        [
+            {
+                "name": "Exam Types",
+                "colors": [
+                    {"key": "A", "value": "#ff0000"},
+                    {"key": "B", "value": "#00ff00"},
+                    {"key": "2", "value": "#0000ff"},
+                ],
+            }
+        ]
+    )[0]
+
+
+class TestMapColors:
+    """Tests for the map_colors() function."""
+
+    def test_map_array_to_rgb(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that values are mapped to RGB colors, including unknown ones."""
+        # Act
+        colors = colormap.map_colors(palette, np.array(["B", "A", "Z", "A"]))
+
+        # Assert
+        assert colors.dtype == np.uint8
+        np.testing.assert_array_equal(
+            colors, [[0, 255, 0], [255, 0, 0], [128, 128, 128], [255, 0, 0]]
+        )
+
+    def test_map_list_to_hex(self, palette):  # pylint: disable=redefined-outer-name
+        """Test mapping a list, with a custom color for unknown values."""
+        colors = colormap.map_colors(
+            palette, ["A", None, "B"], output="hex", unknown="#FFFFFF"
+        )
+        assert colors.tolist() == ["#ff0000", "#ffffff", "#00ff00"]
+
+    def test_map_numbers_to_rgba(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that numbers are matched with keys as strings, keeping the shape."""
+        colors = colormap.map_colors(palette, np.array([[2, 3], [2, 2]]), "rgba")
+        assert colors.shape == (2, 2, 4)
+        np.testing.assert_array_equal(colors[0, 0], [0, 0, 255, 255])
+        np.testing.assert_array_equal(colors[0, 1], [128, 128, 128, 255])
+
+    def test_map_floats(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that whole floats match integer-like keys, other floats don't."""
+        colors = colormap.map_colors(
+            palette, np.array([2.0, 2.5, np.nan, 2.0], dtype=np.float32), "hex"
+        )
+        assert colors.tolist() == ["#0000ff", "#808080", "#808080", "#0000ff"]
+
+    def test_map_object_array(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that floats of object arrays match keys like those of float arrays."""
+        colors = colormap.map_colors(
+            palette, np.array([2.0, "A", 2, 2.5, None], dtype=object), "hex"
+        )
+        assert colors.tolist() == [
+            "#0000ff",
+            "#ff0000",
+            "#0000ff",
+            "#808080",
+            "#808080",
+        ]
+
+    def test_map_bytes(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that byte strings are matched as text."""
+        colors = colormap.map_colors(palette, np.array([b"B", b"2", b"Z"]), "hex")
+        assert colors.tolist() == ["#00ff00", "#0000ff", "#808080"]
+
+    @pytest.mark.parametrize(
+        "wrap", [lambda cat: cat, lambda cat: SimpleNamespace(cat=cat)]
+    )
+    def test_map_categorical(
+        self, palette, wrap
+    ):  # pylint: disable=redefined-outer-name
+        """Test pandas categoricals and Series of them, with missing values."""
+        # Arrange
+        categorical = SimpleNamespace(
+            categories=["B", "A", "C"], codes=np.array([0, 1, -1, 2], dtype=np.int8)
+        )
+
+        # Act
+        colors = colormap.map_colors(palette, wrap(categorical), output="hex")
+
+        # Assert
+        assert colors.tolist() == ["#00ff00", "#ff0000", "#808080", "#808080"]
+
+    def test_map_to_empty_palette(self):
+        """Test that every value of a palette without colors is unknown."""
+        empty = PaletteCatalog.from_dicts([{"name": "Empty"}])[0]
+        colors = colormap.map_colors(empty, ["A", ""], output="hex")
+        assert colors.tolist() == ["#808080", "#808080"]
+
+    def test_map_empty_values(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that no values are mapped to no colors."""
+        assert colormap.map_colors(palette, []).shape == (0, 3)
+
+    def test_invalid_arguments(self, palette):  # pylint: disable=redefined-outer-name
+        """Test that invalid output formats and unknown colors are rejected."""
+        with pytest.raises(ValueError, match="Unknown output format: 'cmyk'"):
+            colormap.map_colors(palette, ["A"], output="cmyk")
+        with pytest.raises(ValueError, match="Invalid hex color: 'gray'"):
+            colormap.map_colors(palette, ["A"], unknown="gray")
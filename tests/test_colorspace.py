@@ -0,0 +1,44 @@
+"""
+Unit tests for ./scripts/colorspace.py
+"""
+
+from array import array
+
+import numpy as np
+import pytest
+
+from scripts import colorspace
+
+
+def test_unpack_rgb():
+    """Test that packed RGB integers are unpacked into channel values."""
+    channels = colorspace.unpack_rgb(array("I", [0xFF8000, 0x000000]))
+    np.testing.assert_allclose(channels, [[1.0, 128 / 255, 0.0], [0.0, 0.0, 0.0]])
+
+
+def test_unpack_rgb_empty():
+    """Test that no colors unpack into an empty array with three channels."""
+    assert colorspace.unpack_rgb([]).shape == (0, 3)
+
+
+def test_srgb_to_linear():
+    """Test the sRGB transfer function on both of its segments."""
+    linear = colorspace.srgb_to_linear(np.array([0.0, 0.04045, 0.5, 1.0]))
+    np.testing.assert_allclose(linear, [0.0, 0.04045 / 12.92, 0.21404114, 1.0])
+
+
+def test_relative_luminance():
+    """Test the WCAG relative luminance of primary colors, white and black."""
+    linear = colorspace.srgb_to_linear(
+        colorspace.unpack_rgb([0xFFFFFF, 0x000000, 0xFF0000, 0x00FF00, 0x0000FF])
+    )
+    np.testing.assert_allclose(
+        colorspace.relative_luminance(linear), [1.0, 0.0, 0.2126, 0.7152, 0.0722]
+    )
+
+
+def test_linear_to_oklab():
+    """Test that white has full lightness and grays have no chroma."""
+    oklab = colorspace.linear_to_oklab(np.array([[1.0, 1.0, 1.0], [0.2, 0.2, 0.2]]))
+    np.testing.assert_allclose(oklab[:, 1:], 0.0, atol=1e-4)
+    assert oklab[0, 0] == pytest.approx(1.0, abs=1e-4)
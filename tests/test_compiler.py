@@ -0,0 +1,207 @@
+"""
+Unit tests for ./scripts/compiler.py
+"""
+
+from scripts import compiler
+from scripts.model import PaletteCatalog
+
+
+class TestGetTableauType:
+    """Tests for get_tableau_type() function."""
+
+    def test_get_tableau_type_categorical(self):
+        """Test conversion of 'categorical' type."""
+        assert compiler.get_tableau_type("categorical") == "regular"
+
+    def test_get_tableau_type_sequential(self):
+        """Test conversion of 'sequential' type."""
+        assert compiler.get_tableau_type("sequential") == "ordered-sequential"
+
+    def test_get_tableau_type_diverging(self):
+        """Test conversion of 'diverging' type."""
+        assert compiler.get_tableau_type("diverging") == "ordered-diverging"
+
+    def test_get_tableau_type_unknown(self):
+        """Test default behavior for unknown type."""
+        assert compiler.get_tableau_type("unknown_type") == "regular"
+
+
+class TestSanitizeVariableName:
+    """Tests for sanitize_variable_name() function."""
+
+    def test_sanitize_variable_name_basic(self):
+        """Test basic conversion to snake_case."""
+        assert compiler.sanitize_variable_name("Test Palette") == "test_palette"
+
+    def test_sanitize_variable_name_with_special_chars(self):
+        """Test removal of special characters."""
+        assert compiler.sanitize_variable_name("Test-Palette!@#$") == "testpalette"
+
+    def test_sanitize_variable_name_multiple_spaces(self):
+        """Test multiple spaces converted to underscores."""
+        assert (
+            compiler.sanitize_variable_name("Test  Multiple   Spaces")
+            == "test__multiple___spaces"
+        )
+
+    def test_sanitize_variable_name_numbers(self):
+        """Test that numbers are preserved."""
+        assert compiler.sanitize_variable_name("Test 123 Palette") == "test_123_palette"
+
+    def test_sanitize_variable_name_already_snake_case(self):
+        """Test that already snake_case names are preserved."""
+        assert compiler.sanitize_variable_name("test_palette") == "test_palette"
+
+    def test_sanitize_variable_name_mixed_case(self):
+        """Test mixed case conversion."""
+        assert compiler.sanitize_variable_name("TestPalette") == "testpalette"
+
+
+class TestFormatRType:
+    """Tests for format_r_type() function."""
+
+    def test_format_r_type_categorical(self):
+        """Test formatting of 'categorical' type."""
+        assert compiler.format_r_type("categorical") == "Categorical"
+
+    def test_format_r_type_sequential(self):
+        """Test formatting of 'sequential' type."""
+        assert compiler.format_r_type("sequential") == "Sequential"
+
+    def test_format_r_type_diverging(self):
+        """Test formatting of 'diverging' type."""
+        assert compiler.format_r_type("diverging") == "Diverging"
+
+    def test_format_r_type_lowercase(self):
+        """Test that lowercase input is capitalized."""
+        assert compiler.format_r_type("lowercase") == "Lowercase"
+
+
+class TestFormatCssName:
+    """Tests for format_css_name() function."""
+
+    def test_whitespace_becomes_hyphens(self):
+        """Test that runs of whitespace become single hyphens."""
+        assert compiler.format_css_name(" Strongly  Agree ") == "strongly-agree"
+
+    def test_symbols_are_escaped(self):
+        """Test that keys differing only in symbols keep distinct names."""
+        names = [compiler.format_css_name(key) for key in ["A+", "A", "A-", "F*"]]
+        assert names == ["a\\+", "a", "a-", "f\\*"]
+
+    def test_non_ascii_is_kept(self):
+        """Test that non-ASCII characters, valid in CSS identifiers, are kept."""
+        assert compiler.format_css_name("Études 学部_1") == "études-学部_1"
+
+
+class TestCompilePalettes:
+    """Tests for compile_palettes() function."""
+
+    def test_compile_palettes(self):
+        """Test that the fields, colors and identifiers are computed."""
+        # Arrange
+        catalog = PaletteCatalog.from_dicts(
+            [
+                {
+                    "name": "AIU Grades",
+                    "type": "diverging",
+                    "description": "Letter grades",
+                    "colors": [
+                        {"key": "A+", "value": "#24693D"},
+                        {"key": "B", "value": "#3b96b2"},
+                    ],
+                },
+                {"name": "Defaults"},
+            ]
+        )
+
+        # Act
+        compiled = compiler.compile_palettes(catalog)
+
+        # Assert
+        grades, defaults = compiled[0], compiled[1]
+        assert grades == compiler.CompiledPalette(
+            name="AIU Grades",
+            type="diverging",
+            description="Letter grades",
+            keys=("A+", "B"),
+            hex_values=("#24693d", "#3b96b2"),
+            rgb_values=((0x24, 0x69, 0x3D), (0x3B, 0x96, 0xB2)),
+            digest=compiler.get_palette_digest(catalog[0]),
+            variable_name="aiu_grades",
+            css_name="aiu-grades",
+            css_keys=("a\\+", "b"),
+            tableau_type="ordered-diverging",
+            type_label="Diverging",
+        )
+        assert (defaults.type, defaults.description, defaults.keys) == (
+            "categorical",
+            "",
+            (),
+        )
+        assert (defaults.tableau_type, defaults.type_label) == (
+            "regular",
+            "Categorical",
+        )
+
+    def test_rgb_tuples_are_shared(self):
+        """Test that the same color has one RGB tuple across palettes."""
+        # Arrange
+        catalog = PaletteCatalog.from_dicts(
+            [
+                {"name": name, "colors": [{"key": "Red", "value": "#ff0000"}]}
+                for name in ["First", "Second"]
+            ]
+        )
+
+        # Act
+        compiled = compiler.compile_palettes(catalog)
+
+        # Assert
+        assert compiled[0].rgb_values[0] == (255, 0, 0)
+        assert compiled[0].rgb_values[0] is compiled[1].rgb_values[0]
+
+    def test_digest_changes_with_palette(self):
+        """Test that the digest identifies the fields and colors of a palette."""
+        # Arrange
+        catalog = PaletteCatalog.from_dicts(
+            [
+                {"name": "Same", "colors": [{"key": "A", "value": "#000000"}]},
+                {"name": "Same", "colors": [{"key": "A", "value": "#000000"}]},
+                {"name": "Same", "colors": [{"key": "A", "value": "#000001"}]},
+                {"name": "Same", "colors": [{"key": "B", "value": "#000000"}]},
+                {"name": "Same", "description": "Other"},
+            ]
+        )
+
+        # Act
+        digests = [palette.digest for palette in compiler.compile_palettes(catalog)]
+
+        # Assert
+        assert digests[0] == digests[1]
+        assert len(set(digests[1:])) == 4
+
+
+class TestAsCompiled:
+    """Tests for as_compiled() function."""
+
+    def test_compiles_model_palette(self):
+        """Test that a palette of the model is compiled."""
+        # Arrange
+        catalog = PaletteCatalog.from_dicts([{"name": "AIU Grades"}])
+
+        # Act
+        compiled = compiler.as_compiled(catalog[0])
+
+        # Assert
+        assert compiled == compiler.compile_palettes(catalog)[0]
+
+    def test_keeps_compiled_palette(self):
+        """Test that a compiled palette is returned as is."""
+        # Arrange
+        compiled = compiler.compile_palettes(
+            PaletteCatalog.from_dicts([{"name": "AIU Grades"}])
+        )[0]
+
+        # Act & Assert
+        assert compiler.as_compiled(compiled) is compiled
@@ -0,0 +1,227 @@
+"""
+Unit tests for ./scripts/contrast.py
+"""
+
+import argparse
+
+import numpy as np
+import pytest
+
+from scripts import contrast
+from scripts.model import PaletteCatalog
+
+BACKGROUNDS = {"white": 0xFFFFFF, "black": 0x000000}
+
+
+@pytest.fixture
+def catalog():
+    """Catalog with a two-color, a one-color and an empty palette."""
+    return PaletteCatalog.from_dicts(
+        [
+            {
+                "name": "Pair",
+                "colors": [
+                    {"key": "Black", "value": "#000000"},
+                    {"key": "Gray", "value": "#777777"},
+                ],
+            },
+            {"name": "Single", "colors": [{"key": "White", "value": "#ffffff"}]},
+            {"name": "Empty", "colors": []},
+        ]
+    )
+
+
+class TestContrastRatios:
+    """Tests for the contrast_ratios() function."""
+
+    def test_contrast_ratios(self):
+        """Test the contrast ratios of white, black and identical colors."""
+        ratios = contrast.contrast_ratios(np.array([1.0, 0.0]), np.array([0.0, 1.0]))
+        np.testing.assert_allclose(ratios, [[21.0, 1.0], [1.0, 21.0]])
+
+    def test_contrast_ratios_are_symmetric(self):
+        """Test that the ratio doesn't depend on the order of the colors."""
+        luminances = np.array([0.1, 0.5, 0.9])
+        ratios = contrast.contrast_ratios(luminances, luminances)
+        np.testing.assert_allclose(ratios, ratios.T)
+        np.testing.assert_allclose(np.diag(ratios), 1.0)
+
+
+class TestAnalyzeContrast:
+    """Tests for the analyze_contrast() function."""
+
+    def test_analyze_contrast(self, catalog):  # pylint: disable=redefined-outer-name
+        """Test the pairwise and background contrast ratios of each palette."""
+        # Act
+        results = contrast.analyze_contrast(catalog, BACKGROUNDS)
+
+        # Assert
+        assert [result.name for result in results] == ["Pair", "Single", "Empty"]
+        pair = results[0]
+        assert pair.keys == ("Black", "Gray")
+        assert pair.ratios.shape == (2, 2)
+        assert pair.ratios[0, 1] == pytest.approx(4.69, abs=0.01)
+        np.testing.assert_allclose(pair.background_ratios[0], [21.0, 1.0])
+        np.testing.assert_allclose(results[1].background_ratios, [[1.0, 21.0]])
+        assert results[2].ratios.shape == (0, 0)
+        assert results[2].background_ratios.shape == (0, 2)
+
+    def test_only_uncached_palettes_are_computed(
+        self, mocker, catalog
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a second run only computes the edited palettes."""
+        # Arrange
+        cache = {}
+        first = contrast.analyze_contrast(catalog, BACKGROUNDS, cache)
+        edited = PaletteCatalog.from_dicts(
+            [
+                {"name": "Pair", "colors": [{"key": "Red", "value": "#ff0000"}]},
+                {"name": "Single", "colors": [{"key": "White", "value": "#ffffff"}]},
+            ]
+        )
+        spy = mocker.spy(contrast, "unpack_rgb")
+
+        # Act
+        contrast.analyze_contrast(catalog, BACKGROUNDS, cache)
+        second = contrast.analyze_contrast(edited, BACKGROUNDS, cache)
+
+        # Assert
+        assert spy.call_count == 1
+        assert spy.spy_return.shape == (3, 3)  # the edited color and the backgrounds
+        assert second[1].digest == first[1].digest
+        assert len(cache) == 4
+
+    def test_digest_depends_on_colors_and_backgrounds(self):
+        """Test the cache key of a palette."""
+        digest = contrast.get_palette_digest([0xFF0000], [0xFFFFFF])
+        assert contrast.get_palette_digest([0xFF0000], [0xFFFFFF]) == digest
+        assert contrast.get_palette_digest([0xFF0001], [0xFFFFFF]) != digest
+        assert contrast.get_palette_digest([0xFF0000], [0x000000]) != digest
+        assert contrast.get_palette_digest([0xFF0000, 0xFFFFFF], []) != digest
+
+
+class TestContrastCache:
+    """Tests for loading and saving the contrast cache."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that saved matrices are loaded back, dropping unused entries."""
+        # Arrange
+        path = str(tmp_path / "cache" / "contrast.npz")
+        cache = {"used": np.eye(2), "unused": np.ones((1, 1))}
+
+        # Act
+        contrast.save_contrast_cache(path, cache, ["used"])
+        loaded = contrast.load_contrast_cache(path)
+
+        # Assert
+        assert list(loaded) == ["used"]
+        np.testing.assert_array_equal(loaded["used"], np.eye(2))
+
+    def test_missing_or_corrupt_cache(self, tmp_path):
+        """Test that a missing or corrupt cache file loads as empty."""
+        path = tmp_path / "contrast.npz"
+        assert not contrast.load_contrast_cache(str(path))
+        path.write_bytes(b"not a zip file")
+        assert not contrast.load_contrast_cache(str(path))
+
+    def test_get_contrast_cache_path(self):
+        """Test that the cache file is in the shared cache directory."""
+        assert contrast.get_contrast_cache_path("/repo") == (
+            "/repo/.build_cache/contrast.npz"
+        )
+
+
+class TestCommandLine:
+    """Tests for the report and the command line arguments."""
+
+    def test_format_report(self, catalog):  # pylint: disable=redefined-outer-name
+        """Test the report lines and the count of low-contrast colors."""
+        # Arrange
+        results = contrast.analyze_contrast(catalog, BACKGROUNDS)
+
+        # Act
+        lines, issues = contrast.format_report(results, list(BACKGROUNDS), 3.0)
+
+        # Assert
+        assert lines == [
+            "Pair",
+            "  lowest pair: 4.69:1 (Black / Gray)",
+            "  white: lowest 4.48:1 (Gray)",
+            "  black: lowest 1.00:1 (Black), 1 of 2 color(s) below 3:1",
+            "Single",
+            "  white: lowest 1.00:1 (White), 1 of 1 color(s) below 3:1",
+            "  black: lowest 21.00:1 (White)",
+            "Empty",
+        ]
+        assert issues == 2
+
+    def test_parse_background(self):
+        """Test parsing a background given on the command line."""
+        assert contrast.parse_background("paper=#FFFFF0") == ("paper", 0xFFFFF0)
+
+    @pytest.mark.parametrize("value", ["#ffffff", "=#ffffff", "paper=white"])
+    def test_parse_background_invalid(self, value):
+        """Test that invalid backgrounds are rejected."""
+        with pytest.raises(argparse.ArgumentTypeError, match="NAME=#RRGGBB"):
+            contrast.parse_background(value)
+
+
+class TestMain:
+    """Tests for the main() function."""
+
+    @pytest.fixture
+    def repo(self, mocker, tmp_path):
+        """Repository with a palettes.yml."""
+        (tmp_path / "palettes.yml").write_text(
+            "palettes:\n"
+            "  - name: 'Pair'\n"
+            "    type: 'categorical'\n"
+            "    colors:\n"
+            "      - key: 'Black'\n"
+            "        value: '#000000'\n"
+            "      - key: 'Blue'\n"
+            "        value: '#0000ff'\n",
+            encoding="utf-8",
+        )
+        mocker.patch("scripts.contrast.get_repo_root", return_value=str(tmp_path))
+        return tmp_path
+
+    def test_main(self, mocker, repo):  # pylint: disable=redefined-outer-name
+        """Test that the report is printed and the results are cached."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        contrast.main([])
+
+        # Assert
+        mock_print.assert_any_call("2 color(s) below 3:1 against a background.")
+        assert (repo / ".build_cache" / "contrast.npz").exists()
+
+    def test_main_strict(
+        self, mocker, repo
+    ):  # pylint: disable=redefined-outer-name,unused-argument
+        """Test that --strict fails on colors below the minimum ratio."""
+        # Arrange
+        mocker.patch("builtins.print")
+
+        # Act & Assert
+        with pytest.raises(SystemExit) as exc_info:
+            contrast.main(["--strict"])
+        assert exc_info.value.code == 1
+
+    def test_main_custom_background(
+        self, mocker, repo
+    ):  # pylint: disable=redefined-outer-name,unused-argument
+        """Test that custom backgrounds replace the defaults."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        contrast.main(["--background", "gray=#808080", "--min-ratio", "1", "--strict"])
+
+        # Assert
+        report = mock_print.call_args_list[0].args[0]
+        assert "  gray: lowest" in report
+        assert "white" not in report
+        assert mock_print.call_count == 1
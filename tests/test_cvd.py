@@ -0,0 +1,139 @@
+"""
+Unit tests for ./scripts/cvd.py
+"""
+
+import numpy as np
+import pytest
+
+from scripts import cvd
+from scripts.colorspace import linear_to_oklab, srgb_to_linear, unpack_rgb
+from scripts.model import PaletteCatalog
+
+
+@pytest.fixture
+def catalog():
+    """Catalog with a red/green, a black/white, a one-color and an empty palette."""
+    return PaletteCatalog.from_dicts(
+        [
+            {
+                "name": "Traffic",
+                "colors": [
+                    {"key": "Red", "value": "#d62728"},
+                    {"key": "Green", "value": "#2ca02c"},
+                    {"key": "Olive", "value": "#8c8c1c"},
+                ],
+            },
+            {
+                "name": "Mono",
+                "colors": [
+                    {"key": "Black", "value": "#000000"},
+                    {"key": "White", "value": "#ffffff"},
+                ],
+            },
+            {"name": "Single", "colors": [{"key": "Blue", "value": "#0000ff"}]},
+            {"name": "Empty", "colors": []},
+        ]
+    )
+
+
+class TestSimulation:
+    """Tests for the simulate_oklab() and find_closest_pairs() functions."""
+
+    def test_normal_vision_is_unchanged(self):
+        """Test that normal vision is the plain OKLab conversion of the colors."""
+        rgb = unpack_rgb([0xD62728, 0x2CA02C, 0x1F77B4])
+        simulated = cvd.simulate_oklab(rgb)
+        assert simulated.shape == (len(cvd.VISION_MATRICES), 3, 3)
+        np.testing.assert_allclose(simulated[0], linear_to_oklab(srgb_to_linear(rgb)))
+
+    def test_grays_are_unaffected(self):
+        """Test that every simulation keeps black and white as they are."""
+        simulated = cvd.simulate_oklab(unpack_rgb([0x000000, 0xFFFFFF]))
+        np.testing.assert_allclose(simulated[:, :, 0], [[0.0, 1.0]] * 4, atol=1e-3)
+
+    def test_find_closest_pairs(self):
+        """Test the distance and indices of the closest pair per vision type."""
+        oklab = np.array(
+            [
+                [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.9, 0.0, 0.0]],
+                [[0.0, 0.0, 0.0], [0.05, 0.0, 0.0], [1.0, 0.0, 0.0]],
+            ]
+        )
+        distances, indices = cvd.find_closest_pairs(oklab)
+        np.testing.assert_allclose(distances, [0.1, 0.05])
+        np.testing.assert_array_equal(indices, [[1, 2], [0, 1]])
+
+
+class TestAnalyzeDistinguishability:
+    """Tests for the analyze_distinguishability() and check_palettes() functions."""
+
+    def test_analyze_distinguishability(
+        self, catalog
+    ):  # pylint: disable=redefined-outer-name
+        """Test the closest pair of each palette under each vision type."""
+        # Act
+        results = cvd.analyze_distinguishability(catalog)
+
+        # Assert
+        assert [result.name for result in results] == [
+            "Traffic",
+            "Mono",
+            "Single",
+            "Empty",
+        ]
+        traffic = {pair.vision: pair for pair in results[0].closest_pairs}
+        assert list(traffic) == list(cvd.VISION_MATRICES)
+        assert traffic["deuteranopia"].distance < traffic["normal vision"].distance
+        assert results[1].closest_pairs[0].distance == pytest.approx(1.0, abs=1e-3)
+        assert results[1].closest_pairs[0][2:] == ("Black", "White")
+        assert not results[2].closest_pairs
+        assert not results[3].closest_pairs
+
+    def test_check_palettes(self, catalog):  # pylint: disable=redefined-outer-name
+        """Test that only pairs closer than the minimum distance are reported."""
+        # Act
+        warnings = cvd.check_palettes(catalog, min_distance=0.1)
+
+        # Assert
+        assert warnings
+        assert all(warning.startswith("'Traffic' colors") for warning in warnings)
+        assert all(warning.endswith(" < 0.1)") for warning in warnings)
+        assert not any("normal vision" in warning for warning in warnings)
+
+    @pytest.mark.parametrize(
+        "distance, min_distance, expected",
+        [
+            (0.0123456, 0.02, "0.01235 < 0.02"),
+            (0.019996, 0.02, "0.019996 < 0.02"),
+            (0.0199999996, 0.02, "0.0199999996 < 0.02"),
+            (0.00003, 0.00005, "3e-05 < 5e-05"),
+            (0.0000412, 0.0000413, "4.12e-05 < 4.13e-05"),
+            (0.04, 0.04 + 1e-17, "0.04 < 0.04000000000000001"),
+        ],
+    )
+    def test_check_palettes_distance_precision(
+        self, mocker, distance, min_distance, expected
+    ):
+        """Test that a distance below the minimum is never shown as equal to it."""
+        # Arrange
+        pair = cvd.ClosestPair("protanopia", distance, "Red", "Green")
+        mocker.patch(
+            "scripts.cvd.analyze_distinguishability",
+            return_value=[cvd.PaletteDistinguishability("Traffic", (pair,))],
+        )
+
+        # Act
+        warnings = cvd.check_palettes({}, min_distance=min_distance)
+
+        # Assert
+        assert warnings == [
+            "'Traffic' colors 'Red' and 'Green' are hard to tell apart "
+            f"under protanopia (OKLab distance {expected})"
+        ]
+
+    def test_check_palettes_default_distance(
+        self, mocker, catalog
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the default minimum distance is used when none is given."""
+        mocker.patch("scripts.cvd.DEFAULT_MIN_DISTANCE", 2.0)
+        assert len(cvd.check_palettes(catalog)) == 2 * len(cvd.VISION_MATRICES)
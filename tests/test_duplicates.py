@@ -0,0 +1,173 @@
+"""
+Unit tests for ./scripts/duplicates.py
+"""
+
+import numpy as np
+import pytest
+
+from scripts import duplicates
+from scripts.model import PaletteCatalog
+
+
+@pytest.fixture
+def catalog():
+    """Catalog with near-duplicate blues across and within palettes."""
+    return PaletteCatalog.from_dicts(
+        [
+            {
+                "name": "Grades",
+                "colors": [
+                    {"key": "A", "value": "#5b8cb8"},
+                    {"key": "B", "value": "#f28e2b"},
+                    {"key": "C", "value": "#5a8cb9"},
+                ],
+            },
+            {"name": "Empty", "colors": []},
+            {
+                "name": "Exams",
+                "colors": [
+                    {"key": "Final", "value": "#e15759"},
+                    {"key": "Midterm", "value": "#5b8cb8"},
+                ],
+            },
+        ]
+    )
+
+
+class TestFindClosePairs:
+    """Tests for the find_close_pairs() function."""
+
+    def test_matches_all_pairs_comparison(self):
+        """Test that the grid index finds exactly the pairs of a brute-force search."""
+        # Arrange
+        points = np.random.default_rng(0).random((500, 3)) - 0.5
+        all_distances = np.linalg.norm(points[:, None] - points[None], axis=-1)
+        expected_firsts, expected_seconds = np.nonzero(
+            np.triu(all_distances <= 0.05, k=1)
+        )
+
+        # Act
+        firsts, seconds, distances = duplicates.find_close_pairs(points, 0.05)
+
+        # Assert
+        assert len(firsts) > 0
+        np.testing.assert_array_equal(firsts, expected_firsts)
+        np.testing.assert_array_equal(seconds, expected_seconds)
+        np.testing.assert_allclose(distances, all_distances[firsts, seconds])
+
+    def test_identical_points(self):
+        """Test that identical points in one grid cell are each paired once."""
+        firsts, seconds, distances = duplicates.find_close_pairs(np.zeros((3, 3)), 0.1)
+        np.testing.assert_array_equal(firsts, [0, 0, 1])
+        np.testing.assert_array_equal(seconds, [1, 2, 2])
+        np.testing.assert_array_equal(distances, 0.0)
+
+    @pytest.mark.parametrize("count", [0, 1])
+    def test_fewer_than_two_points(self, count):
+        """Test that no pairs are found among fewer than two points."""
+        firsts, seconds, distances = duplicates.find_close_pairs(
+            np.zeros((count, 3)), 0.1
+        )
+        assert len(firsts) == len(seconds) == len(distances) == 0
+
+    @pytest.mark.parametrize("threshold", [0.0, -1.0, float("nan")])
+    def test_invalid_threshold(self, threshold):
+        """Test that the threshold must be positive."""
+        with pytest.raises(ValueError, match="Threshold must be positive"):
+            duplicates.find_close_pairs(np.zeros((2, 3)), threshold)
+
+
+class TestFindNearDuplicates:
+    """Tests for the find_near_duplicates() and format_report() functions."""
+
+    def test_find_near_duplicates(
+        self, catalog
+    ):  # pylint: disable=redefined-outer-name
+        """Test that pairs are found both across palettes and within one."""
+        # Act
+        pairs = duplicates.find_near_duplicates(catalog)
+
+        # Assert
+        assert [(str(pair.first), str(pair.second)) for pair in pairs] == [
+            ("'Grades' A (#5b8cb8)", "'Grades' C (#5a8cb9)"),
+            ("'Grades' A (#5b8cb8)", "'Exams' Midterm (#5b8cb8)"),
+            ("'Grades' C (#5a8cb9)", "'Exams' Midterm (#5b8cb8)"),
+        ]
+        assert [pair.same_palette for pair in pairs] == [True, False, False]
+        assert pairs[1].distance == 0.0
+
+    def test_format_report(self, catalog):  # pylint: disable=redefined-outer-name
+        """Test that the report groups pairs across palettes and within one."""
+        # Arrange
+        pairs = duplicates.find_near_duplicates(catalog)
+
+        # Act
+        lines = duplicates.format_report(pairs)
+
+        # Assert
+        assert lines[0] == "Across palettes:"
+        assert lines[1] == (
+            "  'Grades' A (#5b8cb8) and 'Exams' Midterm (#5b8cb8): 0.000"
+        )
+        assert lines[3] == "Within a palette:"
+        assert len(lines) == 5
+        assert not duplicates.format_report([])
+
+
+class TestMain:
+    """Tests for the main() function."""
+
+    @pytest.fixture
+    def repo(self, mocker, tmp_path):
+        """Repository with a palettes.yml."""
+        (tmp_path / "palettes.yml").write_text(
+            "palettes:\n"
+            "  - name: 'Grades'\n"
+            "    type: 'categorical'\n"
+            "    colors:\n"
+            "      - key: 'A'\n"
+            "        value: '#5b8cb8'\n"
+            "      - key: 'B'\n"
+            "        value: '#5a8cb9'\n",
+            encoding="utf-8",
+        )
+        mocker.patch("scripts.duplicates.get_repo_root", return_value=str(tmp_path))
+        return tmp_path
+
+    def test_main(
+        self, mocker, repo
+    ):  # pylint: disable=redefined-outer-name,unused-argument
+        """Test that the pairs and their counts are printed."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        duplicates.main([])
+
+        # Assert
+        assert "Within a palette:" in mock_print.call_args_list[0].args[0]
+        mock_print.assert_called_with(
+            "1 pair(s) of colors within OKLab distance 0.02: "
+            "0 across palettes, 1 within a palette."
+        )
+
+    def test_main_strict(
+        self, mocker, repo
+    ):  # pylint: disable=redefined-outer-name,unused-argument
+        """Test that --strict fails on near-duplicates, but not without them."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+
+        # Act & Assert
+        duplicates.main(["--strict", "--threshold", "0.001"])
+        assert mock_print.call_count == 1
+        with pytest.raises(SystemExit) as exc_info:
+            duplicates.main(["--strict"])
+        assert exc_info.value.code == 1
+
+    def test_main_invalid_threshold(self, mocker):
+        """Test that a threshold that isn't positive is rejected."""
+        mocker.patch("sys.stderr")
+        with pytest.raises(SystemExit) as exc_info:
+            duplicates.main(["--threshold", "0"])
+        assert exc_info.value.code == 2
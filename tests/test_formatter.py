@@ -2,6 +2,11 @@
 Unit tests for ./scripts/formatter.py
 """
 
+import os
+
+import black
+import pytest
+
 from scripts import formatter
 
 
@@ -16,12 +21,14 @@ def test_main_on_windows(mocker):
     mock_print = mocker.patch("builtins.print")
 
     # Act
-    formatter.main()
+    formatter.main([])
 
     # Assert
     mock_subprocess.assert_has_calls(
         [
-            mocker.call(["npx", "prettier", "--write", "."], check=True, shell=True),
+            mocker.call(
+                ["npx", "prettier", "--write", "."], check=True, shell=True, cwd=None
+            ),
             mocker.call(["isort", "."], check=True),
             mocker.call(["black", "."], check=True),
         ],
@@ -52,12 +59,12 @@ def test_main_on_macos(mocker):
     mock_print = mocker.patch("builtins.print")
 
     # Act
-    formatter.main()
+    formatter.main([])
 
     # Assert
     mock_subprocess.assert_has_calls(
         [
-            mocker.call(["npx", "prettier", "--write", "."], check=True),
+            mocker.call(["npx", "prettier", "--write", "."], check=True, cwd=None),
             mocker.call(["isort", "."], check=True),
             mocker.call(["black", "."], check=True),
         ],
@@ -75,3 +82,510 @@ def test_main_on_macos(mocker):
         ],
         any_order=False,
     )
+
+
+@pytest.fixture
+def repo(mocker, tmp_path):
+    """
+    A temporary repository whose file listing is mocked.
+    """
+    (tmp_path / "README.md").write_text("# Title\n", encoding="utf-8")
+    (tmp_path / "module.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "data.R").write_text("x <- 1\n", encoding="utf-8")
+    (tmp_path / ".prettierrc").write_text("{}\n", encoding="utf-8")
+    mocker.patch(
+        "scripts.formatter.list_repository_files",
+        return_value=[".prettierrc", "README.md", "data.R", "deleted.md", "module.py"],
+    )
+    return tmp_path
+
+
+def test_list_repository_files(mocker):
+    """
+    Test that tracked and untracked files are listed with a single git call.
+    """
+    # Arrange
+    mock_subprocess = mocker.patch(
+        "subprocess.run", return_value=mocker.Mock(stdout="b.py\0a.md\0b.py\0")
+    )
+
+    # Act
+    files = formatter.list_repository_files("/repo")
+
+    # Assert
+    assert files == ["a.md", "b.py"]
+    mock_subprocess.assert_called_once_with(
+        ["git", "ls-files", "--cached", "--others", "--exclude-standard", "-z"],
+        check=True,
+        text=True,
+        stdout=formatter.subprocess.PIPE,
+        cwd="/repo",
+    )
+
+
+def test_is_formattable():
+    """
+    Test that only files handled by the formatters are formattable.
+    """
+    assert formatter.is_formattable("README.md")
+    assert formatter.is_formattable("tableau/Preferences.tps")
+    assert formatter.is_formattable("scripts/build.py")
+    assert not formatter.is_formattable("r_script/ir_color_palettes.R")
+    assert not formatter.is_formattable("LICENSE")
+
+
+def test_get_fingerprint_reuses_cached_digest(tmp_path, mocker):
+    """
+    Test that an unchanged modification time and size skip hashing.
+    """
+    # Arrange
+    path = tmp_path / "file.md"
+    path.write_text("content\n", encoding="utf-8")
+    fingerprint = formatter.get_fingerprint(str(path))
+    mock_digest = mocker.patch("scripts.formatter.file_digest")
+
+    # Act
+    result = formatter.get_fingerprint(str(path), fingerprint)
+
+    # Assert
+    assert result == fingerprint
+    mock_digest.assert_not_called()
+    assert formatter.get_fingerprint(str(tmp_path / "missing.md")) is None
+
+
+def test_find_unformatted_files_without_cache(
+    repo,
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that every formattable file needs formatting when nothing is cached.
+    """
+    assert formatter.find_unformatted_files(str(repo)) == ["README.md", "module.py"]
+
+
+def test_format_changed_files_formats_only_changed_files(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that only new or changed files are passed to the formatters.
+    """
+    # Arrange
+    mock_subprocess = mocker.patch("subprocess.run")
+    mocker.patch("builtins.print")
+    formatter.format_changed_files(str(repo))
+    mock_subprocess.reset_mock()
+    (repo / "module.py").write_text("x = 2\n", encoding="utf-8")
+
+    # Act
+    formatter.format_changed_files(str(repo))
+
+    # Assert
+    mock_subprocess.assert_has_calls(
+        [
+            mocker.call(["isort", "module.py"], check=True, cwd=str(repo)),
+            mocker.call(["black", "module.py"], check=True, cwd=str(repo)),
+        ],
+        any_order=False,
+    )
+    assert mock_subprocess.call_count == 2
+
+
+def test_format_changed_files_prettier_only(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that isort and black don't run when no Python file changed.
+    """
+    # Arrange
+    mock_run_prettier = mocker.patch("scripts.formatter.run_prettier")
+    mock_subprocess = mocker.patch("subprocess.run")
+    mocker.patch("builtins.print")
+    formatter.format_changed_files(str(repo))
+    mock_run_prettier.reset_mock()
+    mock_subprocess.reset_mock()
+    (repo / "README.md").write_text("# New title\n", encoding="utf-8")
+
+    # Act
+    formatter.format_changed_files(str(repo))
+
+    # Assert
+    mock_run_prettier.assert_called_once_with(["README.md"], cwd=str(repo))
+    mock_subprocess.assert_not_called()
+
+
+def test_format_changed_files_nothing_to_do(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that no formatter runs when every file is known to be formatted.
+    """
+    # Arrange
+    mock_subprocess = mocker.patch("subprocess.run")
+    mock_print = mocker.patch("builtins.print")
+    formatter.format_changed_files(str(repo))
+    mock_subprocess.reset_mock()
+    # Touching a file without changing its content doesn't make it unformatted
+    os.utime(repo / "README.md", ns=(0, 0))
+
+    # Act
+    formatter.format_changed_files(str(repo))
+
+    # Assert
+    mock_subprocess.assert_not_called()
+    mock_print.assert_called_with("All files are already formatted.")
+
+
+def test_format_changed_files_config_change(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that changing the formatter configuration invalidates the fingerprints.
+    """
+    # Arrange
+    mocker.patch("subprocess.run")
+    mocker.patch("builtins.print")
+    formatter.format_changed_files(str(repo))
+    (repo / ".prettierrc").write_text('{"semi": false}\n', encoding="utf-8")
+
+    # Act & Assert
+    assert formatter.find_unformatted_files(str(repo)) == ["README.md", "module.py"]
+
+
+def test_main_changed(mocker):
+    """
+    Test that the --changed option formats only the changed files.
+    """
+    # Arrange
+    mock_format_changed = mocker.patch("scripts.formatter.format_changed_files")
+    mock_subprocess = mocker.patch("subprocess.run")
+
+    # Act
+    formatter.main(["--changed"])
+
+    # Assert
+    mock_format_changed.assert_called_once_with(
+        formatter.get_repo_root(), concurrent=False
+    )
+    mock_subprocess.assert_not_called()
+
+
+def test_run_prettier_captured(mocker):
+    """
+    Test that Prettier's output is collected instead of printed.
+    """
+    # Arrange
+    mock_subprocess = mocker.patch(
+        "subprocess.run", return_value=mocker.Mock(returncode=2, stdout="error")
+    )
+
+    # Act
+    results = formatter.run_prettier_captured(["a.md"], "/repo")
+
+    # Assert
+    assert results == [formatter.ToolResult("Prettier", 2, "error")]
+    assert mock_subprocess.call_args.args[0] == ["npx", "prettier", "--write", "a.md"]
+    assert mock_subprocess.call_args.kwargs["cwd"] == "/repo"
+
+
+def test_run_python_formatters(tmp_path):
+    """
+    Test that isort and black format Python files in-process.
+    """
+    # Arrange
+    (tmp_path / "pyproject.toml").write_text(
+        '[tool.isort]\nprofile = "black"\n', encoding="utf-8"
+    )
+    (tmp_path / "module.py").write_text(
+        "import sys\nimport os\nx = {'a':os.sep, 'b':sys.argv}\n", encoding="utf-8"
+    )
+    (tmp_path / "clean.py").write_text("x = 1\n", encoding="utf-8")
+
+    # Act
+    results = formatter.run_python_formatters(["module.py", "clean.py"], str(tmp_path))
+
+    # Assert
+    assert results == [
+        formatter.ToolResult("isort", 0, "Fixed module.py"),
+        formatter.ToolResult("black", 0, "reformatted module.py"),
+    ]
+    assert (tmp_path / "module.py").read_text(encoding="utf-8") == (
+        'import os\nimport sys\n\nx = {"a": os.sep, "b": sys.argv}\n'
+    )
+
+
+def test_run_python_formatters_black_settings(tmp_path):
+    """
+    Test that black uses every [tool.black] setting, not only the line length.
+    """
+    # Arrange
+    (tmp_path / "pyproject.toml").write_text(
+        "[tool.black]\nline-length = 20\nskip-string-normalization = true\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "module.py").write_text(
+        "x = {'a': 1, 'b': 2, 'c': 3}\n", encoding="utf-8"
+    )
+
+    # Act
+    results = formatter.run_python_formatters(["module.py"], str(tmp_path))
+
+    # Assert
+    assert results[1] == formatter.ToolResult("black", 0, "reformatted module.py")
+    assert (tmp_path / "module.py").read_text(encoding="utf-8") == (
+        "x = {\n    'a': 1,\n    'b': 2,\n    'c': 3,\n}\n"
+    )
+
+
+def test_get_black_mode(tmp_path):
+    """
+    Test that the black mode follows the settings, inferring the target versions.
+    """
+    # Arrange
+    for name, settings in [
+        (
+            "inferred",
+            "line-length = 100\nskip-magic-trailing-comma = true\npreview = true\n"
+            'enable-unstable-feature = ["hug_parens_with_braces_and_square_brackets"]',
+        ),
+        ("configured", 'target-version = ["py313"]'),
+    ]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "pyproject.toml").write_text(
+            f'[project]\nrequires-python = ">=3.12"\n[tool.black]\n{settings}\n',
+            encoding="utf-8",
+        )
+
+    # Act
+    inferred = formatter.get_black_mode(str(tmp_path / "inferred"))
+    configured = formatter.get_black_mode(str(tmp_path / "configured"))
+    default = formatter.get_black_mode(str(tmp_path))
+
+    # Assert
+    assert inferred.line_length == 100
+    assert not inferred.magic_trailing_comma
+    assert inferred.string_normalization
+    assert inferred.preview
+    assert [feature.name for feature in inferred.enabled_features] == [
+        "hug_parens_with_braces_and_square_brackets"
+    ]
+    assert black.TargetVersion.PY312 in inferred.target_versions
+    assert black.TargetVersion.PY311 not in inferred.target_versions
+    assert configured.target_versions == {black.TargetVersion.PY313}
+    assert configured.line_length == black.DEFAULT_LINE_LENGTH
+    assert default == black.Mode()
+
+
+def test_run_python_formatters_invalid_file(tmp_path):
+    """
+    Test that a file black can't parse fails black but not the other files.
+    """
+    # Arrange
+    (tmp_path / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+    (tmp_path / "module.py").write_text("x  =  1\n", encoding="utf-8")
+
+    # Act
+    results = formatter.run_python_formatters(["broken.py", "module.py"], str(tmp_path))
+
+    # Assert
+    assert results[0].returncode == 0
+    assert results[1].name == "black"
+    assert results[1].returncode == 1
+    assert results[1].output.startswith("Failed to format broken.py")
+    assert (tmp_path / "module.py").read_text(encoding="utf-8") == "x = 1\n"
+
+
+def test_format_files_concurrently(mocker):
+    """
+    Test that each tool runs on its own files and the statuses are combined.
+    """
+    # Arrange
+    mock_prettier = mocker.patch(
+        "scripts.formatter.run_prettier_captured",
+        return_value=[formatter.ToolResult("Prettier", 0, "a.md 10ms")],
+    )
+    mock_python = mocker.patch(
+        "scripts.formatter.run_python_formatters",
+        return_value=[
+            formatter.ToolResult("isort", 0, ""),
+            formatter.ToolResult("black", 123, "error: cannot format b.py"),
+        ],
+    )
+    mock_print = mocker.patch("builtins.print")
+
+    # Act
+    status = formatter.format_files_concurrently("/repo", ["a.md", "b.py", "c.R"])
+
+    # Assert
+    assert status == 1
+    mock_prettier.assert_called_once_with(["a.md"], "/repo")
+    mock_python.assert_called_once_with(["b.py"], "/repo")
+    mock_print.assert_has_calls(
+        [
+            mocker.call("a.md 10ms"),
+            mocker.call("Formatting done (Prettier)."),
+            mocker.call("Formatting done (isort)."),
+            mocker.call("error: cannot format b.py"),
+            mocker.call("Formatting failed (black)."),
+        ],
+        any_order=False,
+    )
+
+
+def test_format_files_concurrently_python_only(mocker):
+    """
+    Test that Prettier doesn't run when there is nothing for it to format.
+    """
+    # Arrange
+    mock_prettier = mocker.patch("scripts.formatter.run_prettier_captured")
+    mocker.patch(
+        "scripts.formatter.run_python_formatters",
+        return_value=[formatter.ToolResult("isort", 0, "")],
+    )
+    mocker.patch("builtins.print")
+
+    # Act & Assert
+    assert formatter.format_files_concurrently("/repo", ["b.py"]) == 0
+    mock_prettier.assert_not_called()
+
+
+def test_format_changed_files_concurrent(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that changed files are formatted concurrently and then recorded.
+    """
+    # Arrange
+    mock_concurrently = mocker.patch(
+        "scripts.formatter.format_files_concurrently", return_value=0
+    )
+    mocker.patch("builtins.print")
+
+    # Act
+    formatter.format_changed_files(str(repo), concurrent=True)
+
+    # Assert
+    mock_concurrently.assert_called_once_with(str(repo), ["README.md", "module.py"])
+    assert not formatter.find_unformatted_files(str(repo))
+
+
+def test_format_changed_files_given_files(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that files found by the caller are formatted without listing the tree again.
+    """
+    # Arrange
+    fingerprints = formatter.load_fingerprints(str(repo))
+    files = formatter.find_unformatted_files(str(repo), fingerprints)
+    mock_find = mocker.patch("scripts.formatter.find_unformatted_files")
+    mock_concurrently = mocker.patch(
+        "scripts.formatter.format_files_concurrently", return_value=0
+    )
+    mocker.patch("builtins.print")
+
+    # Act
+    formatter.format_changed_files(
+        str(repo), concurrent=True, fingerprints=fingerprints, files=files
+    )
+
+    # Assert
+    mock_find.assert_not_called()
+    mock_concurrently.assert_called_once_with(str(repo), ["README.md", "module.py"])
+    assert set(formatter.load_fingerprints(str(repo))) == {"README.md", "module.py"}
+
+
+def test_format_changed_files_concurrent_failure(
+    mocker, repo
+):  # pylint: disable=redefined-outer-name
+    """
+    Test that files aren't recorded as formatted when a formatter failed.
+    """
+    # Arrange
+    mocker.patch("scripts.formatter.format_files_concurrently", return_value=1)
+    mocker.patch("builtins.print")
+
+    # Act & Assert
+    with pytest.raises(SystemExit) as e:
+        formatter.format_changed_files(str(repo), concurrent=True)
+    assert e.value.code == 1
+    assert formatter.find_unformatted_files(str(repo)) == ["README.md", "module.py"]
+
+
+def test_format_all_concurrently(mocker, repo):  # pylint: disable=redefined-outer-name
+    """
+    Test that every formattable file is formatted concurrently and then recorded.
+    """
+    # Arrange
+    mock_concurrently = mocker.patch(
+        "scripts.formatter.format_files_concurrently", return_value=0
+    )
+    mocker.patch("builtins.print")
+
+    # Act
+    formatter.format_all_concurrently(str(repo))
+
+    # Assert
+    mock_concurrently.assert_called_once_with(str(repo), ["README.md", "module.py"])
+    assert not formatter.find_unformatted_files(str(repo))
+
+
+def test_format_all_concurrently_failure(mocker):
+    """
+    Test that a failing formatter makes the concurrent mode exit with its status.
+    """
+    # Arrange
+    mocker.patch("scripts.formatter.list_repository_files", return_value=[])
+    mocker.patch("scripts.formatter.format_files_concurrently", return_value=1)
+    mock_record = mocker.patch("scripts.formatter.record_formatted_files")
+
+    # Act & Assert
+    with pytest.raises(SystemExit):
+        formatter.format_all_concurrently("/repo")
+    mock_record.assert_not_called()
+
+
+def test_main_concurrent(mocker):
+    """
+    Test that the --concurrent option selects the concurrent mode.
+    """
+    # Arrange
+    mock_format_all = mocker.patch("scripts.formatter.format_all_concurrently")
+    mock_format_changed = mocker.patch("scripts.formatter.format_changed_files")
+
+    # Act
+    formatter.main(["--concurrent"])
+    formatter.main(["--changed", "--concurrent"])
+
+    # Assert
+    mock_format_all.assert_called_once_with(formatter.get_repo_root())
+    mock_format_changed.assert_called_once_with(
+        formatter.get_repo_root(), concurrent=True
+    )
+
+
+def test_run_python_formatters_missing_file(tmp_path):
+    """
+    Test that a missing file fails both isort and black.
+    """
+    # Act
+    results = formatter.run_python_formatters(["missing.py"], str(tmp_path))
+
+    # Assert
+    assert [result.returncode for result in results] == [1, 1]
+    assert results[0].output.startswith("Failed to format missing.py")
+
+
+def test_format_files_concurrently_prettier_only(mocker):
+    """
+    Test that the Python formatters don't run when no Python file is given.
+    """
+    # Arrange
+    mocker.patch(
+        "scripts.formatter.run_prettier_captured",
+        return_value=[formatter.ToolResult("Prettier", 0, "")],
+    )
+    mock_python = mocker.patch("scripts.formatter.run_python_formatters")
+    mocker.patch("builtins.print")
+
+    # Act & Assert
+    assert formatter.format_files_concurrently("/repo", ["a.md"]) == 0
+    mock_python.assert_not_called()
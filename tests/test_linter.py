@@ -2,7 +2,10 @@
 Unit tests for ./scripts/linter.py
 """
 
-from scripts import linter
+import pytest
+
+from scripts import formatter, linter
+from scripts.formatter import ToolResult
 
 
 def test_main(mocker):
@@ -14,7 +17,7 @@ def test_main(mocker):
     mock_print = mocker.patch("builtins.print")
 
     # Act
-    linter.main()
+    linter.main([])
 
     # Assert
     mock_subprocess.assert_has_calls(
@@ -41,3 +44,118 @@ def test_main(mocker):
         ],
         any_order=False,
     )
+
+
+class TestLintCached:
+    """Tests for the cached, concurrent linting mode."""
+
+    def test_get_lint_commands(self, mocker):
+        """Test that each linter runs once over all targets with this interpreter."""
+        mocker.patch("sys.executable", "python")
+        commands = linter.get_lint_commands(["./scripts", "./tests"])
+        assert commands == {
+            "mypy": ["python", "-m", "mypy", "--incremental", "./scripts", "./tests"],
+            "pylint": ["python", "-m", "pylint", "./scripts", "./tests"],
+        }
+
+    def test_run_linter(self, mocker):
+        """Test that a linter's output is captured."""
+        # Arrange
+        mock_subprocess = mocker.patch("subprocess.run")
+        mock_subprocess.return_value.returncode = 1
+        mock_subprocess.return_value.stdout = "error\n"
+
+        # Act
+        result = linter.run_linter("mypy", ["mypy", "."], "/repo")
+
+        # Assert
+        assert result == ToolResult("mypy", 1, "error\n")
+        assert mock_subprocess.call_args.kwargs["cwd"] == "/repo"
+        assert mock_subprocess.call_args.kwargs["check"] is False
+
+    def test_run_linters_concurrently(self, mocker):
+        """Test that the outputs are printed per linter with a combined status."""
+        # Arrange
+        mocker.patch(
+            "scripts.linter.run_linter",
+            side_effect=lambda name, command, cwd: ToolResult(
+                name,
+                int(name == "pylint"),
+                "pylint output\n" if name == "pylint" else "",
+            ),
+        )
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        status = linter.run_linters_concurrently("/repo", ["./scripts"])
+
+        # Assert
+        assert status == 1
+        mock_print.assert_has_calls(
+            [
+                mocker.call("Linting ./scripts with mypy and pylint..."),
+                mocker.call("mypy linting done."),
+                mocker.call("pylint output"),
+                mocker.call("pylint linting failed."),
+            ]
+        )
+
+    def test_skips_formatters_when_formatted(self, mocker):
+        """Test that the formatters are skipped when no file changed."""
+        # Arrange
+        mocker.patch("scripts.formatter.load_fingerprints", return_value={})
+        mocker.patch("scripts.formatter.find_unformatted_files", return_value=[])
+        mock_format = mocker.patch("scripts.formatter.format_changed_files")
+        mock_lint = mocker.patch(
+            "scripts.linter.run_linters_concurrently", return_value=0
+        )
+        mock_subprocess = mocker.patch("subprocess.run")
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        linter.main(["--cached"])
+
+        # Assert
+        mock_format.assert_not_called()
+        mock_subprocess.assert_not_called()
+        mock_lint.assert_called_once_with(formatter.get_repo_root(), linter.LINT_TARGET)
+        mock_print.assert_has_calls(
+            [
+                mocker.call("All files are already formatted. Skipping formatters."),
+                mocker.call("All linting complete."),
+            ]
+        )
+
+    def test_formats_changed_files(self, mocker):
+        """Test that changed files are formatted before linting."""
+        # Arrange
+        fingerprints = {"module.py": [1, 2, "old"]}
+        mocker.patch("scripts.formatter.load_fingerprints", return_value=fingerprints)
+        mock_find = mocker.patch(
+            "scripts.formatter.find_unformatted_files", return_value=["module.py"]
+        )
+        mock_format = mocker.patch("scripts.formatter.format_changed_files")
+        mocker.patch("scripts.linter.run_linters_concurrently", return_value=0)
+        mocker.patch("builtins.print")
+
+        # Act
+        linter.lint_cached("/repo")
+
+        # Assert
+        mock_find.assert_called_once_with("/repo", fingerprints)
+        mock_format.assert_called_once_with(
+            "/repo", concurrent=True, fingerprints=fingerprints, files=["module.py"]
+        )
+
+    def test_lint_failure_exits(self, mocker):
+        """Test that a linter failure exits with a non-zero status."""
+        # Arrange
+        mocker.patch("scripts.formatter.load_fingerprints", return_value={})
+        mocker.patch("scripts.formatter.find_unformatted_files", return_value=[])
+        mocker.patch("scripts.linter.run_linters_concurrently", return_value=1)
+        mocker.patch("builtins.print")
+
+        # Act & Assert
+        with pytest.raises(SystemExit) as exc_info:
+            linter.lint_cached("/repo")
+        assert exc_info.value.code == 1
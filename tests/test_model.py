@@ -0,0 +1,184 @@
+"""
+Unit tests for ./scripts/model.py
+"""
+
+from array import array
+from typing import Any, Dict, List
+
+import pytest
+
+from scripts import model
+
+
+@pytest.fixture
+def sample_dicts() -> List[Dict[str, Any]]:
+    """Sample palette dictionaries sharing a color and a key."""
+    return [
+        {
+            "name": "First",
+            "type": "sequential",
+            "description": "First palette",
+            "colors": [
+                {"key": "Low", "value": "#5b8cb8"},
+                {"key": "High", "value": "#FFC685"},
+            ],
+        },
+        {
+            "name": "Second",
+            "colors": [
+                {"key": "Low", "value": "#5b8cb8"},
+                {"key": 0, "value": "#000000"},
+            ],
+        },
+    ]
+
+
+class TestParseHex:
+    """Tests for parse_hex() and rgb_to_hex() functions."""
+
+    def test_parse_hex(self):
+        """Test conversion of hex strings to RGB integers."""
+        assert model.parse_hex("#ff0000") == 0xFF0000
+        assert model.parse_hex("#5B8CB8") == 0x5B8CB8
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "ff0000",
+            "#ff00",
+            "#gg0000",
+            "",
+            None,
+            123,
+            "#-12345",
+            "#+12345",
+            "# 12345",
+            "#12345 ",
+            "#0x1234",
+            "#1_234",
+            "#ff0000\n",
+            "#１２３４５６",
+        ],
+    )
+    def test_parse_hex_invalid(self, value):
+        """Test that invalid hex strings raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid hex color"):
+            model.parse_hex(value)
+
+    def test_negative_hex_color_in_palette(self):
+        """Test that a signed hex color raises ValueError, not OverflowError."""
+        with pytest.raises(ValueError, match="Invalid hex color: '#-12345'"):
+            model.PaletteCatalog.from_dicts(
+                [{"name": "Signed", "colors": [{"key": "A", "value": "#-12345"}]}]
+            )
+
+    def test_rgb_to_hex(self):
+        """Test conversion of RGB integers to lowercase hex strings."""
+        assert model.rgb_to_hex(0x5B8CB8) == "#5b8cb8"
+        assert model.rgb_to_hex(0) == "#000000"
+
+
+class TestColor:
+    """Tests for the Color class."""
+
+    def test_color_attributes(self):
+        """Test the attributes of a color."""
+        color = model.Color("Key", 0xFF0000)
+        assert color.key == "Key"
+        assert color.rgb == 0xFF0000
+        assert color.hex == "#ff0000"
+        assert repr(color) == "Color('Key', '#ff0000')"
+
+    def test_color_equality(self):
+        """Test equality and hashing of colors."""
+        assert model.Color("A", 1) == model.Color("A", 1)
+        assert model.Color("A", 1) != model.Color("B", 1)
+        assert model.Color("A", 1) != ("A", 1)
+        assert len({model.Color("A", 1), model.Color("A", 1)}) == 1
+
+    def test_color_has_no_instance_dict(self):
+        """Test that colors use __slots__."""
+        assert not hasattr(model.Color("A", 1), "__dict__")
+
+
+class TestPaletteCatalog:
+    """Tests for the Palette and PaletteCatalog classes."""
+
+    def test_from_dicts(self, sample_dicts):  # pylint: disable=redefined-outer-name
+        """Test that a catalog is built from palette dictionaries."""
+        # Act
+        catalog = model.PaletteCatalog.from_dicts(sample_dicts)
+
+        # Assert
+        assert len(catalog) == 2
+        first = catalog[0]
+        assert first.name == "First"
+        assert first.type == "sequential"
+        assert first.description == "First palette"
+        assert first.keys == ("Low", "High")
+        assert first.rgb == array("I", [0x5B8CB8, 0xFFC685])
+        assert first.hex_values == ("#5b8cb8", "#ffc685")
+        assert list(first) == [
+            model.Color("Low", 0x5B8CB8),
+            model.Color("High", 0xFFC685),
+        ]
+        assert [palette.name for palette in catalog[0:2]] == ["First", "Second"]
+
+    def test_from_dicts_resolves_defaults(
+        self, sample_dicts
+    ):  # pylint: disable=redefined-outer-name
+        """Test that missing fields are resolved to their defaults."""
+        # Act
+        second = model.PaletteCatalog.from_dicts(sample_dicts)[1]
+
+        # Assert
+        assert second.type == model.DEFAULT_PALETTE_TYPE
+        assert second.description == ""
+        assert second.keys == ("Low", "0")
+        assert len(model.PaletteCatalog.from_dicts([{}])[0]) == 0
+
+    def test_from_dicts_invalid_color(self):
+        """Test that an invalid color value raises ValueError."""
+        with pytest.raises(ValueError, match="Invalid hex color: 'red'"):
+            model.PaletteCatalog.from_dicts(
+                [{"name": "Bad", "colors": [{"key": "A", "value": "red"}]}]
+            )
+
+    def test_shared_values_are_stored_once(
+        self, sample_dicts
+    ):  # pylint: disable=redefined-outer-name
+        """Test that keys and hex strings shared by palettes are stored once."""
+        # Act
+        catalog = model.PaletteCatalog.from_dicts(sample_dicts)
+
+        # Assert
+        assert catalog.table.keys == ["Low", "High", "0"]
+        assert catalog[0].keys[0] is catalog[1].keys[0]
+        assert catalog[0].hex_values[0] is catalog[1].hex_values[0]
+
+    def test_to_dicts_round_trip(
+        self, sample_dicts
+    ):  # pylint: disable=redefined-outer-name
+        """Test that converting a catalog back into dictionaries normalizes it."""
+        # Act
+        catalog = model.PaletteCatalog.from_dicts(sample_dicts)
+        dicts = catalog.to_dicts()
+
+        # Assert
+        assert dicts[0]["colors"][1] == {"key": "High", "value": "#ffc685"}
+        assert dicts[1]["type"] == "categorical"
+        assert model.PaletteCatalog.from_dicts(dicts).to_dicts() == dicts
+
+    def test_repr(self, sample_dicts):  # pylint: disable=redefined-outer-name
+        """Test the representations of catalogs and palettes."""
+        catalog = model.PaletteCatalog.from_dicts(sample_dicts)
+        assert repr(catalog) == "PaletteCatalog(2 palette(s))"
+        assert repr(catalog[0]) == "Palette('First', 'sequential', 2 color(s))"
+
+    def test_palette_has_no_instance_dict(
+        self, sample_dicts
+    ):  # pylint: disable=redefined-outer-name
+        """Test that palettes and catalogs use __slots__."""
+        catalog = model.PaletteCatalog.from_dicts(sample_dicts)
+        assert not hasattr(catalog[0], "__dict__")
+        assert not hasattr(catalog, "__dict__")
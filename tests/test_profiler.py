@@ -0,0 +1,236 @@
+"""
+Unit tests for ./scripts/profiler.py
+"""
+
+from contextvars import copy_context
+import json
+import threading
+import time
+import tracemalloc
+
+from scripts import profiler
+
+
+def busy_wait(seconds: float) -> None:
+    """Spend CPU time in the current thread."""
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+class TestProfiler:
+    """Tests for the Profiler class."""
+
+    def test_phases_nest(self):
+        """Test that nested phases are recorded with their totals."""
+        # Act
+        with profiler.Profiler(trace_memory=False) as active:
+            with profiler.phase("build"):
+                with profiler.phase("emit", "emitter") as current:
+                    profiler.record_bytes(100)
+                    busy_wait(0.01)
+                profiler.record_bytes(20)
+
+        # Assert
+        records = {record.name: record for record in active.records}
+        assert list(records) == ["emit", "build"]
+        assert isinstance(current, profiler.Phase)
+        assert (records["emit"].depth, records["emit"].category) == (1, "emitter")
+        assert (records["build"].depth, records["build"].category) == (0, "phase")
+        assert records["emit"].bytes_written == 100
+        assert records["build"].bytes_written == 120
+        assert records["emit"].cpu_time >= 0.01
+        assert records["build"].cpu_time >= records["emit"].cpu_time
+        assert records["build"].wall_time >= records["emit"].wall_time
+        assert records["build"].start <= records["emit"].start
+        assert records["build"].peak_memory == 0
+
+    def test_phases_on_other_threads(self):
+        """Test that phases run in a copied context add up in the enclosing phase."""
+
+        # Arrange
+        def emit(name: str) -> None:
+            with profiler.phase(name, "emitter"):
+                busy_wait(0.02)
+                profiler.record_bytes(10)
+
+        # Act
+        with profiler.Profiler(trace_memory=False) as active:
+            with profiler.phase("emit"):
+                threads = [
+                    threading.Thread(target=copy_context().run, args=(emit, name))
+                    for name in ["tableau", "r_script"]
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+        # Assert
+        records = {record.name: record for record in active.records}
+        assert records["emit"].bytes_written == 20
+        assert records["emit"].cpu_time >= 0.04
+        assert records["tableau"].depth == records["r_script"].depth == 1
+        assert records["tableau"].thread_id != records["emit"].thread_id
+
+    def test_peak_memory(self):
+        """Test that each phase records its own peak traced memory."""
+        # Arrange
+        size = 4 * 1024 * 1024
+
+        # Act
+        with profiler.Profiler() as active:
+            assert tracemalloc.is_tracing()
+            with profiler.phase("build"):
+                with profiler.phase("allocate"):
+                    data = bytearray(size)
+                    del data
+                with profiler.phase("idle"):
+                    pass
+
+        # Assert
+        assert not tracemalloc.is_tracing()
+        records = {record.name: record for record in active.records}
+        # Memory freed during the phase lowers the peak above the start slightly
+        assert records["allocate"].peak_memory > size * 0.99
+        assert records["build"].peak_memory > size * 0.99
+        assert records["idle"].peak_memory < size * 0.01
+
+    def test_keeps_tracing_started_elsewhere(self):
+        """Test that tracing started before the profiler isn't stopped by it."""
+        tracemalloc.start()
+        try:
+            with profiler.Profiler():
+                pass
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_phases_without_profiler(self, tmp_path):
+        """Test that phases and written bytes are ignored without a profiler."""
+        # Arrange
+        path = tmp_path / "output.txt"
+        path.write_text("12345", encoding="utf-8")
+        inactive = profiler.Profiler(trace_memory=False)
+
+        # Act
+        with profiler.phase("build") as current:
+            profiler.record_bytes(10)
+            profiler.record_file(str(path))
+
+        # Assert
+        assert current is None
+        assert not inactive.records
+
+    def test_record_file(self, tmp_path):
+        """Test that the size of a written file is added to the running phase."""
+        # Arrange
+        path = tmp_path / "manifest.json"
+        path.write_text("{}\n", encoding="utf-8")
+
+        # Act
+        with profiler.Profiler(trace_memory=False) as active:
+            profiler.record_file(str(path))
+            with profiler.phase("save manifest"):
+                profiler.record_file(str(path))
+
+        # Assert
+        assert [record.bytes_written for record in active.records] == [3]
+
+
+class TestReports:
+    """Tests for the trace and the summary of a profiler."""
+
+    def test_write_trace(self, tmp_path):
+        """Test that the phases are written as Chrome trace events."""
+        # Arrange
+        active = profiler.Profiler(trace_memory=False)
+        with active:
+            with profiler.phase("build"):
+                with profiler.phase("emit", "emitter"):
+                    profiler.record_bytes(64)
+        path = tmp_path / "trace" / "profile.json"
+
+        # Act
+        active.write_trace(str(path))
+
+        # Assert
+        with open(path, encoding="utf-8") as file:
+            trace = json.load(file)
+        assert trace["displayTimeUnit"] == "ms"
+        metadata, build, emit = trace["traceEvents"]
+        assert metadata["ph"] == "M"
+        assert metadata["args"] == {"name": threading.current_thread().name}
+        assert [build["name"], emit["name"]] == ["build", "emit"]
+        assert [build["cat"], emit["cat"]] == ["phase", "emitter"]
+        assert build["ph"] == emit["ph"] == "X"
+        assert build["tid"] == emit["tid"] == metadata["tid"] == 1
+        assert build["ts"] <= emit["ts"]
+        assert build["dur"] >= emit["dur"]
+        assert emit["args"]["bytes_written"] == 64
+        assert set(emit["args"]) == {
+            "cpu_time_ms",
+            "peak_memory_bytes",
+            "bytes_written",
+        }
+
+    def test_trace_names_threads(self):
+        """Test that every thread that ran a phase is named in the trace."""
+        # Arrange
+        active = profiler.Profiler(trace_memory=False)
+
+        def emit() -> None:
+            with profiler.phase("r_script", "emitter"):
+                pass
+
+        with active:
+            with profiler.phase("emit"):
+                thread = threading.Thread(
+                    target=copy_context().run, args=(emit,), name="emitter-thread"
+                )
+                thread.start()
+                thread.join()
+
+        # Act
+        events = active.to_trace()["traceEvents"]
+
+        # Assert
+        names = {
+            event["tid"]: event["args"]["name"]
+            for event in events
+            if event["ph"] == "M"
+        }
+        assert sorted(names.values()) == sorted(
+            ["emitter-thread", threading.current_thread().name]
+        )
+        tids = {event["name"]: event["tid"] for event in events if event["ph"] == "X"}
+        assert names[tids["r_script"]] == "emitter-thread"
+
+    def test_format_summary(self):
+        """Test that the summary has a row per phase, nested phases indented."""
+        # Arrange
+        active = profiler.Profiler(trace_memory=False)
+        with active:
+            with profiler.phase("build"):
+                with profiler.phase("load palettes"):
+                    profiler.record_bytes(123456)
+
+        # Act
+        lines = active.format_summary()
+
+        # Assert
+        assert lines[0].split() == [
+            "Phase",
+            "Wall",
+            "ms",
+            "CPU",
+            "ms",
+            "Peak",
+            "KiB",
+            "Written",
+        ]
+        assert lines[1].startswith("build ")
+        assert lines[2].startswith("  load palettes ")
+        assert lines[1].endswith("123,456")
+        assert lines[2].split()[-2] == "0.0"
+        assert len({len(line) for line in lines}) == 1
@@ -0,0 +1,157 @@
+"""
+Unit tests for ./scripts/registry.py
+"""
+
+import pytest
+
+from scripts import registry
+from scripts.model import PaletteCatalog
+
+
+@pytest.fixture
+def sample_registry() -> registry.PaletteRegistry:
+    """Registry of two palettes sharing a color key."""
+    return registry.PaletteRegistry(
+        PaletteCatalog.from_dicts(
+            [
+                {
+                    "name": "AIU Grades",
+                    "colors": [
+                        {"key": "A", "value": "#5b8cb8"},
+                        {"key": "B", "value": "#FFC685"},
+                    ],
+                },
+                {
+                    "name": "Exam Types (2024)",
+                    "colors": [{"key": "A", "value": "#000000"}],
+                },
+            ]
+        )
+    )
+
+
+class TestPaletteRegistry:
+    """Tests for the PaletteRegistry class."""
+
+    def test_palette_lookup(
+        self, sample_registry
+    ):  # pylint: disable=redefined-outer-name
+        """Test looking up palettes by name and by variable name."""
+        grades = sample_registry.palette("AIU Grades")
+        assert grades is sample_registry.catalog[0]
+        assert sample_registry.palette_by_variable_name("aiu_grades") is grades
+        assert sample_registry.palette_by_variable_name("exam_types_2024").name == (
+            "Exam Types (2024)"
+        )
+
+    def test_color_lookup(
+        self, sample_registry
+    ):  # pylint: disable=redefined-outer-name
+        """Test the hex strings, RGB tuples and key order of colors."""
+        assert sample_registry.hex("AIU Grades", "B") == "#ffc685"
+        assert sample_registry.rgb("AIU Grades", "A") == (0x5B, 0x8C, 0xB8)
+        assert sample_registry.hex("Exam Types (2024)", "A") == "#000000"
+        assert sample_registry.keys("AIU Grades") == ("A", "B")
+
+    def test_container_protocol(
+        self, sample_registry
+    ):  # pylint: disable=redefined-outer-name
+        """Test membership, iteration, length and representation."""
+        assert "AIU Grades" in sample_registry
+        assert "aiu_grades" not in sample_registry
+        assert list(sample_registry) == ["AIU Grades", "Exam Types (2024)"]
+        assert len(sample_registry) == 2
+        assert repr(sample_registry) == "PaletteRegistry(2 palette(s))"
+
+    @pytest.mark.parametrize(
+        "lookup, message",
+        [
+            (lambda r: r.palette("Missing"), "Unknown palette: 'Missing'"),
+            (
+                lambda r: r.palette_by_variable_name("AIU Grades"),
+                "Unknown palette variable name: 'AIU Grades'",
+            ),
+            (lambda r: r.keys("Missing"), "Unknown palette: 'Missing'"),
+            (lambda r: r.hex("Missing", "A"), "Unknown palette: 'Missing'"),
+            (
+                lambda r: r.rgb("AIU Grades", "C"),
+                "Unknown color 'C' in palette 'AIU Grades'",
+            ),
+        ],
+    )
+    def test_unknown_lookups(
+        self, sample_registry, lookup, message
+    ):  # pylint: disable=redefined-outer-name
+        """Test that unknown palettes and colors raise KeyError."""
+        with pytest.raises(KeyError, match=message):
+            lookup(sample_registry)
+
+    @pytest.mark.parametrize(
+        "names, message",
+        [
+            (["Grades", "Grades"], "Duplicate palette name: 'Grades'"),
+            (
+                ["AIU Grades", "AIU_Grades"],
+                "Palettes 'AIU Grades' and 'AIU_Grades' have the same variable "
+                "name: 'aiu_grades'",
+            ),
+        ],
+    )
+    def test_ambiguous_names(self, names, message):
+        """Test that palettes that can't be told apart are rejected."""
+        catalog = PaletteCatalog.from_dicts([{"name": name} for name in names])
+        with pytest.raises(ValueError, match=message):
+            registry.PaletteRegistry(catalog)
+
+    def test_load(self, tmp_path):
+        """Test loading a registry from a YAML file."""
+        # Arrange
+        yaml_path = tmp_path / "palettes.yml"
+        yaml_path.write_text(
+            "palettes:\n"
+            "  - name: 'Scale'\n"
+            "    type: 'sequential'\n"
+            "    colors: [{key: 'Low', value: '#102030'}]\n",
+            encoding="utf-8",
+        )
+
+        # Act
+        loaded = registry.PaletteRegistry.load(str(yaml_path))
+
+        # Assert
+        assert loaded.rgb("Scale", "Low") == (0x10, 0x20, 0x30)
+
+    def test_load_palette_dir(self, tmp_path):
+        """Test that the palettes of palettes.d/ are merged as in the build."""
+        # Arrange
+        yaml_path = tmp_path / "palettes.yml"
+        yaml_path.write_text(
+            "palettes:\n"
+            "  - name: 'Scale'\n"
+            "    type: 'sequential'\n"
+            "    colors: [{key: 'Low', value: '#102030'}]\n",
+            encoding="utf-8",
+        )
+        (tmp_path / "palettes.d").mkdir()
+        (tmp_path / "palettes.d" / "library.yml").write_text(
+            "palettes:\n"
+            "  - name: 'Library'\n"
+            "    type: 'categorical'\n"
+            "    colors: [{key: 'Books', value: '#405060'}]\n",
+            encoding="utf-8",
+        )
+
+        # Act
+        loaded = registry.PaletteRegistry.load(str(yaml_path))
+
+        # Assert
+        assert [palette.name for palette in loaded.catalog] == ["Scale", "Library"]
+        assert loaded.hex("Library", "Books") == "#405060"
+
+
+def test_map_colors(sample_registry):  # pylint: disable=redefined-outer-name
+    """Test mapping values to the colors of a palette looked up by name."""
+    colors = sample_registry.map_colors("AIU Grades", ["B", "A"], output="hex")
+    assert colors.tolist() == ["#ffc685", "#5b8cb8"]
+    with pytest.raises(KeyError, match="Unknown palette: 'Missing'"):
+        sample_registry.map_colors("Missing", ["A"])
@@ -0,0 +1,435 @@
+"""
+Unit tests for ./scripts/server.py
+"""
+
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+
+from scripts import server
+from scripts.model import PaletteCatalog
+
+PALETTES_YAML = (
+    "palettes:\n"
+    "  - name: 'Exam Types'\n"
+    "    type: 'categorical'\n"
+    "    description: 'Exam types'\n"
+    "    colors:\n"
+    "      - key: 'Final'\n"
+    "        value: '#e15759'\n"
+)
+
+
+@pytest.fixture
+def store(tmp_path) -> server.ResourceStore:
+    """Resource store of a palettes.yml with one palette."""
+    yaml_path = tmp_path / "palettes.yml"
+    yaml_path.write_text(PALETTES_YAML, encoding="utf-8")
+    return server.ResourceStore(str(yaml_path))
+
+
+class TestResources:
+    """Tests for rendering and storing the resources."""
+
+    def test_make_resource(self):
+        """Test the gzip body and the ETags of both encodings."""
+        # Act
+        resource = server.make_resource(b"body", "text/plain")
+
+        # Assert
+        assert gzip.decompress(resource.gzip_body) == b"body"
+        assert resource.etag.startswith('"') and resource.etag.endswith('"')
+        assert resource.gzip_etag == resource.etag[:-1] + '-gzip"'
+        assert server.make_resource(b"body", "text/plain") == resource
+
+    def test_build_resources(self):
+        """Test the generated files and the JSON views of the palettes."""
+        # Arrange
+        catalog = PaletteCatalog.from_dicts(
+            [{"name": "Exam Types", "colors": [{"key": "Final", "value": "#e15759"}]}]
+        )
+
+        # Act
+        resources = server.build_resources(catalog)
+
+        # Assert
+        assert sorted(resources) == [
+            "/css/ir_color_palettes.css",
+            "/json/ir_color_palettes.json",
+            "/palettes.json",
+            "/palettes/exam_types.json",
+            "/python/ir_color_palettes.py",
+            "/r_script/ir_color_palettes.R",
+            "/sass/_ir_color_palettes.scss",
+            "/tableau/Preferences.tps",
+        ]
+        assert resources["/tableau/Preferences.tps"].content_type.startswith(
+            "application/xml"
+        )
+        assert resources["/css/ir_color_palettes.css"].content_type.startswith(
+            "text/css"
+        )
+        assert b'"Final" = "#e15759"' in resources["/r_script/ir_color_palettes.R"].body
+        assert json.loads(resources["/palettes.json"].body) == {
+            "palettes": [
+                {
+                    "name": "Exam Types",
+                    "type": "categorical",
+                    "url": "/palettes/exam_types.json",
+                }
+            ]
+        }
+        assert json.loads(resources["/palettes/exam_types.json"].body) == (
+            catalog[0].to_dict()
+        )
+
+    def test_store_rebuilds_on_change(
+        self, mocker, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that resources are rebuilt only when palettes.yml changes."""
+        # Arrange
+        spy = mocker.spy(server, "build_resources")
+        first = store.get("/palettes.json")
+        store.get("/palettes.json")
+        with open(store.yaml_path, "a", encoding="utf-8") as file:
+            file.write("    # Changed\n")
+
+        # Act
+        second = store.get("/palettes.json")
+
+        # Assert
+        assert spy.call_count == 2
+        assert second == first
+        assert store.get("/missing") is None
+
+    def test_store_loads_palette_dir(
+        self, mocker, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that palettes.d/ is merged, and rebuilt when a file is added."""
+        # Arrange
+        spy = mocker.spy(server, "build_resources")
+        store.get("/palettes.json")
+        palette_dir = os.path.join(os.path.dirname(store.yaml_path), "palettes.d")
+        os.mkdir(palette_dir)
+        with open(
+            os.path.join(palette_dir, "library.yml"), "w", encoding="utf-8"
+        ) as file:
+            file.write(PALETTES_YAML.replace("Exam Types", "Library Visits"))
+
+        # Act
+        resource = store.get("/palettes.json")
+
+        # Assert
+        assert spy.call_count == 2
+        assert resource is not None
+        names = [palette["name"] for palette in json.loads(resource.body)["palettes"]]
+        assert names == ["Exam Types", "Library Visits"]
+        assert store.get("/palettes/library_visits.json") is not None
+
+    def test_store_keeps_resources_on_error(
+        self, mocker, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a broken palettes.yml keeps the last good resources."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+        first = store.get("/palettes.json")
+        with open(store.yaml_path, "w", encoding="utf-8") as file:
+            file.write("palettes: [\n")
+
+        # Act
+        second = store.get("/palettes.json")
+
+        # Assert
+        assert second == first
+        assert mock_print.call_args.args[0].startswith("Failed to load")
+
+    def test_store_keeps_resources_while_file_missing(
+        self, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a palettes.yml renamed away mid-save keeps the resources."""
+        # Arrange
+        first = store.get("/palettes.json")
+        os.rename(store.yaml_path, f"{store.yaml_path}.bak")
+
+        # Act
+        second = store.get("/palettes.json")
+
+        # Assert
+        assert second == first
+
+    def test_store_raises_on_first_missing_file(
+        self, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a missing palettes.yml fails if there is nothing to serve."""
+        os.remove(store.yaml_path)
+        with pytest.raises(FileNotFoundError):
+            store.refresh()
+
+    def test_refresh_async_reloads_on_a_thread_once(
+        self, mocker, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that concurrent requests share one reload run off the event loop."""
+        # Arrange
+        to_thread = mocker.spy(asyncio, "to_thread")
+
+        async def run():
+            return await asyncio.gather(
+                store.refresh_async(), store.refresh_async(), store.refresh_async()
+            )
+
+        # Act
+        results = asyncio.run(run())
+
+        # Assert
+        to_thread.assert_called_once()
+        assert to_thread.call_args.args[0] == store.reload
+        assert results[0] is results[1] is results[2]
+        assert "/palettes.json" in results[0]
+
+    def test_store_raises_on_first_error(
+        self, mocker, store
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a broken palettes.yml fails if there is nothing to serve."""
+        mocker.patch("builtins.print")
+        with open(store.yaml_path, "w", encoding="utf-8") as file:
+            file.write("colors: []\n")
+        with pytest.raises(ValueError, match="palettes"):
+            store.get("/palettes.json")
+
+
+class TestHeaders:
+    """Tests for the Accept-Encoding and If-None-Match headers."""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("gzip", True),
+            ("deflate, gzip;q=0.5", True),
+            ("gzip;level=1", True),
+            ("*", True),
+            ("gzip;q=0", False),
+            ("gzip;q=x", False),
+            ("identity", False),
+            ("", False),
+        ],
+    )
+    def test_accepts_gzip(self, header, expected):
+        """Test parsing the Accept-Encoding header."""
+        assert server.accepts_gzip(header) is expected
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ('"a"', True),
+            ('"b", "a"', True),
+            ('W/"a"', True),
+            ("*", True),
+            ('"b"', False),
+            ("", False),
+        ],
+    )
+    def test_etag_matches(self, header, expected):
+        """Test the weak comparison of If-None-Match with an ETag."""
+        assert server.etag_matches(header, '"a"') is expected
+
+
+class TestRespond:
+    """Tests for the respond() function."""
+
+    def test_plain_response(self, store):  # pylint: disable=redefined-outer-name
+        """Test a response without compression, ignoring the query string."""
+        # Act
+        response = server.respond(store.refresh(), "GET", "/palettes.json?x=1", {})
+
+        # Assert
+        resource = store.get("/palettes.json")
+        assert response.status == 200
+        assert response.body == resource.body
+        headers = dict(response.headers)
+        assert headers["ETag"] == resource.etag
+        assert headers["Content-Length"] == str(len(resource.body))
+        assert "Content-Encoding" not in headers
+
+    def test_gzip_and_not_modified(self, store):  # pylint: disable=redefined-outer-name
+        """Test a gzip response and a conditional request for it."""
+        # Arrange
+        path = "/r_script/ir_color_palettes.R"
+        first = server.respond(
+            store.refresh(), "GET", path, {"accept-encoding": "gzip"}
+        )
+        etag = dict(first.headers)["ETag"]
+
+        # Act
+        second = server.respond(
+            store.refresh(),
+            "GET",
+            path,
+            {"accept-encoding": "gzip", "if-none-match": etag},
+        )
+        plain = server.respond(store.refresh(), "GET", path, {"if-none-match": etag})
+
+        # Assert
+        assert dict(first.headers)["Content-Encoding"] == "gzip"
+        assert first.body == store.get(path).gzip_body
+        assert second.status == 304
+        assert not second.body
+        assert plain.status == 200
+
+    def test_head(self, store):  # pylint: disable=redefined-outer-name
+        """Test that HEAD requests get the headers without the body."""
+        response = server.respond(
+            store.refresh(), "HEAD", "/palettes/exam_types.json", {}
+        )
+        assert response.status == 200
+        assert int(dict(response.headers)["Content-Length"]) > 0
+        assert not response.body
+
+    def test_errors(self, store):  # pylint: disable=redefined-outer-name
+        """Test responses to unknown paths and unsupported methods."""
+        not_found = server.respond(store.refresh(), "GET", "/missing", {})
+        assert not_found.status == 404
+        assert not_found.body == b"Not Found\n"
+        not_allowed = server.respond(store.refresh(), "POST", "/palettes.json", {})
+        assert not_allowed.status == 405
+        assert ("Allow", "GET, HEAD") in not_allowed.headers
+
+
+class TestProtocol:
+    """Tests for parsing requests and encoding responses."""
+
+    def test_parse_request(self):
+        """Test parsing the request line and headers."""
+        assert server.parse_request(
+            b'GET /palettes.json HTTP/1.1\r\nHost: x\r\nIf-None-Match: "a"\r\n\r\n'
+        ) == (
+            "GET",
+            "/palettes.json",
+            "HTTP/1.1",
+            {"host": "x", "if-none-match": '"a"'},
+        )
+
+    @pytest.mark.parametrize(
+        "head",
+        [
+            b"GET /\r\n\r\n",
+            b"GET / HTTP/2\r\n\r\n",
+            b"GET palettes.json HTTP/1.1\r\n\r\n",
+            b"GET / HTTP/1.1\r\nNo colon\r\n\r\n",
+        ],
+    )
+    def test_parse_request_invalid(self, head):
+        """Test that malformed requests are rejected."""
+        with pytest.raises(ValueError):
+            server.parse_request(head)
+
+    def test_encode_response(self):
+        """Test the status line, headers and connection header of a response."""
+        response = server.Response(200, [("Content-Length", "2")], b"ok")
+        assert server.encode_response(response, keep_alive=False) == (
+            b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok"
+        )
+
+
+class TestConnection:
+    """Tests for handling client connections."""
+
+    @staticmethod
+    def exchange(mocker, resource_store, data: bytes) -> bytes:
+        """Feed requests to a connection and collect everything written back."""
+        writer = mocker.MagicMock()
+        writer.drain = mocker.AsyncMock()
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            await server.handle_connection(resource_store, reader, writer)
+
+        asyncio.run(run())
+        writer.close.assert_called_once()
+        return b"".join(call.args[0] for call in writer.write.call_args_list)
+
+    def test_keep_alive(self, mocker, store):  # pylint: disable=redefined-outer-name
+        """Test that HTTP/1.1 connections answer requests until the client closes."""
+        output = self.exchange(
+            mocker,
+            store,
+            b"GET /palettes.json HTTP/1.1\r\n\r\n"
+            b"HEAD /missing HTTP/1.1\r\nContent-Length: 2\r\n\r\nxx",
+        )
+        assert output.startswith(b"HTTP/1.1 200 OK\r\n")
+        assert output.count(b"Connection: keep-alive") == 2
+        assert b"HTTP/1.1 404 Not Found" in output
+
+    @pytest.mark.parametrize(
+        "request_head",
+        [
+            b"GET /palettes.json HTTP/1.0\r\n\r\n",
+            b"GET /palettes.json HTTP/1.1\r\nConnection: close\r\n\r\n",
+        ],
+    )
+    def test_close(
+        self, mocker, store, request_head
+    ):  # pylint: disable=redefined-outer-name
+        """Test that the connection is closed after the response when requested."""
+        output = self.exchange(mocker, store, request_head * 2)
+        assert output.count(b"HTTP/1.1 200 OK") == 1
+        assert b"Connection: close" in output
+
+    def test_bad_requests(self, mocker, store):  # pylint: disable=redefined-outer-name
+        """Test that malformed requests close the connection."""
+        output = self.exchange(mocker, store, b"BAD\r\n\r\nGET / HTTP/1.1\r\n\r\n")
+        assert output.startswith(b"HTTP/1.1 400 Bad Request\r\n")
+        invalid_length = b"GET / HTTP/1.1\r\nContent-Length: x\r\n\r\n"
+        assert not self.exchange(mocker, store, invalid_length)
+
+
+class TestServe:
+    """Tests for the serve() and main() functions."""
+
+    def test_serve(self, mocker, store):  # pylint: disable=redefined-outer-name
+        """Test serving requests over a socket."""
+        # Arrange
+        mock_print = mocker.patch("builtins.print")
+
+        async def run() -> bytes:
+            task = asyncio.create_task(server.serve(store, "127.0.0.1", 0))
+            while not mock_print.called:
+                await asyncio.sleep(0.01)
+            port = int(mock_print.call_args.args[0].split(":")[2].split("/")[0])
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /palettes.json HTTP/1.0\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            task.cancel()
+            return response
+
+        # Act
+        response = asyncio.run(run())
+
+        # Assert
+        assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+        assert response.endswith(store.get("/palettes.json").body)
+
+    def test_main(self, mocker, tmp_path):
+        """Test that main renders the resources and serves them until interrupted."""
+        # Arrange
+        (tmp_path / "palettes.yml").write_text(PALETTES_YAML, encoding="utf-8")
+        mocker.patch("scripts.server.get_repo_root", return_value=str(tmp_path))
+        mock_serve = mocker.patch("scripts.server.serve")
+        mock_run = mocker.patch("asyncio.run", side_effect=KeyboardInterrupt)
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        server.main(["--port", "9000"])
+
+        # Assert
+        resource_store, host, port = mock_serve.call_args.args
+        assert resource_store.yaml_path == os.path.join(str(tmp_path), "palettes.yml")
+        assert (host, port) == ("127.0.0.1", 9000)
+        mock_run.assert_called_once()
+        mock_run.call_args.args[0].close()
+        mock_print.assert_called_once_with("Server stopped.")
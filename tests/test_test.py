@@ -2,24 +2,343 @@
 Unit tests for ./scripts/test.py
 """
 
+import os
+import threading
+
+import pytest
+
 from scripts import test
+from scripts.formatter import ToolResult
 
 
-def test_main(mocker):
-    """
-    Test for the main function in test.py.
-    """
-    # Arrange
-    mock_subprocess = mocker.patch("subprocess.run")
+def make_stage(name, depends_on=(), returncode=0, calls=None, **kwargs):
+    """Create a stage whose inputs are Python files and which records its runs."""
 
-    # Act
-    test.main()
+    def run(_repo_root):
+        if calls is not None:
+            calls.append(name)
+        return ToolResult(name, returncode, f"{name} output\n")
 
-    # Assert
-    mock_subprocess.assert_has_calls(
-        [
-            mocker.call(["poetry", "run", "linter"], check=True),
-            mocker.call(["poetry", "run", "pytest"], check=True),
-        ],
-        any_order=False,
+    return test.Stage(
+        name, depends_on, lambda path: path.endswith(".py"), run, **kwargs
     )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Repository with a Python module and a Markdown file."""
+    (tmp_path / "module.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "README.md").write_text("# Title\n", encoding="utf-8")
+    return str(tmp_path)
+
+
+class TestInputs:
+    """Tests for the input predicates of the stages."""
+
+    def test_format_inputs(self):
+        """Test that formatted files and formatter configs are format inputs."""
+        assert test.is_format_input("README.md")
+        assert test.is_format_input("scripts/build.py")
+        assert test.is_format_input(".prettierrc")
+        assert not test.is_format_input("LICENSE")
+
+    def test_lint_inputs(self):
+        """Test that Python files and pyproject.toml are lint inputs."""
+        assert test.is_lint_input("scripts/build.py")
+        assert test.is_lint_input("pyproject.toml")
+        assert not test.is_lint_input("palettes.yml")
+
+    def test_test_inputs(self):
+        """Test that the data files read by the tests are test inputs."""
+        assert test.is_test_input("tests/test_build.py")
+        assert test.is_test_input("palettes.yml")
+        assert test.is_test_input("tableau/Preferences.tps")
+        assert test.is_test_input("r_script/ir_color_palettes.R")
+        assert not test.is_test_input("README.md")
+
+
+class TestStages:
+    """Tests for the stage definitions."""
+
+    def test_get_stages(self):
+        """Test that formatting runs before the other stages."""
+        stages = test.get_stages()
+        assert [stage.name for stage in stages] == [
+            "format",
+            "typecheck",
+            "lint",
+            "tests",
+        ]
+        assert all(stage.depends_on == ("format",) for stage in stages[1:])
+        assert stages[0].rewrites_inputs
+
+    def test_tool_stages(self, mocker):
+        """Test that the tool stages run their commands in the repository root."""
+        # Arrange
+        mock_run = mocker.patch(
+            "scripts.linter.run_linter", return_value=ToolResult("x", 0, "")
+        )
+        mocker.patch("sys.executable", "python")
+
+        # Act
+        for stage in test.get_stages()[1:]:
+            stage.run("/repo")
+
+        # Assert
+        commands = [call.args[1] for call in mock_run.call_args_list]
+        assert commands[0][1:4] == ["-m", "mypy", "--incremental"]
+        assert commands[1][1:3] == ["-m", "pylint"]
+        assert commands[2] == ["python", "-m", "pytest"]
+        assert all(call.args[2] == "/repo" for call in mock_run.call_args_list)
+
+    def test_run_format(self, mocker):
+        """Test that the format stage formats the changed files concurrently."""
+        mock_format = mocker.patch("scripts.formatter.format_changed_files")
+        assert test.run_format("/repo") == ToolResult("format", 0, "")
+        mock_format.assert_called_once_with("/repo", concurrent=True)
+
+    def test_run_format_failure(self, mocker):
+        """Test that a formatter failure fails the format stage."""
+        mocker.patch(
+            "scripts.formatter.format_changed_files", side_effect=SystemExit(1)
+        )
+        assert test.run_format("/repo").returncode == 1
+
+
+class TestRunStage:
+    """Tests for the run_stage() function."""
+
+    def test_digest_depends_on_inputs(
+        self, repo
+    ):  # pylint: disable=redefined-outer-name
+        """Test that only input files affect the stage digest."""
+        # Arrange
+        stage = make_stage("stage")
+        files = ["module.py", "README.md", "deleted.py"]
+        digest = test.get_stage_digest(repo, stage, files)
+
+        # Act & Assert
+        with open(os.path.join(repo, "README.md"), "w", encoding="utf-8") as f:
+            f.write("# Changed\n")
+        assert test.get_stage_digest(repo, stage, files) == digest
+        with open(os.path.join(repo, "module.py"), "w", encoding="utf-8") as f:
+            f.write("x = 2\n")
+        assert test.get_stage_digest(repo, stage, files) != digest
+        assert test.get_stage_digest(repo, make_stage("other"), files) != digest
+
+    def test_unchanged_stage_is_cached(
+        self, repo, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a stage passing twice with the same inputs runs once."""
+        # Arrange
+        calls = []
+        stage = make_stage("stage", calls=calls)
+        cache = {}
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        first = test.run_stage(repo, stage, ["module.py"], cache)
+        second = test.run_stage(repo, stage, ["module.py"], cache)
+
+        # Assert
+        assert (first, second) == (test.PASSED, test.CACHED)
+        assert calls == ["stage"]
+        mock_print.assert_has_calls(
+            [
+                mocker.call("stage output\nstage: passed"),
+                mocker.call("stage: cached"),
+            ]
+        )
+
+    def test_failed_stage_is_not_cached(
+        self, repo, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a failed stage is run again and clears its cache entry."""
+        # Arrange
+        calls = []
+        stage = make_stage("stage", returncode=1, calls=calls)
+        cache = {"stage": "outdated"}
+        mocker.patch("builtins.print")
+
+        # Act
+        test.run_stage(repo, stage, ["module.py"], cache)
+        status = test.run_stage(repo, stage, ["module.py"], cache)
+
+        # Assert
+        assert status == test.FAILED
+        assert calls == ["stage", "stage"]
+        assert not cache
+
+    def test_rewriting_stage_caches_rewritten_inputs(
+        self, repo, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a stage rewriting its inputs is cached against the result."""
+
+        # Arrange
+        def rewrite(repo_root):
+            with open(os.path.join(repo_root, "module.py"), "w", encoding="utf-8") as f:
+                f.write("x = 3\n")
+            return ToolResult("format", 0, "")
+
+        stage = test.Stage(
+            "format", (), lambda path: True, rewrite, rewrites_inputs=True
+        )
+        cache = {}
+        mocker.patch("builtins.print")
+
+        # Act
+        test.run_stage(repo, stage, ["module.py"], cache)
+
+        # Assert
+        assert cache["format"] == test.get_stage_digest(repo, stage, ["module.py"])
+
+
+class TestRunStages:
+    """Tests for the run_stages() function."""
+
+    def test_independent_stages_run_in_parallel(
+        self, repo, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that stages with no dependency between them run at the same time."""
+        # Arrange
+        barrier = threading.Barrier(2, timeout=5)
+
+        def run(_repo_root):
+            barrier.wait()
+            return ToolResult("x", 0, "")
+
+        stages = [
+            make_stage("first"),
+            test.Stage("a", ("first",), lambda path: False, run),
+            test.Stage("b", ("first",), lambda path: False, run),
+        ]
+        mocker.patch("builtins.print")
+
+        # Act
+        statuses = test.run_stages(repo, stages, ["module.py"], {})
+
+        # Assert
+        assert statuses == {"first": "passed", "a": "passed", "b": "passed"}
+
+    def test_dependents_of_failed_stage_are_skipped(
+        self, repo, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that stages depending on a failed stage, directly or not, are skipped."""
+        # Arrange
+        calls = []
+        stages = [
+            make_stage("first", returncode=1, calls=calls),
+            make_stage("second", ("first",), calls=calls),
+            make_stage("third", ("second",), calls=calls),
+        ]
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        statuses = test.run_stages(repo, stages, ["module.py"], {})
+
+        # Assert
+        assert statuses == {"first": "failed", "second": "skipped", "third": "skipped"}
+        assert calls == ["first"]
+        mock_print.assert_any_call("third: skipped")
+
+    def test_unknown_dependency(self, repo):  # pylint: disable=redefined-outer-name
+        """Test that a dependency on an unknown stage raises ValueError."""
+        with pytest.raises(ValueError, match="Unresolvable stage dependencies: a"):
+            test.run_stages(repo, [make_stage("a", ("missing",))], [], {})
+
+    def test_no_stages(self, repo):  # pylint: disable=redefined-outer-name
+        """Test that running no stages returns no statuses."""
+        assert not test.run_stages(repo, [], [], {})
+
+
+class TestMain:
+    """Tests for the main() function."""
+
+    @pytest.fixture
+    def stages(self, mocker):
+        """Patch the stages with two stages recording their runs."""
+        calls = []
+        mocker.patch(
+            "scripts.test.get_stages",
+            return_value=[
+                make_stage("format", calls=calls),
+                make_stage("tests", ("format",), calls=calls),
+            ],
+        )
+        return calls
+
+    def test_main(self, repo, stages, mocker):  # pylint: disable=redefined-outer-name
+        """Test that a second run reports every stage as cached."""
+        # Arrange
+        mocker.patch("scripts.formatter.get_repo_root", return_value=repo)
+        mocker.patch(
+            "scripts.formatter.list_repository_files", return_value=["module.py"]
+        )
+        mock_print = mocker.patch("builtins.print")
+
+        # Act
+        test.main([])
+        test.main([])
+
+        # Assert
+        assert stages == ["format", "tests"]
+        mock_print.assert_has_calls(
+            [
+                mocker.call("Summary:"),
+                mocker.call("  format     cached"),
+                mocker.call("  tests      cached"),
+            ]
+        )
+
+    def test_main_force(
+        self, repo, stages, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that --force runs every stage again."""
+        # Arrange
+        mocker.patch("scripts.formatter.get_repo_root", return_value=repo)
+        mocker.patch(
+            "scripts.formatter.list_repository_files", return_value=["module.py"]
+        )
+        mocker.patch("builtins.print")
+
+        # Act
+        test.main([])
+        test.main(["--force"])
+
+        # Assert
+        assert stages == ["format", "tests", "format", "tests"]
+
+    def test_main_invalid_cache(
+        self, repo, stages, mocker
+    ):  # pylint: disable=redefined-outer-name
+        """Test that a cache from another version is ignored."""
+        # Arrange
+        mocker.patch("scripts.formatter.get_repo_root", return_value=repo)
+        mocker.patch(
+            "scripts.formatter.list_repository_files", return_value=["module.py"]
+        )
+        mocker.patch("builtins.print")
+        test.main([])
+        mocker.patch("scripts.test.STAGE_CACHE_VERSION", 0)
+
+        # Act
+        test.main([])
+
+        # Assert
+        assert stages == ["format", "tests", "format", "tests"]
+
+    def test_main_failure(self, repo, mocker):  # pylint: disable=redefined-outer-name
+        """Test that a failed stage exits with a non-zero status."""
+        # Arrange
+        mocker.patch("scripts.formatter.get_repo_root", return_value=repo)
+        mocker.patch("scripts.formatter.list_repository_files", return_value=[])
+        mocker.patch(
+            "scripts.test.get_stages",
+            return_value=[make_stage("format", returncode=1)],
+        )
+        mocker.patch("builtins.print")
+
+        # Act & Assert
+        with pytest.raises(SystemExit) as exc_info:
+            test.main([])
+        assert exc_info.value.code == 1
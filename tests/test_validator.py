@@ -0,0 +1,226 @@
+"""
+Unit tests for ./scripts/validator.py
+"""
+
+import pickle
+import textwrap
+
+import pytest
+import yaml
+
+from scripts import validator
+from scripts.validator import ValidationError
+
+VALID_YAML = """\
+organization:
+  name: 'Test'
+palettes:
+  - name: 'First'
+    type: 'categorical'
+    description: 'First palette'
+    colors:
+      - key: 'A'
+        value: '#ff0000'
+      - key: 1
+        value: '#00FF00'
+  - name: 'Second'
+    type: 'diverging'
+    colors:
+      - key: 'A'
+        value: '#ff0000'
+"""
+
+
+def validate(text):
+    """Validate dedented YAML text with the loader used by the build."""
+    return validator.validate_node(yaml.compose(textwrap.dedent(text)))
+
+
+class TestFindInvalidHex:
+    """Tests for the find_invalid_hex() function."""
+
+    def test_find_invalid_hex(self):
+        """Test that all invalid values are found in one call."""
+        values = ["#ff0000", "#FF0000", "ff0000", "#ff00", "#gg0000", "", "#ff0000 "]
+        assert validator.find_invalid_hex(values) == {
+            "ff0000",
+            "#ff00",
+            "#gg0000",
+            "",
+            "#ff0000 ",
+        }
+
+    def test_values_with_newlines(self):
+        """Test that values spanning lines can't pass as several valid lines."""
+        assert validator.find_invalid_hex(["#ff0000\n#00ff00", "#ffffff"]) == {
+            "#ff0000\n#00ff00"
+        }
+
+    def test_no_values(self):
+        """Test that no values yield no invalid values."""
+        assert not validator.find_invalid_hex([])
+
+
+class TestValidateNode:
+    """Tests for the validate_node() function."""
+
+    def test_valid_document(self):
+        """Test that a valid document has no errors."""
+        assert not validate(VALID_YAML)
+
+    @pytest.mark.parametrize("text", ["", "organization: {}\n", "- palettes\n"])
+    def test_missing_palettes_key(self, text):
+        """Test that a document without 'palettes' raises ValueError."""
+        with pytest.raises(ValueError, match="YAML file must contain 'palettes' key"):
+            validate(text)
+
+    def test_reports_every_error_with_position(self):
+        """Test that all errors are reported in document order with positions."""
+        # Act
+        errors = validate(
+            """\
+            palettes:
+              - name: 'First'
+                type: 'qualitative'
+                colors:
+                  - key: 'A'
+                    value: '#ff000'
+                  - key: 'A'
+                    value: 'red'
+              - name: 'First'
+                description: 3
+                colors:
+                  - value: '#000000'
+                  - key: ''
+                  - 'B'
+                  - key: 'C'
+                    value: 0x000000
+            """
+        )
+
+        # Assert
+        assert errors == [
+            ValidationError(
+                3,
+                11,
+                "Palette 'First' has invalid type 'qualitative' "
+                "(expected one of: categorical, sequential, diverging)",
+            ),
+            ValidationError(
+                6, 16, "Invalid hex color '#ff000' (expected #rrggbb format)"
+            ),
+            ValidationError(
+                7,
+                14,
+                "Palette 'First' has duplicate color key 'A' (first defined at line 5)",
+            ),
+            ValidationError(8, 16, "Invalid hex color 'red' (expected #rrggbb format)"),
+            ValidationError(9, 5, "Palette 'First' is missing required key 'type'"),
+            ValidationError(
+                9, 11, "Duplicate palette name 'First' (first defined at line 2)"
+            ),
+            ValidationError(10, 18, "Palette 'First' description must be a string"),
+            ValidationError(
+                12, 9, "Palette 'First' color is missing required key 'key'"
+            ),
+            ValidationError(
+                13, 9, "Palette 'First' color is missing required key 'value'"
+            ),
+            ValidationError(
+                13, 14, "Palette 'First' color key must be a non-empty scalar"
+            ),
+            ValidationError(14, 9, "Palette 'First' color must be a mapping"),
+            ValidationError(
+                16, 16, "Palette 'First' color value must be a hex color string"
+            ),
+        ]
+
+    def test_duplicate_mapping_keys(self):
+        """Test that duplicate keys, which loaders silently overwrite, are found."""
+        errors = validate(
+            """\
+            palettes:
+              - name: 'First'
+                type: 'categorical'
+                type: 'sequential'
+                colors:
+                  - key: 'A'
+                    value: '#000000'
+                    value: '#ffffff'
+            """
+        )
+        assert errors == [
+            ValidationError(4, 5, "Duplicate key 'type' (first defined at line 3)"),
+            ValidationError(8, 9, "Duplicate key 'value' (first defined at line 7)"),
+        ]
+
+    def test_invalid_structure(self):
+        """Test errors for values of the wrong kind."""
+        errors = validate(
+            """\
+            palettes:
+              - 'First'
+              - name: ['First']
+                type: ['categorical']
+                colors: []
+              - ? ['complex key']
+                : 'value'
+                name: 'Third'
+                type: 'sequential'
+                colors: 'A'
+              - type: 'sequential'
+            """
+        )
+        assert [str(error) for error in errors] == [
+            "line 2, column 5: Palette must be a mapping",
+            "line 3, column 11: Palette name must be a non-empty string",
+            "line 4, column 11: Palette '(unnamed)' has invalid type '' "
+            "(expected one of: categorical, sequential, diverging)",
+            "line 5, column 13: Palette '(unnamed)' colors must be a non-empty list",
+            "line 10, column 13: Palette 'Third' colors must be a non-empty list",
+            "line 11, column 5: Palette '(unnamed)' is missing required key 'colors'",
+            "line 11, column 5: Palette '(unnamed)' is missing required key 'name'",
+        ]
+
+    def test_palettes_not_a_list(self):
+        """Test that 'palettes' must be a list."""
+        assert validate("palettes: 'none'\n") == [
+            ValidationError(1, 11, "'palettes' must be a list")
+        ]
+
+
+class TestLoadValidated:
+    """Tests for the load_validated() function."""
+
+    def test_load_validated(self):
+        """Test that a valid document is constructed from the validated tree."""
+        data = validator.load_validated(VALID_YAML, "palettes.yml", yaml.SafeLoader)
+        assert data == yaml.safe_load(VALID_YAML)
+
+    def test_load_validated_errors(self):
+        """Test that all errors are raised together with the file path."""
+        # Arrange
+        text = "palettes:\n  - name: 'First'\n  - name: 'First'\n"
+
+        # Act
+        with pytest.raises(validator.PaletteValidationError) as exc_info:
+            validator.load_validated(text, "palettes.yml", yaml.SafeLoader)
+
+        # Assert
+        error = exc_info.value
+        assert isinstance(error, ValueError)
+        assert error.path == "palettes.yml"
+        assert len(error.errors) == 5
+        assert str(error).splitlines()[:3] == [
+            "palettes.yml has 5 error(s):",
+            "  line 2, column 5: Palette 'First' is missing required key 'colors'",
+            "  line 2, column 5: Palette 'First' is missing required key 'type'",
+        ]
+        unpickled = pickle.loads(pickle.dumps(error))
+        assert (unpickled.path, unpickled.errors) == (error.path, error.errors)
+        assert str(unpickled) == str(error)
+
+    def test_load_validated_malformed(self):
+        """Test that malformed YAML raises yaml.YAMLError."""
+        with pytest.raises(yaml.YAMLError):
+            validator.load_validated("palettes: [", "palettes.yml", yaml.SafeLoader)
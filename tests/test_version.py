@@ -10,29 +10,109 @@ CURRENT_VERSION = "1.2.3"
 NEW_VERSION_PATCH = "1.2.4"
 
 
-def test_get_version(mocker):
+PYPROJECT_TEXT = (
+    "[project]\r\n"
+    'name = "pkg_name"\r\n'
+    f'version = "{CURRENT_VERSION}"\r\n'
+    "\r\n"
+    "[tool.other]\r\n"
+    'version = "9.9.9"\r\n'
+)
+
+
+@pytest.fixture
+def pyproject(tmp_path, monkeypatch):
+    """Working directory with a pyproject.toml using CRLF line endings."""
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "pyproject.toml"
+    path.write_bytes(PYPROJECT_TEXT.encode("utf-8"))
+    return path
+
+
+def test_get_version(pyproject):  # pylint: disable=redefined-outer-name,unused-argument
     """
     Check that get_version() correctly retrieves the version number.
     """
-    # Arrange
-    mocker.patch(
-        "subprocess.run", return_value=mocker.Mock(stdout=f"pkg_name {CURRENT_VERSION}")
-    )
-
     # Act & Assert
     assert version.get_version() == CURRENT_VERSION
 
 
-def test_get_branch(mocker):
+@pytest.mark.parametrize(
+    "version_type, expected",
+    [("major", "2.0.0"), ("minor", "1.3.0"), ("patch", NEW_VERSION_PATCH)],
+)
+def test_increment_version(version_type, expected):
+    """
+    Check that increment_version() bumps the version like `poetry version`.
+    """
+    assert version.increment_version(CURRENT_VERSION, version_type) == expected
+
+
+def test_increment_version_invalid():
+    """
+    Check that a ValueError is raised for a version not in X.Y.Z format.
+    """
+    with pytest.raises(ValueError, match="Version is not in X.Y.Z format: 1.2.3a1"):
+        version.increment_version("1.2.3a1", "patch")
+
+
+def test_update_pyproject_version(pyproject):  # pylint: disable=redefined-outer-name
     """
-    Check that get_branch() correctly retrieves the branch name.
+    Check that update_pyproject_version() only updates the [project] version,
+    leaving the rest of the file byte-for-byte untouched.
+    """
+    # Act
+    version.update_pyproject_version(CURRENT_VERSION, NEW_VERSION_PATCH)
+
+    # Assert
+    assert pyproject.read_bytes() == PYPROJECT_TEXT.replace(
+        CURRENT_VERSION, NEW_VERSION_PATCH
+    ).encode("utf-8")
+    assert version.get_version() == NEW_VERSION_PATCH
+
+
+def test_update_pyproject_version_mismatch(
+    pyproject,
+):  # pylint: disable=redefined-outer-name
+    """
+    Check that a RuntimeError is raised when the current version isn't found,
+    and that pyproject.toml is left untouched.
+    """
+    # Act & Assert
+    with pytest.raises(RuntimeError, match='No version = "9.9.9" in the'):
+        version.update_pyproject_version("9.9.9", "9.9.10")
+    assert pyproject.read_bytes() == PYPROJECT_TEXT.encode("utf-8")
+
+
+def test_get_git_status(mocker):
+    """
+    Check that get_git_status() returns the lines of a single status query.
     """
     # Arrange
-    branch_name = "my-branch-name"
-    mocker.patch("subprocess.run", return_value=mocker.Mock(stdout=branch_name))
+    mock_subprocess_run = mocker.patch(
+        "subprocess.run",
+        return_value=mocker.Mock(stdout="## main...origin/main\n M README.md\n"),
+    )
 
     # Act & Assert
-    assert version.get_branch() == branch_name
+    assert version.get_git_status() == ["## main...origin/main", " M README.md"]
+    mock_subprocess_run.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("## main...origin/main", "main"),
+        ("## my-branch-name...origin/my-branch-name [ahead 1]", "my-branch-name"),
+        ("## my-branch-name", "my-branch-name"),
+        ("## No commits yet on main", "main"),
+    ],
+)
+def test_get_branch(header, expected):
+    """
+    Check that get_branch() correctly retrieves the branch name from the status.
+    """
+    assert version.get_branch([header]) == expected
 
 
 def test_update_init_py_version(mocker):
@@ -67,8 +147,9 @@ def test_git_add_commit_version_tag(mocker):
     # Assert
     mock_subprocess_run.assert_has_calls(
         [
-            mocker.call(["git", "add", "scripts/__init__.py"], check=True),
-            mocker.call(["git", "add", "pyproject.toml"], check=True),
+            mocker.call(
+                ["git", "add", "scripts/__init__.py", "pyproject.toml"], check=True
+            ),
             mocker.call(
                 ["git", "commit", "-m", f"Bump version to {NEW_VERSION_PATCH}"],
                 check=True,
@@ -84,44 +165,30 @@ class TestIsCleanMainBranch:
     Test suite for is_clean_main_branch function
     """
 
-    def test_is_clean_main_branch_success(self, mocker):
+    def test_is_clean_main_branch_success(self):
         """
         Check that True is returned when on the main branch
         with no uncommitted or unpushed changes.
         """
-        # Arrange
-        mocker.patch(
-            "subprocess.run", return_value=mocker.Mock(stdout="## main...origin/main")
-        )
-
         # Act & Assert
-        assert version.is_clean_main_branch() is True
+        assert version.is_clean_main_branch(["## main...origin/main"]) is True
 
-    def test_is_clean_main_branch_not_main_branch(self, mocker):
+    def test_is_clean_main_branch_not_main_branch(self):
         """
         Check that False is returned when not on the main branch.
         """
-        # Arrange
-        mocker.patch(
-            "subprocess.run",
-            return_value=mocker.Mock(stdout="## not-main...origin/not-main"),
-        )
-
         # Act & Assert
-        assert version.is_clean_main_branch() is False
+        assert version.is_clean_main_branch(["## not-main...origin/not-main"]) is False
 
-    def test_is_clean_main_branch_uncommitted_changes(self, mocker):
+    def test_is_clean_main_branch_uncommitted_changes(self):
         """
         Check that False is returned when there are uncommitted changes.
         """
-        # Arrange
-        mocker.patch(
-            "subprocess.run",
-            return_value=mocker.Mock(stdout="## main...origin/main\n M README.md"),
-        )
-
         # Act & Assert
-        assert version.is_clean_main_branch() is False
+        assert (
+            version.is_clean_main_branch(["## main...origin/main", " M README.md"])
+            is False
+        )
 
 
 class TestCheckBranch:
@@ -135,6 +202,7 @@ class TestCheckBranch:
         with no uncommitted or unpushed changes.
         """
         # Arrange
+        mocker.patch("scripts.version.get_git_status", return_value=["## status"])
         mocker.patch("scripts.version.get_branch", return_value="main")
         mocker.patch("scripts.version.is_clean_main_branch", return_value=True)
 
@@ -146,6 +214,7 @@ class TestCheckBranch:
         Check that an error is raised when not on the main branch.
         """
         # Arrange
+        mocker.patch("scripts.version.get_git_status", return_value=["## status"])
         mocker.patch("scripts.version.get_branch", return_value="not-main")
 
         # Act & Assert
@@ -163,6 +232,7 @@ class TestCheckBranch:
         Check that an error is raised when there are uncommitted changes.
         """
         # Arrange
+        mocker.patch("scripts.version.get_git_status", return_value=["## status"])
         mocker.patch("scripts.version.get_branch", return_value="main")
         mocker.patch("scripts.version.is_clean_main_branch", return_value=False)
 
@@ -187,12 +257,12 @@ class TestBumpVersion:
         Check that bump_version function works correctly.
         """
         # Arrange
-        mocker.patch(
-            "scripts.version.get_version",
-            side_effect=[CURRENT_VERSION, NEW_VERSION_PATCH],
-        )
+        mocker.patch("scripts.version.get_version", return_value=CURRENT_VERSION)
         mocker.patch("scripts.version.check_branch")
-        mocker.patch("subprocess.run")
+        mock_subprocess_run = mocker.patch("subprocess.run")
+        mock_update_pyproject_version = mocker.patch(
+            "scripts.version.update_pyproject_version"
+        )
         mock_update_init_py_version = mocker.patch(
             "scripts.version.update_init_py_version"
         )
@@ -205,6 +275,10 @@ class TestBumpVersion:
         version.bump_version("patch")
 
         # Assert
+        mock_subprocess_run.assert_not_called()
+        mock_update_pyproject_version.assert_called_once_with(
+            CURRENT_VERSION, NEW_VERSION_PATCH
+        )
         mock_update_init_py_version.assert_called_once_with(
             CURRENT_VERSION, NEW_VERSION_PATCH
         )
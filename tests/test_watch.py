@@ -0,0 +1,283 @@
+"""
+Unit tests for ./scripts/watch.py
+"""
+
+import os
+
+import pytest
+
+from scripts import watch
+
+INOTIFY_AVAILABLE = isinstance(watch.open_watcher([__file__]), watch.InotifyWatcher)
+
+
+class FakeLibc:
+    """C library whose inotify functions fail."""
+
+    def __init__(self, init_result: int):
+        self.init_result = init_result
+
+    def inotify_init1(self, _flags):
+        """Return the configured file descriptor."""
+        return self.init_result
+
+    def inotify_add_watch(self, _fd, _path, _mask):
+        """Fail to add the watch."""
+        return -1
+
+
+@pytest.mark.skipif(not INOTIFY_AVAILABLE, reason="inotify is not available")
+class TestInotifyWatcher:
+    """Tests for the InotifyWatcher class."""
+
+    def test_detects_changes_to_the_file_only(self, tmp_path):
+        """Test that only events about the watched file count as changes."""
+        # Arrange
+        path = tmp_path / "palettes.yml"
+        path.write_text("a", encoding="utf-8")
+        watcher = watch.open_watcher([str(path)])
+
+        try:
+            # Act & Assert
+            (tmp_path / "other.yml").write_text("b", encoding="utf-8")
+            assert watcher.wait(0.05) is False
+            path.write_text("c", encoding="utf-8")
+            assert watcher.wait(1.0) is True
+        finally:
+            watcher.close()
+
+    def test_detects_replaced_file(self, tmp_path):
+        """Test that saving by renaming a temporary file counts as a change."""
+        # Arrange
+        path = tmp_path / "palettes.yml"
+        path.write_text("a", encoding="utf-8")
+        watcher = watch.open_watcher([str(path)])
+
+        try:
+            # Act
+            (tmp_path / "palettes.yml.tmp").write_text("b", encoding="utf-8")
+            while watcher.wait(0.01):
+                pass
+            os.replace(tmp_path / "palettes.yml.tmp", path)
+
+            # Assert
+            assert watcher.wait(1.0) is True
+            assert not watcher.read_names()
+        finally:
+            watcher.close()
+
+    def test_detects_changes_in_directories(self, tmp_path):
+        """Test that any file counts in a watched directory, named ones elsewhere."""
+        # Arrange
+        palette_dir = tmp_path / "palettes.d"
+        palette_dir.mkdir()
+        paths = [tmp_path / "palettes.yml", tmp_path / "other.yml"]
+        watcher = watch.open_watcher([*map(str, paths), str(palette_dir)])
+
+        try:
+            # Act & Assert
+            assert len(watcher.names) == 2
+            (tmp_path / "unwatched.yml").write_text("a", encoding="utf-8")
+            assert watcher.wait(0.05) is False
+            for path in [*paths, palette_dir / "added.yml"]:
+                path.write_text("b", encoding="utf-8")
+                assert watcher.wait(1.0) is True
+                while watcher.wait(0.01):
+                    pass
+        finally:
+            watcher.close()
+
+    def test_watches_directories_created_later(self, mocker, tmp_path):
+        """Test that a watched path created as a directory is then watched as one."""
+        # Arrange
+        palette_dir = tmp_path / "palettes.d"
+        watcher = watch.open_watcher([str(tmp_path / "palettes.yml"), str(palette_dir)])
+
+        try:
+            # Act & Assert
+            palette_dir.mkdir()
+            assert watcher.wait(1.0) is True
+            assert watcher.directories == {str(palette_dir): palette_dir.stat().st_ino}
+            (palette_dir / "added.yml").write_text("a", encoding="utf-8")
+            assert watcher.wait(1.0) is True
+            # A directory removed before it could be watched is skipped
+            palette_dir.rename(tmp_path / "replaced.d")
+            palette_dir.mkdir()
+            mocker.patch.object(watcher, "add_watch", side_effect=FileNotFoundError)
+            watcher.watch_new_directories()
+            assert watcher.directories != {str(palette_dir): palette_dir.stat().st_ino}
+        finally:
+            watcher.close()
+
+    def test_detects_removed_files_and_directories(self, tmp_path):
+        """Test that removed and renamed files and directories count as changes."""
+        # Arrange
+        path = tmp_path / "palettes.yml"
+        path.write_text("a", encoding="utf-8")
+        palette_dir = tmp_path / "palettes.d"
+        palette_dir.mkdir()
+        (palette_dir / "a.yml").write_text("b", encoding="utf-8")
+        watcher = watch.open_watcher([str(path), str(palette_dir)])
+
+        try:
+            for change in [
+                (palette_dir / "a.yml").unlink,
+                lambda: path.rename(tmp_path / "renamed.yml"),
+                lambda: palette_dir.rename(tmp_path / "renamed.d"),
+                palette_dir.mkdir,
+            ]:
+                # Act
+                change()
+
+                # Assert
+                assert watcher.wait(1.0) is True
+                while watcher.wait(0.01):
+                    pass
+            assert watcher.directories == {str(palette_dir): palette_dir.stat().st_ino}
+        finally:
+            watcher.close()
+
+    def test_detects_removed_parent_directory(self, tmp_path):
+        """Test that removing the directory of a watched file counts as a change."""
+        # Arrange
+        repo_dir = tmp_path / "repo"
+        repo_dir.mkdir()
+        watcher = watch.open_watcher([str(repo_dir / "palettes.yml")])
+
+        try:
+            # Act
+            repo_dir.rename(tmp_path / "moved")
+
+            # Assert
+            assert watcher.wait(1.0) is True
+        finally:
+            watcher.close()
+
+    def test_setup_failures(self, tmp_path):
+        """Test that failing inotify calls raise OSError without leaking descriptors."""
+        # Arrange
+        path = str(tmp_path / "palettes.yml")
+        read_fd, write_fd = os.pipe()
+        os.close(write_fd)
+
+        # Act & Assert
+        with pytest.raises(OSError, match="inotify_init1 failed"):
+            watch.InotifyWatcher([path], FakeLibc(-1))
+        with pytest.raises(OSError, match="inotify_add_watch failed"):
+            watch.InotifyWatcher([path], FakeLibc(read_fd))
+        with pytest.raises(OSError):  # Already closed by the watcher
+            os.close(read_fd)
+
+
+class TestPollingWatcher:
+    """Tests for the PollingWatcher fallback and the watch() function."""
+
+    def test_detects_changes(self, tmp_path):
+        """Test that a changed, deleted or recreated file counts as a change."""
+        # Arrange
+        path = tmp_path / "palettes.yml"
+        path.write_text("a", encoding="utf-8")
+        watcher = watch.PollingWatcher([str(path)], interval=0.001)
+
+        # Act & Assert
+        assert watcher.wait(0.01) is False
+        path.write_text("longer", encoding="utf-8")
+        assert watcher.wait(None) is True
+        path.unlink()
+        assert watcher.wait(0.01) is True
+        assert watcher.signature == [None]
+        watcher.close()
+
+    def test_detects_changes_in_directories(self, tmp_path):
+        """Test that added, changed and removed files of a directory count."""
+        # Arrange
+        palette_dir = tmp_path / "palettes.d"
+        palette_dir.mkdir()
+        path = palette_dir / "finance.yml"
+        watcher = watch.PollingWatcher([str(palette_dir)], interval=0.001)
+
+        # Act & Assert
+        path.write_text("a", encoding="utf-8")
+        assert watcher.wait(None) is True
+        assert watcher.wait(0.01) is False
+        path.write_text("changed", encoding="utf-8")
+        assert watcher.wait(None) is True
+        path.unlink()
+        assert watcher.wait(None) is True
+        assert watcher.signature == [[]]
+
+    def test_falls_back_to_polling(self, mocker, tmp_path):
+        """Test that polling is used when inotify isn't available."""
+        path = str(tmp_path / "palettes.yml")
+        mocker.patch("ctypes.CDLL", return_value=object())
+        assert isinstance(watch.open_watcher([path]), watch.PollingWatcher)
+        mocker.patch("ctypes.CDLL", side_effect=OSError("no libc"))
+        assert isinstance(watch.open_watcher([path]), watch.PollingWatcher)
+
+    def test_watch_debounces_bursts(self, mocker):
+        """Test that a burst of changes results in one call."""
+        # Arrange
+        watcher = mocker.Mock()
+        # A burst of three changes, then the quiet period, then an interruption
+        watcher.wait.side_effect = [True, True, True, False, KeyboardInterrupt]
+        on_change = mocker.Mock()
+
+        # Act
+        with pytest.raises(KeyboardInterrupt):
+            watch.watch(["palettes.yml"], on_change, debounce=0.5, watcher=watcher)
+
+        # Assert
+        on_change.assert_called_once_with()
+        assert watcher.wait.call_args_list[:2] == [mocker.call(None), mocker.call(0.5)]
+        watcher.close.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    "open_watcher",
+    [
+        pytest.param(
+            watch.open_watcher,
+            marks=pytest.mark.skipif(
+                not INOTIFY_AVAILABLE, reason="inotify is not available"
+            ),
+            id="inotify",
+        ),
+        pytest.param(
+            lambda paths: watch.PollingWatcher(paths, interval=0.001), id="polling"
+        ),
+    ],
+)
+@pytest.mark.parametrize("removed", ["palettes.yml", "palettes.d/a.yml"])
+@pytest.mark.parametrize("rename", [False, True])
+def test_watch_rebuilds_on_removed_files(
+    mocker, tmp_path, open_watcher, removed, rename
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Test that deleting or renaming away a palette file calls for a rebuild."""
+    # Arrange
+    (tmp_path / "palettes.yml").write_text("a", encoding="utf-8")
+    (tmp_path / "palettes.d").mkdir()
+    (tmp_path / "palettes.d" / "a.yml").write_text("b", encoding="utf-8")
+    paths = [str(tmp_path / "palettes.yml"), str(tmp_path / "palettes.d")]
+    watcher = open_watcher(paths)
+    wait = watcher.wait
+
+    def wait_briefly(timeout):
+        """Wait at most a second for the first change, instead of indefinitely."""
+        if timeout is None:
+            assert wait(1.0), "No change noticed"
+            return True
+        return wait(timeout)
+
+    mocker.patch.object(watcher, "wait", side_effect=wait_briefly)
+    on_change = mocker.Mock(side_effect=KeyboardInterrupt)
+    if rename:
+        (tmp_path / removed).rename(tmp_path / "renamed")
+    else:
+        (tmp_path / removed).unlink()
+
+    # Act
+    with pytest.raises(KeyboardInterrupt):
+        watch.watch(paths, on_change, debounce=0.01, watcher=watcher)
+
+    # Assert
+    on_change.assert_called_once_with()